@@ -70,7 +70,9 @@ class Change:
             when = datetime2epoch(when)
         change.when = when
 
-        change.files = sorted(chdict['files'])
+        # the files are only sorted when they are first needed, see below
+        change._files = chdict['files']
+        change._files_sorted = False
 
         change.properties = Properties()
         for n, (v, s) in chdict['properties'].items():
@@ -120,7 +122,25 @@ class Change:
         # keep a sorted list of the files, for easier display
         self.files = sorted(files or [])
 
+    @property
+    def files(self):
+        # a change can touch a very large number of files, and most change
+        # filters never look at them, so don't pay for sorting them up front
+        if not self._files_sorted:
+            self._files = sorted(self._files)
+            self._files_sorted = True
+        return self._files
+
+    @files.setter
+    def files(self, files):
+        self._files = files
+        self._files_sorted = True
+
     def __setstate__(self, dict):
+        # Older Changes store their files in a plain 'files' attribute
+        if 'files' in dict:
+            dict['_files'] = dict.pop('files')
+            dict['_files_sorted'] = True
         self.__dict__ = dict
         # Older Changes won't have a 'properties' attribute in them
         if not hasattr(self, 'properties'):
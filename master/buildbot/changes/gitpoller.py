@@ -26,6 +26,8 @@ from buildbot.changes import base
 from buildbot.util import bytes2unicode
 from buildbot.util import private_tempdir
 from buildbot.util import runprocess
+from buildbot.util import service
+from buildbot.util._notifier import Notifier
 from buildbot.util.git import GitMixin
 from buildbot.util.git import getSshKnownHostsContents
 from buildbot.util.misc import writeLocalFile
@@ -37,6 +39,75 @@ class GitError(Exception):
     """Raised when git exits with code 128."""
 
 
+class SharedGitRepository(service.SharedService):
+
+    """Coalesces the fetches of the GitPoller instances that use the same
+    remote repository and the same working directory.
+
+    A fetch retrieves the union of the refspecs of all the pollers sharing
+    the repository, and a poller does not fetch again if its refspecs have
+    been fetched during its last poll interval.
+    """
+
+    def __init__(self, repourl, workdir):
+        super().__init__()
+        self.repourl = repourl
+        self.workdir = workdir
+        self._refspecs = {}
+        self._last_fetch_time = None
+        self._last_fetch_refspecs = frozenset()
+        self._fetching_refspecs = None
+        self._fetch_notifier = Notifier()
+
+    def unregister(self, poller):
+        self._refspecs.pop(poller.name, None)
+
+    def _is_fetched(self, refspecs, max_age):
+        if self._last_fetch_time is None or not refspecs <= self._last_fetch_refspecs:
+            return False
+        return self.master.reactor.seconds() - self._last_fetch_time < max_age
+
+    @defer.inlineCallbacks
+    def fetch(self, poller, refspecs, max_age):
+        refspecs = frozenset(refspecs)
+        self._refspecs[poller.name] = refspecs
+
+        while not self._is_fetched(refspecs, max_age):
+            if self._fetching_refspecs is None:
+                yield self._do_fetch(poller, refspecs)
+                return
+            covered = refspecs <= self._fetching_refspecs
+            fetched = yield self._fetch_notifier.wait()
+            if covered and fetched:
+                return
+
+    @defer.inlineCallbacks
+    def _do_fetch(self, poller, refspecs):
+        all_refspecs = frozenset().union(refspecs, *self._refspecs.values())
+        self._fetching_refspecs = all_refspecs
+        start = self.master.reactor.seconds()
+        fetched = False
+        try:
+            try:
+                yield poller._dovccmd('fetch', ['--progress', self.repourl] + sorted(all_refspecs),
+                                      path=self.workdir)
+            except GitError:
+                if all_refspecs == refspecs:
+                    raise
+                # a branch of another poller may have been removed since its last poll
+                log.msg(f'gitpoller: fetch of all the branches of {self.repourl} failed, '
+                        'retrying with the branches of this poller only')
+                all_refspecs = refspecs
+                yield poller._dovccmd('fetch', ['--progress', self.repourl] + sorted(refspecs),
+                                      path=self.workdir)
+            self._last_fetch_time = start
+            self._last_fetch_refspecs = all_refspecs
+            fetched = True
+        finally:
+            self._fetching_refspecs = None
+            self._fetch_notifier.notify(fetched)
+
+
 class GitPoller(base.ReconfigurablePollingChangeSource, StateMixin, GitMixin):
 
     """This source will poll a remote git repo for changes and submit
@@ -45,10 +116,12 @@ class GitPoller(base.ReconfigurablePollingChangeSource, StateMixin, GitMixin):
     compare_attrs = ("repourl", "branches", "workdir", "pollInterval", "gitbin", "usetimestamps",
                      "category", "project", "pollAtLaunch", "buildPushesWithNoCommits",
                      "sshPrivateKey", "sshHostKey", "sshKnownHosts", "pollRandomDelayMin",
-                     "pollRandomDelayMax")
+                     "pollRandomDelayMax", "batchLog", "branchConcurrency", "coalesceFetches")
 
     secrets = ("sshPrivateKey", "sshHostKey", "sshKnownHosts")
 
+    sharedRepository = None
+
     def __init__(self, repourl, **kwargs):
         name = kwargs.get("name", None)
         if name is None:
@@ -60,7 +133,8 @@ class GitPoller(base.ReconfigurablePollingChangeSource, StateMixin, GitMixin):
                     project=None, pollinterval=-2, fetch_refspec=None, encoding="utf-8",
                     name=None, pollAtLaunch=False, buildPushesWithNoCommits=False,
                     only_tags=False, sshPrivateKey=None, sshHostKey=None, sshKnownHosts=None,
-                    pollRandomDelayMin=0, pollRandomDelayMax=0):
+                    pollRandomDelayMin=0, pollRandomDelayMax=0, batchLog=False,
+                    branchConcurrency=1, coalesceFetches=False):
 
         # for backward compatibility; the parameter used to be spelled with 'i'
         if pollinterval != -2:
@@ -70,6 +144,8 @@ class GitPoller(base.ReconfigurablePollingChangeSource, StateMixin, GitMixin):
             config.error("GitPoller: can't specify only_tags and branch/branches")
         if branch and branches:
             config.error("GitPoller: can't specify both branch and branches")
+        if not isinstance(branchConcurrency, int) or branchConcurrency < 1:
+            config.error("GitPoller: branchConcurrency must be a positive integer")
 
         self.sshPrivateKey = sshPrivateKey
         self.sshHostKey = sshHostKey
@@ -94,7 +170,8 @@ class GitPoller(base.ReconfigurablePollingChangeSource, StateMixin, GitMixin):
                         project=None, pollinterval=-2, fetch_refspec=None, encoding="utf-8",
                         name=None, pollAtLaunch=False, buildPushesWithNoCommits=False,
                         only_tags=False, sshPrivateKey=None, sshHostKey=None, sshKnownHosts=None,
-                        pollRandomDelayMin=0, pollRandomDelayMax=0):
+                        pollRandomDelayMin=0, pollRandomDelayMax=0, batchLog=False,
+                        branchConcurrency=1, coalesceFetches=False):
 
         # for backward compatibility; the parameter used to be spelled with 'i'
         if pollinterval != -2:
@@ -129,6 +206,8 @@ class GitPoller(base.ReconfigurablePollingChangeSource, StateMixin, GitMixin):
         self.sshPrivateKey = sshPrivateKey
         self.sshHostKey = sshHostKey
         self.sshKnownHosts = sshKnownHosts
+        self.batchLog = batchLog
+        self.branchConcurrency = branchConcurrency
         self.setupGit(logname='GitPoller')
 
         if self.workdir is None:
@@ -140,6 +219,13 @@ class GitPoller(base.ReconfigurablePollingChangeSource, StateMixin, GitMixin):
             self.workdir = os.path.join(self.master.basedir, self.workdir)
             log.msg(f"gitpoller: using workdir '{self.workdir}'")
 
+        if self.sharedRepository is not None:
+            self.sharedRepository.unregister(self)
+            self.sharedRepository = None
+        if coalesceFetches:
+            self.sharedRepository = yield SharedGitRepository.getService(
+                self.master, self.repourl, self.workdir)
+
         yield super().reconfigService(name=name,
                                       pollInterval=pollInterval, pollAtLaunch=pollAtLaunch,
                                       pollRandomDelayMin=pollRandomDelayMin,
@@ -166,6 +252,11 @@ class GitPoller(base.ReconfigurablePollingChangeSource, StateMixin, GitMixin):
         except Exception as e:
             log.err(e, 'while initializing GitPoller repository')
 
+    def deactivate(self):
+        if self.sharedRepository is not None:
+            self.sharedRepository.unregister(self)
+        return super().deactivate()
+
     def describe(self):
         str = ('GitPoller watching the remote git repository ' +
                bytes2unicode(self.repourl, self.encoding))
@@ -247,14 +338,22 @@ class GitPoller(base.ReconfigurablePollingChangeSource, StateMixin, GitMixin):
         ]
 
         try:
-            yield self._dovccmd('fetch', ['--progress', self.repourl] + refspecs,
-                                path=self.workdir)
+            if self.sharedRepository is not None:
+                yield self.sharedRepository.fetch(self, refspecs, self.pollInterval)
+            else:
+                yield self._dovccmd('fetch', ['--progress', self.repourl] + refspecs,
+                                    path=self.workdir)
         except GitError as e:
             log.msg(e.args[0])
             return
 
         revs = {}
         log.msg(f'gitpoller: processing changes from "{self.repourl}"')
+        # The list of new commits of each branch depends on the revisions already seen on the
+        # other branches, so it is computed serially. Adding the changes of independent
+        # branches can then proceed concurrently.
+        sem = defer.DeferredSemaphore(self.branchConcurrency)
+        dl = []
         for branch in branches:
             try:
                 if self.poll_should_exit():  # pragma: no cover
@@ -265,9 +364,16 @@ class GitPoller(base.ReconfigurablePollingChangeSource, StateMixin, GitMixin):
                 rev = yield self._dovccmd(
                     'rev-parse', [self._trackerBranch(branch)], path=self.workdir)
                 revs[branch] = bytes2unicode(rev, self.encoding)
-                yield self._process_changes(revs[branch], branch)
+                commits = yield self._get_new_commits(revs[branch], branch)
             except Exception:
                 log.err(_why=f"trying to poll branch {branch} of {self.repourl}")
+                continue
+
+            d = sem.run(self._add_changes, commits, revs[branch], branch)
+            d.addErrback(log.err, f"trying to poll branch {branch} of {self.repourl}")
+            dl.append(d)
+
+        yield defer.gatherResults(dl)
 
         self.lastRev = revs
         yield self.setState('lastRev', self.lastRev)
@@ -334,37 +440,112 @@ class GitPoller(base.ReconfigurablePollingChangeSource, StateMixin, GitMixin):
             raise EnvironmentError('could not get commit committer for rev')
         return res
 
+    # Format used to retrieve the metadata of many commits with a single 'git log -z' call.
+    # Each commit is output as an empty field followed by the hash, timestamp, author,
+    # committer and comments fields, and then by the (non-empty) names of the changed files.
+    BATCH_LOG_FORMAT = r'--format=%x00%H%x00%ct%x00%aN <%aE>%x00%cN <%cE>%x00%s%n%b'
+
+    def _get_commits_info(self, args):
+        args = ['-z', '--name-only', self.BATCH_LOG_FORMAT] + args
+        d = self._dovccmd('log', args, path=self.workdir)
+
+        @d.addCallback
+        def process(git_output):
+            return list(self._parse_commits_info(git_output))
+        return d
+
+    def _parse_commits_info(self, git_output):
+        fields = git_output.split('\0')
+        pos = 0
+        while pos + 1 < len(fields):
+            if fields[pos] != '':
+                raise EnvironmentError(f'could not parse git log output: {fields[pos]!r}')
+            rev, timestamp, author, committer, comments = fields[pos + 1:pos + 6]
+            pos += 6
+
+            files = []
+            while pos < len(fields) and fields[pos] != '':
+                file = fields[pos]
+                if not files and file.startswith('\n'):
+                    file = file[1:]
+                files.append(file)
+                pos += 1
+
+            if self.usetimestamps:
+                try:
+                    timestamp = int(timestamp)
+                except Exception as e:
+                    log.msg(f'gitpoller: caught exception converting output \'{timestamp}\' '
+                            'to timestamp')
+                    raise e
+            else:
+                timestamp = None
+            if not author:
+                raise EnvironmentError('could not get commit author for rev')
+            if not committer:
+                raise EnvironmentError('could not get commit committer for rev')
+
+            yield rev.strip(), timestamp, author, committer, files, comments.strip()
+
     @defer.inlineCallbacks
-    def _process_changes(self, newRev, branch):
+    def _get_commit_info(self, rev):
+        dl = defer.DeferredList([
+            self._get_commit_timestamp(rev),
+            self._get_commit_author(rev),
+            self._get_commit_committer(rev),
+            self._get_commit_files(rev),
+            self._get_commit_comments(rev),
+        ], consumeErrors=True)
+
+        results = yield dl
+
+        # check for failures
+        failures = [r[1] for r in results if not r[0]]
+        if failures:
+            for failure in failures:
+                log.err(failure, f"while processing changes for {rev}")
+            # just fail on the first error; they're probably all related!
+            failures[0].raiseException()
+
+        timestamp, author, committer, files, comments = [r[1] for r in results]
+        return rev, timestamp, author, committer, files, comments
+
+    @defer.inlineCallbacks
+    def _get_new_commits(self, newRev, branch):
         """
-        Read changes since last change.
+        Read list of commits since last change.
 
-        - Read list of commit hashes.
-        - Extract details from each commit.
-        - Add changes to database.
+        Returns the list of new commit hashes, oldest first. If batchLog is enabled, returns
+        the list of tuples of (rev, timestamp, author, committer, files, comments) instead.
         """
 
         # initial run, don't parse all history
         if not self.lastRev:
-            return
+            return []
 
         # get the change list
-        revListArgs = (['--ignore-missing'] +
-                       ['--format=%H', f'{newRev}'] +
+        revListArgs = ([f'{newRev}'] +
                        ['^' + rev
                         for rev in sorted(self.lastRev.values())] +
                        ['--'])
         self.changeCount = 0
-        results = yield self._dovccmd('log', revListArgs, path=self.workdir)
+        if self.batchLog:
+            revList = yield self._get_commits_info(['--ignore-missing'] + revListArgs)
+        else:
+            results = yield self._dovccmd('log', ['--ignore-missing', '--format=%H'] + revListArgs,
+                                          path=self.workdir)
+            revList = results.split()
 
         # process oldest change first
-        revList = results.split()
         revList.reverse()
 
         if self.buildPushesWithNoCommits and not revList:
             existingRev = self.lastRev.get(branch)
             if existingRev != newRev:
-                revList = [newRev]
+                if self.batchLog:
+                    revList = yield self._get_commits_info(['--no-walk', newRev, '--'])
+                else:
+                    revList = [newRev]
                 if existingRev is None:
                     # This branch was completely unknown, rebuild
                     log.msg(f'gitpoller: rebuilding {newRev} for new branch "{branch}"')
@@ -377,31 +558,23 @@ class GitPoller(base.ReconfigurablePollingChangeSource, StateMixin, GitMixin):
         self.lastRev[branch] = newRev
 
         if self.changeCount:
-            log.msg(f'gitpoller: processing {self.changeCount} changes: {revList} from '
+            revs = [rev if isinstance(rev, str) else rev[0] for rev in revList]
+            log.msg(f'gitpoller: processing {self.changeCount} changes: {revs} from '
                     f'"{self.repourl}" branch "{branch}"')
+        return revList
 
+    @defer.inlineCallbacks
+    def _add_changes(self, revList, newRev, branch):
+        changes = []
         for rev in revList:
-            dl = defer.DeferredList([
-                self._get_commit_timestamp(rev),
-                self._get_commit_author(rev),
-                self._get_commit_committer(rev),
-                self._get_commit_files(rev),
-                self._get_commit_comments(rev),
-            ], consumeErrors=True)
-
-            results = yield dl
-
-            # check for failures
-            failures = [r[1] for r in results if not r[0]]
-            if failures:
-                for failure in failures:
-                    log.err(failure, f"while processing changes for {newRev} {branch}")
-                # just fail on the first error; they're probably all related!
-                failures[0].raiseException()
-
-            timestamp, author, committer, files, comments = [r[1] for r in results]
-
-            yield self.master.data.updates.addChange(
+            if isinstance(rev, str):
+                info = yield self._get_commit_info(rev)
+            else:
+                info = rev
+
+            rev, timestamp, author, committer, files, comments = info
+
+            changes.append(dict(
                 author=author,
                 committer=committer,
                 revision=bytes2unicode(rev, encoding=self.encoding),
@@ -409,7 +582,22 @@ class GitPoller(base.ReconfigurablePollingChangeSource, StateMixin, GitMixin):
                 branch=bytes2unicode(self._removeHeads(branch)),
                 project=self.project,
                 repository=bytes2unicode(self.repourl, encoding=self.encoding),
-                category=self.category, src='git')
+                category=self.category, src='git'))
+
+        if changes:
+            yield self.master.data.updates.addChanges(changes)
+
+    @defer.inlineCallbacks
+    def _process_changes(self, newRev, branch):
+        """
+        Read changes since last change.
+
+        - Read list of commit hashes.
+        - Extract details from each commit.
+        - Add changes to database.
+        """
+        revList = yield self._get_new_commits(newRev, branch)
+        yield self._add_changes(revList, newRev, branch)
 
     def _isSshPrivateKeyNeededForCommand(self, command):
         commandsThatNeedKey = [
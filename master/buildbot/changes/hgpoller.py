@@ -337,10 +337,11 @@ class HgPoller(base.ReconfigurablePollingChangeSource, StateMixin):
 
         log.msg(f'hgpoller: processing {len(revNodeList)} changes in branch '
                 f'{repr(branch)}: {repr(revNodeList)} in {repr(self._absWorkdir())}')
+        changes = []
         for _, node in revNodeList:
             timestamp, author, files, comments = yield self._getRevDetails(
                 node)
-            yield self.master.data.updates.addChange(
+            changes.append(dict(
                 author=author,
                 committer=None,
                 revision=str(node),
@@ -352,8 +353,11 @@ class HgPoller(base.ReconfigurablePollingChangeSource, StateMixin):
                 category=bytes2unicode(self.category),
                 project=bytes2unicode(self.project),
                 repository=bytes2unicode(self.repourl),
-                src='hg')
-            # writing after addChange so that a rev is never missed,
+                src='hg'))
+
+        if changes:
+            yield self.master.data.updates.addChanges(changes)
+            # writing after addChanges so that a rev is never missed,
             # but at once to avoid impact from later errors
             yield self._setCurrentRev(new_rev, branch)
 
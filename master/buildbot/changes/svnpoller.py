@@ -439,8 +439,9 @@ class SVNPoller(base.ReconfigurablePollingChangeSource, util.ComparableMixin):
 
     @defer.inlineCallbacks
     def submit_changes(self, changes):
-        for chdict in changes:
-            yield self.master.data.updates.addChange(src='svn', **chdict)
+        if changes:
+            yield self.master.data.updates.addChanges(
+                [dict(src='svn', **chdict) for chdict in changes])
 
     def finished_ok(self, res):
         if self.cachepath:
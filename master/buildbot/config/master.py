@@ -457,7 +457,8 @@ class MasterConfig(util.ComparableMixin):
 
         if 'db' in config_dict:
             db = config_dict['db']
-            if set(db.keys()) - set(['db_url']) and throwErrors:
+            if set(db.keys()) - set(['db_url', 'pool_size', 'read_db_url', 'read_pool_size',
+                                     'sqlite_single_writer']) and throwErrors:
                 error("unrecognized keys in c['db']")
 
             config_dict = db
@@ -472,6 +473,24 @@ class MasterConfig(util.ComparableMixin):
     def load_db(self, filename, config_dict):
         self.db = dict(db_url=self.getDbUrlFromConfig(config_dict))
 
+        db = config_dict.get('db', {})
+        for key in ('pool_size', 'read_pool_size'):
+            if key in db:
+                if not isinstance(db[key], int) or db[key] < 1:
+                    error(f"c['db']['{key}'] must be a strictly positive integer")
+                else:
+                    self.db[key] = db[key]
+        if 'read_db_url' in db:
+            if not isinstance(db['read_db_url'], str):
+                error("c['db']['read_db_url'] must be a string")
+            else:
+                self.db['read_db_url'] = db['read_db_url']
+        if 'sqlite_single_writer' in db:
+            if not isinstance(db['sqlite_single_writer'], bool):
+                error("c['db']['sqlite_single_writer'] must be a boolean")
+            else:
+                self.db['sqlite_single_writer'] = db['sqlite_single_writer']
+
     def load_mq(self, filename, config_dict):
         from buildbot.mq import connector  # avoid circular imports
         if 'mq' in config_dict:
@@ -489,14 +508,34 @@ class MasterConfig(util.ComparableMixin):
             error(f"unrecognized keys in c['mq']: {', '.join(unk)}")
 
     def load_metrics(self, filename, config_dict):
-        # we don't try to validate metrics keys
+        # we don't try to validate metrics keys, except the reactor profiler
+        # configuration, which is passed to ReactorProfiler as keyword arguments
         if 'metrics' in config_dict:
             metrics = config_dict["metrics"]
             if not isinstance(metrics, dict):
                 error("c['metrics'] must be a dictionary")
             else:
+                self._check_reactor_profiler(metrics.get('reactor_profiler'))
                 self.metrics = metrics
 
+    @staticmethod
+    def _check_reactor_profiler(profiler):
+        if profiler is None or isinstance(profiler, bool):
+            return
+        if not isinstance(profiler, dict):
+            error("c['metrics']['reactor_profiler'] must be a boolean or a dictionary")
+            return
+        unknown_keys = set(profiler) - {'threshold', 'interval', 'sample_interval'}
+        if unknown_keys:
+            error("unrecognized keys in c['metrics']['reactor_profiler']: "
+                  f"{', '.join(sorted(unknown_keys))}")
+        for key in ('threshold', 'interval', 'sample_interval'):
+            value = profiler.get(key)
+            if value is None:
+                continue
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+                error(f"c['metrics']['reactor_profiler']['{key}'] must be a positive number")
+
     def load_secrets(self, filename, config_dict):
         if 'secretsProviders' in config_dict:
             secretsProviders = config_dict["secretsProviders"]
@@ -710,6 +749,7 @@ class MasterConfig(util.ComparableMixin):
             'logRotateLength',
             'logfileName',
             'maxRotatedFiles',
+            'metrics',
             'plugins',
             'port',
             'rest_minimum_version',
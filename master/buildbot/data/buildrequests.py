@@ -168,7 +168,8 @@ class BuildRequestsEndpoint(Db2DataMixin, base.Endpoint):
             complete=complete,
             claimed=claimed,
             bsid=bsid,
-            resultSpec=resultSpec)
+            resultSpec=resultSpec,
+            stale_ok=kwargs.get('stale_ok', False))
         results = []
         filters = resultSpec.popProperties() if hasattr(resultSpec, 'popProperties') else []
         for br in buildrequests:
@@ -164,7 +164,8 @@ class BuildsEndpoint(Db2DataMixin, base.BuildNestingMixin, base.Endpoint):
                 buildrequestid=kwargs.get('buildrequestid', buildrequestid),
                 workerid=kwargs.get('workerid'),
                 complete=complete,
-                resultSpec=resultSpec)
+                resultSpec=resultSpec,
+                stale_ok=kwargs.get('stale_ok', False))
 
         # returns properties' list
         filters = resultSpec.popProperties()
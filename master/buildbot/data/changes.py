@@ -105,7 +105,8 @@ class ChangesEndpoint(FixerMixin, base.BuildNestingMixin, base.Endpoint):
         else:
             if resultSpec is not None:
                 resultSpec.fieldMapping = self.fieldMapping
-                changes = yield self.master.db.changes.getChanges(resultSpec=resultSpec)
+                changes = yield self.master.db.changes.getChanges(
+                    resultSpec=resultSpec, stale_ok=kwargs.get('stale_ok', False))
         results = []
         for ch in changes:
             results.append((yield self._fixChange(ch, is_graphql='graphql' in kwargs)))
@@ -142,14 +143,12 @@ class Change(base.ResourceType):
         sourcestamp = sourcestamps.SourceStamp.entityType
     entityType = EntityType(name, 'Change')
 
-    @base.updateMethod
     @defer.inlineCallbacks
-    def addChange(self, files=None, comments=None, author=None, committer=None, revision=None,
-                  when_timestamp=None, branch=None, category=None, revlink='',
-                  properties=None, repository='', codebase=None, project='',
-                  src=None):
-        metrics.MetricCountEvent.log("added_changes", 1)
-
+    def _prepareChange(self, files=None, comments=None, author=None, committer=None,
+                       revision=None, when_timestamp=None, branch=None, category=None,
+                       revlink='', properties=None, repository='', codebase=None, project='',
+                       src=None):
+        # turn the arguments of addChange into the arguments of the db API
         if properties is None:
             properties = {}
         # add the source to the properties
@@ -202,8 +201,7 @@ class Change(base.ResourceType):
         else:
             codebase = codebase or ''
 
-        # add the Change to the database
-        changeid = yield self.master.db.changes.addChange(
+        return dict(
             author=author,
             committer=committer,
             files=files,
@@ -219,13 +217,51 @@ class Change(base.ResourceType):
             project=project,
             uid=uid)
 
+    @defer.inlineCallbacks
+    def _announceChange(self, changeid):
         # get the change and munge the result for the notification
         change = yield self.master.data.get(('changes', str(changeid)))
         change = copy.deepcopy(change)
         self.produceEvent(change, 'new')
 
         # log, being careful to handle funny characters
-        msg = f"added change with revision {revision} to database"
+        msg = f"added change with revision {change['revision']} to database"
         log.msg(msg.encode('utf-8', 'replace'))
 
+    @base.updateMethod
+    @defer.inlineCallbacks
+    def addChange(self, files=None, comments=None, author=None, committer=None, revision=None,
+                  when_timestamp=None, branch=None, category=None, revlink='',
+                  properties=None, repository='', codebase=None, project='',
+                  src=None):
+        metrics.MetricCountEvent.log("added_changes", 1)
+
+        change = yield self._prepareChange(
+            files=files, comments=comments, author=author, committer=committer,
+            revision=revision, when_timestamp=when_timestamp, branch=branch,
+            category=category, revlink=revlink, properties=properties,
+            repository=repository, codebase=codebase, project=project, src=src)
+
+        # add the Change to the database
+        changeid = yield self.master.db.changes.addChange(**change)
+
+        yield self._announceChange(changeid)
         return changeid
+
+    @base.updateMethod
+    @defer.inlineCallbacks
+    def addChanges(self, changes):
+        # each element of changes is a dict of addChange arguments; the whole
+        # batch is written in one transaction, and only announced once it is
+        # committed
+        metrics.MetricCountEvent.log("added_changes", len(changes))
+
+        prepared = []
+        for change in changes:
+            prepared.append((yield self._prepareChange(**change)))
+
+        changeids = yield self.master.db.changes.addChanges(prepared)
+
+        for changeid in changeids:
+            yield self._announceChange(changeid)
+        return changeids
@@ -60,6 +60,7 @@ class DataConnector(service.AsyncService):
         'buildbot.data.properties',
         'buildbot.data.test_results',
         'buildbot.data.test_result_sets',
+        'buildbot.data.reactor_profiler',
     ]
     name = "data"
 
@@ -255,6 +255,8 @@ class GraphQLConnector(service.AsyncService):
             ep = self.data.getEndPointForResourceName(field)
             rspec = None
             kwargs = ep.get_kwargs_from_graphql(parent, resolve_info, args)
+            # the web clients can read from the read replica of the database
+            kwargs['stale_ok'] = True
 
             if ep.isCollection or ep.isPseudoCollection:
                 args = {k: _enforce_list(v) for k, v in args.items()}
@@ -81,7 +81,7 @@ class LogChunkEndpoint(LogChunkEndpointBase):
             return None
 
         logLines = yield self.master.db.logs.getLogLines(
-            logid, firstline, lastline)
+            logid, firstline, lastline, stale_ok=kwargs.get('stale_ok', False))
         return {'logid': logid,
                 'firstline': firstline,
                 'content': logLines}
@@ -122,7 +122,7 @@ class RawLogChunkEndpoint(LogChunkEndpointBase):
         lastline = max(0, dbdict['num_lines'] - 1)
 
         logLines = yield self.master.db.logs.getLogLines(
-            logid, 0, lastline)
+            logid, 0, lastline, stale_ok=kwargs.get('stale_ok', False))
 
         if dbdict['type'] == 's':
             logLines = "\n".join([line[1:] for line in logLines.splitlines()])
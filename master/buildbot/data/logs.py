@@ -83,7 +83,8 @@ class LogsEndpoint(EndpointMixin, base.BuildNestingMixin, base.Endpoint):
         stepid = yield self.getStepid(kwargs)
         if not stepid:
             return []
-        logs = yield self.master.db.logs.getLogs(stepid=stepid)
+        logs = yield self.master.db.logs.getLogs(stepid=stepid,
+                                                 stale_ok=kwargs.get('stale_ok', False))
         results = []
         for dbdict in logs:
             results.append((yield self.db2data(dbdict)))
@@ -0,0 +1,102 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+
+from twisted.internet import defer
+
+from buildbot.data import base
+from buildbot.data import types
+
+
+def _get_profiler(master):
+    # the data is not stored in the database: only the profiler of the master answering the
+    # request is reported
+    metrics = getattr(master, 'metrics', None)
+    return getattr(metrics, 'reactor_profiler', None)
+
+
+def _seconds2ms(seconds):
+    return int(round(seconds * 1000))
+
+
+def stall2data(stall):
+    return dict(stallid=stall['stallid'],
+                started_at=int(stall['started_at']),
+                duration_ms=_seconds2ms(stall['duration']),
+                generators=list(stall['generators']),
+                stack=list(stall['stack']))
+
+
+class ReactorStallsEndpoint(base.Endpoint):
+
+    isCollection = True
+    pathPatterns = """
+        /reactor_stalls
+    """
+    rootLinkName = 'reactor_stalls'
+
+    def get(self, resultSpec, kwargs):
+        profiler = _get_profiler(self.master)
+        if profiler is None:
+            return defer.succeed([])
+        return defer.succeed([stall2data(stall) for stall in profiler.stalls])
+
+
+class ReactorStall(base.ResourceType):
+
+    name = "reactor_stall"
+    plural = "reactor_stalls"
+    endpoints = [ReactorStallsEndpoint]
+    keyField = "stallid"
+
+    class EntityType(types.Entity):
+        stallid = types.Integer()
+        started_at = types.DateTime()
+        duration_ms = types.Integer()
+        generators = types.List(of=types.String())
+        stack = types.List(of=types.String())
+    entityType = EntityType(name, 'ReactorStall')
+
+
+class ReactorGeneratorsEndpoint(base.Endpoint):
+
+    isCollection = True
+    pathPatterns = """
+        /reactor_generators
+    """
+    rootLinkName = 'reactor_generators'
+
+    def get(self, resultSpec, kwargs):
+        profiler = _get_profiler(self.master)
+        if profiler is None:
+            return defer.succeed([])
+        return defer.succeed([dict(name=name,
+                                   stalled_time_ms=_seconds2ms(stalled_time),
+                                   stalls=stalls)
+                              for name, (stalled_time, stalls)
+                              in sorted(profiler.generators.items())])
+
+
+class ReactorGenerator(base.ResourceType):
+
+    name = "reactor_generator"
+    plural = "reactor_generators"
+    endpoints = [ReactorGeneratorsEndpoint]
+    keyField = "name"
+
+    class EntityType(types.Entity):
+        name = types.String()
+        stalled_time_ms = types.Integer()
+        stalls = types.Integer()
+    entityType = EntityType(name, 'ReactorGenerator')
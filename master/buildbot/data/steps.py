@@ -84,7 +84,8 @@ class StepsEndpoint(Db2DataMixin, base.BuildNestingMixin, base.Endpoint):
             buildid = yield self.getBuildid(kwargs)
             if buildid is None:
                 return None
-        steps = yield self.master.db.steps.getSteps(buildid=buildid)
+        steps = yield self.master.db.steps.getSteps(buildid=buildid,
+                                                    stale_ok=kwargs.get('stale_ok', False))
         results = []
         for dbdict in steps:
             results.append((yield self.db2data(dbdict)))
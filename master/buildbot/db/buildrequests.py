@@ -80,11 +80,12 @@ class BuildRequestsConnectorComponent(base.DBConnectorComponent):
                 rv = self._brdictFromRow(row, self.db.master.masterid)
             res.close()
             return rv
-        return self.db.pool.do(thd)
+        return self.db.get_read_pool().do(thd)
 
     @defer.inlineCallbacks
     def getBuildRequests(self, builderid=None, complete=None, claimed=None,
-                         bsid=None, branch=None, repository=None, resultSpec=None):
+                         bsid=None, branch=None, repository=None, resultSpec=None,
+                         stale_ok=False):
 
         def deduplicateBrdict(brdicts):
             return list(({b['buildrequestid']: b for b in brdicts}).values())
@@ -130,7 +131,7 @@ class BuildRequestsConnectorComponent(base.DBConnectorComponent):
 
             return deduplicateBrdict([self._brdictFromRow(row, self.db.master.masterid)
                                       for row in res.fetchall()])
-        res = yield self.db.pool.do(thd)
+        res = yield self.db.get_read_pool(stale_ok).do(thd)
         return res
 
     @defer.inlineCallbacks
@@ -40,7 +40,7 @@ class BuildsConnectorComponent(base.DBConnectorComponent):
                 rv = self._builddictFromRow(row)
             res.close()
             return rv
-        return self.db.pool.do(thd)
+        return self.db.get_read_pool().do(thd)
 
     def getBuild(self, buildid):
         return self._getBuild(self.db.model.builds.c.id == buildid)
@@ -63,7 +63,7 @@ class BuildsConnectorComponent(base.DBConnectorComponent):
             res = conn.execute(q)
             return list(self._builddictFromRow(row) for row in res.fetchall())
 
-        return self.db.pool.do(thd)
+        return self.db.get_read_pool().do(thd)
 
     @defer.inlineCallbacks
     def getPrevSuccessfulBuild(self, builderid, number, ssBuild):
@@ -123,11 +123,11 @@ class BuildsConnectorComponent(base.DBConnectorComponent):
             return [self._builddictFromRow(row)
                     for row in res.fetchall()]
 
-        return self.db.pool.do(thd)
+        return self.db.get_read_pool().do(thd)
 
     # returns a Deferred that returns a value
     def getBuilds(self, builderid=None, buildrequestid=None, workerid=None, complete=None,
-                  resultSpec=None):
+                  resultSpec=None, stale_ok=False):
         def thd(conn):
             tbl = self.db.model.builds
             q = tbl.select()
@@ -149,7 +149,7 @@ class BuildsConnectorComponent(base.DBConnectorComponent):
             res = conn.execute(q)
             return [self._builddictFromRow(row) for row in res.fetchall()]
 
-        return self.db.pool.do(thd)
+        return self.db.get_read_pool(stale_ok).do(thd)
 
     # returns a Deferred that returns a value
     def addBuild(self, builderid, buildrequestid, workerid, masterid,
@@ -191,7 +191,7 @@ class BuildsConnectorComponent(base.DBConnectorComponent):
 
             q = tbl.update(whereclause=(tbl.c.id == buildid))
             conn.execute(q, state_string=state_string)
-        return self.db.pool.do(thd)
+        return self.db.pool.do_batched(thd)
 
     # returns a Deferred that returns None
     def finishBuild(self, buildid, results):
@@ -219,7 +219,7 @@ class BuildsConnectorComponent(base.DBConnectorComponent):
                 prop = (json.loads(row.value), row.source)
                 props.append((row.name, prop))
             return dict(props)
-        return self.db.pool.do(thd)
+        return self.db.get_read_pool().do(thd)
 
     @defer.inlineCallbacks
     def setBuildProperty(self, bid, name, value, source):
@@ -18,6 +18,7 @@ Support for changes in the database
 """
 
 import json
+import zlib
 
 import sqlalchemy as sa
 
@@ -36,27 +37,36 @@ class ChDict(dict):
 class ChangesConnectorComponent(base.DBConnectorComponent):
     # Documentation is in developer/db.rst
 
+    # changes touching more files than this are stored with a single
+    # compressed row in change_files_compact rather than a change_files row per
+    # file
+    COMPACT_FILES_THRESHOLD = 1000
+
     # returns a Deferred that returns a value
     def getParentChangeIds(self, branch, repository, project, codebase):
         def thd(conn):
-            changes_tbl = self.db.model.changes
-            q = sa.select([changes_tbl.c.changeid],
-                          whereclause=((changes_tbl.c.branch == branch) &
-                                       (changes_tbl.c.repository == repository) &
-                                       (changes_tbl.c.project == project) &
-                                       (changes_tbl.c.codebase == codebase)),
-                          order_by=sa.desc(changes_tbl.c.changeid),
-                          limit=1)
-            parent_id = conn.scalar(q)
+            parent_id = self._getParentChangeId_thd(conn, branch, repository, project, codebase)
             return [parent_id] if parent_id else []
 
         return self.db.pool.do(thd)
 
-    @defer.inlineCallbacks
-    def addChange(self, author=None, committer=None, files=None, comments=None, is_dir=None,
-                  revision=None, when_timestamp=None, branch=None,
-                  category=None, revlink='', properties=None, repository='', codebase='',
-                  project='', uid=None):
+    def _getParentChangeId_thd(self, conn, branch, repository, project, codebase):
+        changes_tbl = self.db.model.changes
+        q = sa.select([changes_tbl.c.changeid],
+                      whereclause=((changes_tbl.c.branch == branch) &
+                                   (changes_tbl.c.repository == repository) &
+                                   (changes_tbl.c.project == project) &
+                                   (changes_tbl.c.codebase == codebase)),
+                      order_by=sa.desc(changes_tbl.c.changeid),
+                      limit=1)
+        return conn.scalar(q)
+
+    def _checkChange(self, author=None, committer=None, files=None, comments=None, is_dir=None,
+                     revision=None, when_timestamp=None, branch=None,
+                     category=None, revlink='', properties=None, repository='', codebase='',
+                     project='', uid=None):
+        # validate the arguments of a single change, and return them as a dict
+        # with the defaults filled in
         assert project is not None, "project must be a string, not None"
         assert repository is not None, "repository must be a string, not None"
 
@@ -85,68 +95,158 @@ class ChangesConnectorComponent(base.DBConnectorComponent):
         self.checkLength(ch_tbl.c.repository, repository)
         self.checkLength(ch_tbl.c.project, project)
 
-        # calculate the sourcestamp first, before adding it
-        ssid = yield self.db.sourcestamps.findSourceStampId(
-            revision=revision, branch=branch, repository=repository,
-            codebase=codebase, project=project)
+        for f in files or []:
+            self.checkLength(self.db.model.change_files.c.filename, f)
+        for k in properties:
+            self.checkLength(self.db.model.change_properties.c.property_name, k)
 
-        parent_changeids = yield self.getParentChangeIds(branch, repository, project, codebase)
-        # Someday, changes will have multiple parents.
-        # But for the moment, a Change can only have 1 parent
-        parent_changeid = parent_changeids[0] if parent_changeids else None
+        return dict(author=author, committer=committer, files=files or [], comments=comments,
+                    revision=revision, when_timestamp=when_timestamp, branch=branch,
+                    category=category, revlink=revlink, properties=properties,
+                    repository=repository, codebase=codebase, project=project, uid=uid)
 
-        def thd(conn):
+    def addChange(self, author=None, committer=None, files=None, comments=None, is_dir=None,
+                  revision=None, when_timestamp=None, branch=None,
+                  category=None, revlink='', properties=None, repository='', codebase='',
+                  project='', uid=None):
+        d = self.addChanges([dict(
+            author=author, committer=committer, files=files, comments=comments,
+            is_dir=is_dir, revision=revision, when_timestamp=when_timestamp, branch=branch,
+            category=category, revlink=revlink, properties=properties,
+            repository=repository, codebase=codebase, project=project, uid=uid)])
+        d.addCallback(lambda changeids: changeids[0])
+        return d
+
+    def _findSourceStampIds_thd(self, conn, changes):
+        # the sourcestamps of the changes (without patches), created if needed
+        ss_tbl = self.db.model.sourcestamps
+        hashes = {}
+        for change in changes:
+            ss = (change['branch'], change['revision'], change['repository'],
+                  change['project'], change['codebase'])
+            if ss not in hashes:
+                hashes[ss] = self.hashColumns(*ss, None)
+
+        ssids = {}
+        unique_hashes = list(set(hashes.values()))
+        for batch in self.doBatch(unique_hashes):
+            q = sa.select([ss_tbl.c.id, ss_tbl.c.ss_hash],
+                          whereclause=ss_tbl.c.ss_hash.in_(batch))
+            for row in conn.execute(q):
+                ssids[row.ss_hash] = row.id
+
+        for (branch, revision, repository, project, codebase), ss_hash in hashes.items():
+            if ss_hash in ssids:
+                continue
+            r = conn.execute(ss_tbl.insert(), dict(
+                branch=branch, revision=revision, repository=repository, project=project,
+                codebase=codebase, patchid=None, ss_hash=ss_hash,
+                created_at=int(self.master.reactor.seconds())))
+            ssids[ss_hash] = r.inserted_primary_key[0]
+
+        return [ssids[hashes[(change['branch'], change['revision'], change['repository'],
+                              change['project'], change['codebase'])]]
+                for change in changes]
+
+    @defer.inlineCallbacks
+    def addChanges(self, changes):
+        changes = [self._checkChange(**change) for change in changes]
+        if not changes:
+            return []
+        ss_tbl = self.db.model.sourcestamps
+        for change in changes:
+            self.checkLength(ss_tbl.c.branch, change['branch'])
+            self.checkLength(ss_tbl.c.revision, change['revision'])
+            self.checkLength(ss_tbl.c.repository, change['repository'])
+            self.checkLength(ss_tbl.c.project, change['project'])
+
+        def thd(conn, no_recurse=False):
             # note that in a read-uncommitted database like SQLite this
             # transaction does not buy atomicity - other database users may
             # still come across a change without its files, properties,
-            # etc.  That's OK, since we don't announce the change until it's
+            # etc.  That's OK, since we don't announce the changes until they're
             # all in the database, but beware.
 
+            ch_tbl = self.db.model.changes
             transaction = conn.begin()
 
-            r = conn.execute(ch_tbl.insert(), dict(
-                author=author,
-                committer=committer,
-                comments=comments,
-                branch=branch,
-                revision=revision,
-                revlink=revlink,
-                when_timestamp=datetime2epoch(when_timestamp),
-                category=category,
-                repository=repository,
-                codebase=codebase,
-                project=project,
-                sourcestampid=ssid,
-                parent_changeids=parent_changeid))
-            changeid = r.inserted_primary_key[0]
-            if files:
-                tbl = self.db.model.change_files
-                for f in files:
-                    self.checkLength(tbl.c.filename, f)
-                conn.execute(tbl.insert(), [
-                    dict(changeid=changeid, filename=f)
-                    for f in files
-                ])
-            if properties:
-                tbl = self.db.model.change_properties
-                inserts = [
-                    dict(changeid=changeid,
-                         property_name=k,
-                         property_value=json.dumps(v))
-                    for k, v in properties.items()
-                ]
-                for i in inserts:
-                    self.checkLength(tbl.c.property_name,
-                                     i['property_name'])
-
-                conn.execute(tbl.insert(), inserts)
-            if uid:
-                ins = self.db.model.change_users.insert()
-                conn.execute(ins, dict(changeid=changeid, uid=uid))
+            try:
+                # calculate the sourcestamps first, before adding the changes
+                ssids = self._findSourceStampIds_thd(conn, changes)
+            except (sa.exc.IntegrityError, sa.exc.ProgrammingError):
+                # a sourcestamp has been created by an overlapping call: try it
+                # all over again, but only once
+                transaction.rollback()
+                if no_recurse:
+                    raise
+                return thd(conn, no_recurse=True)
+
+            # Someday, changes will have multiple parents.
+            # But for the moment, a Change can only have 1 parent.  Within the
+            # batch, the parent of a change is the previous change on the same
+            # branch, so the database only needs to be asked once per branch.
+            # The changes are inserted one at a time, as the ID of each one is
+            # needed for its ancillary rows and by the next change on its
+            # branch.
+            parents = {}
+            changeids = []
+            files_rows = []
+            compact_files_rows = []
+            properties_rows = []
+            users_rows = []
+            for change, ssid in zip(changes, ssids):
+                key = (change['branch'], change['repository'], change['project'],
+                       change['codebase'])
+                if key not in parents:
+                    parents[key] = self._getParentChangeId_thd(conn, *key)
+
+                r = conn.execute(ch_tbl.insert(), dict(
+                    author=change['author'],
+                    committer=change['committer'],
+                    comments=change['comments'],
+                    branch=change['branch'],
+                    revision=change['revision'],
+                    revlink=change['revlink'],
+                    when_timestamp=datetime2epoch(change['when_timestamp']),
+                    category=change['category'],
+                    repository=change['repository'],
+                    codebase=change['codebase'],
+                    project=change['project'],
+                    sourcestampid=ssid,
+                    parent_changeids=parents[key] or None,
+                    files_compact=int(len(change['files']) > self.COMPACT_FILES_THRESHOLD)))
+                changeid = r.inserted_primary_key[0]
+                parents[key] = changeid
+                changeids.append(changeid)
+
+                if len(change['files']) > self.COMPACT_FILES_THRESHOLD:
+                    compact_files_rows.append(dict(
+                        changeid=changeid,
+                        files=zlib.compress(json.dumps(change['files']).encode('utf-8'))))
+                else:
+                    files_rows.extend(dict(changeid=changeid, filename=f)
+                                      for f in change['files'])
+                properties_rows.extend(dict(changeid=changeid,
+                                            property_name=k,
+                                            property_value=json.dumps(v))
+                                       for k, v in change['properties'].items())
+                if change['uid']:
+                    users_rows.append(dict(changeid=changeid, uid=change['uid']))
+
+            # the ancillary rows of the whole batch are written with one
+            # multi-row insert per table
+            if files_rows:
+                conn.execute(self.db.model.change_files.insert(), files_rows)
+            if compact_files_rows:
+                conn.execute(self.db.model.change_files_compact.insert(), compact_files_rows)
+            if properties_rows:
+                conn.execute(self.db.model.change_properties.insert(), properties_rows)
+            if users_rows:
+                conn.execute(self.db.model.change_users.insert(), users_rows)
 
             transaction.commit()
 
-            return changeid
+            return changeids
         return (yield self.db.pool.do(thd))
 
     # returns a Deferred that returns a value
@@ -166,7 +266,7 @@ class ChangesConnectorComponent(base.DBConnectorComponent):
             # and fetch the ancillary data (files, properties)
             return self._chdict_from_change_row_thd(conn, row)
 
-        return self.db.pool.do(thd)
+        return self.db.get_read_pool().do(thd)
 
     @defer.inlineCallbacks
     def getChangesForBuild(self, buildid):
@@ -227,7 +327,7 @@ class ChangesConnectorComponent(base.DBConnectorComponent):
                 return None
             # and fetch the ancillary data (files, properties)
             return self._chdict_from_change_row_thd(conn, row)
-        return self.db.pool.do(thd)
+        return self.db.get_read_pool().do(thd)
 
     # returns a Deferred that returns a value
     def getChangeUids(self, changeid):
@@ -240,12 +340,12 @@ class ChangesConnectorComponent(base.DBConnectorComponent):
             rows = res.fetchall()
             row_uids = [row.uid for row in rows]
             return row_uids
-        return self.db.pool.do(thd)
+        return self.db.get_read_pool().do(thd)
 
     def _getDataFromRow(self, row):
         return row.changeid
 
-    def getChanges(self, resultSpec=None):
+    def getChanges(self, resultSpec=None, stale_ok=False):
         def thd(conn):
             # get the changeids from the 'changes' table
             changes_tbl = self.db.model.changes
@@ -259,7 +359,7 @@ class ChangesConnectorComponent(base.DBConnectorComponent):
             changeids = [self._getDataFromRow(row) for row in rp]
             rp.close()
             return list(changeids)
-        d = self.db.pool.do(thd)
+        d = self.db.get_read_pool(stale_ok).do(thd)
 
         # then turn those into changes, using the cache
         @d.addCallback
@@ -279,7 +379,7 @@ class ChangesConnectorComponent(base.DBConnectorComponent):
                 r = row[0]
             rp.close()
             return int(r)
-        return self.db.pool.do(thd)
+        return self.db.get_read_pool().do(thd)
 
     # returns a Deferred that returns a value
     def getLatestChangeid(self):
@@ -318,7 +418,7 @@ class ChangesConnectorComponent(base.DBConnectorComponent):
             ids_to_delete = [r.changeid for r in res]
 
             # and delete from all relevant tables, in dependency order
-            for table_name in ('scheduler_changes', 'change_files',
+            for table_name in ('scheduler_changes', 'change_files', 'change_files_compact',
                                'change_properties', 'changes', 'change_users'):
                 remaining = ids_to_delete[:]
                 while remaining:
@@ -357,11 +457,22 @@ class ChangesConnectorComponent(base.DBConnectorComponent):
             project=ch_row.project,
             sourcestampid=int(ch_row.sourcestampid))
 
-        query = change_files_tbl.select(
-            whereclause=(change_files_tbl.c.changeid == ch_row.changeid))
-        rows = conn.execute(query)
-        for r in rows:
-            chdict['files'].append(r.filename)
+        if ch_row.files_compact:
+            # changes with very many files have no change_files rows, but a
+            # single compressed list instead
+            change_files_compact_tbl = self.db.model.change_files_compact
+            query = sa.select([change_files_compact_tbl.c.files],
+                              whereclause=(change_files_compact_tbl.c.changeid ==
+                                           ch_row.changeid))
+            blob = conn.scalar(query)
+            if blob is not None:
+                chdict['files'] = json.loads(zlib.decompress(blob).decode('utf-8'))
+        else:
+            query = change_files_tbl.select(
+                whereclause=(change_files_tbl.c.changeid == ch_row.changeid))
+            rows = conn.execute(query)
+            for r in rows:
+                chdict['files'].append(r.filename)
 
         # and properties must be given without a source, so strip that, but
         # be flexible in case users have used a development version where the
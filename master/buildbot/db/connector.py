@@ -35,6 +35,7 @@ from buildbot.db import masters
 from buildbot.db import model
 from buildbot.db import pool
 from buildbot.db import projects
+from buildbot.db import reporter_queue
 from buildbot.db import schedulers
 from buildbot.db import sourcestamps
 from buildbot.db import state
@@ -71,6 +72,9 @@ class DBConnector(service.ReconfigurableServiceMixin,
     # periodic cleanup actions on this schedule.
     CLEANUP_PERIOD = 3600
 
+    # default number of reader threads in the SQLite single writer mode
+    SQLITE_READ_POOL_SIZE = 4
+
     def __init__(self, basedir):
         super().__init__()
         self.setName('db')
@@ -83,6 +87,10 @@ class DBConnector(service.ReconfigurableServiceMixin,
         # set up components
         self._engine = None  # set up in reconfigService
         self.pool = None  # set up in reconfigService
+        # optional pool of the read-only queries, see get_read_pool
+        self._read_engine = None
+        self.read_pool = None
+        self.read_pool_is_replica = False
 
     @defer.inlineCallbacks
     def setServiceParent(self, p):
@@ -109,6 +117,7 @@ class DBConnector(service.ReconfigurableServiceMixin,
         self.logs = logs.LogsConnectorComponent(self)
         self.test_results = test_results.TestResultsConnectorComponent(self)
         self.test_result_sets = test_result_sets.TestResultSetsConnectorComponent(self)
+        self.reporter_queue = reporter_queue.ReporterQueueConnectorComponent(self)
 
         self.cleanup_timer = internet.TimerService(self.CLEANUP_PERIOD,
                                                    self._doCleanup)
@@ -117,15 +126,23 @@ class DBConnector(service.ReconfigurableServiceMixin,
 
     @defer.inlineCallbacks
     def setup(self, check_version=True, verbose=True):
-        db_url = self.configured_url = self.master.config.db['db_url']
+        db_config = self.master.config.db
+        db_url = self.configured_url = db_config['db_url']
 
         log.msg(f"Setting up database with URL {repr(util.stripUrlPassword(db_url))}")
 
         # set up the engine and pool
         self._engine = enginestrategy.create_engine(db_url,
                                                     basedir=self.basedir)
+        single_writer = db_config.get('sqlite_single_writer', False)
+        if single_writer and self._engine.dialect.name != 'sqlite':
+            log.msg("c['db']['sqlite_single_writer'] is ignored for "
+                    f"{self._engine.dialect.name} databases")
+            single_writer = False
         self.pool = pool.DBThreadPool(
-            self._engine, reactor=self.master.reactor, verbose=verbose)
+            self._engine, reactor=self.master.reactor, verbose=verbose,
+            pool_size=db_config.get('pool_size'), batch_writes=single_writer)
+        self._setup_read_pool(db_config, verbose)
 
         # make sure the db is up to date, unless specifically asked not to
         if check_version:
@@ -140,10 +157,61 @@ class DBConnector(service.ReconfigurableServiceMixin,
                     log.msg(l)
                 raise exceptions.DatabaseNotReadyError()
 
+    def _setup_read_pool(self, db_config, verbose):
+        read_db_url = db_config.get('read_db_url')
+        read_pool_size = db_config.get('read_pool_size')
+        sqlite_readers = False
+        if read_db_url is None:
+            if self.pool.batch_writes and self._engine.url.database:
+                # SQLite single writer mode: in WAL mode, the readers of a database file do not
+                # wait for the writer, so they get their own connections
+                sqlite_readers = True
+                read_pool_size = read_pool_size or self.SQLITE_READ_POOL_SIZE
+            elif read_pool_size is None:
+                return
+            elif self._engine.optimal_thread_pool_size == 1:
+                # a second connection to an in-memory database would open another database, and
+                # SQLite serializes the queries anyway
+                log.msg("the database engine supports a single connection, "
+                        "c['db']['read_pool_size'] is ignored")
+                return
+            read_db_url = db_config['db_url']
+        else:
+            self.read_pool_is_replica = True
+            log.msg("Setting up read-only database with URL "
+                    f"{repr(util.stripUrlPassword(read_db_url))}")
+
+        # the read pool has its own engine, so that its queries do not wait for the connections
+        # used by the write pool
+        self._read_engine = enginestrategy.create_engine(read_db_url, basedir=self.basedir)
+        if sqlite_readers:
+            self._read_engine.optimal_thread_pool_size = read_pool_size
+        self.read_pool = pool.DBThreadPool(
+            self._read_engine, reactor=self.master.reactor, verbose=verbose,
+            pool_size=read_pool_size, name='read')
+
+    def get_read_pool(self, stale_ok=False):
+        """
+        Returns the pool to use for a read-only query.  If a read replica is configured, the query
+        is only sent to it if C{stale_ok} is true, i.e. if the caller tolerates the replication
+        lag.  Otherwise the read pool is used if configured, and the main pool if not.
+        """
+        if self.read_pool is None or (self.read_pool_is_replica and not stale_ok):
+            return self.pool
+        return self.read_pool
+
+    @property
+    def pools(self):
+        return [p for p in (self.pool, self.read_pool) if p is not None]
+
     def reconfigServiceWithBuildbotConfig(self, new_config):
         # double-check -- the master ensures this in config checks
         assert self.configured_url == new_config.db['db_url']
 
+        for db_pool in self.pools:
+            db_pool.slow_query_threshold = \
+                (new_config.metrics or {}).get('db_slow_query_threshold')
+
         return super().reconfigServiceWithBuildbotConfig(new_config)
 
     def _doCleanup(self):
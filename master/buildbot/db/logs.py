@@ -84,7 +84,7 @@ class LogsConnectorComponent(base.DBConnectorComponent):
                 rv = self._logdictFromRow(row)
             res.close()
             return rv
-        return self.db.pool.do(thd_getLog)
+        return self.db.get_read_pool().do(thd_getLog)
 
     def getLog(self, logid):
         return self._getLog(self.db.model.logs.c.id == logid)
@@ -94,7 +94,7 @@ class LogsConnectorComponent(base.DBConnectorComponent):
         return self._getLog((tbl.c.slug == slug) & (tbl.c.stepid == stepid))
 
     # returns a Deferred that returns a value
-    def getLogs(self, stepid=None):
+    def getLogs(self, stepid=None, stale_ok=False):
         def thdGetLogs(conn):
             tbl = self.db.model.logs
             q = tbl.select()
@@ -103,10 +103,10 @@ class LogsConnectorComponent(base.DBConnectorComponent):
             q = q.order_by(tbl.c.id)
             res = conn.execute(q)
             return [self._logdictFromRow(row) for row in res.fetchall()]
-        return self.db.pool.do(thdGetLogs)
+        return self.db.get_read_pool(stale_ok).do(thdGetLogs)
 
     # returns a Deferred that returns a value
-    def getLogLines(self, logid, first_line, last_line):
+    def getLogLines(self, logid, first_line, last_line, stale_ok=False):
         def thdGetLogLines(conn):
             # get a set of chunks that completely cover the requested range
             tbl = self.db.model.logchunks
@@ -138,7 +138,7 @@ class LogsConnectorComponent(base.DBConnectorComponent):
                     content = content[:idx]
                 rv.append(content)
             return '\n'.join(rv) + '\n' if rv else ''
-        return self.db.pool.do(thdGetLogLines)
+        return self.db.get_read_pool(stale_ok).do(thdGetLogLines)
 
     # returns a Deferred that returns a value
     def addLog(self, stepid, name, slug, type):
@@ -213,7 +213,7 @@ class LogsConnectorComponent(base.DBConnectorComponent):
         def thdappendLog(conn):
             return self.thdAppendLog(conn, logid, content)
 
-        return self.db.pool.do(thdappendLog)
+        return self.db.pool.do_batched(thdappendLog)
 
     def _splitBigChunk(self, content, logid):
         """
@@ -252,7 +252,7 @@ class LogsConnectorComponent(base.DBConnectorComponent):
             tbl = self.db.model.logs
             q = tbl.update(whereclause=(tbl.c.id == logid))
             conn.execute(q, complete=1)
-        return self.db.pool.do(thdfinishLog)
+        return self.db.pool.do_batched(thdfinishLog)
 
     @defer.inlineCallbacks
     def compressLog(self, logid, force=False):
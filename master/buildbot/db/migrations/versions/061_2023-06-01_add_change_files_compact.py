@@ -0,0 +1,49 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+
+"""add change_files_compact
+
+Revision ID: 061
+Revises: 060
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '061'
+down_revision = '060'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "change_files_compact",
+        sa.Column('changeid', sa.Integer,
+                  sa.ForeignKey('changes.changeid', ondelete='CASCADE'),
+                  nullable=False),
+        sa.Column('files', sa.LargeBinary().with_variant(sa.dialects.mysql.LONGBLOB, "mysql"),
+                  nullable=False),
+        mysql_DEFAULT_CHARSET='utf8',
+    )
+
+    op.create_index('change_files_compact_changeid', "change_files_compact", ["changeid"],
+                    unique=True)
+
+
+def downgrade():
+    op.drop_index("change_files_compact_changeid")
+    op.drop_table("change_files_compact")
@@ -0,0 +1,57 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+
+"""add reporter_queue
+
+Revision ID: 062
+Revises: 061
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '062'
+down_revision = '061'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "reporter_queue",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column('objectid', sa.Integer,
+                  sa.ForeignKey('objects.id', ondelete='CASCADE'),
+                  nullable=False),
+        sa.Column('masterid', sa.Integer,
+                  sa.ForeignKey('masters.id', ondelete='CASCADE'),
+                  nullable=False),
+        sa.Column('created_at', sa.Integer, nullable=False),
+        sa.Column('next_attempt_at', sa.Integer, nullable=False),
+        sa.Column('attempts', sa.Integer, nullable=False),
+        sa.Column('ordering_key', sa.String(255), nullable=True),
+        sa.Column('reports', sa.LargeBinary().with_variant(sa.dialects.mysql.LONGBLOB, "mysql"),
+                  nullable=False),
+        mysql_DEFAULT_CHARSET='utf8',
+    )
+
+    op.create_index('reporter_queue_objectid_masterid', "reporter_queue",
+                    ["objectid", "masterid"])
+
+
+def downgrade():
+    op.drop_index("reporter_queue_objectid_masterid")
+    op.drop_table("reporter_queue")
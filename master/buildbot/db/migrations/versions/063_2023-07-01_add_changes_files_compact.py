@@ -0,0 +1,48 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+
+"""add changes.files_compact
+
+Revision ID: 063
+Revises: 062
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '063'
+down_revision = '062'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("changes") as batch_op:
+        batch_op.add_column(
+            sa.Column('files_compact', sa.SmallInteger, nullable=False, server_default='0'),
+        )
+
+    # flag the changes whose files were already stored in change_files_compact
+    changes = sa.table('changes', sa.column('changeid'), sa.column('files_compact'))
+    change_files_compact = sa.table('change_files_compact', sa.column('changeid'))
+    op.execute(
+        changes.update()
+        .where(changes.c.changeid.in_(sa.select([change_files_compact.c.changeid])))
+        .values(files_compact=1))
+
+
+def downgrade():
+    op.drop_column("changes", "files_compact")
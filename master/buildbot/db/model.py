@@ -370,6 +370,17 @@ class Model(base.DBConnectorComponent):
         sa.Column('filename', sa.String(1024), nullable=False),
     )
 
+    # Files touched in changes with very many files, stored as a single
+    # zlib-compressed JSON list instead of one change_files row per file
+    change_files_compact = sautils.Table(
+        'change_files_compact', metadata,
+        sa.Column('changeid', sa.Integer,
+                  sa.ForeignKey('changes.changeid', ondelete='CASCADE'),
+                  nullable=False),
+        sa.Column('files', sa.LargeBinary().with_variant(sa.dialects.mysql.LONGBLOB, "mysql"),
+                  nullable=False),
+    )
+
     # Properties for changes
     change_properties = sautils.Table(
         'change_properties', metadata,
@@ -453,6 +464,10 @@ class Model(base.DBConnectorComponent):
         sa.Column('parent_changeids', sa.Integer,
                   sa.ForeignKey('changes.changeid', ondelete='SET NULL'),
                   nullable=True),
+
+        # true (nonzero) if the files of this change are stored in
+        # change_files_compact rather than in change_files
+        sa.Column('files_compact', sa.SmallInteger, nullable=False, server_default='0'),
     )
 
     # Tables related to sourcestamps
@@ -800,6 +815,33 @@ class Model(base.DBConnectorComponent):
         sa.Column("value_json", sa.Text, nullable=False),
     )
 
+    # This table stores the reports that reporters with a persistent queue
+    # have yet to deliver, so that they survive master restarts.
+    reporter_queue = sautils.Table(
+        "reporter_queue", metadata,
+        sa.Column("id", sa.Integer, primary_key=True),
+        # the reporter, as identified in the objects table
+        sa.Column('objectid', sa.Integer,
+                  sa.ForeignKey('objects.id', ondelete='CASCADE'),
+                  nullable=False),
+        # the master which generated the reports and is responsible for
+        # delivering them
+        sa.Column('masterid', sa.Integer,
+                  sa.ForeignKey('masters.id', ondelete='CASCADE'),
+                  nullable=False),
+        sa.Column('created_at', sa.Integer, nullable=False),
+        # time of the next delivery attempt
+        sa.Column('next_attempt_at', sa.Integer, nullable=False),
+        # number of failed delivery attempts
+        sa.Column('attempts', sa.Integer, nullable=False),
+        # the reports with the same ordering key are delivered in order, NULL
+        # if they can be delivered in any order
+        sa.Column('ordering_key', sa.String(255), nullable=True),
+        # the reports, as a zlib-compressed JSON list
+        sa.Column('reports', sa.LargeBinary().with_variant(sa.dialects.mysql.LONGBLOB, "mysql"),
+                  nullable=False),
+    )
+
     # Tables related to users
     # -----------------------
 
@@ -877,6 +919,8 @@ class Model(base.DBConnectorComponent):
     sa.Index('changes_category', changes.c.category)
     sa.Index('changes_when_timestamp', changes.c.when_timestamp)
     sa.Index('change_files_changeid', change_files.c.changeid)
+    sa.Index('change_files_compact_changeid', change_files_compact.c.changeid,
+             unique=True)
     sa.Index('change_properties_changeid', change_properties.c.changeid)
     sa.Index('changes_sourcestampid', changes.c.sourcestampid)
     sa.Index('changesource_name_hash', changesources.c.name_hash, unique=True)
@@ -920,6 +964,8 @@ class Model(base.DBConnectorComponent):
              users_info.c.attr_data, unique=True)
     sa.Index('change_users_changeid', change_users.c.changeid)
     sa.Index('users_bb_user', users.c.bb_username, unique=True)
+    sa.Index('reporter_queue_objectid_masterid', reporter_queue.c.objectid,
+             reporter_queue.c.masterid)
     sa.Index('object_identity', objects.c.name, objects.c.class_name,
              unique=True)
     sa.Index('name_per_object', object_state.c.objectid, object_state.c.name,
@@ -14,8 +14,10 @@
 # Copyright Buildbot Team Members
 
 
+import functools
 import inspect
 import sqlite3
+import threading
 import time
 import traceback
 
@@ -25,6 +27,7 @@ from twisted.internet import defer
 from twisted.internet import threads
 from twisted.python import log
 from twisted.python import threadpool
+from twisted.python.failure import Failure
 
 from buildbot.db.buildrequests import AlreadyClaimedError
 from buildbot.db.buildsets import AlreadyCompleteError
@@ -68,6 +71,7 @@ def timed_do_fn(f):
 
         # wrap the callable to log the begin and end of the actual thread
         # function
+        @functools.wraps(callable)
         def callable_wrap(*args, **kargs):
             log.msg(f"{descr} - thd start")
             try:
@@ -88,11 +92,48 @@ def timed_do_fn(f):
     return wrap
 
 
+class QueryStats:
+
+    """
+    Statistics of the queries of a connector component method: the number of queries, their total
+    latency, and the histograms of the time spent waiting for a thread and executing
+    """
+
+    __slots__ = ('count', 'total', 'wait', 'execution')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.wait = metrics.Histogram()
+        self.execution = metrics.Histogram()
+
+
+class _QueryTiming:
+    # filled by the thread executing the query, read by the reactor thread once it completes
+
+    __slots__ = ('submitted', 'started', 'finished', 'statements')
+
+    def __init__(self):
+        self.submitted = time.monotonic()
+        self.started = self.finished = None
+        self.statements = None
+
+
 class DBThreadPool:
 
     running = False
 
-    def __init__(self, engine, reactor, verbose=False):
+    # queries executing for longer than this number of seconds are logged with their SQL
+    # statements; None disables the log. Set from c['metrics']['db_slow_query_threshold']
+    slow_query_threshold = None
+    MAX_LOGGED_STATEMENTS = 10
+    MAX_LOGGED_STATEMENT_LENGTH = 2000
+
+    # maximum number of callables passed to do_batched that share a transaction
+    MAX_BATCH_SIZE = 100
+
+    def __init__(self, engine, reactor, verbose=False, pool_size=None, name='write',
+                 batch_writes=False):
         # verbose is used by upgrade scripts, and if it is set we should print
         # messages about versions and other warnings
         log_msg = log.msg
@@ -102,21 +143,44 @@ class DBThreadPool:
             log_msg = _log_msg
 
         self.reactor = reactor
-
-        pool_size = 5
+        # 'write' for the main pool, 'read' for the pool of the read-only queries
+        self.name = name
 
         # If the engine has an C{optimal_thread_pool_size} attribute, then the
-        # maxthreads of the thread pool will be set to that value.  This is
-        # most useful for SQLite in-memory connections, where exactly one
-        # connection (and thus thread) should be used.
-        if hasattr(engine, 'optimal_thread_pool_size'):
-            pool_size = engine.optimal_thread_pool_size
+        # maxthreads of the thread pool is limited to that value: more threads
+        # than connections would only wait for a connection.  This is most
+        # useful for SQLite connections, where exactly one connection (and thus
+        # thread) should be used.
+        optimal_size = getattr(engine, 'optimal_thread_pool_size', None)
+        if pool_size is None:
+            pool_size = 5 if optimal_size is None else optimal_size
+        elif optimal_size is not None and pool_size > optimal_size:
+            log_msg(f"NOTE: the size of the {name} database thread pool is limited to "
+                    f"{optimal_size} threads by the database engine")
+            pool_size = optimal_size
 
         self._pool = threadpool.ThreadPool(minthreads=1,
                                            maxthreads=pool_size,
-                                           name='DBThreadPool')
+                                           name=f'DBThreadPool-{name}')
+        self.pool_size = pool_size
+
+        # if set, the callables passed to do_batched that are queued at the same time run in a
+        # single transaction; used for the SQLite single writer mode
+        self.batch_writes = batch_writes
+        self._batch = []
+        self._batch_scheduled = False
+        self._batch_lock = threading.Lock()
+
+        # cheap instrumentation, read by the metrics endpoint: number of queries submitted and
+        # not yet completed, and QueryStats by query name
+        self.queries_in_flight = 0
+        self.query_stats = {}
 
         self.engine = engine
+        # statements executed by the current query of each thread, if the slow query log is
+        # enabled
+        self._thd_statements = threading.local()
+        sa.event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
         if engine.dialect.name == 'sqlite':
             vers = self.get_sqlite_version()
             if vers < (3, 7):
@@ -164,6 +228,7 @@ class DBThreadPool:
         self._stop_evt = None
         threads.deferToThreadPool(self.reactor, self._pool, self.engine.dispose)
         self._pool.stop()
+        self._remove_listeners()
         self.running = False
 
     @defer.inlineCallbacks
@@ -171,8 +236,13 @@ class DBThreadPool:
         self._stop_evt = None
         yield threads.deferToThreadPool(self.reactor, self._pool, self.engine.dispose)
         self._pool.stop()
+        self._remove_listeners()
         self.running = False
 
+    def _remove_listeners(self):
+        if sa.event.contains(self.engine, 'before_cursor_execute', self._before_cursor_execute):
+            sa.event.remove(self.engine, 'before_cursor_execute', self._before_cursor_execute)
+
     @defer.inlineCallbacks
     def shutdown(self):
         """Manually stop the pool.  This is only necessary from tests, as the
@@ -191,7 +261,23 @@ class DBThreadPool:
     BACKOFF_MULT = 1.05
     MAX_OPERATIONALERROR_TIME = 3600 * 24  # one day
 
-    def __thd(self, with_engine, callable, args, kwargs):
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        statements = getattr(self._thd_statements, 'statements', None)
+        if statements is not None:
+            # the parameters are not recorded, they may contain sensitive data
+            statements.append(statement)
+
+    def __thd(self, timing, with_engine, callable, args, kwargs):
+        timing.started = time.monotonic()
+        if self.slow_query_threshold is not None:
+            timing.statements = self._thd_statements.statements = []
+        try:
+            return self.__thd_retry(with_engine, callable, args, kwargs)
+        finally:
+            self._thd_statements.statements = None
+            timing.finished = time.monotonic()
+
+    def __thd_retry(self, with_engine, callable, args, kwargs):
         # try to call callable(arg, *args, **kwargs) repeatedly until no
         # OperationalErrors occur, where arg is either the engine (with_engine)
         # or a connection (not with_engine)
@@ -239,19 +325,161 @@ class DBThreadPool:
             break
         return rv
 
+    @property
+    def queries_queued(self):
+        return max(0, self.queries_in_flight - self.pool_size)
+
+    @staticmethod
+    def _query_name(callable):
+        name = getattr(callable, '__qualname__', None) or repr(callable)
+        # 'BuildsConnectorComponent.getBuild.<locals>.thd' -> 'BuildsConnectorComponent.getBuild'
+        return name.split('.<locals>.', 1)[0]
+
+    def _record_query(self, name, elapsed, timing):
+        stats = self.query_stats.get(name)
+        if stats is None:
+            stats = self.query_stats[name] = QueryStats()
+        stats.count += 1
+        stats.total += elapsed
+
+        if timing.started is None:
+            # the query was not run, e.g. the pool was stopped
+            return
+        stats.wait.observe(timing.started - timing.submitted)
+        execution = timing.finished - timing.started
+        stats.execution.observe(execution)
+
+        if self.slow_query_threshold is not None and execution >= self.slow_query_threshold:
+            self._log_slow_query(name, timing)
+
+    def _log_slow_query(self, name, timing):
+        metrics.MetricCountEvent.log('DBThreadPool.slow_queries', 1)
+        wait = (timing.started - timing.submitted) * 1000
+        execution = (timing.finished - timing.started) * 1000
+        lines = [f"slow database query {name}: executed in {execution:0.1f} ms "
+                 f"after waiting {wait:0.1f} ms for a thread"]
+        statements = timing.statements or []
+        for statement in statements[:self.MAX_LOGGED_STATEMENTS]:
+            if len(statement) > self.MAX_LOGGED_STATEMENT_LENGTH:
+                statement = statement[:self.MAX_LOGGED_STATEMENT_LENGTH] + '...'
+            lines.append(f"  {' '.join(statement.split())}")
+        if len(statements) > self.MAX_LOGGED_STATEMENTS:
+            lines.append(f"  ... and {len(statements) - self.MAX_LOGGED_STATEMENTS} "
+                         "more statements")
+        log.msg('\n'.join(lines))
+
     @defer.inlineCallbacks
-    def do(self, callable, *args, **kwargs):
-        ret = yield threads.deferToThreadPool(self.reactor, self._pool,
-                                              self.__thd, False, callable,
-                                              args, kwargs)
+    def _do(self, with_engine, callable, args, kwargs):
+        start = self.reactor.seconds()
+        timing = _QueryTiming()
+        self.queries_in_flight += 1
+        try:
+            ret = yield threads.deferToThreadPool(self.reactor, self._pool,
+                                                  self.__thd, timing, with_engine, callable,
+                                                  args, kwargs)
+        finally:
+            self.queries_in_flight -= 1
+            self._record_query(self._query_name(callable), self.reactor.seconds() - start,
+                               timing)
         return ret
 
+    def do(self, callable, *args, **kwargs):
+        return self._do(False, callable, args, kwargs)
+
+    def do_batched(self, callable, *args, **kwargs):
+        """
+        Like do(), for a callable that only writes and does not manage transactions itself.  If
+        batch_writes is set, the callable may run in the same transaction as the other batched
+        callables queued at the same time, which saves a commit per query.
+        """
+        if not self.batch_writes:
+            return self.do(callable, *args, **kwargs)
+
+        d = defer.Deferred()
+        item = (_QueryTiming(), self.reactor.seconds(), callable, args, kwargs, d)
+        self.queries_in_flight += 1
+        with self._batch_lock:
+            self._batch.append(item)
+            schedule = not self._batch_scheduled
+            self._batch_scheduled = True
+        # the batch is picked up by the thread when it starts, so that the callables queued
+        # until then are added to it
+        if schedule:
+            self._run_batch()
+        return d
+
     @defer.inlineCallbacks
+    def _run_batch(self):
+        try:
+            batch, results = yield threads.deferToThreadPool(self.reactor, self._pool,
+                                                             self.__thd_batch)
+        except Exception:
+            # the pool was stopped
+            failure = Failure()
+            with self._batch_lock:
+                batch, self._batch = self._batch, []
+                self._batch_scheduled = False
+            results = [(False, failure)] * len(batch)
+
+        for (timing, start, callable, _, _, d), (success, result) in zip(batch, results):
+            self.queries_in_flight -= 1
+            self._record_query(self._query_name(callable), self.reactor.seconds() - start,
+                               timing)
+            if success:
+                d.callback(result)
+            else:
+                d.errback(result)
+
+    def __thd_batch(self):
+        with self._batch_lock:
+            batch, self._batch = self._batch, []
+            self._batch_scheduled = False
+
+        results = []
+        for i in range(0, len(batch), self.MAX_BATCH_SIZE):
+            chunk = batch[i:i + self.MAX_BATCH_SIZE]
+            started = time.monotonic()
+            statements = None
+            if self.slow_query_threshold is not None:
+                statements = self._thd_statements.statements = []
+            try:
+                results.extend(self.__thd_retry(False, self.__thd_run_batch, (chunk,), {}))
+            except Exception:
+                results.extend([(False, Failure())] * len(chunk))
+            finally:
+                self._thd_statements.statements = None
+            finished = time.monotonic()
+            for timing, *_ in chunk:
+                timing.started, timing.finished = started, finished
+                timing.statements = statements
+        return batch, results
+
+    def __thd_run_batch(self, conn, chunk):
+        transaction = conn.begin()
+        try:
+            results = [(True, callable(conn, *args, **kwargs))
+                       for _, _, callable, args, kwargs, _ in chunk]
+            transaction.commit()
+            return results
+        except sa.exc.OperationalError as e:
+            transaction.rollback()
+            if self.engine.should_retry(e):
+                raise
+        except Exception:
+            transaction.rollback()
+
+        # one of the callables failed: run each of them in its own transaction, so that the
+        # error is only reported to its caller
+        results = []
+        for _, _, callable, args, kwargs, _ in chunk:
+            try:
+                results.append((True, self.__thd_retry(False, callable, args, kwargs)))
+            except Exception:
+                results.append((False, Failure()))
+        return results
+
     def do_with_engine(self, callable, *args, **kwargs):
-        ret = yield threads.deferToThreadPool(self.reactor, self._pool,
-                                              self.__thd, True, callable,
-                                              args, kwargs)
-        return ret
+        return self._do(True, callable, args, kwargs)
 
     def get_sqlite_version(self):
         return sqlite3.sqlite_version_info
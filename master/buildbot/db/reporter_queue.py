@@ -0,0 +1,86 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+
+import json
+import zlib
+
+from twisted.internet import defer
+
+from buildbot.db import base
+
+
+class ReporterQueueDict(dict):
+    pass
+
+
+class ReporterQueueConnectorComponent(base.DBConnectorComponent):
+    # Documentation is in developer/db.rst
+
+    @defer.inlineCallbacks
+    def enqueueReports(self, objectid, masterid, reports, ordering_key=None):
+        def thd(conn):
+            tbl = self.db.model.reporter_queue
+            now = int(self.master.reactor.seconds())
+            r = conn.execute(tbl.insert(), dict(
+                objectid=objectid,
+                masterid=masterid,
+                created_at=now,
+                next_attempt_at=now,
+                attempts=0,
+                ordering_key=ordering_key,
+                reports=zlib.compress(json.dumps(reports).encode('utf-8'))))
+            return r.inserted_primary_key[0]
+        res = yield self.db.pool.do(thd)
+        return res
+
+    @defer.inlineCallbacks
+    def getQueuedReports(self, objectid, masterid, limit=None, after_id=None):
+        def thd(conn):
+            tbl = self.db.model.reporter_queue
+            q = tbl.select().where((tbl.c.objectid == objectid) & (tbl.c.masterid == masterid))
+            if after_id is not None:
+                q = q.where(tbl.c.id > after_id)
+            q = q.order_by(tbl.c.id)
+            if limit is not None:
+                q = q.limit(limit)
+            return [self._row2dict(row) for row in conn.execute(q).fetchall()]
+        res = yield self.db.pool.do(thd)
+        return res
+
+    @defer.inlineCallbacks
+    def rescheduleQueuedReport(self, queueid, next_attempt_at):
+        def thd(conn):
+            tbl = self.db.model.reporter_queue
+            q = tbl.update().where(tbl.c.id == queueid)
+            conn.execute(q.values(next_attempt_at=next_attempt_at,
+                                  attempts=tbl.c.attempts + 1))
+        yield self.db.pool.do(thd)
+
+    @defer.inlineCallbacks
+    def deleteQueuedReport(self, queueid):
+        def thd(conn):
+            tbl = self.db.model.reporter_queue
+            conn.execute(tbl.delete().where(tbl.c.id == queueid))
+        yield self.db.pool.do(thd)
+
+    def _row2dict(self, row):
+        return ReporterQueueDict(id=row.id,
+                                 objectid=row.objectid,
+                                 masterid=row.masterid,
+                                 created_at=row.created_at,
+                                 next_attempt_at=row.next_attempt_at,
+                                 attempts=row.attempts,
+                                 ordering_key=row.ordering_key,
+                                 reports=json.loads(zlib.decompress(row.reports).decode('utf-8')))
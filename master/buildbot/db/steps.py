@@ -54,10 +54,10 @@ class StepsConnectorComponent(base.DBConnectorComponent):
                 rv = self._stepdictFromRow(row)
             res.close()
             return rv
-        return (yield self.db.pool.do(thd))
+        return (yield self.db.get_read_pool().do(thd))
 
     # returns a Deferred that returns a value
-    def getSteps(self, buildid):
+    def getSteps(self, buildid, stale_ok=False):
         def thd(conn):
             tbl = self.db.model.steps
             q = tbl.select()
@@ -65,7 +65,7 @@ class StepsConnectorComponent(base.DBConnectorComponent):
             q = q.order_by(tbl.c.number)
             res = conn.execute(q)
             return [self._stepdictFromRow(row) for row in res.fetchall()]
-        return self.db.pool.do(thd)
+        return self.db.get_read_pool(stale_ok).do(thd)
 
     # returns a Deferred that returns a value
     def addStep(self, buildid, name, state_string):
@@ -128,7 +128,7 @@ class StepsConnectorComponent(base.DBConnectorComponent):
             tbl = self.db.model.steps
             q = tbl.update(whereclause=(tbl.c.id == stepid))
             conn.execute(q, state_string=state_string)
-        return self.db.pool.do(thd)
+        return self.db.pool.do_batched(thd)
 
     def addURL(self, stepid, name, url, _racehook=None):
         # This methods adds an URL to the db
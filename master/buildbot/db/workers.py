@@ -16,6 +16,7 @@
 import sqlalchemy as sa
 
 from twisted.internet import defer
+from twisted.python.failure import Failure
 
 from buildbot.db import base
 from buildbot.util import identifiers
@@ -24,6 +25,13 @@ from buildbot.util import identifiers
 class WorkersConnectorComponent(base.DBConnectorComponent):
     # Documentation is in developer/database.rst
 
+    def __init__(self, connector):
+        super().__init__(connector)
+        # (workerid, masterid, connected, workerinfo, deferred) of the connections and
+        # disconnections not written yet, in order
+        self._pending_connections = []
+        self._writing_connections = False
+
     def findWorkerId(self, name):
         tbl = self.db.model.workers
         # callers should verify this and give good user error messages
@@ -209,29 +217,101 @@ class WorkersConnectorComponent(base.DBConnectorComponent):
 
     # returns a Deferred that returns None
     def workerConnected(self, workerid, masterid, workerinfo):
-        def thd(conn):
-            conn_tbl = self.db.model.connected_workers
-            q = conn_tbl.insert()
-            try:
-                conn.execute(q,
-                             {'workerid': workerid, 'masterid': masterid})
-            except (sa.exc.IntegrityError, sa.exc.ProgrammingError):
-                # if the row is already present, silently fail..
-                pass
-
-            bs_tbl = self.db.model.workers
-            q = bs_tbl.update(whereclause=(bs_tbl.c.id == workerid))
-            conn.execute(q, info=workerinfo)
-        return self.db.pool.do(thd)
+        return self._queueConnectionChange(workerid, masterid, True, workerinfo)
 
     # returns a Deferred that returns None
     def workerDisconnected(self, workerid, masterid):
-        def thd(conn):
-            tbl = self.db.model.connected_workers
-            q = tbl.delete(whereclause=(tbl.c.workerid == workerid) &
-                                       (tbl.c.masterid == masterid))
-            conn.execute(q)
-        return self.db.pool.do(thd)
+        return self._queueConnectionChange(workerid, masterid, False, None)
+
+    def _queueConnectionChange(self, workerid, masterid, connected, workerinfo):
+        # when a master restarts, all its workers reconnect at the same time: the changes queued
+        # while a write is in progress are written together, in a single transaction
+        d = defer.Deferred()
+        self._pending_connections.append((workerid, masterid, connected, workerinfo, d))
+        if not self._writing_connections:
+            self._writeConnectionChanges()
+        return d
+
+    @defer.inlineCallbacks
+    def _writeConnectionChanges(self):
+        self._writing_connections = True
+        try:
+            while self._pending_connections:
+                changes, self._pending_connections = self._pending_connections, []
+                try:
+                    yield self.db.pool.do(self._thdWriteConnectionChanges, changes)
+                except Exception:
+                    # one of the changes failed: write them one at a time, so that the error
+                    # is only reported to its caller
+                    for workerid, masterid, connected, workerinfo, d in changes:
+                        try:
+                            yield self.db.pool.do(self._thdWriteConnectionChange,
+                                                  workerid, masterid, connected, workerinfo)
+                        except Exception:
+                            d.errback(Failure())
+                        else:
+                            d.callback(None)
+                else:
+                    for *_, d in changes:
+                        d.callback(None)
+        finally:
+            self._writing_connections = False
+
+    def _thdWriteConnectionChanges(self, conn, changes):
+        conn_tbl = self.db.model.connected_workers
+        workers_tbl = self.db.model.workers
+
+        # only the last change of a worker decides whether it is connected
+        connected = {}
+        infos = {}
+        for workerid, masterid, is_connected, workerinfo, _ in changes:
+            connected[(workerid, masterid)] = is_connected
+            if is_connected:
+                infos[workerid] = workerinfo
+
+        transaction = conn.begin()
+        to_connect = sorted(key for key, is_connected in connected.items() if is_connected)
+        # batch the queries to avoid using too many variables
+        for batch in self.doBatch(to_connect, 100):
+            q = sa.select([conn_tbl.c.workerid, conn_tbl.c.masterid])
+            q = q.where(conn_tbl.c.workerid.in_({workerid for workerid, _ in batch}))
+            # the row is already present if the master did not see the worker disconnect
+            existing = {(row.workerid, row.masterid) for row in conn.execute(q)}
+            rows = [{'workerid': workerid, 'masterid': masterid}
+                    for workerid, masterid in batch if (workerid, masterid) not in existing]
+            if rows:
+                conn.execute(conn_tbl.insert(), rows).close()
+
+        for (workerid, masterid), is_connected in connected.items():
+            if not is_connected:
+                q = conn_tbl.delete(whereclause=(conn_tbl.c.workerid == workerid) &
+                                                (conn_tbl.c.masterid == masterid))
+                conn.execute(q).close()
+
+        if infos:
+            q = workers_tbl.update(whereclause=(workers_tbl.c.id == sa.bindparam('_workerid')))
+            q = q.values(info=sa.bindparam('_info'))
+            conn.execute(q, [{'_workerid': workerid, '_info': workerinfo}
+                             for workerid, workerinfo in infos.items()]).close()
+        transaction.commit()
+
+    def _thdWriteConnectionChange(self, conn, workerid, masterid, connected, workerinfo):
+        conn_tbl = self.db.model.connected_workers
+        if not connected:
+            q = conn_tbl.delete(whereclause=(conn_tbl.c.workerid == workerid) &
+                                            (conn_tbl.c.masterid == masterid))
+            conn.execute(q).close()
+            return
+
+        try:
+            conn.execute(conn_tbl.insert(), {'workerid': workerid, 'masterid': masterid})
+        except (sa.exc.IntegrityError, sa.exc.ProgrammingError):
+            # if the row is already present, silently fail..
+            pass
+
+        workers_tbl = self.db.model.workers
+        q = workers_tbl.update(whereclause=(workers_tbl.c.id == workerid))
+        conn.execute(q, info=workerinfo).close()
 
     # returns a Deferred that returns None
     def setWorkerState(self, workerid, paused, graceful):
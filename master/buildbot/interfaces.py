@@ -370,6 +370,8 @@ class IHttpResponse(Interface):
                      "http status code of the request's response (e.g 200)")
     url = Attribute('url',
                     "request's url (e.g https://api.github.com/endpoint')")
+    headers = Attribute('headers',
+                        "dictionary of the response's headers, with lower-cased names")
 
 
 class IConfigurator(Interface):
@@ -14,6 +14,8 @@
 # Copyright Buildbot Team Members
 
 
+from collections import Counter
+
 from twisted.internet import defer
 from twisted.python import failure
 from twisted.python import log
@@ -28,6 +30,8 @@ class MQBase(service.AsyncService):
     def __init__(self):
         super().__init__()
         self._deferwaiter = deferwaiter.DeferWaiter()
+        # number of produced messages, by the first element of their routing key
+        self.produced = Counter()
 
     @defer.inlineCallbacks
     def stopService(self):
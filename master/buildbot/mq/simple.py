@@ -37,6 +37,7 @@ class SimpleMQ(service.ReconfigurableServiceMixin, base.MQBase):
         return super().reconfigServiceWithBuildbotConfig(new_config)
 
     def produce(self, routingKey, data):
+        self.produced[routingKey[0]] += 1
         if self.debug:
             log.msg(f"MSG: {routingKey}\n{pprint.pformat(data)}")
         for qref in self.qrefs:
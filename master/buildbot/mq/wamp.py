@@ -31,6 +31,7 @@ class WampMQ(service.ReconfigurableServiceMixin, base.MQBase):
     NAMESPACE = "org.buildbot.mq"
 
     def produce(self, routingKey, data):
+        self.produced[routingKey[0]] += 1
         d = self._produce(routingKey, data)
         d.addErrback(
             log.err, "Problem while producing message on topic " + repr(routingKey))
@@ -354,6 +354,8 @@ class Build(properties.PropertiesMixin):
             yield self.buildFinished(['Build.setupBuild', 'failed'], EXCEPTION)
             return
 
+        self.prefetchSecrets()
+
         # flush properties in the beginning of the build
         yield self.master.data.updates.setBuildProperties(self.buildid, self)
         yield self.master.data.updates.setBuildStateString(self.buildid,
@@ -518,6 +520,20 @@ class Build(properties.PropertiesMixin):
             self.setProperty('owners', sorted(owners), 'Build')
         self.text = []  # list of text string lists (text2)
 
+    def prefetchSecrets(self):
+        # query the secrets needed by the steps while the worker is prepared, so that the
+        # providers have cached them when the steps are rendered
+        secrets_manager = self.master.namedServices.get('secrets')
+        if secrets_manager is None:
+            return
+        names = set()
+        for factory in self.stepFactories:
+            names.update(properties.get_secret_names((getattr(factory, 'args', ()),
+                                                      getattr(factory, 'kwargs', {}))))
+        if names:
+            d = secrets_manager.prefetch(names)
+            d.addErrback(log.err, 'while prefetching secrets')
+
     def addStepsAfterCurrentStep(self, step_factories):
         # Add the new steps after the step that is running.
         # The running step has already been popped from self.steps
@@ -24,6 +24,7 @@ from buildbot import interfaces
 from buildbot.data import resultspec
 from buildbot.interfaces import IRenderable
 from buildbot.process import buildrequest
+from buildbot.process import metrics
 from buildbot.process import workerforbuilder
 from buildbot.process.build import Build
 from buildbot.process.properties import Properties
@@ -338,6 +339,11 @@ class Builder(util_service.ReconfigurableServiceMixin,
 
         log.msg(f"starting build {build} using worker {workerforbuilder}")
 
+        submitted = [br.submittedAt for br in buildrequests if br.submittedAt is not None]
+        if submitted:
+            metrics.MetricTimeEvent.log('Builder.build_start_latency',
+                                        self.master.reactor.seconds() - min(submitted))
+
         # set up locks
         locks = yield build.render(self.config.locks)
         yield build.setLocks(locks)
@@ -293,6 +293,8 @@ class BuildRequestDistributor(service.AsyncMultiService):
         # sorted list of names of builders that need their maybeStartBuild
         # method invoked.
         self._pending_builders = []
+        # names of builders waiting to be sorted into _pending_builders
+        self._unsorted_builders = set()
         self.activity_lock = defer.DeferredLock()
         self.active = False
 
@@ -340,9 +342,17 @@ class BuildRequestDistributor(service.AsyncMultiService):
         if new_builders < existing_pending:
             return None
 
+        # the builders added while the list is being sorted, e.g. by many workers attaching at
+        # the same time, are sorted together by the first call that gets the lock
+        self._unsorted_builders |= new_builders
+
         # reset the list of pending builders
         @defer.inlineCallbacks
-        def resetPendingBuildersList(new_builders):
+        def resetPendingBuildersList():
+            new_builders = self._unsorted_builders
+            if not new_builders:
+                return
+            self._unsorted_builders = set()
             try:
                 # re-fetch existing_pending, in case it has changed
                 # while acquiring the lock
@@ -360,8 +370,7 @@ class BuildRequestDistributor(service.AsyncMultiService):
             except Exception:  # pragma: no cover
                 log.err(Failure(), f"while attempting to start builds on {self.name}")
 
-        yield self.pending_builders_lock.run(
-            resetPendingBuildersList, new_builders)
+        yield self.pending_builders_lock.run(resetPendingBuildersList)
         return None
 
     @defer.inlineCallbacks
@@ -285,6 +285,7 @@ class BuildStep(results.ResultComputingConfigMixin,
         self.results = None
         self._start_unhandled_deferreds = None
         self._test_result_submitters = {}
+        self._collecting_commands = []
 
     def __new__(klass, *args, **kwargs):
         self = object.__new__(klass)
@@ -528,6 +529,10 @@ class BuildStep(results.ResultComputingConfigMixin,
                 hidden = False
 
         # perform final clean ups
+        for cmd in self._collecting_commands:
+            cmd.close_collected_output()
+        self._collecting_commands = []
+
         success = yield self._cleanup_logs()
         if not success:
             self.results = EXCEPTION
@@ -762,6 +767,8 @@ class BuildStep(results.ResultComputingConfigMixin,
 
         self.cmd = command
         command.worker = self.worker
+        if command.collectStdout or command.collectStderr:
+            self._collecting_commands.append(command)
         try:
             res = yield command.run(self, self.remote, self.build.builder.name)
         finally:
@@ -13,8 +13,6 @@
 #
 # Copyright Buildbot Team Members
 
-import re
-
 from twisted.internet import defer
 from twisted.python import log
 
@@ -168,8 +166,6 @@ Log._byType['h'] = HtmlLog
 
 class StreamLog(Log):
 
-    pat = re.compile('^', re.M)
-
     def __init__(self, step, name, type, logid, decoder):
         super().__init__(step, name, type, logid, decoder)
         self.lbfs = {}
@@ -184,9 +180,9 @@ class StreamLog(Log):
     def _on_whole_lines(self, stream, lines):
         # deliver the un-annotated version to subscribers
         self.subPoint.deliver(stream, lines)
-        # strip the last character, as the regexp will add a
-        # prefix character after the trailing newline
-        return self.addRawLines(self.pat.sub(stream, lines)[:-1])
+        # prefix each line with the stream; strip the last character, as the
+        # replacement adds a prefix character after the trailing newline
+        return self.addRawLines((stream + lines.replace('\n', '\n' + stream))[:-1])
 
     def split_lines(self, stream, text):
         lbf = self._getLbf(stream)
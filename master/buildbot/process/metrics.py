@@ -32,6 +32,7 @@ Basic architecture:
     MetricWatcher
 """
 
+import bisect
 import gc
 import os
 import sys
@@ -44,6 +45,7 @@ from twisted.internet.task import LoopingCall
 from twisted.python import log
 
 from buildbot import util
+from buildbot.process import reactorprofiler
 from buildbot.util import service as util_service
 
 # Make use of the resource module if we can
@@ -175,6 +177,39 @@ class AveragingFiniteList(FiniteList):
         return self.average
 
 
+class Histogram:
+
+    """
+    Counts observed values in buckets of fixed upper bounds, as exposed by Prometheus
+    """
+
+    DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    __slots__ = ('buckets', 'counts', 'count', 'sum')
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        # the last count is for the values above the last bucket
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulativeCounts(self):
+        """Returns a list of (upper bound, number of values <= upper bound), ending with
+        the infinite upper bound"""
+        retval = []
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            retval.append((bound, total))
+        return retval
+
+
 class MetricHandler:
 
     def __init__(self, metrics):
@@ -245,9 +280,15 @@ class MetricTimeHandler(MetricHandler):
 
     def reset(self):
         self._timers = defaultdict(AveragingFiniteList)
+        # number of events and total elapsed time since the start, as needed by the
+        # Prometheus exposition
+        self._totals = defaultdict(lambda: [0, 0.0])
 
     def handle(self, eventDict, metric):
         self._timers[metric.timer].append(metric.elapsed)
+        totals = self._totals[metric.timer]
+        totals[0] += 1
+        totals[1] += metric.elapsed
 
     def keys(self):
         return list(self._timers)
@@ -255,6 +296,10 @@ class MetricTimeHandler(MetricHandler):
     def get(self, timer):
         return self._timers[timer].average
 
+    def getTotals(self, timer):
+        count, total = self._totals[timer]
+        return count, total
+
     def report(self):
         retval = []
         for timer in sorted(self.keys()):
@@ -384,6 +429,8 @@ class MetricLogObserver(util_service.ReconfigurableServiceMixin,
         self.periodic_interval = None
         self.log_task = None
         self.log_interval = None
+        self.reactor_profiler = None
+        self.reactor_profiler_config = None
 
         # Mapping of metric type to handlers for that type
         self.handlers = {}
@@ -397,14 +444,17 @@ class MetricLogObserver(util_service.ReconfigurableServiceMixin,
             AttachedWorkersWatcher(self))
 
     def reconfigServiceWithBuildbotConfig(self, new_config):
+        metrics_config = new_config.metrics
+        if metrics_config is None and new_config.www.get('metrics'):
+            # the metrics are only exposed by the web server, don't log them
+            metrics_config = {'log_interval': 0}
+
         # first, enable or disable
-        if new_config.metrics is None:
+        if metrics_config is None:
             self.disable()
         else:
             self.enable()
 
-            metrics_config = new_config.metrics
-
             # Start up periodic logging
             log_interval = metrics_config.get('log_interval', 60)
             if log_interval != self.log_interval:
@@ -428,6 +478,20 @@ class MetricLogObserver(util_service.ReconfigurableServiceMixin,
                     self.periodic_task.clock = self._reactor
                     self.periodic_task.start(periodic_interval)
 
+            # and for the reactor profiler
+            profiler_config = metrics_config.get('reactor_profiler')
+            if profiler_config is True:
+                profiler_config = {}
+            elif not profiler_config:
+                profiler_config = None
+            if profiler_config != self.reactor_profiler_config:
+                self.stopReactorProfiler()
+                if profiler_config is not None:
+                    self.reactor_profiler = reactorprofiler.ReactorProfiler(
+                        self._reactor, **profiler_config)
+                    self.reactor_profiler.start()
+                    self.reactor_profiler_config = profiler_config
+
         # upcall
         return super().reconfigServiceWithBuildbotConfig(new_config)
 
@@ -453,9 +517,17 @@ class MetricLogObserver(util_service.ReconfigurableServiceMixin,
             self.log_task.stop()
             self.log_task = None
 
+        self.stopReactorProfiler()
+
         log.removeObserver(self.emit)
         self.enabled = False
 
+    def stopReactorProfiler(self):
+        if self.reactor_profiler:
+            self.reactor_profiler.stop()
+            self.reactor_profiler = None
+        self.reactor_profiler_config = None
+
     def registerHandler(self, interface, handler):
         old = self.getHandler(interface)
         self.handlers[interface] = handler
@@ -576,6 +576,41 @@ class _SecretIndexer:
         return _SecretRenderer(password)
 
 
+def get_secret_names(obj):
+    """
+    Returns the names of the secrets that rendering ``obj`` may need: those of the ``Secret``
+    renderables and of the ``secret`` selectors of ``Interpolate``, found in ``obj`` and in the
+    containers and renderables it holds. The secrets selected by other renderables, e.g. by a
+    property, are not found.
+    """
+    names = set()
+    seen = set()
+
+    def walk(o):
+        if id(o) in seen or isinstance(o, (str, bytes, int, float)) or o is None:
+            return
+        seen.add(id(o))
+        if isinstance(o, _SecretRenderer):
+            names.add(o.secret_name)
+        elif isinstance(o, _Lookup) and isinstance(o.value, _SecretIndexer):
+            if isinstance(o.index, str):
+                names.add(o.index)
+            walk(o.default)
+        elif isinstance(o, dict):
+            for k, v in o.items():
+                walk(k)
+                walk(v)
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            for v in o:
+                walk(v)
+        elif IRenderable.providedBy(o):
+            for v in getattr(o, '__dict__', {}).values():
+                walk(v)
+
+    walk(obj)
+    return names
+
+
 @implementer(IRenderable)
 class _SourceStampDict(util.ComparableMixin):
 
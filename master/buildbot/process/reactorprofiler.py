@@ -0,0 +1,210 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+
+"""
+Detects when the reactor is blocked and finds out what blocks it.
+
+A LoopingCall ticks every ``interval`` seconds in the reactor thread and measures the lag of the
+event loop. A watchdog thread checks that the ticks keep coming: once the reactor has been
+blocked for more than ``threshold`` seconds, it samples the stack of the reactor thread every
+``sample_interval`` seconds until the reactor runs again. The blocked time is then attributed to
+the ``inlineCallbacks`` generators found in the samples, logged, and kept for the data API.
+"""
+
+import collections
+import inspect
+import sys
+import threading
+import traceback
+
+from twisted.internet.task import LoopingCall
+from twisted.python import log
+
+from buildbot.process import metrics
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    name = getattr(code, 'co_qualname', None)
+    if name is None:
+        # before Python 3.11, use the class of self for methods
+        name = code.co_name
+        self = frame.f_locals.get('self')
+        if self is not None:
+            name = f'{type(self).__name__}.{name}'
+    return name
+
+
+def _is_inline_callbacks_frame(frame):
+    return (frame.f_code.co_name == '_inlineCallbacks' and
+            frame.f_code.co_filename.endswith(('defer.py', 'defer.pyc')))
+
+
+def inline_callbacks_generators(frame):
+    """ Returns the names of the ``inlineCallbacks`` generators running in the stack of
+        ``frame``, from the innermost to the outermost.
+    """
+    generators = []
+    while frame is not None:
+        parent = frame.f_back
+        if (frame.f_code.co_flags & inspect.CO_GENERATOR and parent is not None and
+                _is_inline_callbacks_frame(parent)):
+            generators.append(_frame_name(frame))
+        frame = parent
+    return generators
+
+
+class _Stall:
+    __slots__ = ['samples', 'stack', 'generators']
+
+    def __init__(self):
+        self.samples = 0
+        self.stack = None
+        # number of samples in which each generator was running
+        self.generators = collections.Counter()
+
+
+class ReactorProfiler:
+
+    MAX_STALLS = 50
+    MAX_STACK_DEPTH = 40
+
+    def __init__(self, reactor, interval=0.1, threshold=0.5, sample_interval=None):
+        self.reactor = reactor
+        self.interval = interval
+        self.threshold = threshold
+        self.sample_interval = sample_interval or threshold / 5
+
+        self.lag = 0
+        self.max_lag = 0
+        self.stall_count = 0
+        self.stalled_time = 0
+        # name -> [blocked time, number of stalls]
+        self.generators = {}
+        # the most recent stalls, as dictionaries
+        self.stalls = collections.deque(maxlen=self.MAX_STALLS)
+
+        self._next_stallid = 1
+        self._expected = None
+        self._lock = threading.Lock()
+        # written by the reactor thread, read by the watchdog thread
+        self._heartbeat = None
+        # written by the watchdog thread, consumed by the reactor thread
+        self._stall = None
+        self._task = None
+        self._thread = None
+        self._stopping = threading.Event()
+        self._reactor_thread_id = None
+
+    def start(self):
+        self._reactor_thread_id = threading.get_ident()
+        self._stopping.clear()
+        self._task = LoopingCall(self._tick)
+        self._task.clock = self.reactor
+        self._task.start(self.interval)
+
+        self._thread = threading.Thread(target=self._watchdog, name='ReactorProfiler',
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._task is not None:
+            self._task.stop()
+            self._task = None
+        if self._thread is not None:
+            self._stopping.set()
+            self._thread.join()
+            self._thread = None
+        self._expected = None
+        with self._lock:
+            self._heartbeat = None
+            self._stall = None
+
+    def _tick(self):
+        now = self.reactor.seconds()
+        lag = 0
+        if self._expected is not None:
+            lag = max(0, now - self._expected)
+        self._expected = now + self.interval
+        self.lag = lag
+        self.max_lag = max(self.max_lag, lag)
+
+        with self._lock:
+            self._heartbeat = now
+            stall, self._stall = self._stall, None
+
+        if stall is not None or lag >= self.threshold:
+            self._record_stall(stall or _Stall(), lag, now)
+
+    def _get_reactor_frame(self):
+        return sys._current_frames().get(self._reactor_thread_id)
+
+    def _watchdog(self):
+        while not self._stopping.wait(self.sample_interval):
+            try:
+                self._check()
+            except Exception:
+                log.err(None, 'while sampling the reactor thread')
+
+    def _check(self):
+        """ Samples the reactor thread if it is blocked. Called from the watchdog thread. """
+        with self._lock:
+            if self._heartbeat is None:
+                return
+            blocked = self.reactor.seconds() - self._heartbeat - self.interval
+            if blocked < self.threshold:
+                return
+
+            frame = self._get_reactor_frame()
+            if frame is None:
+                return
+            if self._stall is None:
+                self._stall = _Stall()
+            stall = self._stall
+            stall.samples += 1
+            for name in set(inline_callbacks_generators(frame)):
+                stall.generators[name] += 1
+            if stall.stack is None:
+                stall.stack = traceback.format_list(
+                    traceback.extract_stack(frame, limit=self.MAX_STACK_DEPTH))
+
+    def _record_stall(self, stall, duration, now):
+        self.stall_count += 1
+        self.stalled_time += duration
+
+        generators = [name for name, _ in stall.generators.most_common()]
+        for name, samples in stall.generators.items():
+            stats = self.generators.setdefault(name, [0, 0])
+            stats[0] += duration * samples / stall.samples
+            stats[1] += 1
+
+        self.stalls.append({
+            'stallid': self._next_stallid,
+            'started_at': now - duration,
+            'duration': duration,
+            'stack': [line.rstrip('\n') for line in stall.stack or []],
+            'generators': generators,
+        })
+        self._next_stallid += 1
+
+        metrics.MetricCountEvent.log('ReactorProfiler.stalls', 1)
+        metrics.MetricTimeEvent.log('ReactorProfiler.stall', duration)
+
+        msg = f'ReactorProfiler: the reactor was blocked for {duration:.3f}s'
+        if generators:
+            msg += f" in {', '.join(generators)}"
+        if stall.stack:
+            msg += '\n' + ''.join(stall.stack)
+        log.msg(msg)
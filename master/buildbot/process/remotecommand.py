@@ -27,6 +27,7 @@ from buildbot.process.results import FAILURE
 from buildbot.process.results import SUCCESS
 from buildbot.util import lineboundaries
 from buildbot.util.eventual import eventually
+from buildbot.util.spillbuffer import SpillBuffer
 from buildbot.worker.protocols import base
 
 
@@ -42,6 +43,9 @@ class RemoteCommand(base.RemoteCommandImpl):
     active = False
     rc = None
     debug = False
+    # the collected stdout and stderr are moved to a temporary file when they are larger than
+    # this number of characters
+    collectMaxMemory = 1024 * 1024
 
     def __init__(self, remote_command, args, ignore_updates=False,
                  collectStdout=False, collectStderr=False, decodeRC=None,
@@ -53,8 +57,8 @@ class RemoteCommand(base.RemoteCommandImpl):
         self._closeWhenFinished = {}
         self.collectStdout = collectStdout
         self.collectStderr = collectStderr
-        self.stdout = ''
-        self.stderr = ''
+        self.stdout_buffer = SpillBuffer(self.collectMaxMemory)
+        self.stderr_buffer = SpillBuffer(self.collectMaxMemory)
         self.updates = {}
         self.stdioLogName = stdioLogName
         self._startTime = None
@@ -77,9 +81,33 @@ class RemoteCommand(base.RemoteCommandImpl):
         self.loglock = defer.DeferredLock()
         self._line_boundary_finders = {}
 
+    # stdout and stderr load the whole collected text in memory, stdout_buffer.chunks() and
+    # stderr_buffer.chunks() read it piece by piece
+    @property
+    def stdout(self):
+        return self.stdout_buffer.getvalue()
+
+    @stdout.setter
+    def stdout(self, value):
+        self.stdout_buffer.close()
+        self.stdout_buffer.append(value)
+
+    @property
+    def stderr(self):
+        return self.stderr_buffer.getvalue()
+
+    @stderr.setter
+    def stderr(self, value):
+        self.stderr_buffer.close()
+        self.stderr_buffer.append(value)
+
     def __repr__(self):
         return f"<RemoteCommand '{self.remote_command}' at {id(self)}>"
 
+    def close_collected_output(self):
+        self.stdout_buffer.close()
+        self.stderr_buffer.close()
+
     @classmethod
     def generate_new_command_id(cls):
         cmd_id = cls._commandCounter
@@ -203,6 +231,8 @@ class RemoteCommand(base.RemoteCommandImpl):
         try:
             for key, value in updates:
                 if self.active and not self.ignore_updates:
+                    # the worker sends whole lines, along with the indexes of the line ends, so
+                    # unlike remote_update(), the text is not split again
                     if key in ['stdout', 'stderr', 'header']:
                         self.remoteUpdate(key, value[0], False)
                     elif key == "log":
@@ -280,7 +310,7 @@ class RemoteCommand(base.RemoteCommandImpl):
     @util.deferredLocked('loglock')
     def addStdout(self, data):
         if self.collectStdout:
-            self.stdout += data
+            self.stdout_buffer.append(data)
         if self.stdioLogName is not None and self.stdioLogName in self.logs:
             self.logs[self.stdioLogName].addStdout(data)
         return defer.succeed(None)
@@ -290,7 +320,7 @@ class RemoteCommand(base.RemoteCommandImpl):
         if self.collectStdout:
             if is_flushed:
                 data = data[:-1]
-            self.stdout += data
+            self.stdout_buffer.append(data)
         if self.stdioLogName is not None and self.stdioLogName in self.logs:
             self.logs[self.stdioLogName].add_stdout_lines(data)
         return defer.succeed(None)
@@ -298,7 +328,7 @@ class RemoteCommand(base.RemoteCommandImpl):
     @util.deferredLocked('loglock')
     def addStderr(self, data):
         if self.collectStderr:
-            self.stderr += data
+            self.stderr_buffer.append(data)
         if self.stdioLogName is not None and self.stdioLogName in self.logs:
             self.logs[self.stdioLogName].addStderr(data)
         return defer.succeed(None)
@@ -308,7 +338,7 @@ class RemoteCommand(base.RemoteCommandImpl):
         if self.collectStderr:
             if is_flushed:
                 data = data[:-1]
-            self.stderr += data
+            self.stderr_buffer.append(data)
         if self.stdioLogName is not None and self.stdioLogName in self.logs:
             self.logs[self.stdioLogName].add_stderr_lines(data)
         return defer.succeed(None)
@@ -14,12 +14,19 @@
 # Copyright Buildbot Team Members
 
 import abc
+import datetime
+import json
 
 from twisted.internet import defer
 from twisted.python import log
 
 from buildbot import config
+from buildbot.process import metrics
 from buildbot.reporters import utils
+from buildbot.util import Notifier
+from buildbot.util import bytes2unicode
+from buildbot.util import datetime2epoch
+from buildbot.util import epoch2datetime
 from buildbot.util import service
 from buildbot.util import tuplematch
 
@@ -30,38 +37,66 @@ class ReporterBase(service.BuildbotService):
     name = None
     __meta__ = abc.ABCMeta
 
-    compare_attrs = ['generators']
+    compare_attrs = ['generators', 'max_concurrent_events', 'persistent_queue']
+
+    # Reports queued in the database are read in batches of QUEUE_BATCH_SIZE.
+    # Failed deliveries are retried after QUEUE_RETRY_START seconds, doubling
+    # up to QUEUE_RETRY_MAX, and dropped after QUEUE_MAX_ATTEMPTS attempts.
+    QUEUE_BATCH_SIZE = 50
+    QUEUE_RETRY_START = 10
+    QUEUE_RETRY_MAX = 3600
+    QUEUE_MAX_ATTEMPTS = 10
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.generators = None
+        self.max_concurrent_events = 1
+        self.persistent_queue = False
         self._event_consumers = []
-        self._pending_got_event_call = None
+        # the Deferred of the last event queued for each ordering key
+        self._pending_got_event_calls = {}
+        self._event_semaphore = None
+        self._queue_objectid = None
+        # the reports as generated, by queue id, for the queued reports delivered by this run
+        self._queued_reports = {}
+        self._queue_dispatching = False
+        self._queue_dispatch_again = False
+        self._queue_stopping = False
+        self._queue_timer = None
+        self._queue_idle_notifier = Notifier()
 
-    def checkConfig(self, generators):
+    def checkConfig(self, generators, max_concurrent_events=1, persistent_queue=False):
         if not isinstance(generators, list):
             config.error('{}: generators argument must be a list')
 
+        if not isinstance(max_concurrent_events, int) or max_concurrent_events < 1:
+            config.error(f'{self.__class__.__name__}: max_concurrent_events must be a '
+                         'positive integer')
+
         for g in generators:
             g.check()
 
+        # the queued reports are found by name after a reconfig or a restart, so the name used
+        # for the queue must not depend on the generators
+        self._queue_name = self.name or self.__class__.__name__
         if self.name is None:
             self.name = self.__class__.__name__
             for g in generators:
                 self.name += "_" + g.generate_name()
 
     @defer.inlineCallbacks
-    def reconfigService(self, generators):
+    def reconfigService(self, generators, max_concurrent_events=1, persistent_queue=False):
 
         for consumer in self._event_consumers:
             yield consumer.stopConsuming()
         self._event_consumers = []
 
-        if self._pending_got_event_call is not None:
-            yield self._pending_got_event_call
-        self._pending_got_event_call = None
+        yield self._wait_pending_got_event_calls()
 
         self.generators = generators
+        self.max_concurrent_events = max_concurrent_events
+        self._event_semaphore = defer.DeferredSemaphore(max_concurrent_events)
+        self.persistent_queue = persistent_queue
 
         wanted_event_keys = set()
         for g in self.generators:
@@ -71,34 +106,65 @@ class ReporterBase(service.BuildbotService):
             consumer = yield self.master.mq.startConsuming(self._got_event, key)
             self._event_consumers.append(consumer)
 
+        if self.persistent_queue:
+            self._queue_stopping = False
+            if self._queue_objectid is None:
+                self._queue_objectid = yield self.master.db.state.getObjectId(
+                    self._queue_name, self.__class__.__name__)
+            # deliver whatever has been left over by a previous run of the master
+            self._dispatch_queued_reports()
+
     @defer.inlineCallbacks
     def stopService(self):
         for consumer in self._event_consumers:
             yield consumer.stopConsuming()
         self._event_consumers = []
-        if self._pending_got_event_call is not None:
-            yield self._pending_got_event_call
-        self._pending_got_event_call = None
+        yield self._wait_pending_got_event_calls()
+        yield self._stop_queue_dispatcher()
         yield super().stopService()
 
+    @defer.inlineCallbacks
+    def _wait_pending_got_event_calls(self):
+        while self._pending_got_event_calls:
+            yield defer.gatherResults(list(self._pending_got_event_calls.values()))
+
     def _does_generator_want_key(self, generator, key):
         for filter in generator.wanted_event_keys:
             if tuplematch.matchTuple(key, filter):
                 return True
         return False
 
+    def _get_report_ordering_key(self, key, msg):
+        # The reports of events with the same ordering key are sent in the
+        # order the events were queued, while the other ones may be sent
+        # concurrently.  A build and its build request share their key, so that
+        # e.g. a 'pending' status can never overtake the 'running' one.
+        if not isinstance(msg, dict):
+            return None
+        if key[0] in ('builds', 'buildrequests') and 'buildrequestid' in msg:
+            return ('buildrequests', msg['buildrequestid'])
+        return tuple(key[:2])
+
+    def _get_event_ordering_key(self, key, msg):
+        if self.max_concurrent_events == 1:
+            return None
+        return self._get_report_ordering_key(key, msg)
+
     @defer.inlineCallbacks
     def _got_event(self, key, msg):
-        pending_got_event_call = self._pending_got_event_call
+        ordering_key = self._get_event_ordering_key(key, msg)
+        pending_got_event_call = self._pending_got_event_calls.get(ordering_key)
 
         # Mark this call as pending.
-        self._pending_got_event_call = d = defer.Deferred()
+        self._pending_got_event_calls[ordering_key] = d = defer.Deferred()
+        metrics.MetricCountEvent.log(f'{self.name}.pending_events', 1)
 
-        # Wait for previously pending call, if any, to ensure
+        # Wait for previously pending call for the same key, if any, to ensure
         # reports are sent out in the order events were queued.
         if pending_got_event_call is not None:
             yield pending_got_event_call
 
+        yield self._event_semaphore.acquire()
         try:
             reports = []
             for g in self.generators:
@@ -108,12 +174,162 @@ class ReporterBase(service.BuildbotService):
                         reports.append(report)
 
             if reports:
-                yield self.sendMessage(reports)
+                if self.persistent_queue:
+                    yield self._enqueue_reports(reports,
+                                                self._get_report_ordering_key(key, msg))
+                else:
+                    start = self.master.reactor.seconds()
+                    yield self.sendMessage(reports)
+                    metrics.MetricTimeEvent.log(f'{self.name}.sendMessage',
+                                                self.master.reactor.seconds() - start)
         except Exception as e:
             log.err(e, 'Got exception when handling reporter events')
+        finally:
+            self._event_semaphore.release()
 
+        metrics.MetricCountEvent.log(f'{self.name}.pending_events', -1)
+        if self._pending_got_event_calls.get(ordering_key) is d:
+            del self._pending_got_event_calls[ordering_key]
         d.callback(None)  # This event is now fully handled
 
+    @staticmethod
+    def _json_default(obj):
+        if isinstance(obj, datetime.datetime):
+            return {'__datetime__': datetime2epoch(obj)}
+        if isinstance(obj, bytes):
+            return bytes2unicode(obj, errors='replace')
+        raise TypeError(f'Object of type {obj.__class__.__name__} is not JSON serializable')
+
+    @classmethod
+    def _restore_stored_reports(cls, obj):
+        if isinstance(obj, dict):
+            if len(obj) == 1 and '__datetime__' in obj:
+                return epoch2datetime(obj['__datetime__'])
+            return {k: cls._restore_stored_reports(v) for k, v in obj.items()}
+        if isinstance(obj, list):
+            return [cls._restore_stored_reports(v) for v in obj]
+        return obj
+
+    @defer.inlineCallbacks
+    def _enqueue_reports(self, reports, ordering_key=None):
+        stored_reports = json.loads(json.dumps(reports, default=self._json_default))
+        if ordering_key is not None:
+            ordering_key = '/'.join(str(k) for k in ordering_key)
+        queueid = yield self.master.db.reporter_queue.enqueueReports(
+            self._queue_objectid, self.master.masterid, stored_reports,
+            ordering_key=ordering_key)
+        metrics.MetricCountEvent.log(f'{self.name}.queued_reports', 1)
+        # the reports read back from the database are only used after a restart, or when too
+        # many reports are waiting to keep them all in memory
+        if len(self._queued_reports) < self.QUEUE_BATCH_SIZE:
+            self._queued_reports[queueid] = reports
+        self._dispatch_queued_reports()
+
+    def _dispatch_queued_reports(self):
+        if self._queue_dispatching:
+            self._queue_dispatch_again = True
+            return
+        self._run_queue_dispatcher()
+
+    @defer.inlineCallbacks
+    def _run_queue_dispatcher(self):
+        self._queue_dispatching = True
+
+        try:
+            while not self._queue_stopping:
+                self._queue_dispatch_again = False
+                if self._queue_timer is not None and self._queue_timer.active():
+                    self._queue_timer.cancel()
+                self._queue_timer = None
+
+                next_attempt_at = yield self._deliver_all_queued_reports()
+
+                if next_attempt_at is not None and not self._queue_stopping:
+                    self._queue_timer = self.master.reactor.callLater(
+                        max(0, next_attempt_at - self.master.reactor.seconds()),
+                        self._dispatch_queued_reports)
+                if not self._queue_dispatch_again:
+                    break
+        except Exception as e:
+            log.err(e, f'{self.name}: got exception when dispatching queued reports')
+        finally:
+            self._queue_dispatching = False
+            self._queue_idle_notifier.notify(None)
+
+    @defer.inlineCallbacks
+    def _deliver_all_queued_reports(self):
+        # returns the time of the earliest retry, if any
+        #
+        # the reports with the same ordering key are delivered in order, so a
+        # report waiting for a retry holds back the later ones with its key,
+        # but not the other ones
+        waiting_keys = set()
+        next_attempt_at = None
+        after_id = None
+        while not self._queue_stopping:
+            entries = yield self.master.db.reporter_queue.getQueuedReports(
+                self._queue_objectid, self.master.masterid, limit=self.QUEUE_BATCH_SIZE,
+                after_id=after_id)
+
+            for entry in entries:
+                if self._queue_stopping:
+                    break
+                ordering_key = entry['ordering_key']
+                if ordering_key is not None and ordering_key in waiting_keys:
+                    continue
+                attempt_at = entry['next_attempt_at']
+                if attempt_at <= self.master.reactor.seconds():
+                    attempt_at = yield self._deliver_queued_reports(entry)
+                if attempt_at is not None:
+                    waiting_keys.add(ordering_key)
+                    if next_attempt_at is None or attempt_at < next_attempt_at:
+                        next_attempt_at = attempt_at
+
+            if len(entries) < self.QUEUE_BATCH_SIZE:
+                break
+            after_id = entries[-1]['id']
+        return next_attempt_at
+
+    @defer.inlineCallbacks
+    def _deliver_queued_reports(self, entry):
+        # returns the time of the next attempt if the delivery failed
+        start = self.master.reactor.seconds()
+        reports = self._queued_reports.get(entry['id'])
+        if reports is None:
+            reports = self._restore_stored_reports(entry['reports'])
+        try:
+            yield self.sendMessage(reports)
+        except Exception as e:
+            attempts = entry['attempts'] + 1
+            if attempts < self.QUEUE_MAX_ATTEMPTS:
+                delay = min(self.QUEUE_RETRY_START * 2 ** (attempts - 1), self.QUEUE_RETRY_MAX)
+                log.err(e, f'{self.name}: failed to deliver queued reports, '
+                           f'retrying in {delay} seconds')
+                next_attempt_at = int(self.master.reactor.seconds() + delay)
+                yield self.master.db.reporter_queue.rescheduleQueuedReport(entry['id'],
+                                                                           next_attempt_at)
+                return next_attempt_at
+
+            log.err(e, f'{self.name}: failed to deliver queued reports after {attempts} '
+                       'attempts, dropping them')
+        else:
+            metrics.MetricTimeEvent.log(f'{self.name}.sendMessage',
+                                        self.master.reactor.seconds() - start)
+
+        yield self.master.db.reporter_queue.deleteQueuedReport(entry['id'])
+        self._queued_reports.pop(entry['id'], None)
+        metrics.MetricCountEvent.log(f'{self.name}.queued_reports', -1)
+        return None
+
+    @defer.inlineCallbacks
+    def _stop_queue_dispatcher(self):
+        self._queue_stopping = True
+        if self._queue_timer is not None and self._queue_timer.active():
+            self._queue_timer.cancel()
+        self._queue_timer = None
+        if self._queue_dispatching:
+            yield self._queue_idle_notifier.wait()
+
     def getResponsibleUsersForBuild(self, master, buildid):
         # Use library method but subclassers may want to override that
         return utils.getResponsibleUsersForBuild(master, buildid)
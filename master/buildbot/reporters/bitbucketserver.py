@@ -13,6 +13,7 @@
 #
 # Copyright Buildbot Team Members
 
+import functools
 import re
 from urllib.parse import urlparse
 
@@ -32,6 +33,7 @@ from buildbot.reporters.message import MessageFormatterRenderable
 from buildbot.util import bytes2unicode
 from buildbot.util import httpclientservice
 from buildbot.util import unicode2bytes
+from buildbot.util.ratelimit import CoalescingRateLimitedQueue
 
 from .utils import merge_reports_prop
 
@@ -49,6 +51,10 @@ HTTP_CREATED = 201
 class BitbucketServerStatusPush(ReporterBase):
     name = "BitbucketServerStatusPush"
 
+    status_push_rate = 10
+    status_push_burst = 100
+    _status_queue = None
+
     def checkConfig(self, base_url, user, password, key=None, statusName=None, verbose=False,
                     debug=None, verify=None, generators=None, **kwargs):
 
@@ -77,6 +83,20 @@ class BitbucketServerStatusPush(ReporterBase):
             self.master, base_url, auth=(user, password),
             debug=self.debug, verify=self.verify)
 
+        if self._status_queue is None:
+            self._status_queue = CoalescingRateLimitedQueue(
+                self.master.reactor, rate=self.status_push_rate, burst=self.status_push_burst,
+                name='status_queue')
+            yield self._status_queue.setServiceParent(self)
+
+    @defer.inlineCallbacks
+    def stopService(self):
+        # the events being reported wait for their statuses: send the pending ones, or drop them
+        # after a timeout, before waiting for the events
+        if self._status_queue is not None:
+            yield self._status_queue.drain()
+        yield super().stopService()
+
     def _create_default_generators(self):
         start_formatter = MessageFormatterRenderable('Build started.')
         end_formatter = MessageFormatterRenderable('Build done.')
@@ -121,34 +141,55 @@ class BitbucketServerStatusPush(ReporterBase):
 
         sourcestamps = build['buildset']['sourcestamps']
 
+        dl = []
         for sourcestamp in sourcestamps:
-            try:
-                sha = sourcestamp['revision']
+            sha = sourcestamp['revision']
 
-                if sha is None:
-                    log.msg("Unable to get the commit hash")
-                    continue
+            if sha is None:
+                log.msg("Unable to get the commit hash")
+                continue
 
-                url = build['url']
-                res = yield self.createStatus(
-                    sha=sha,
-                    state=state,
-                    url=url,
-                    key=key,
-                    description=description,
-                    context=context
-                )
+            dl.append(self._send_status(
+                (sha, key),
+                functools.partial(self.createStatus, sha=sha, state=state, url=build['url'],
+                                  key=key, description=description, context=context),
+                sourcestamp['repository'], sha, state))
+        if not self.persistent_queue:
+            # the statuses are sent in the background, so that the events of other builds are
+            # not delayed by the rate limit, and a status still waiting in the queue is replaced
+            # by a newer one
+            for d in dl:
+                d.addErrback(log.err, 'while sending status')
+            return
+        # the queued report is only removed once all its statuses have been sent
+        try:
+            yield defer.gatherResults(dl, consumeErrors=True)
+        except defer.FirstError as e:
+            raise e.subFailure.value
 
-                if res.code not in (HTTP_PROCESSED,):
-                    content = yield res.content()
-                    log.msg(f"{res.code}: Unable to send Bitbucket Server status: "
-                            f"{content}")
-                elif self.verbose:
-                    log.msg(f'Status "{state}" sent for {sha}.')
-            except Exception as e:
-                log.err(
-                    e,
-                    f"Failed to send status '{state}' for {sourcestamp['repository']} at {sha}")
+    @defer.inlineCallbacks
+    def _send_status(self, queue_key, create_status, repository, sha, state):
+        try:
+            res = yield self._status_queue.push(queue_key, create_status)
+            if res is None:
+                # superseded by a newer status
+                return
+
+            if res.code not in (HTTP_PROCESSED,):
+                content = yield res.content()
+                message = f"{res.code}: Unable to send Bitbucket Server status: {content}"
+                if self.persistent_queue:
+                    # the reports stay queued and are sent again later
+                    raise RuntimeError(message)
+                log.msg(message)
+            elif self.verbose:
+                log.msg(f'Status "{state}" sent for {sha}.')
+        except Exception as e:
+            if self.persistent_queue:
+                raise
+            log.err(
+                e,
+                f"Failed to send status '{state}' for {repository} at {sha}")
 
 
 class BitbucketServerCoreAPIStatusPush(ReporterBase):
@@ -14,6 +14,7 @@
 # Copyright Buildbot Team Members
 
 
+import functools
 import re
 
 from twisted.internet import defer
@@ -34,6 +35,7 @@ from buildbot.reporters.generators.buildrequest import BuildRequestGenerator
 from buildbot.reporters.message import MessageFormatterRenderable
 from buildbot.util import httpclientservice
 from buildbot.util.giturlparse import giturlparse
+from buildbot.util.ratelimit import CoalescingRateLimitedQueue
 
 HOSTED_BASE_URL = 'https://api.github.com'
 
@@ -41,6 +43,11 @@ HOSTED_BASE_URL = 'https://api.github.com'
 class GitHubStatusPush(ReporterBase):
     name = "GitHubStatusPush"
 
+    # GitHub allows at most 80 content-creating requests per minute
+    status_push_rate = 80 / 60
+    status_push_burst = 80
+    _status_queue = None
+
     def checkConfig(self, token, context=None, baseURL=None, verbose=False,
                     debug=None, verify=None, generators=None,
                     **kwargs):
@@ -78,6 +85,20 @@ class GitHubStatusPush(ReporterBase):
             },
             debug=self.debug, verify=self.verify)
 
+        if self._status_queue is None:
+            self._status_queue = CoalescingRateLimitedQueue(
+                self.master.reactor, rate=self.status_push_rate, burst=self.status_push_burst,
+                name='status_queue')
+            yield self._status_queue.setServiceParent(self)
+
+    @defer.inlineCallbacks
+    def stopService(self):
+        # the events being reported wait for their statuses: send the pending ones, or drop them
+        # after a timeout, before waiting for the events
+        if self._status_queue is not None:
+            yield self._status_queue.drain()
+        yield super().stopService()
+
     def setup_context(self, context):
         return context or Interpolate('buildbot/%(prop:buildername)s')
 
@@ -182,6 +203,7 @@ class GitHubStatusPush(ReporterBase):
 
         issue = self._extract_issue(props)
 
+        dl = []
         for sourcestamp in sourcestamps:
             repo_owner, repo_name = self._extract_github_info(sourcestamp)
 
@@ -190,7 +212,6 @@ class GitHubStatusPush(ReporterBase):
                 continue
 
             sha = sourcestamp['revision']
-            response = None
 
             # If the scheduler specifies multiple codebases, don't bother updating
             # the ones for which there is no revision
@@ -200,42 +221,65 @@ class GitHubStatusPush(ReporterBase):
                     f"context '{context}', issue {issue}.")
                 continue
 
-            try:
-                if self.verbose:
-                    log.msg(
-                        f"Updating github status: repo_owner={repo_owner}, repo_name={repo_name}")
-
-                response = yield self.createStatus(repo_user=repo_owner,
-                                                   repo_name=repo_name,
-                                                   sha=sha,
-                                                   state=state,
-                                                   target_url=build['url'],
-                                                   context=context,
-                                                   issue=issue,
-                                                   description=description)
-
-                if not response:
-                    # the implementation of createStatus refused to post update due to missing data
-                    continue
-
-                if not self.is_status_2xx(response.code):
-                    raise Exception()
-
-                if self.verbose:
-                    log.msg(
-                        f'Updated status with "{state}" for {repo_owner}/{repo_name} '
-                        f'at {sha}, context "{context}", issue {issue}.')
-            except Exception as e:
-                if response:
-                    content = yield response.content()
-                    code = response.code
-                else:
-                    content = code = "n/a"
-                log.err(
-                    e,
-                    (f'Failed to update "{state}" for {repo_owner}/{repo_name} '
-                    f'at {sha}, context "{context}", issue {issue}. '
-                    f'http {code}, {content}'))
+            dl.append(self._send_status(
+                self._get_status_queue_key(repo_owner, repo_name, sha, context, issue),
+                functools.partial(self.createStatus, repo_user=repo_owner, repo_name=repo_name,
+                                  sha=sha, state=state, target_url=build['url'],
+                                  context=context, issue=issue, description=description),
+                repo_owner, repo_name, sha, state, context, issue))
+        if not self.persistent_queue:
+            # the statuses are sent in the background, so that the events of other builds are
+            # not delayed by the rate limit, and a status still waiting in the queue is replaced
+            # by a newer one
+            for d in dl:
+                d.addErrback(log.err, 'while sending status')
+            return
+        # the queued report is only removed once all its statuses have been sent
+        try:
+            yield defer.gatherResults(dl, consumeErrors=True)
+        except defer.FirstError as e:
+            raise e.subFailure.value
+
+    def _get_status_queue_key(self, repo_owner, repo_name, sha, context, issue):
+        # only the latest state of a given status needs to be sent
+        return (repo_owner, repo_name, sha, context)
+
+    @defer.inlineCallbacks
+    def _send_status(self, queue_key, create_status, repo_owner, repo_name, sha, state, context,
+                     issue):
+        response = None
+        try:
+            if self.verbose:
+                log.msg(
+                    f"Updating github status: repo_owner={repo_owner}, repo_name={repo_name}")
+
+            response = yield self._status_queue.push(queue_key, create_status)
+
+            if not response:
+                # the implementation of createStatus refused to post update due to missing data
+                # or the update has been superseded by a newer one
+                return
+
+            if not self.is_status_2xx(response.code):
+                raise Exception()
+
+            if self.verbose:
+                log.msg(
+                    f'Updated status with "{state}" for {repo_owner}/{repo_name} '
+                    f'at {sha}, context "{context}", issue {issue}.')
+        except Exception as e:
+            if response:
+                content = yield response.content()
+                code = response.code
+            else:
+                content = code = "n/a"
+            message = (f'Failed to update "{state}" for {repo_owner}/{repo_name} '
+                       f'at {sha}, context "{context}", issue {issue}. '
+                       f'http {code}, {content}')
+            if self.persistent_queue:
+                # the reports stay queued and are sent again later
+                raise RuntimeError(message) from e
+            log.err(e, message)
 
 
 class GitHubCommentPush(GitHubStatusPush):
@@ -253,6 +297,10 @@ class GitHubCommentPush(GitHubStatusPush):
                                          end_formatter=end_formatter)
         ]
 
+    def _get_status_queue_key(self, repo_owner, repo_name, sha, context, issue):
+        # every comment must be posted
+        return None
+
     @defer.inlineCallbacks
     def sendMessage(self, reports):
         report = reports[0]
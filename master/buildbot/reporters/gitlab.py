@@ -13,6 +13,7 @@
 #
 # Copyright Buildbot Team Members
 
+import functools
 from urllib.parse import quote_plus as urlquote_plus
 
 from twisted.internet import defer
@@ -33,6 +34,7 @@ from buildbot.reporters.generators.buildrequest import BuildRequestGenerator
 from buildbot.reporters.message import MessageFormatterRenderable
 from buildbot.util import giturlparse
 from buildbot.util import httpclientservice
+from buildbot.util.ratelimit import CoalescingRateLimitedQueue
 
 HOSTED_BASE_URL = 'https://gitlab.com'
 
@@ -40,6 +42,10 @@ HOSTED_BASE_URL = 'https://gitlab.com'
 class GitLabStatusPush(ReporterBase):
     name = "GitLabStatusPush"
 
+    status_push_rate = 10
+    status_push_burst = 100
+    _status_queue = None
+
     def checkConfig(self, token, context=None, baseURL=None, verbose=False,
                     debug=None, verify=None, generators=None,
                     **kwargs):
@@ -76,6 +82,20 @@ class GitLabStatusPush(ReporterBase):
             debug=self.debug, verify=self.verify)
         self.project_ids = {}
 
+        if self._status_queue is None:
+            self._status_queue = CoalescingRateLimitedQueue(
+                self.master.reactor, rate=self.status_push_rate, burst=self.status_push_burst,
+                name='status_queue')
+            yield self._status_queue.setServiceParent(self)
+
+    @defer.inlineCallbacks
+    def stopService(self):
+        # the events being reported wait for their statuses: send the pending ones, or drop them
+        # after a timeout, before waiting for the events
+        if self._status_queue is not None:
+            yield self._status_queue.drain()
+        yield super().stopService()
+
     def _create_default_generators(self):
         start_formatter = MessageFormatterRenderable('Build started.')
         end_formatter = MessageFormatterRenderable('Build done.')
@@ -167,6 +187,7 @@ class GitLabStatusPush(ReporterBase):
         sourcestamps = build['buildset']['sourcestamps']
 
         # FIXME: probably only want to report status for the last commit in the changeset
+        dl = []
         for sourcestamp in sourcestamps:
             sha = sourcestamp['revision']
             if 'source_project_id' in props:
@@ -175,33 +196,52 @@ class GitLabStatusPush(ReporterBase):
                 proj_id = yield self.getProjectId(sourcestamp)
             if proj_id is None:
                 continue
-            try:
-                if 'source_branch' in props:
-                    branch = props['source_branch']
-                else:
-                    branch = sourcestamp['branch']
-                target_url = build['url']
-                res = yield self.createStatus(
-                    project_id=proj_id,
-                    branch=branch,
-                    sha=sha,
-                    state=state,
-                    target_url=target_url,
-                    context=context,
-                    description=description
-                )
-                if res.code not in (200, 201, 204):
-                    message = yield res.json()
-                    message = message.get('message', 'unspecified error')
-                    log.msg(
-                        f'Could not send status "{state}" for '
-                        f'{sourcestamp["repository"]} at {sha}: {message}')
-                elif self.verbose:
-                    log.msg(
-                        f'Status "{state}" sent for '
-                        f'{sourcestamp["repository"]} at {sha}.')
-            except Exception as e:
-                log.err(
-                    e,
-                    (f'Failed to send status "{state}" for '
-                     f'{sourcestamp["repository"]} at {sha}'))
+            if 'source_branch' in props:
+                branch = props['source_branch']
+            else:
+                branch = sourcestamp['branch']
+            dl.append(self._send_status(
+                (proj_id, branch, sha, context),
+                functools.partial(self.createStatus, project_id=proj_id, branch=branch, sha=sha,
+                                  state=state, target_url=build['url'], context=context,
+                                  description=description),
+                sourcestamp['repository'], sha, state))
+        if not self.persistent_queue:
+            # the statuses are sent in the background, so that the events of other builds are
+            # not delayed by the rate limit, and a status still waiting in the queue is replaced
+            # by a newer one
+            for d in dl:
+                d.addErrback(log.err, 'while sending status')
+            return
+        # the queued report is only removed once all its statuses have been sent
+        try:
+            yield defer.gatherResults(dl, consumeErrors=True)
+        except defer.FirstError as e:
+            raise e.subFailure.value
+
+    @defer.inlineCallbacks
+    def _send_status(self, queue_key, create_status, repository, sha, state):
+        try:
+            res = yield self._status_queue.push(queue_key, create_status)
+            if res is None:
+                # superseded by a newer status
+                return
+            if res.code not in (200, 201, 204):
+                message = yield res.json()
+                message = message.get('message', 'unspecified error')
+                message = f'Could not send status "{state}" for {repository} at {sha}: {message}'
+                if self.persistent_queue:
+                    # the reports stay queued and are sent again later
+                    raise RuntimeError(message)
+                log.msg(message)
+            elif self.verbose:
+                log.msg(
+                    f'Status "{state}" sent for '
+                    f'{repository} at {sha}.')
+        except Exception as e:
+            if self.persistent_queue:
+                raise
+            log.err(
+                e,
+                (f'Failed to send status "{state}" for '
+                 f'{repository} at {sha}'))
@@ -64,4 +64,8 @@ class HttpStatusPush(ReporterBase):
     def sendMessage(self, reports):
         response = yield self._http.post("", json=reports[0]['body'])
         if not self.is_status_2xx(response.code):
-            log.msg(f"{response.code}: unable to upload status: {response.content}")
+            message = f"{response.code}: unable to upload status: {response.content}"
+            if self.persistent_queue:
+                # the reports stay queued and are sent again later
+                raise RuntimeError(message)
+            log.msg(message)
@@ -93,7 +93,7 @@ class MailNotifier(ReporterBase):
     def checkConfig(self, fromaddr, relayhost="localhost", lookup=None, extraRecipients=None,
                     sendToInterestedUsers=True, extraHeaders=None, useTls=False, useSmtps=False,
                     smtpUser=None, smtpPassword=None, smtpPort=25,
-                    dumpMailsToLog=False, generators=None):
+                    dumpMailsToLog=False, generators=None, **kwargs):
         if ESMTPSenderFactory is None:
             config.error("twisted-mail is not installed - cannot "
                          "send mail")
@@ -101,7 +101,7 @@ class MailNotifier(ReporterBase):
         if generators is None:
             generators = self._create_default_generators()
 
-        super().checkConfig(generators=generators)
+        super().checkConfig(generators=generators, **kwargs)
 
         if extraRecipients is None:
             extraRecipients = []
@@ -128,12 +128,12 @@ class MailNotifier(ReporterBase):
     def reconfigService(self, fromaddr, relayhost="localhost", lookup=None, extraRecipients=None,
                         sendToInterestedUsers=True, extraHeaders=None, useTls=False, useSmtps=False,
                         smtpUser=None, smtpPassword=None, smtpPort=25,
-                        dumpMailsToLog=False, generators=None):
+                        dumpMailsToLog=False, generators=None, **kwargs):
 
         if generators is None:
             generators = self._create_default_generators()
 
-        yield super().reconfigService(generators=generators)
+        yield super().reconfigService(generators=generators, **kwargs)
 
         if extraRecipients is None:
             extraRecipients = []
@@ -48,24 +48,24 @@ DEFAULT_MSG_TEMPLATE = \
 class PushjetNotifier(ReporterBase):
 
     def checkConfig(self, secret, levels=None, base_url='https://api.pushjet.io',
-                    generators=None):
+                    generators=None, **kwargs):
 
         if generators is None:
             generators = self._create_default_generators()
 
-        super().checkConfig(generators=generators)
+        super().checkConfig(generators=generators, **kwargs)
 
         httpclientservice.HTTPClientService.checkAvailable(self.__class__.__name__)
 
     @defer.inlineCallbacks
     def reconfigService(self, secret, levels=None, base_url='https://api.pushjet.io',
-                        generators=None):
+                        generators=None, **kwargs):
         secret = yield self.renderSecrets(secret)
 
         if generators is None:
             generators = self._create_default_generators()
 
-        yield super().reconfigService(generators=generators)
+        yield super().reconfigService(generators=generators, **kwargs)
         self.secret = secret
         if levels is None:
             self.levels = {}
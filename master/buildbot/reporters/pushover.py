@@ -52,12 +52,12 @@ DEFAULT_MSG_TEMPLATE = \
 class PushoverNotifier(ReporterBase):
 
     def checkConfig(self, user_key, api_token, priorities=None, otherParams=None,
-                    generators=None):
+                    generators=None, **kwargs):
 
         if generators is None:
             generators = self._create_default_generators()
 
-        super().checkConfig(generators=generators)
+        super().checkConfig(generators=generators, **kwargs)
 
         httpclientservice.HTTPClientService.checkAvailable(self.__class__.__name__)
 
@@ -67,13 +67,13 @@ class PushoverNotifier(ReporterBase):
 
     @defer.inlineCallbacks
     def reconfigService(self, user_key, api_token, priorities=None, otherParams=None,
-                        generators=None):
+                        generators=None, **kwargs):
         user_key, api_token = yield self.renderSecrets(user_key, api_token)
 
         if generators is None:
             generators = self._create_default_generators()
 
-        yield super().reconfigService(generators=generators)
+        yield super().reconfigService(generators=generators, **kwargs)
         self.user_key = user_key
         self.api_token = api_token
         if priorities is None:
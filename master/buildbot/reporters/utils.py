@@ -13,6 +13,7 @@
 #
 # Copyright Buildbot Team Members
 
+import copy
 from collections import UserList
 
 from twisted.internet import defer
@@ -22,6 +23,7 @@ from buildbot.data import resultspec
 from buildbot.process.properties import renderer
 from buildbot.process.results import RETRY
 from buildbot.util import flatten
+from buildbot.util import service
 
 
 @defer.inlineCallbacks
@@ -67,27 +69,184 @@ def getDetailsForBuildset(master, bsid, want_properties=False, want_steps=False,
     return dict(buildset=buildset, builds=builds)
 
 
+class BuildDetailsCache(service.SharedService):
+    """
+    Remembers the details fetched by getDetailsForBuild and getDetailsForBuilds for a short
+    time, so that all the reporters handling the same build event share a single fetch of the
+    build request, buildset, properties, steps and logs of a build.  The callers get copies of
+    the remembered details.
+    """
+
+    # seconds during which fetched details are reused
+    TIMEOUT = 5
+
+    # keys of the build dictionary filled by _fetchDetailsForBuild
+    DETAILS_KEYS = ('buildrequest', 'buildset', 'parentbuild', 'parentbuilder',
+                    'properties', 'steps', 'prev_build')
+
+    def __init__(self):
+        super().__init__()
+        # (buildid, complete_at) -> _BuildDetailsEntry
+        self._entries = {}
+
+    def _expire(self):
+        now = self.master.reactor.seconds()
+        for key, entry in list(self._entries.items()):
+            if entry.expires <= now:
+                del self._entries[key]
+
+    @defer.inlineCallbacks
+    def getDetails(self, build, wanted):
+        # the details of a build change when it finishes, so a 'new' and a
+        # 'finished' event for the same build never share their details
+        key = (build['buildid'], build.get('complete_at'))
+        self._expire()
+
+        while key in self._entries:
+            entry = self._entries[key]
+            if entry.wanted >= wanted:
+                details = yield entry.wait()
+                return details
+            # fetch everything that was fetched before, too, so that the new
+            # entry can serve all the callers of the old one
+            wanted = wanted | entry.wanted
+            try:
+                yield entry.wait()
+            except Exception:
+                pass
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+
+        entry = self._entries[key] = _BuildDetailsEntry(
+            self.master.reactor.seconds() + self.TIMEOUT, wanted)
+        try:
+            details = yield _fetchDetailsForBuild(self.master, build, wanted)
+        except Exception as e:
+            # don't remember failures
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+            entry.fail(e)
+            raise
+        entry.succeed(details)
+        return details
+
+
+class _BuildDetailsEntry:
+
+    def __init__(self, expires, wanted):
+        self.expires = expires
+        self.wanted = wanted
+        self._result = None
+        self._waiters = []
+
+    def wait(self):
+        if self._result is not None:
+            return defer.succeed(self._result)
+        d = defer.Deferred()
+        self._waiters.append(d)
+        return d
+
+    def succeed(self, details):
+        self._result = details
+        waiters, self._waiters = self._waiters, []
+        for d in waiters:
+            d.callback(details)
+
+    def fail(self, e):
+        waiters, self._waiters = self._waiters, []
+        for d in waiters:
+            d.errback(e)
+
+
+def _wantedDetails(want_properties, want_steps, want_previous_build, want_logs,
+                   want_logs_content):
+    if want_logs_content:
+        want_logs = True
+    if want_logs:
+        want_steps = True
+    return frozenset(name for name, want in [
+        ('properties', want_properties),
+        ('steps', want_steps),
+        ('previous_build', want_previous_build),
+        ('logs', want_logs),
+        ('logs_content', want_logs_content),
+    ] if want)
+
+
+def _applyDetails(build, details, wanted, keys):
+    # only give the details that were asked for, even if a previous caller fetched more.  The
+    # details are shared by all the reporters handling the same event, so each caller gets its
+    # own copy that it can modify
+    for k in keys:
+        if k not in details:
+            continue
+        if k == 'properties' and 'properties' not in wanted:
+            continue
+        if k == 'steps' and 'steps' not in wanted:
+            continue
+        if k == 'prev_build' and 'previous_build' not in wanted:
+            continue
+        build[k] = copy.deepcopy(details[k])
+
+
+# keys of the build dictionary filled by getDetailsForBuild, in addition to the ones of
+# getDetailsForBuilds
+BUILDSET_DETAILS_KEYS = ('buildrequest', 'buildset', 'parentbuild', 'parentbuilder')
+
+
 @defer.inlineCallbacks
 def getDetailsForBuild(master, build, want_properties=False, want_steps=False,
                        want_previous_build=False, want_logs=False, want_logs_content=False):
-    buildrequest = yield master.data.get(("buildrequests", build['buildrequestid']))
-    buildset = yield master.data.get(("buildsets", buildrequest['buildsetid']))
-    build['buildrequest'], build['buildset'] = buildrequest, buildset
+    wanted = _wantedDetails(want_properties, want_steps, want_previous_build, want_logs,
+                            want_logs_content)
+    cache = yield BuildDetailsCache.getService(master)
+    # the buildset is fetched along with the other details, which are then found in the cache
+    details = yield cache.getDetails(build, wanted | {'buildset'})
+    _applyDetails(build, details, wanted, BUILDSET_DETAILS_KEYS)
+    yield getDetailsForBuilds(master, build['buildset'], [build],
+                              want_properties=want_properties, want_steps=want_steps,
+                              want_previous_build=want_previous_build, want_logs=want_logs,
+                              want_logs_content=want_logs_content)
 
-    parentbuild = None
-    parentbuilder = None
-    if buildset['parent_buildid']:
-        parentbuild = yield master.data.get(("builds", buildset['parent_buildid']))
-        parentbuilder = yield master.data.get(("builders", parentbuild['builderid']))
-    build['parentbuild'] = parentbuild
-    build['parentbuilder'] = parentbuilder
 
-    ret = yield getDetailsForBuilds(master, buildset, [build],
-                                    want_properties=want_properties, want_steps=want_steps,
-                                    want_previous_build=want_previous_build,
-                                    want_logs=want_logs,
-                                    want_logs_content=want_logs_content)
-    return ret
+@defer.inlineCallbacks
+def _fetchDetailsForBuild(master, build, wanted):
+    # fetches the details of a single build, its buildset only if 'buildset' is wanted
+    details = {}
+    if 'buildset' in wanted:
+        buildrequest = yield master.data.get(("buildrequests", build['buildrequestid']))
+        buildset = yield master.data.get(("buildsets", buildrequest['buildsetid']))
+        details['buildrequest'], details['buildset'] = buildrequest, buildset
+
+        parentbuild = None
+        parentbuilder = None
+        if buildset['parent_buildid']:
+            parentbuild = yield master.data.get(("builds", buildset['parent_buildid']))
+            parentbuilder = yield master.data.get(("builders", parentbuild['builderid']))
+        details['parentbuild'] = parentbuild
+        details['parentbuilder'] = parentbuilder
+
+    if 'properties' in wanted:
+        details['properties'] = yield master.data.get(("builds", build['buildid'], 'properties'))
+
+    if 'previous_build' in wanted:
+        details['prev_build'] = yield getPreviousBuild(master, build)
+
+    if 'steps' in wanted:
+        steps = yield master.data.get(("builds", build['buildid'], 'steps'))
+        steps = list(steps)
+        if 'logs' in wanted:
+            for s in steps:
+                logs = yield master.data.get(("steps", s['stepid'], 'logs'))
+                s['logs'] = list(logs)
+                for l in s['logs']:
+                    l['url'] = get_url_for_log(master, build['builderid'], build['number'],
+                                               s['number'], l['slug'])
+                    if 'logs_content' in wanted:
+                        l['content'] = yield master.data.get(("logs", l['logid'], 'contents'))
+        details['steps'] = steps
+
+    return details
 
 
 @defer.inlineCallbacks
@@ -104,69 +263,30 @@ def get_details_for_buildrequest(master, buildrequest, build):
     build['complete'] = False
 
 
+# keys of the build dictionaries filled by getDetailsForBuilds from the cached details
+BUILDS_DETAILS_KEYS = ('properties', 'steps', 'prev_build')
+
+
 @defer.inlineCallbacks
 def getDetailsForBuilds(master, buildset, builds, want_properties=False, want_steps=False,
                         want_previous_build=False, want_logs=False, want_logs_content=False):
+    wanted = _wantedDetails(want_properties, want_steps, want_previous_build, want_logs,
+                            want_logs_content)
 
+    # the builds of a buildset mostly share a few builders, fetched once for all of them
     builderids = {build['builderid'] for build in builds}
-
     builders = yield defer.gatherResults([master.data.get(("builders", _id))
                                           for _id in builderids])
-
     buildersbyid = {builder['builderid']: builder
                     for builder in builders}
 
-    if want_properties:
-        buildproperties = yield defer.gatherResults(
-            [master.data.get(("builds", build['buildid'], 'properties'))
-             for build in builds])
-    else:  # we still need a list for the big zip
-        buildproperties = list(range(len(builds)))
-
-    if want_previous_build:
-        prev_builds = yield defer.gatherResults(
-            [getPreviousBuild(master, build) for build in builds])
-    else:  # we still need a list for the big zip
-        prev_builds = list(range(len(builds)))
-
-    if want_logs_content:
-        want_logs = True
-    if want_logs:
-        want_steps = True
-
-    if want_steps:  # pylint: disable=too-many-nested-blocks
-        buildsteps = yield defer.gatherResults(
-            [master.data.get(("builds", build['buildid'], 'steps'))
-             for build in builds])
-        if want_logs:
-            for build, build_steps in zip(builds, buildsteps):
-                for s in build_steps:
-                    logs = yield master.data.get(("steps", s['stepid'], 'logs'))
-                    s['logs'] = list(logs)
-                    for l in s['logs']:
-                        l['url'] = get_url_for_log(master, build['builderid'], build['number'],
-                                                   s['number'], l['slug'])
-                        if want_logs_content:
-                            l['content'] = yield master.data.get(("logs", l['logid'], 'contents'))
-
-    else:  # we still need a list for the big zip
-        buildsteps = list(range(len(builds)))
-
-    # a big zip to connect everything together
-    for build, properties, steps, prev in zip(builds, buildproperties, buildsteps, prev_builds):
-        build['builder'] = buildersbyid[build['builderid']]
+    cache = yield BuildDetailsCache.getService(master)
+    details = yield defer.gatherResults([cache.getDetails(build, wanted) for build in builds])
+    for build, build_details in zip(builds, details):
+        _applyDetails(build, build_details, wanted, BUILDS_DETAILS_KEYS)
+        build['builder'] = copy.deepcopy(buildersbyid[build['builderid']])
         build['buildset'] = buildset
-        build['url'] = getURLForBuild(
-            master, build['builderid'], build['number'])
-
-        if want_properties:
-            build['properties'] = properties
-
-        if want_steps:
-            build['steps'] = list(steps)
-
-        if want_previous_build:
-            build['prev_build'] = prev
+        build['url'] = getURLForBuild(master, build['builderid'], build['number'])
 
 
 # perhaps we need data api for users with sourcestamps/:id/users
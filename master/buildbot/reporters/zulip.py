@@ -28,20 +28,21 @@ log = Logger()
 class ZulipStatusPush(ReporterBase):
     name = "ZulipStatusPush"
 
-    def checkConfig(self, endpoint, token, stream=None, debug=None, verify=None):
+    def checkConfig(self, endpoint, token, stream=None, debug=None, verify=None, **kwargs):
         if not isinstance(endpoint, str):
             config.error("Endpoint must be a string")
         if not isinstance(token, str):
             config.error("Token must be a string")
 
-        super().checkConfig(generators=[BuildStartEndStatusGenerator()])
+        super().checkConfig(generators=[BuildStartEndStatusGenerator()], **kwargs)
         httpclientservice.HTTPClientService.checkAvailable(self.__class__.__name__)
 
     @defer.inlineCallbacks
-    def reconfigService(self, endpoint, token, stream=None, debug=None, verify=None):
+    def reconfigService(self, endpoint, token, stream=None, debug=None, verify=None,
+                        **kwargs):
         self.debug = debug
         self.verify = verify
-        yield super().reconfigService(generators=[BuildStartEndStatusGenerator()])
+        yield super().reconfigService(generators=[BuildStartEndStatusGenerator()], **kwargs)
         self._http = yield httpclientservice.HTTPClientService.getService(
             self.master, endpoint,
             debug=self.debug, verify=self.verify)
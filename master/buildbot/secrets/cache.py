@@ -0,0 +1,111 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+"""
+in-memory cache of the values returned by a secret provider
+"""
+
+from collections import OrderedDict
+
+from twisted.internet import defer
+from twisted.python.failure import Failure
+
+from buildbot.process import metrics
+
+
+class SecretCache:
+    """
+    Caches the values returned by a secret provider for ``ttl`` seconds, and the secrets it does
+    not know about for ``negative_ttl`` seconds. At most ``max_size`` secrets are kept, the least
+    recently used ones are evicted first. Concurrent lookups of the same secret share a single
+    query to the provider.
+
+    The values are only kept in the memory of the master, they are never written to disk.
+    """
+
+    def __init__(self, reactor, ttl, negative_ttl=None, max_size=1000):
+        self.reactor = reactor
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self.max_size = max_size
+
+        self.hits = self.misses = self.evictions = 0
+        # secret name -> (expiration time, value)
+        self._entries = OrderedDict()
+        # secret name -> deferreds waiting for the query in progress
+        self._pending = {}
+
+    def __repr__(self):
+        # never show the values
+        return (f'<SecretCache ttl={self.ttl} negative_ttl={self.negative_ttl} '
+                f'size={len(self._entries)}/{self.max_size}>')
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, fetch_fn):
+        """
+        Returns a deferred firing with the cached value of ``key``, calling ``fetch_fn(key)`` to
+        query the provider if there is no valid cached value.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > self.reactor.seconds():
+                self._entries.move_to_end(key)
+                self._count_hit()
+                return defer.succeed(value)
+            del self._entries[key]
+
+        if key in self._pending:
+            self._count_hit()
+            d = defer.Deferred()
+            self._pending[key].append(d)
+            return d
+
+        self.misses += 1
+        metrics.MetricCountEvent.log('SecretManager.cache_misses', 1)
+        waiters = self._pending[key] = []
+        d = defer.maybeDeferred(fetch_fn, key)
+        d.addBoth(self._fetched, key, waiters)
+        return d
+
+    def _count_hit(self):
+        self.hits += 1
+        metrics.MetricCountEvent.log('SecretManager.cache_hits', 1)
+
+    def _fetched(self, result, key, waiters):
+        # a query started before clear() is not stored
+        if self._pending.get(key) is waiters:
+            del self._pending[key]
+            # errors are not cached, the provider may be temporarily unavailable
+            if not isinstance(result, Failure):
+                self._store(key, result)
+        for d in waiters:
+            d.callback(result)
+        return result
+
+    def _store(self, key, value):
+        ttl = self.negative_ttl if value is None else self.ttl
+        if not ttl:
+            return
+        self._entries[key] = (self.reactor.seconds() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._pending = {}
@@ -17,6 +17,7 @@ manage providers and handle secrets
 """
 
 from twisted.internet import defer
+from twisted.python import log
 
 from buildbot.secrets.secret import SecretDetails
 from buildbot.util import service
@@ -39,8 +40,35 @@ class SecretManager(service.BuildbotServiceManager):
         @return type: SecretDetails
         """
         for provider in self.services:
-            value = yield provider.get(secret)
+            value = yield self._getFromProvider(provider, secret)
             source_name = provider.__class__.__name__
             if value is not None:
                 return SecretDetails(source_name, secret, value)
         return None
+
+    def _getFromProvider(self, provider, secret):
+        cache = getattr(provider, 'secret_cache', None)
+        if cache is None:
+            return defer.maybeDeferred(provider.get, secret)
+        return cache.get(secret, provider.get)
+
+    @defer.inlineCallbacks
+    def prefetch(self, secrets):
+        """
+        query the given secrets in parallel, so that they are in the cache of the providers
+        when they are rendered. Does nothing when no provider has a cache.
+        @secrets: secrets keys
+        @type: iterable of strings
+        """
+        if all(getattr(provider, 'secret_cache', None) is None for provider in self.services):
+            return
+
+        @defer.inlineCallbacks
+        def prefetch_one(secret):
+            try:
+                yield self.get(secret)
+            except Exception as e:
+                # the error is reported when the secret is rendered
+                log.msg(f"SecretManager: could not prefetch secret {secret}: {e}")
+
+        yield defer.gatherResults([prefetch_one(secret) for secret in sorted(set(secrets))])
@@ -18,14 +18,55 @@ secret provider interface
 
 import abc
 
+from twisted.internet import defer
+
+from buildbot import config
+from buildbot import util
+from buildbot.secrets.cache import SecretCache
 from buildbot.util.service import BuildbotService
 
 
 class SecretProviderBase(BuildbotService):
     """
         Secret provider base
+
+        All providers accept the ``cache_ttl``, ``cache_negative_ttl`` and ``cache_max_size``
+        arguments, which configure the cache of the values they return.
     """
 
+    compare_attrs = ('cache_ttl', 'cache_negative_ttl', 'cache_max_size')
+    secret_cache = None
+
+    def __init__(self, *args, cache_ttl=0, cache_negative_ttl=None, cache_max_size=1000,
+                 **kwargs):
+        if not isinstance(cache_ttl, (int, float)) or cache_ttl < 0:
+            config.error("cache_ttl must be a positive number")
+        if cache_negative_ttl is not None and \
+                (not isinstance(cache_negative_ttl, (int, float)) or cache_negative_ttl < 0):
+            config.error("cache_negative_ttl must be a positive number")
+        if not isinstance(cache_max_size, int) or cache_max_size < 1:
+            config.error("cache_max_size must be a strictly positive integer")
+        self.cache_ttl = cache_ttl
+        self.cache_negative_ttl = cache_negative_ttl
+        self.cache_max_size = cache_max_size
+        super().__init__(*args, **kwargs)
+
+    @defer.inlineCallbacks
+    def reconfigServiceWithSibling(self, sibling):
+        # the cache arguments are not passed to reconfigService()
+        changed = not (self.configured and util.ComparableMixin.isEquivalent(sibling, self))
+        yield super().reconfigServiceWithSibling(sibling)
+        if changed:
+            self.cache_ttl = sibling.cache_ttl
+            self.cache_negative_ttl = sibling.cache_negative_ttl
+            self.cache_max_size = sibling.cache_max_size
+            # the cached values may come from the previous configuration of the provider
+            self.secret_cache = None
+            if self.cache_ttl or self.cache_negative_ttl:
+                self.secret_cache = SecretCache(self.master.reactor, self.cache_ttl,
+                                                negative_ttl=self.cache_negative_ttl,
+                                                max_size=self.cache_max_size)
+
     @abc.abstractmethod
     def get(self, *args, **kwargs):
         """
@@ -24,6 +24,7 @@ from buildbot.statistics.capture import CaptureDataAllBuilders
 from buildbot.statistics.capture import CaptureProperty
 from buildbot.statistics.capture import CapturePropertyAllBuilders
 from buildbot.statistics.stats_service import StatsService
+from buildbot.statistics.storage_backends.file_storage import FileStorageService
 from buildbot.statistics.storage_backends.influxdb_client import InfluxStorageService
 
 __all__ = [
@@ -37,6 +38,7 @@ __all__ = [
     'CaptureDataAllBuilders',
     'CaptureProperty',
     'CapturePropertyAllBuilders',
+    'FileStorageService',
     'InfluxStorageService',
     'StatsService'
 ]
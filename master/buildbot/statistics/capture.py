@@ -18,7 +18,6 @@ import datetime
 import re
 
 from twisted.internet import defer
-from twisted.internet import threads
 
 from buildbot import config
 from buildbot.errors import CaptureCallbackError
@@ -50,11 +49,11 @@ class Capture:
     def consume(self, routingKey, msg):
         pass
 
-    @defer.inlineCallbacks
     def _store(self, post_data, series_name, context):
+        # the values are buffered by StatsService and written in batches
         for svc in self.parent_svcs:
-            yield threads.deferToThread(svc.thd_postStatsValue, post_data, series_name,
-                                        context)
+            svc.postStatsValue(post_data, series_name, context)
+        return defer.succeed(None)
 
 
 class CapturePropertyBase(Capture):
@@ -14,12 +14,108 @@
 # Copyright Buildbot Team Members
 
 from twisted.internet import defer
+from twisted.internet import threads
 from twisted.python import log
 
+from buildbot.process import metrics
 from buildbot.statistics.storage_backends.base import StatsStorageBase
 from buildbot.util import service
 
 
+class StatsBuffer:
+
+    """
+    Buffers the values captured for one storage backend and writes them to it in batches from a
+    thread. A batch is written once ``max_batch_size`` values are buffered, or ``flush_interval``
+    seconds after the first value of the batch. A single batch is written at a time; values
+    captured while the backend is busy are buffered up to ``max_buffered_points``, after which
+    they are dropped and counted in ``dropped``.
+    """
+
+    def __init__(self, reactor, backend, max_batch_size, flush_interval, max_buffered_points):
+        self.reactor = reactor
+        self.backend = backend
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.max_buffered_points = max_buffered_points
+
+        self.points = []
+        self.written = 0
+        self.dropped = 0
+        self._lock = defer.DeferredLock()
+        self._flush_queued = False
+        self._timer = None
+
+    def postStatsValue(self, post_data, series_name, context=None):
+        if len(self.points) >= self.max_buffered_points:
+            self._drop(1)
+            return
+        self.points.append((post_data, series_name, context, self.reactor.seconds()))
+
+        if len(self.points) >= self.max_batch_size:
+            self._queue_flush()
+        elif self._timer is None:
+            self._timer = self.reactor.callLater(self.flush_interval, self._on_timer)
+
+    def _drop(self, count):
+        if not self.dropped:
+            log.msg(f"StatsService: dropping values for {self.backend.name}, "
+                    "the storage backend does not keep up")
+        self.dropped += count
+        metrics.MetricCountEvent.log(f'stats.{self.backend.name}.dropped_points', count)
+
+    def _on_timer(self):
+        self._timer = None
+        self._queue_flush()
+
+    def _queue_flush(self):
+        # at most one flush waits behind the one in progress, it will pick all the values
+        # buffered in the meantime
+        if self._flush_queued:
+            return
+        self._flush_queued = True
+        d = self._lock.run(self._flush)
+        d.addErrback(log.err, "while flushing statistics")
+
+    def flush(self):
+        """ Writes all the buffered values. Returns a Deferred """
+        return self._lock.run(self._flush)
+
+    @defer.inlineCallbacks
+    def _flush(self):
+        self._flush_queued = False
+        if self._timer is not None and self._timer.active():
+            self._timer.cancel()
+        self._timer = None
+
+        while self.points:
+            batch = self.points[:self.max_batch_size]
+            del self.points[:self.max_batch_size]
+            try:
+                yield threads.deferToThread(self.backend.thd_postStatsValues, batch)
+                self.written += len(batch)
+            except Exception as e:
+                log.err(e, f"while writing statistics to {self.backend.name}")
+                self._drop(len(batch))
+            if len(self.points) < self.max_batch_size:
+                break
+
+        if self.points and self._timer is None:
+            self._timer = self.reactor.callLater(self.flush_interval, self._on_timer)
+
+    def stop(self):
+        """ Writes all the buffered values and stops the timer. Returns a Deferred """
+        return self._lock.run(self._flush_all)
+
+    @defer.inlineCallbacks
+    def _flush_all(self):
+        while self.points:
+            yield self._flush()
+        if self._timer is not None and self._timer.active():
+            self._timer.cancel()
+        self._timer = None
+
+
 class StatsService(service.BuildbotService):
 
     """
@@ -29,42 +125,69 @@ class StatsService(service.BuildbotService):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.consumers = []
+        self.buffers = []
 
-    def checkConfig(self, storage_backends):
+    def checkConfig(self, storage_backends, max_batch_size=100, flush_interval=5,
+                    max_buffered_points=10000):
         for wfb in storage_backends:
             if not isinstance(wfb, StatsStorageBase):
                 raise TypeError(f"Invalid type of stats storage service {type(StatsStorageBase)!r}."
                                 " Should be of type StatsStorageBase, "
                                 f"is: {type(StatsStorageBase)!r}")
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        if max_buffered_points < max_batch_size:
+            raise ValueError("max_buffered_points must be at least max_batch_size")
 
     @defer.inlineCallbacks
-    def reconfigService(self, storage_backends):
+    def reconfigService(self, storage_backends, max_batch_size=100, flush_interval=5,
+                        max_buffered_points=10000):
         log.msg(f"Reconfiguring StatsService with config: {storage_backends!r}")
 
-        self.checkConfig(storage_backends)
+        self.checkConfig(storage_backends, max_batch_size, flush_interval, max_buffered_points)
 
         self.registeredStorageServices = []
         for svc in storage_backends:
             self.registeredStorageServices.append(svc)
 
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.max_buffered_points = max_buffered_points
+
         yield self.removeConsumers()
+        yield self.flushBuffers()
         yield self.registerConsumers()
 
     @defer.inlineCallbacks
     def registerConsumers(self):
         self.consumers = []
+        self.buffers = []
+
+        # captures may be shared between storage backends, so reset them all first
+        for svc in self.registeredStorageServices:
+            for cap in svc.captures:
+                cap.parent_svcs = []
 
         for svc in self.registeredStorageServices:
+            buf = StatsBuffer(self.master.reactor, svc, self.max_batch_size,
+                              self.flush_interval, self.max_buffered_points)
+            self.buffers.append(buf)
             for cap in svc.captures:
-                cap.parent_svcs.append(svc)
+                cap.parent_svcs.append(buf)
                 cap.master = self.master
                 consumer = yield self.master.mq.startConsuming(cap.consume, cap.routingKey)
                 self.consumers.append(consumer)
 
+    @defer.inlineCallbacks
+    def flushBuffers(self):
+        for buf in self.buffers:
+            yield buf.stop()
+
     @defer.inlineCallbacks
     def stopService(self):
         yield super().stopService()
         yield self.removeConsumers()
+        yield self.flushBuffers()
 
     @defer.inlineCallbacks
     def removeConsumers(self):
@@ -28,3 +28,13 @@ class StatsStorageBase:
     @abc.abstractmethod
     def thd_postStatsValue(self, post_data, series_name, context=None):
         pass
+
+    def thd_postStatsValues(self, points):
+        """
+        Stores a batch of values. ``points`` is a list of
+        ``(post_data, series_name, context, timestamp)`` tuples, ``timestamp`` being the time at
+        which the value was captured, in seconds since the epoch. Backends that can send several
+        values in one request should override this method.
+        """
+        for post_data, series_name, context, _ in points:
+            self.thd_postStatsValue(post_data, series_name, context)
@@ -0,0 +1,73 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+
+import os
+
+from buildbot.statistics.storage_backends.base import StatsStorageBase
+
+
+def _escape(value, chars):
+    value = str(value).replace('\\', '\\\\')
+    for c in chars:
+        value = value.replace(c, '\\' + c)
+    return value
+
+
+def _format_field_value(value):
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, int):
+        return f'{value}i'
+    if isinstance(value, float):
+        return repr(value)
+    value = str(value).replace('\\', '\\\\').replace('"', '\\"')
+    return f'"{value}"'
+
+
+def format_line(post_data, series_name, context=None, timestamp=None):
+    """
+    Formats a value in the InfluxDB line protocol
+    """
+    line = _escape(series_name, ', ')
+    for key in sorted(context or {}):
+        line += f",{_escape(key, ',= ')}={_escape(context[key], ',= ')}"
+
+    fields = ','.join(f"{_escape(key, ',= ')}={_format_field_value(post_data[key])}"
+                      for key in sorted(post_data))
+    line += f' {fields}'
+
+    if timestamp is not None:
+        line += f' {int(timestamp * 1e9)}'
+    return line
+
+
+class FileStorageService(StatsStorageBase):
+
+    """
+    Appends the statistics to a local file in the InfluxDB line protocol
+    """
+
+    def __init__(self, path, captures, name="FileStorageService"):
+        self.path = os.path.abspath(path)
+        self.captures = captures
+        self.name = name
+
+    def thd_postStatsValue(self, post_data, series_name, context=None):
+        self.thd_postStatsValues([(post_data, series_name, context, None)])
+
+    def thd_postStatsValues(self, points):
+        lines = [format_line(*point) + '\n' for point in points]
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.writelines(lines)
@@ -48,19 +48,24 @@ class InfluxStorageService(StatsStorageBase):
         self._inited = True
 
     def thd_postStatsValue(self, post_data, series_name, context=None):
+        self.thd_postStatsValues([(post_data, series_name, context, None)])
+
+    def thd_postStatsValues(self, points):
         if not self._inited:
             log.err(f"Service {self.name} not initialized")
             return
 
-        data = {
-            'measurement': series_name,
-            'fields': post_data
-        }
-
-        log.msg("Sending data to InfluxDB")
-        log.msg(f"post_data: {post_data!r}")
-        if context:
-            log.msg(f"context: {context!r}")
-            data['tags'] = context
+        data = []
+        for post_data, series_name, context, timestamp in points:
+            point = {
+                'measurement': series_name,
+                'fields': post_data
+            }
+            if context:
+                point['tags'] = context
+            if timestamp is not None:
+                point['time'] = int(timestamp * 1000)
+            data.append(point)
 
-        self.client.write_points([data])
+        log.msg(f"Sending {len(data)} points to InfluxDB")
+        self.client.write_points(data, time_precision='ms')
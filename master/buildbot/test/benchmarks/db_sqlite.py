@@ -0,0 +1,121 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+"""
+Measures the throughput of a SQLite database under a mixed load: log appends, as sent by
+running builds, and reads of log lines and builds, as sent by the web UI.  The default mode is
+compared with the single writer mode (c['db']['sqlite_single_writer']).
+
+    python -m buildbot.test.benchmarks.db_sqlite --duration 10 --writers 20 --readers 8
+"""
+
+import argparse
+import shutil
+import tempfile
+
+from twisted.internet import defer
+from twisted.internet import task
+
+from buildbot.db import connector
+from buildbot.test.fake import fakemaster
+
+LOG_CHUNK = ''.join(f'line {i} of the output of a step, with some padding {"x" * 40}\n'
+                    for i in range(20))
+
+
+class Results:
+
+    def __init__(self, name):
+        self.name = name
+        self.appends = 0
+        self.reads = 0
+        self.read_time = 0.0
+
+    def report(self, duration):
+        latency = self.read_time / self.reads * 1000 if self.reads else 0
+        print(f'{self.name:<16} {self.appends / duration:>12.1f} {self.reads / duration:>10.1f} '
+              f'{latency:>16.2f}')
+
+
+@defer.inlineCallbacks
+def setup_db(basedir, single_writer):
+    master = fakemaster.make_master(None, wantRealReactor=True)
+    master.basedir = basedir
+    master.config.db = dict(db_url='sqlite:///state.sqlite', sqlite_single_writer=single_writer)
+    db = connector.DBConnector(basedir)
+    yield db.setServiceParent(master)
+    yield db.setup(check_version=False, verbose=False)
+    yield db.model.upgrade()
+    return db
+
+
+@defer.inlineCallbacks
+def run(reactor, results, single_writer, options):
+    basedir = tempfile.mkdtemp(dir=options.basedir)
+    try:
+        db = yield setup_db(basedir, single_writer)
+        logids = []
+        for i in range(options.writers):
+            logid = yield db.logs.addLog(stepid=1, name=f'log {i}', slug=f'log{i}', type='s')
+            logids.append(logid)
+        deadline = reactor.seconds() + options.duration
+
+        @defer.inlineCallbacks
+        def writer(logid):
+            while reactor.seconds() < deadline:
+                yield db.logs.appendLog(logid, LOG_CHUNK)
+                results.appends += 1
+
+        @defer.inlineCallbacks
+        def reader(i):
+            while reactor.seconds() < deadline:
+                start = reactor.seconds()
+                yield db.logs.getLogLines(logids[i % len(logids)], 0, 200)
+                yield db.builds.getBuilds()
+                results.read_time += reactor.seconds() - start
+                results.reads += 1
+
+        yield defer.gatherResults([writer(logid) for logid in logids] +
+                                  [reader(i) for i in range(options.readers)],
+                                  consumeErrors=True)
+        for db_pool in db.pools:
+            yield db_pool.shutdown()
+    finally:
+        shutil.rmtree(basedir)
+
+
+@defer.inlineCallbacks
+def main(reactor, *argv):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--duration', type=float, default=10,
+                        help='duration of the load of each mode, in seconds')
+    parser.add_argument('--writers', type=int, default=20,
+                        help='number of logs appended to concurrently')
+    parser.add_argument('--readers', type=int, default=8,
+                        help='number of concurrent readers')
+    parser.add_argument('--basedir', default=None,
+                        help='directory of the database; the cost of the commits depends on the '
+                        'disk, so use a directory of the disk of the master')
+    options = parser.parse_args(argv)
+
+    print(f'{"mode":<16} {"appends/s":>12} {"reads/s":>10} {"read latency ms":>16}')
+    for name, single_writer in (('default', False), ('single writer', True)):
+        results = Results(name)
+        yield run(reactor, results, single_writer, options)
+        results.report(options.duration)
+
+
+if __name__ == '__main__':
+    import sys
+    task.react(main, sys.argv[1:])
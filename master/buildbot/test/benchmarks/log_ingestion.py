@@ -0,0 +1,124 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+"""
+Measures the CPU used by the master to store the output of a command, from the updates sent by
+the worker to the rows of the database.  Both the msgpack and PB protocols are measured, with the
+updates of the size sent by the output buffer of the worker.
+
+    python -m buildbot.test.benchmarks.log_ingestion --size 100
+"""
+
+import argparse
+import shutil
+import tempfile
+import time
+
+from twisted.internet import defer
+from twisted.internet import task
+
+from buildbot.data import connector as dataconnector
+from buildbot.db import connector as dbconnector
+from buildbot.mq import simple
+from buildbot.process import log
+from buildbot.process import remotecommand
+from buildbot.test.fake import fakemaster
+
+
+class FakeWorker:
+
+    def messageReceivedFromWorker(self):
+        pass
+
+
+def make_updates(options):
+    line = ('x' * (options.line_length - 1)) + '\n'
+    text = line * max(1, options.buffer_size // options.line_length)
+    line_indexes = list(range(options.line_length - 1, len(text), options.line_length))
+    line_times = [0.0] * len(line_indexes)
+    count = max(1, options.size * 1024 * 1024 // len(text))
+    return text, line_indexes, line_times, count
+
+
+@defer.inlineCallbacks
+def setup_master(basedir):
+    master = fakemaster.make_master(None, wantRealReactor=True)
+    master.basedir = basedir
+    master.config.db = dict(db_url='sqlite:///state.sqlite')
+    master.db = dbconnector.DBConnector(basedir)
+    yield master.db.setServiceParent(master)
+    yield master.db.setup(check_version=False, verbose=False)
+    yield master.db.model.upgrade()
+    master.mq = simple.SimpleMQ()
+    yield master.mq.setServiceParent(master)
+    master.data = dataconnector.DataConnector()
+    yield master.data.setServiceParent(master)
+    return master
+
+
+@defer.inlineCallbacks
+def run(master, protocol, options):
+    text, line_indexes, line_times, count = make_updates(options)
+    logid = yield master.db.logs.addLog(stepid=1, name=protocol, slug=protocol, type='s')
+    cmd = remotecommand.RemoteCommand('shell', {})
+    cmd.worker = FakeWorker()
+    cmd.active = True
+    cmd.useLog(log.Log.new(master, 'stdio', 's', logid, 'utf-8'))
+
+    start_cpu = time.process_time()
+    start_reactor_cpu = time.thread_time()
+    for num in range(count):
+        if protocol == 'msgpack':
+            cmd.remote_update_msgpack([('stdout', (text, line_indexes, line_times))])
+        else:
+            cmd.remote_update([({'stdout': text}, num)])
+    # the updates are processed in order, wait for the last one
+    yield cmd.loglock.run(lambda: None)
+    yield cmd.logs['stdio'].finish()
+    reactor_cpu = time.thread_time() - start_reactor_cpu
+    cpu = time.process_time() - start_cpu
+
+    size = len(text) * count / (1024 * 1024)
+    print(f'{protocol:<10} {size:>8.1f} {reactor_cpu / size * 1000:>18.2f} '
+          f'{cpu / size * 1000:>16.2f}')
+
+
+@defer.inlineCallbacks
+def main(reactor, *argv):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--size', type=int, default=100,
+                        help='size of the output of each protocol, in MB')
+    parser.add_argument('--line-length', type=int, default=80,
+                        help='length of the lines of the output')
+    parser.add_argument('--buffer-size', type=int, default=64 * 1024,
+                        help='size of the updates sent by the worker')
+    parser.add_argument('--basedir', default=None,
+                        help='directory of the database')
+    options = parser.parse_args(argv)
+
+    basedir = tempfile.mkdtemp(dir=options.basedir)
+    try:
+        master = yield setup_master(basedir)
+        print(f'{"protocol":<10} {"MB":>8} {"reactor CPU ms/MB":>18} {"total CPU ms/MB":>16}')
+        for protocol in ('msgpack', 'pb'):
+            yield run(master, protocol, options)
+        for db_pool in master.db.pools:
+            yield db_pool.shutdown()
+    finally:
+        shutil.rmtree(basedir)
+
+
+if __name__ == '__main__':
+    import sys
+    task.react(main, sys.argv[1:])
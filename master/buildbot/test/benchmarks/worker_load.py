@@ -0,0 +1,359 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+"""
+Simulates many workers connected to a master on localhost, to find how many workers the master
+can handle and to catch regressions of the worker protocols.  Each worker runs a build whose step
+outputs lines at a given rate, and a build uploading files to the master.  During the load, the
+master measures:
+
+- the latency of requests sent to the workers (the round trip of a remote print, as the keepalive
+  requests),
+- the throughput of the log lines stored by the master and of the uploads,
+- the CPU used by the master.
+
+The workers run in subprocesses, so that the CPU they use is not attributed to the master.
+
+    python -m buildbot.test.benchmarks.worker_load --workers 50 --protocol pb,msgpack
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import sqlalchemy as sa
+
+from twisted.application import service
+from twisted.internet import defer
+from twisted.internet import task
+
+from buildbot.config import BuilderConfig
+from buildbot.master import BuildMaster
+from buildbot.plugins import schedulers
+from buildbot.plugins import steps
+from buildbot.plugins import util
+from buildbot.plugins import worker
+from buildbot.process.results import SUCCESS
+from buildbot.test.util.integration import DictLoader
+
+PROTOCOLS = {
+    'pb': ('pb', {'port': 'tcp:0:interface=127.0.0.1'}),
+    'msgpack': ('msgpack_experimental_v7', {'port': 0}),
+}
+
+# outputs argv[2] characters long lines at a rate of argv[1] lines per second for argv[3] seconds
+OUTPUT_SCRIPT = """
+import sys, time
+rate, length, duration = float(sys.argv[1]), int(sys.argv[2]), float(sys.argv[3])
+line = 'x' * (length - 1) + '\\n'
+start = time.time()
+written = 0
+while time.time() - start < duration:
+    expected = int((time.time() - start) * rate)
+    sys.stdout.write(line * (expected - written))
+    sys.stdout.flush()
+    written = expected
+    time.sleep(0.05)
+"""
+
+CREATE_FILE_SCRIPT = """
+import sys
+with open(sys.argv[1], 'wb') as f:
+    f.write(b'x' * int(sys.argv[2]))
+"""
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def make_config(options, basedir, protocol):
+    output_command = [sys.executable, '-c', OUTPUT_SCRIPT, str(options.line_rate),
+                      str(options.line_length), str(options.duration)]
+    output_factory = util.BuildFactory([steps.ShellCommand(command=output_command,
+                                                           name='output')])
+
+    upload_steps = [steps.ShellCommand(command=[sys.executable, '-c', CREATE_FILE_SCRIPT,
+                                                'upload.bin', str(options.upload_size)],
+                                       name='create file')]
+    for i in range(options.uploads):
+        upload_steps.append(steps.FileUpload(
+            workersrc='upload.bin', name=f'upload {i}',
+            masterdest=util.Interpolate(os.path.join(basedir, 'uploads', '%(prop:workername)s'))))
+    upload_factory = util.BuildFactory(upload_steps)
+
+    builders = []
+    for i in range(options.workers):
+        builders.append(BuilderConfig(name=f'output{i}', workernames=[f'worker{i}'],
+                                      factory=output_factory))
+        if options.uploads:
+            builders.append(BuilderConfig(name=f'upload{i}', workernames=[f'worker{i}'],
+                                          factory=upload_factory))
+
+    name, protocol_config = PROTOCOLS[protocol]
+    return {
+        'workers': [worker.Worker(f'worker{i}', 'pass') for i in range(options.workers)],
+        'builders': builders,
+        'schedulers': [schedulers.ForceScheduler(name='force',
+                                                 builderNames=[b.name for b in builders])],
+        'protocols': {name: protocol_config},
+        'db_url': options.db_url,
+        'buildbotNetUsageData': None,
+    }
+
+
+@defer.inlineCallbacks
+def start_master(master, db_url):
+    master.config.db['db_url'] = db_url
+    yield master.db.setup(check_version=False)
+    yield master.db.model.upgrade()
+    master.db.setup = lambda: None
+    yield master.startService()
+
+
+def master_port(master, protocol):
+    if protocol == 'pb':
+        dispatcher = list(master.pbmanager.dispatchers.values())[0]
+    else:
+        dispatcher = list(master.msgmanager.dispatchers.values())[0]
+    return dispatcher.port.getHost().port
+
+
+def start_worker_processes(options, protocol, port, basedir):
+    processes = []
+    count = options.workers
+    per_process = -(-count // options.worker_processes)
+    for first in range(0, count, per_process):
+        processes.append(subprocess.Popen([
+            sys.executable, '-m', 'buildbot.test.benchmarks.worker_load', '--run-workers',
+            '--protocol', protocol, '--port', str(port), '--basedir', basedir,
+            '--first-worker', str(first), '--workers', str(min(per_process, count - first))]))
+    return processes
+
+
+def create_workers(options, parent):
+    # the worker is an optional dependency of the master
+    from buildbot_worker.bot import Worker  # pylint: disable=import-outside-toplevel
+    for i in range(options.first_worker, options.first_worker + options.workers):
+        basedir = os.path.join(options.basedir, f'worker{i}')
+        os.makedirs(basedir, exist_ok=True)
+        Worker('127.0.0.1', options.port, f'worker{i}', 'pass', basedir, False,
+               protocol=PROTOCOLS[options.protocol][0]).setServiceParent(parent)
+
+
+@defer.inlineCallbacks
+def wait_for(reactor, condition, timeout, what):
+    deadline = reactor.seconds() + timeout
+    while not condition():
+        if reactor.seconds() > deadline:
+            raise RuntimeError(f'timed out waiting for {what}')
+        yield task.deferLater(reactor, 0.1, lambda: None)
+
+
+@defer.inlineCallbacks
+def measure_latency(reactor, master, latencies, deadline):
+    while reactor.seconds() < deadline:
+        for conn in list(master.workers.connections.values()):
+            start = time.perf_counter()
+            yield conn.remotePrint('ping')
+            latencies.append(time.perf_counter() - start)
+        yield task.deferLater(reactor, 0.2, lambda: None)
+
+
+@defer.inlineCallbacks
+def stored_log_lines(master):
+    def thd(conn):
+        return conn.execute(sa.select([sa.func.sum(master.db.model.logs.c.num_lines)])).scalar()
+    lines = yield master.db.pool.do(thd)
+    return lines or 0
+
+
+@defer.inlineCallbacks
+def run(reactor, protocol, options):
+    basedir = tempfile.mkdtemp(dir=options.basedir)
+    master = workers = None
+    processes = []
+    try:
+        os.makedirs(os.path.join(basedir, 'uploads'))
+        master = BuildMaster(basedir, reactor=reactor,
+                             config_loader=DictLoader(make_config(options, basedir, protocol)))
+        yield start_master(master, options.db_url)
+        port = master_port(master, protocol)
+        workers_dir = os.path.join(basedir, 'workers')
+        if options.worker_processes:
+            processes = start_worker_processes(options, protocol, port, workers_dir)
+        else:
+            workers = service.MultiService()
+            create_workers(argparse.Namespace(first_worker=0, workers=options.workers, port=port,
+                                              protocol=protocol, basedir=workers_dir), workers)
+            workers.startService()
+
+        start = reactor.seconds()
+        yield wait_for(reactor, lambda: len(master.workers.connections) == options.workers,
+                       options.timeout, 'the workers to connect')
+        connection_time = reactor.seconds() - start
+
+        builderids = []
+        for builder in master.config.builders:
+            builderid = yield master.data.updates.findBuilderId(builder.name)
+            builderids.append(builderid)
+
+        start = reactor.seconds()
+        start_cpu = time.process_time()
+        yield master.data.updates.addBuildset(
+            waited_for=False, builderids=builderids,
+            sourcestamps=[{'codebase': '', 'repository': '', 'branch': None, 'revision': None,
+                           'project': ''}])
+        latencies = []
+        latency_measure = measure_latency(reactor, master, latencies, start + options.duration)
+
+        builds = []
+
+        @defer.inlineCallbacks
+        def check_builds():
+            builds[:] = yield master.data.get(('builds',))
+
+        def builds_complete():
+            check_builds()
+            return len(builds) == len(builderids) and all(b['complete'] for b in builds)
+
+        yield wait_for(reactor, builds_complete, options.duration + options.timeout,
+                       'the builds to finish')
+        elapsed = reactor.seconds() - start
+        cpu = time.process_time() - start_cpu
+        yield latency_measure
+
+        lines = yield stored_log_lines(master)
+        failed = len([b for b in builds if b['results'] != SUCCESS])
+        return {
+            'protocol': protocol,
+            'workers': options.workers,
+            'connection_time': connection_time,
+            'latency_p50_ms': percentile(latencies, 0.5) * 1000,
+            'latency_p99_ms': percentile(latencies, 0.99) * 1000,
+            'lines_per_second': lines / elapsed,
+            'upload_mb_per_second': (options.workers * options.uploads * options.upload_size /
+                                     (1024 * 1024) / elapsed),
+            'master_cpu_percent': cpu / elapsed * 100,
+            'failed_builds': failed,
+        }
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+        if workers is not None:
+            yield workers.stopService()
+        if master is not None:
+            yield master.stopService()
+            for db_pool in master.db.pools:
+                yield db_pool.shutdown()
+        shutil.rmtree(basedir)
+
+
+def report(results):
+    print(f'{"protocol":<10} {"workers":>8} {"connect s":>10} {"latency p50 ms":>15} '
+          f'{"p99 ms":>8} {"lines/s":>10} {"upload MB/s":>12} {"master CPU %":>13} '
+          f'{"failed":>7}')
+    for r in results:
+        print(f'{r["protocol"]:<10} {r["workers"]:>8} {r["connection_time"]:>10.2f} '
+              f'{r["latency_p50_ms"]:>15.2f} {r["latency_p99_ms"]:>8.2f} '
+              f'{r["lines_per_second"]:>10.0f} {r["upload_mb_per_second"]:>12.2f} '
+              f'{r["master_cpu_percent"]:>13.1f} {r["failed_builds"]:>7}')
+
+
+def compare(results, baseline):
+    baseline = {r['protocol']: r for r in baseline}
+    print(f'{"change vs baseline":<19} {"latency p50":>12} {"p99":>8} {"lines/s":>8} '
+          f'{"upload":>8} {"master CPU":>11}')
+    for r in results:
+        base = baseline.get(r['protocol'])
+        if base is None:
+            continue
+        changes = []
+        for key in ('latency_p50_ms', 'latency_p99_ms', 'lines_per_second',
+                    'upload_mb_per_second', 'master_cpu_percent'):
+            changes.append((r[key] - base[key]) / base[key] * 100 if base[key] else 0)
+        print(f'{r["protocol"]:<19} {changes[0]:>+11.1f}% {changes[1]:>+7.1f}% '
+              f'{changes[2]:>+7.1f}% {changes[3]:>+7.1f}% {changes[4]:>+10.1f}%')
+
+
+@defer.inlineCallbacks
+def main(reactor, *argv):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n', maxsplit=1)[0])
+    parser.add_argument('--workers', type=int, default=20,
+                        help='number of connected workers')
+    parser.add_argument('--protocol', default='pb,msgpack',
+                        help='comma separated list of the protocols to measure')
+    parser.add_argument('--duration', type=float, default=10,
+                        help='duration of the output of the builds, in seconds')
+    parser.add_argument('--line-rate', type=float, default=1000,
+                        help='number of lines output per second by each build')
+    parser.add_argument('--line-length', type=int, default=80,
+                        help='length of the output lines')
+    parser.add_argument('--uploads', type=int, default=5,
+                        help='number of files uploaded by each worker, 0 to disable the uploads')
+    parser.add_argument('--upload-size', type=int, default=1024 * 1024,
+                        help='size of the uploaded files, in bytes')
+    parser.add_argument('--worker-processes', type=int, default=os.cpu_count() or 1,
+                        help='number of processes running the workers, 0 to run them in the '
+                        'process of the master (the CPU used by the master then includes the '
+                        'CPU used by the workers)')
+    parser.add_argument('--db-url', default='sqlite:///state.sqlite',
+                        help='database of the master')
+    parser.add_argument('--timeout', type=float, default=60,
+                        help='timeout of the connection of the workers and of the end of the '
+                        'builds, in seconds')
+    parser.add_argument('--basedir', default=None,
+                        help='directory of the master and of the workers')
+    parser.add_argument('--json', default=None,
+                        help='file to write the results to, to compare them between versions')
+    parser.add_argument('--baseline', default=None,
+                        help='file of results written by --json, to compare the results with')
+    # used by the processes running the workers
+    parser.add_argument('--run-workers', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--first-worker', type=int, default=0, help=argparse.SUPPRESS)
+    options = parser.parse_args(argv)
+
+    if options.run_workers:
+        workers = service.MultiService()
+        create_workers(options, workers)
+        workers.startService()
+        # run until terminated by the master process
+        yield defer.Deferred()
+
+    options.worker_processes = min(options.worker_processes, options.workers)
+    results = []
+    for protocol in options.protocol.split(','):
+        result = yield run(reactor, protocol, options)
+        results.append(result)
+    report(results)
+    if options.baseline:
+        with open(options.baseline, encoding='utf-8') as f:
+            compare(results, json.load(f))
+    if options.json:
+        with open(options.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    task.react(main, sys.argv[1:])
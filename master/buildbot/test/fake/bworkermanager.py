@@ -38,6 +38,8 @@ class FakeWorkerManager(service.AsyncMultiService):
         # connected, that attribute will hold None.
         self.workers = {}  # maps workername to Worker
 
+        self.attach_limit = defer.DeferredSemaphore(20)
+
     def register(self, worker):
         workerName = worker.workername
         reg = FakeWorkerRegistration(worker)
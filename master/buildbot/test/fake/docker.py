@@ -32,12 +32,15 @@ class Client:
             {'RepoTags': ['busybox:latest', 'worker:latest', 'tester:latest']}]
         self._pullable = ['alpine:latest', 'tester:latest']
         self._pullCount = 0
+        self._imagesCount = 0
         self._containers = {}
+        self.attached = []
 
         if Client.containerCreated:
             self.create_container("some-default-image")
 
     def images(self):
+        self._imagesCount += 1
         return self._images
 
     def start(self, container):
@@ -47,6 +50,10 @@ class Client:
     def stop(self, id):
         pass
 
+    def attach(self, container, stdout, stderr, stream):
+        self.attached.append(container)
+        return iter([b'starting worker'])
+
     def wait(self, id):
         return 0
 
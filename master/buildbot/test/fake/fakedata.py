@@ -118,6 +118,14 @@ class FakeUpdates(service.AsyncService):
         self.changesAdded[-1].pop('self')
         return defer.succeed(len(self.changesAdded))
 
+    @defer.inlineCallbacks
+    def addChanges(self, changes):
+        changeids = []
+        for change in changes:
+            changeid = yield self.addChange(**change)
+            changeids.append(changeid)
+        return changeids
+
     def masterActive(self, name, masterid):
         self.testcase.assertIsInstance(name, str)
         self.testcase.assertIsInstance(masterid, int)
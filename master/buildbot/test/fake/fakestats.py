@@ -35,12 +35,23 @@ class FakeStatsStorageService(StatsStorageBase):
             self.stats = stats
         self.name = name
         self.captures = []
+        self.batch_sizes = []
+        self.timestamps = []
+        self.fail = False
 
     def thd_postStatsValue(self, post_data, series_name, context=None):
         if not context:
             context = {}
         self.stored_data.append((post_data, series_name, context))
 
+    def thd_postStatsValues(self, points):
+        if self.fail:
+            raise RuntimeError('write failed')
+        self.batch_sizes.append(len(points))
+        for post_data, series_name, context, timestamp in points:
+            self.thd_postStatsValue(post_data, series_name, context)
+            self.timestamps.append(timestamp)
+
 
 class FakeBuildStep(buildstep.BuildStep):
 
@@ -64,6 +75,8 @@ class FakeInfluxDBClient:
 
     def __init__(self, *args, **kwargs):
         self.points = []
+        self.writes = 0
 
-    def write_points(self, points):
+    def write_points(self, points, time_precision=None):
+        self.writes += 1
         self.points.extend(points)
@@ -34,10 +34,11 @@ log = Logger()
 @implementer(IHttpResponse)
 class ResponseWrapper:
 
-    def __init__(self, code, content, url=None):
+    def __init__(self, code, content, url=None, headers=None):
         self._content = content
         self._code = code
         self._url = url
+        self._headers = {k.lower(): str(v) for k, v in (headers or {}).items()}
 
     def content(self):
         content = unicode2bytes(self._content)
@@ -54,6 +55,10 @@ class ResponseWrapper:
     def url(self):
         return self._url
 
+    @property
+    def headers(self):
+        return self._headers
+
 
 class HTTPClientService(service.SharedService):
     """ HTTPClientService is a SharedService class that fakes http requests for buildbot http
@@ -100,7 +105,7 @@ class HTTPClientService(service.SharedService):
     checkAvailable = mock.Mock()
 
     def expect(self, method, ep, params=None, headers=None, data=None, json=None, code=200,
-               content=None, content_json=None, files=None):
+               content=None, content_json=None, files=None, response_headers=None):
         if content is not None and content_json is not None:
             return ValueError("content and content_json cannot be both specified")
 
@@ -109,7 +114,7 @@ class HTTPClientService(service.SharedService):
 
         self._expected.append(dict(
             method=method, ep=ep, params=params, headers=headers, data=data, json=json, code=code,
-            content=content, files=files))
+            content=content, files=files, response_headers=response_headers))
         return None
 
     def assertNoOutstanding(self):
@@ -152,7 +157,8 @@ class HTTPClientService(service.SharedService):
         if not self.quiet:
             log.debug("{method} {ep} -> {code} {content!r}",
                       method=method, ep=ep, code=expect['code'], content=expect['content'])
-        return defer.succeed(ResponseWrapper(expect['code'], expect['content']))
+        return defer.succeed(ResponseWrapper(expect['code'], expect['content'],
+                                             headers=expect['response_headers']))
 
     # lets be nice to the auto completers, and don't generate that code
     def get(self, ep, **kwargs):
@@ -52,6 +52,8 @@ from .masters import FakeMastersComponent
 from .masters import Master
 from .projects import FakeProjectsComponent
 from .projects import Project
+from .reporter_queue import FakeReporterQueueComponent
+from .reporter_queue import ReporterQueueEntry
 from .schedulers import FakeSchedulersComponent
 from .schedulers import Scheduler
 from .schedulers import SchedulerChange
@@ -112,6 +114,7 @@ __all__ = [
     'FakeLogsComponent',
     'FakeMastersComponent',
     'FakeProjectsComponent',
+    'FakeReporterQueueComponent',
     'FakeSchedulersComponent',
     'FakeSourceStampsComponent',
     'FakeStateComponent',
@@ -128,6 +131,7 @@ __all__ = [
     'ObjectState',
     'Patch',
     'Project',
+    'ReporterQueueEntry',
     'Scheduler',
     'SchedulerChange',
     'SchedulerMaster',
@@ -87,7 +87,8 @@ class FakeBuildRequestsComponent(FakeDBComponent):
 
     @defer.inlineCallbacks
     def getBuildRequests(self, builderid=None, complete=None, claimed=None,
-                         bsid=None, branch=None, repository=None, resultSpec=None):
+                         bsid=None, branch=None, repository=None, resultSpec=None,
+                         stale_ok=False):
         rv = []
         for br in self.reqs.values():
             if builderid and br.builderid != builderid:
@@ -99,7 +99,7 @@ class FakeBuildsComponent(FakeDBComponent):
         return defer.succeed(None)
 
     def getBuilds(self, builderid=None, buildrequestid=None, workerid=None, complete=None,
-                  resultSpec=None):
+                  resultSpec=None, stale_ok=False):
         ret = []
         for row in self.builds.values():
             if builderid is not None and row['builderid'] != builderid:
@@ -147,19 +147,27 @@ class FakeChangesComponent(FakeDBComponent):
 
         return changeid
 
+    @defer.inlineCallbacks
+    def addChanges(self, changes):
+        changeids = []
+        for change in changes:
+            changeid = yield self.addChange(**change)
+            changeids.append(changeid)
+        return changeids
+
     def getLatestChangeid(self):
         if self.changes:
             return defer.succeed(max(list(self.changes)))
         return defer.succeed(None)
 
     def getParentChangeIds(self, branch, repository, project, codebase):
-        if self.changes:
-            for change in self.changes.values():
-                if (change['branch'] == branch and
-                        change['repository'] == repository and
-                        change['project'] == project and
-                        change['codebase'] == codebase):
-                    return defer.succeed([change['changeid']])
+        changeids = [change['changeid'] for change in self.changes.values()
+                     if (change['branch'] == branch and
+                         change['repository'] == repository and
+                         change['project'] == project and
+                         change['codebase'] == codebase)]
+        if changeids:
+            return defer.succeed([max(changeids)])
         return defer.succeed([])
 
     def getChange(self, key, no_cache=False):
@@ -177,7 +185,7 @@ class FakeChangesComponent(FakeDBComponent):
             ch_uids = []
         return defer.succeed(ch_uids)
 
-    def getChanges(self, resultSpec=None):
+    def getChanges(self, resultSpec=None, stale_ok=False):
         if resultSpec is not None and resultSpec.limit is not None:
             ids = sorted(self.changes.keys())
             chdicts = [self._chdict(self.changes[id]) for id in ids[-resultSpec.limit:]]
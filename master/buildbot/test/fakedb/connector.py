@@ -25,6 +25,7 @@ from buildbot.test.fakedb.changesources import FakeChangeSourcesComponent
 from buildbot.test.fakedb.logs import FakeLogsComponent
 from buildbot.test.fakedb.masters import FakeMastersComponent
 from buildbot.test.fakedb.projects import FakeProjectsComponent
+from buildbot.test.fakedb.reporter_queue import FakeReporterQueueComponent
 from buildbot.test.fakedb.row import Row
 from buildbot.test.fakedb.schedulers import FakeSchedulersComponent
 from buildbot.test.fakedb.sourcestamps import FakeSourceStampsComponent
@@ -94,6 +95,8 @@ class FakeDBConnector(service.AsyncMultiService):
         self._components.append(comp)
         self.test_result_sets = comp = FakeTestResultSetsComponent(self, testcase)
         self._components.append(comp)
+        self.reporter_queue = comp = FakeReporterQueueComponent(self, testcase)
+        self._components.append(comp)
 
     def setup(self):
         self.is_setup = True
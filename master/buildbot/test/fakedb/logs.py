@@ -97,13 +97,13 @@ class FakeLogsComponent(FakeDBComponent):
             return defer.succeed(None)
         return defer.succeed(self._row2dict(row))
 
-    def getLogs(self, stepid=None):
+    def getLogs(self, stepid=None, stale_ok=False):
         return defer.succeed([
             self._row2dict(row)
             for row in self.logs.values()
             if row['stepid'] == stepid])
 
-    def getLogLines(self, logid, first_line, last_line):
+    def getLogLines(self, logid, first_line, last_line, stale_ok=False):
         if logid not in self.logs or first_line > last_line:
             return defer.succeed('')
         lines = self.log_lines.get(logid, [])
@@ -0,0 +1,89 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+
+import copy
+import json
+import zlib
+
+from twisted.internet import defer
+
+from buildbot.test.fakedb.base import FakeDBComponent
+from buildbot.test.fakedb.row import Row
+
+
+class ReporterQueueEntry(Row):
+    table = 'reporter_queue'
+
+    id_column = 'id'
+    foreignKeys = ('masterid',)
+    required_columns = ('objectid', 'masterid')
+    binary_columns = ('reports',)
+
+    def __init__(self, id=None, objectid=None, masterid=None, created_at=0, next_attempt_at=0,
+                 attempts=0, ordering_key=None, reports=None):
+        if reports is None:
+            reports = []
+        super().__init__(id=id, objectid=objectid, masterid=masterid, created_at=created_at,
+                         next_attempt_at=next_attempt_at, attempts=attempts,
+                         ordering_key=ordering_key,
+                         reports=zlib.compress(json.dumps(reports).encode('utf-8')))
+
+
+class FakeReporterQueueComponent(FakeDBComponent):
+
+    def setUp(self):
+        self.entries = {}
+
+    def insert_test_data(self, rows):
+        for row in rows:
+            if isinstance(row, ReporterQueueEntry):
+                entry = row.values.copy()
+                entry['reports'] = json.loads(zlib.decompress(entry['reports']).decode('utf-8'))
+                self.entries[row.id] = entry
+
+    def enqueueReports(self, objectid, masterid, reports, ordering_key=None):
+        id = Row.nextId()
+        now = int(self.reactor.seconds())
+        self.entries[id] = {
+            'id': id,
+            'objectid': objectid,
+            'masterid': masterid,
+            'created_at': now,
+            'next_attempt_at': now,
+            'attempts': 0,
+            'ordering_key': ordering_key,
+            # make sure the reports survive a round trip to the database
+            'reports': json.loads(json.dumps(reports)),
+        }
+        return defer.succeed(id)
+
+    def getQueuedReports(self, objectid, masterid, limit=None, after_id=None):
+        entries = [copy.deepcopy(entry) for id, entry in sorted(self.entries.items())
+                   if entry['objectid'] == objectid and entry['masterid'] == masterid and
+                   (after_id is None or id > after_id)]
+        if limit is not None:
+            entries = entries[:limit]
+        return defer.succeed(entries)
+
+    def rescheduleQueuedReport(self, queueid, next_attempt_at):
+        entry = self.entries.get(queueid)
+        if entry is not None:
+            entry['next_attempt_at'] = next_attempt_at
+            entry['attempts'] += 1
+        return defer.succeed(None)
+
+    def deleteQueuedReport(self, queueid):
+        self.entries.pop(queueid, None)
+        return defer.succeed(None)
@@ -88,7 +88,7 @@ class FakeStepsComponent(FakeDBComponent):
                 return defer.succeed(self._row2dict(row))
             return defer.succeed(None)
 
-    def getSteps(self, buildid):
+    def getSteps(self, buildid, stale_ok=False):
         ret = []
 
         for row in self.steps.values():
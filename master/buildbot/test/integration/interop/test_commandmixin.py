@@ -70,6 +70,16 @@ class CommandMixinMasterMsgPack(CommandMixinMaster):
     proto = "msgpack"
 
 
+class CommandMixinMasterPBCompressed(CommandMixinMaster):
+    proto = "pb"
+    worker_compression = 'zlib'
+
+
+class CommandMixinMasterMsgPackCompressed(CommandMixinMaster):
+    proto = "msgpack"
+    worker_compression = 'zlib'
+
+
 class TestCommandMixinStep(BuildStep, CommandMixin):
 
     @defer.inlineCallbacks
@@ -202,5 +202,9 @@ class TransferStepsMasterPb(RunMasterBase):
         self.assertTrue(res)
 
 
+class TransferStepsMasterPbCompressed(TransferStepsMasterPb):
+    worker_compression = 'zlib'
+
+
 class TransferStepsMasterNull(TransferStepsMasterPb):
     proto = "null"
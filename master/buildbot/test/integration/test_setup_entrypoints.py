@@ -118,6 +118,7 @@ class TestSetupPyEntryPoints(unittest.TestCase):
             'buildbot.util.httpclientservice.HTTPClientService',
             'buildbot.util.httpclientservice.TreqResponseWrapper',
             'buildbot.util.httpclientservice.TxRequestsResponseWrapper',
+            'buildbot.util.httpclientservice.HTTPConnectionPoolService',
             'buildbot.util.kubeclientservice.KubeClientService',
             'buildbot.util.kubeclientservice.KubeConfigLoaderBase',
             'buildbot.util.kubeclientservice.KubeError',
@@ -140,6 +141,8 @@ class TestSetupPyEntryPoints(unittest.TestCase):
             'buildbot.util.queue.UndoableQueue',
             'buildbot.util.raml.RamlLoader',
             'buildbot.util.raml.RamlSpec',
+            'buildbot.util.ratelimit.CoalescingRateLimitedQueue',
+            'buildbot.util.ratelimit.TokenBucket',
             'buildbot.util.runprocess.RunProcessPP',
             'buildbot.util.runprocess.RunProcess',
             'buildbot.util.sautils.InsertFromSelect',
@@ -151,6 +154,7 @@ class TestSetupPyEntryPoints(unittest.TestCase):
             'buildbot.util.service.MasterService',
             'buildbot.util.service.ReconfigurableServiceMixin',
             'buildbot.util.service.SharedService',
+            'buildbot.util.spillbuffer.SpillBuffer',
             'buildbot.util.state.StateMixin',
             'buildbot.util.subscription.Subscription',
             'buildbot.util.subscription.SubscriptionPoint',
@@ -177,6 +181,7 @@ class TestSetupPyEntryPoints(unittest.TestCase):
             'buildbot.reporters.telegram.TelegramPollingBot',
             'buildbot.reporters.telegram.TelegramStatusBot',
             'buildbot.reporters.telegram.TelegramWebhookBot',
+            'buildbot.reporters.utils.BuildDetailsCache',
             'buildbot.reporters.words.Channel',
             'buildbot.reporters.words.Contact',
             'buildbot.reporters.words.ForceOptions',
@@ -189,6 +194,7 @@ class TestSetupPyEntryPoints(unittest.TestCase):
 
     def test_secrets(self):
         known_not_exported = {
+            'buildbot.secrets.cache.SecretCache',
             'buildbot.secrets.manager.SecretManager',
             'buildbot.secrets.providers.base.SecretProviderBase',
             'buildbot.secrets.secret.SecretDetails',
@@ -33,7 +33,7 @@ class TestBadRows(connector_component.ConnectorComponentMixin,
     def setUp(self):
         yield self.setUpConnectorComponent(
             table_names=['patches', 'sourcestamps', 'changes',
-                         'change_properties', 'change_files'])
+                         'change_properties', 'change_files', 'change_files_compact'])
 
         self.db.changes = changes.ChangesConnectorComponent(self.db)
 
@@ -13,6 +13,7 @@
 #
 # Copyright Buildbot Team Members
 
+import copy
 import pprint
 import re
 import textwrap
@@ -125,6 +126,31 @@ class Change(unittest.TestCase, TestReactorMixin):
                 return pprint.pformat(c.__dict__)
             self.fail(f"changes do not match; expected\n{printable(exp)}\ngot\n{printable(got)}")
 
+    @defer.inlineCallbacks
+    def test_fromChdict_files_sorted_lazily(self):
+        yield self.master.db.insert_test_data(self.change23_rows)
+        chdict = yield self.master.db.changes.getChange(23)
+        chdict = dict(chdict, files=['worker/README.txt', 'master/README.txt'])
+
+        got = yield changes.Change.fromChdict(self.master, chdict)
+
+        self.assertFalse(got._files_sorted)
+        self.assertEqual(got.files, ['master/README.txt', 'worker/README.txt'])
+        self.assertTrue(got._files_sorted)
+
+    def test_files_setter(self):
+        self.change23.files = ['worker/a', 'master/b']
+        self.assertEqual(self.change23.files, ['worker/a', 'master/b'])
+
+    def test_setstate_old_files(self):
+        change = changes.Change.__new__(changes.Change)
+        change.__setstate__({'files': ['master/README.txt'], 'number': 3})
+        self.assertEqual(change.files, ['master/README.txt'])
+
+    def test_deepcopy(self):
+        change = copy.deepcopy(self.change23)
+        self.assertEqual(change.files, self.change23.files)
+
     def test_str(self):
         string = str(self.change23)
         self.assertTrue(re.match(r"Change\(.*\)", string), string)
@@ -606,6 +606,239 @@ class TestGitPoller(TestGitPollerBase):
             }
         ])
 
+    def test_parse_commits_info(self):
+        output = ('\x00' + '4423cdbcbb89c14e50dd5f4152415afd686c5241' +
+                  '\x001273258009\x00by:4423cdbc <a@example.com>\x00by:4423cdbc <c@example.com>'
+                  '\x00no files\n\x00'
+                  '\x00' + '64a5dc2a4bd4f558b5dd193d47c83c7d7abc9a1a' +
+                  '\x001273258010\x00by:64a5dc2a <a@example.com>\x00by:64a5dc2a <c@example.com>'
+                  '\x00hello!\n\nmultiline\x00\nfile space\x00d\u00e9j\u00e0\x00')
+        self.assertEqual(list(self.poller._parse_commits_info(output)), [
+            ('4423cdbcbb89c14e50dd5f4152415afd686c5241', 1273258009,
+             'by:4423cdbc <a@example.com>', 'by:4423cdbc <c@example.com>', [], 'no files'),
+            ('64a5dc2a4bd4f558b5dd193d47c83c7d7abc9a1a', 1273258010,
+             'by:64a5dc2a <a@example.com>', 'by:64a5dc2a <c@example.com>',
+             ['file space', 'd\u00e9j\u00e0'], 'hello!\n\nmultiline'),
+        ])
+
+    def test_parse_commits_info_empty(self):
+        self.assertEqual(list(self.poller._parse_commits_info('')), [])
+
+    def test_parse_commits_info_no_author(self):
+        output = ('\x004423cdbcbb89c14e50dd5f4152415afd686c5241\x001273258009\x00'
+                  '\x00by:4423cdbc <c@example.com>\x00hello!')
+        with self.assertRaises(EnvironmentError):
+            list(self.poller._parse_commits_info(output))
+
+    @defer.inlineCallbacks
+    def test_poll_multipleBranches_batchLog(self):
+        self.expect_commands(
+            ExpectMasterShell(['git', '--version'])
+            .stdout(b'git version 1.7.5\n'),
+            ExpectMasterShell(['git', 'init', '--bare', self.POLLER_WORKDIR]),
+            ExpectMasterShell(['git', 'ls-remote', '--refs', self.REPOURL])
+            .stdout(b'9118f4ab71963d23d02d4bdc54876ac8bf05acf2\t'
+                    b'refs/heads/release\n'
+                    b'4423cdbcbb89c14e50dd5f4152415afd686c5241\t'
+                    b'refs/heads/master\n'),
+            ExpectMasterShell(['git', 'fetch', '--progress', self.REPOURL,
+                               '+master:refs/buildbot/' + self.REPOURL_QUOTED + '/master',
+                               '+release:refs/buildbot/' + self.REPOURL_QUOTED + '/release'])
+            .workdir(self.POLLER_WORKDIR),
+            ExpectMasterShell(['git', 'rev-parse',
+                               'refs/buildbot/' + self.REPOURL_QUOTED + '/master'])
+            .workdir(self.POLLER_WORKDIR)
+            .stdout(b'4423cdbcbb89c14e50dd5f4152415afd686c5241\n'),
+            ExpectMasterShell(['git', 'log', '-z', '--name-only',
+                               gitpoller.GitPoller.BATCH_LOG_FORMAT,
+                               '--ignore-missing',
+                               '4423cdbcbb89c14e50dd5f4152415afd686c5241',
+                               '^bf0b01df6d00ae8d1ffa0b2e2acbe642a6cd35d5',
+                               '^fa3ae8ed68e664d4db24798611b352e3c6509930',
+                               '--'])
+            .workdir(self.POLLER_WORKDIR)
+            .stdout(b'\x004423cdbcbb89c14e50dd5f4152415afd686c5241\x001273258009'
+                    b'\x00by:4423cdbc\x00by:4423cdbc\x00second\n\x00\n/etc/442\x00'
+                    b'\x0064a5dc2a4bd4f558b5dd193d47c83c7d7abc9a1a\x001273258008'
+                    b'\x00by:64a5dc2a\x00by:64a5dc2a\x00first\n\x00\n/etc/64a\x00'),
+            ExpectMasterShell(['git', 'rev-parse',
+                               'refs/buildbot/' + self.REPOURL_QUOTED + '/release'])
+            .workdir(self.POLLER_WORKDIR)
+            .stdout(b'9118f4ab71963d23d02d4bdc54876ac8bf05acf2'),
+            ExpectMasterShell(['git', 'log', '-z', '--name-only',
+                               gitpoller.GitPoller.BATCH_LOG_FORMAT,
+                               '--ignore-missing',
+                               '9118f4ab71963d23d02d4bdc54876ac8bf05acf2',
+                               '^4423cdbcbb89c14e50dd5f4152415afd686c5241',
+                               '^bf0b01df6d00ae8d1ffa0b2e2acbe642a6cd35d5',
+                               '--'])
+            .workdir(self.POLLER_WORKDIR)
+            .stdout(b'\x009118f4ab71963d23d02d4bdc54876ac8bf05acf2\x001273258010'
+                    b'\x00by:9118f4ab\x00by:9118f4ab\x00release\n'),
+        )
+
+        # do the poll
+        self.poller.batchLog = True
+        self.poller.branches = ['master', 'release']
+        self.poller.lastRev = {
+            'master': 'fa3ae8ed68e664d4db24798611b352e3c6509930',
+            'release': 'bf0b01df6d00ae8d1ffa0b2e2acbe642a6cd35d5'
+        }
+        self.poller.doPoll.running = True
+        yield self.poller.poll()
+
+        self.assert_all_commands_ran()
+        self.assertEqual(self.poller.lastRev, {
+            'master': '4423cdbcbb89c14e50dd5f4152415afd686c5241',
+            'release': '9118f4ab71963d23d02d4bdc54876ac8bf05acf2'
+        })
+
+        def change(rev, branch, files, comments, when_timestamp):
+            return {
+                'author': 'by:' + rev[:8],
+                'committer': 'by:' + rev[:8],
+                'branch': branch,
+                'category': None,
+                'codebase': None,
+                'comments': comments,
+                'files': files,
+                'project': '',
+                'properties': {},
+                'repository': 'git@example.com:~foo/baz.git',
+                'revision': rev,
+                'revlink': '',
+                'src': 'git',
+                'when_timestamp': when_timestamp,
+            }
+
+        self.assertEqual(self.master.data.updates.changesAdded, [
+            change('64a5dc2a4bd4f558b5dd193d47c83c7d7abc9a1a', 'master', ['/etc/64a'],
+                   'first', 1273258008),
+            change('4423cdbcbb89c14e50dd5f4152415afd686c5241', 'master', ['/etc/442'],
+                   'second', 1273258009),
+            change('9118f4ab71963d23d02d4bdc54876ac8bf05acf2', 'release', [],
+                   'release', 1273258010),
+        ])
+
+    @defer.inlineCallbacks
+    def test_poll_multipleBranches_batchLog_buildPushesWithNoCommits(self):
+        self.expect_commands(
+            ExpectMasterShell(['git', '--version'])
+            .stdout(b'git version 1.7.5\n'),
+            ExpectMasterShell(['git', 'init', '--bare', self.POLLER_WORKDIR]),
+            ExpectMasterShell(['git', 'ls-remote', '--refs', self.REPOURL])
+            .stdout(b'4423cdbcbb89c14e50dd5f4152415afd686c5241\t'
+                    b'refs/heads/release\n'),
+            ExpectMasterShell(['git', 'fetch', '--progress', self.REPOURL,
+                               '+release:refs/buildbot/' + self.REPOURL_QUOTED + '/release'])
+            .workdir(self.POLLER_WORKDIR),
+            ExpectMasterShell(['git', 'rev-parse',
+                               'refs/buildbot/' + self.REPOURL_QUOTED + '/release'])
+            .workdir(self.POLLER_WORKDIR)
+            .stdout(b'4423cdbcbb89c14e50dd5f4152415afd686c5241'),
+            ExpectMasterShell(['git', 'log', '-z', '--name-only',
+                               gitpoller.GitPoller.BATCH_LOG_FORMAT,
+                               '--ignore-missing',
+                               '4423cdbcbb89c14e50dd5f4152415afd686c5241',
+                               '^4423cdbcbb89c14e50dd5f4152415afd686c5241',
+                               '--'])
+            .workdir(self.POLLER_WORKDIR),
+            ExpectMasterShell(['git', 'log', '-z', '--name-only',
+                               gitpoller.GitPoller.BATCH_LOG_FORMAT,
+                               '--no-walk', '4423cdbcbb89c14e50dd5f4152415afd686c5241', '--'])
+            .workdir(self.POLLER_WORKDIR)
+            .stdout(b'\x004423cdbcbb89c14e50dd5f4152415afd686c5241\x001273258009'
+                    b'\x00by:4423cdbc\x00by:4423cdbc\x00hello!\n\x00\n/etc/442\x00'),
+        )
+
+        self.poller.batchLog = True
+        self.poller.buildPushesWithNoCommits = True
+        self.poller.branches = ['release']
+        self.poller.lastRev = {
+            'master': '4423cdbcbb89c14e50dd5f4152415afd686c5241',
+        }
+        self.poller.doPoll.running = True
+        yield self.poller.poll()
+
+        self.assert_all_commands_ran()
+        self.assertEqual([(ch['revision'], ch['branch'], ch['files'])
+                          for ch in self.master.data.updates.changesAdded],
+                         [('4423cdbcbb89c14e50dd5f4152415afd686c5241', 'release',
+                           ['/etc/442'])])
+
+    @defer.inlineCallbacks
+    def test_poll_branchConcurrency(self):
+        self.expect_commands(
+            ExpectMasterShell(['git', '--version'])
+            .stdout(b'git version 1.7.5\n'),
+            ExpectMasterShell(['git', 'init', '--bare', self.POLLER_WORKDIR]),
+            ExpectMasterShell(['git', 'ls-remote', '--refs', self.REPOURL])
+            .stdout(b'9118f4ab71963d23d02d4bdc54876ac8bf05acf2\t'
+                    b'refs/heads/release\n'
+                    b'4423cdbcbb89c14e50dd5f4152415afd686c5241\t'
+                    b'refs/heads/master\n'),
+            ExpectMasterShell(['git', 'fetch', '--progress', self.REPOURL,
+                               '+master:refs/buildbot/' + self.REPOURL_QUOTED + '/master',
+                               '+release:refs/buildbot/' + self.REPOURL_QUOTED + '/release'])
+            .workdir(self.POLLER_WORKDIR),
+            ExpectMasterShell(['git', 'rev-parse',
+                               'refs/buildbot/' + self.REPOURL_QUOTED + '/master'])
+            .workdir(self.POLLER_WORKDIR)
+            .stdout(b'4423cdbcbb89c14e50dd5f4152415afd686c5241\n'),
+            ExpectMasterShell(['git', 'log', '--ignore-missing',
+                               '--format=%H',
+                               '4423cdbcbb89c14e50dd5f4152415afd686c5241',
+                               '^bf0b01df6d00ae8d1ffa0b2e2acbe642a6cd35d5',
+                               '^fa3ae8ed68e664d4db24798611b352e3c6509930',
+                               '--'])
+            .workdir(self.POLLER_WORKDIR)
+            .stdout(b'4423cdbcbb89c14e50dd5f4152415afd686c5241'),
+            ExpectMasterShell(['git', 'rev-parse',
+                               'refs/buildbot/' + self.REPOURL_QUOTED + '/release'])
+            .workdir(self.POLLER_WORKDIR)
+            .stdout(b'9118f4ab71963d23d02d4bdc54876ac8bf05acf2'),
+            ExpectMasterShell(['git', 'log', '--ignore-missing',
+                               '--format=%H',
+                               '9118f4ab71963d23d02d4bdc54876ac8bf05acf2',
+                               '^4423cdbcbb89c14e50dd5f4152415afd686c5241',
+                               '^bf0b01df6d00ae8d1ffa0b2e2acbe642a6cd35d5',
+                               '--'])
+            .workdir(self.POLLER_WORKDIR)
+            .stdout(b'9118f4ab71963d23d02d4bdc54876ac8bf05acf2'),
+        )
+
+        # block the retrieval of commit details so that we can check that
+        # both branches are processed at the same time
+        pending = {}
+
+        def get_commit_info(rev):
+            pending[rev] = defer.Deferred()
+            return pending[rev]
+        self.patch(self.poller, '_get_commit_info', get_commit_info)
+
+        self.poller.branchConcurrency = 2
+        self.poller.branches = ['master', 'release']
+        self.poller.lastRev = {
+            'master': 'fa3ae8ed68e664d4db24798611b352e3c6509930',
+            'release': 'bf0b01df6d00ae8d1ffa0b2e2acbe642a6cd35d5'
+        }
+        self.poller.doPoll.running = True
+        d = self.poller.poll()
+
+        self.assertEqual(sorted(pending), ['4423cdbcbb89c14e50dd5f4152415afd686c5241',
+                                           '9118f4ab71963d23d02d4bdc54876ac8bf05acf2'])
+        self.assertFalse(d.called)
+        for rev in sorted(pending, reverse=True):
+            pending[rev].callback((rev, 1273258009, 'by:' + rev[:8], 'by:' + rev[:8],
+                                   [], 'hello!'))
+        yield d
+
+        self.assert_all_commands_ran()
+        self.assertEqual([(ch['revision'], ch['branch'])
+                          for ch in self.master.data.updates.changesAdded],
+                         [('9118f4ab71963d23d02d4bdc54876ac8bf05acf2', 'release'),
+                          ('4423cdbcbb89c14e50dd5f4152415afd686c5241', 'master')])
+
     @defer.inlineCallbacks
     def test_poll_multipleBranches_buildPushesWithNoCommits_default(self):
         self.expect_commands(
@@ -1504,6 +1737,166 @@ class TestGitPoller(TestGitPollerBase):
         })
 
 
+class TestGitPollerCoalesceFetches(TestGitPollerBase):
+
+    def createPoller(self):
+        return gitpoller.GitPoller(self.REPOURL, branches=['master'], coalesceFetches=True,
+                                   pollInterval=60)
+
+    @defer.inlineCallbacks
+    def setUp(self):
+        yield super().setUp()
+        self.poller2 = gitpoller.GitPoller(self.REPOURL, name='release-poller',
+                                           branches=['release'], coalesceFetches=True,
+                                           pollInterval=60)
+        yield self.poller2.setServiceParent(self.master)
+        yield self.poller2.configureService()
+        # polls are triggered manually by the tests
+        for poller in (self.poller, self.poller2):
+            yield poller.doPoll.stop()
+            poller.doPoll.running = True
+
+    def expect_poll(self, branch, rev, fetch=None, last_rev=None):
+        commands = [
+            ExpectMasterShell(['git', '--version'])
+            .stdout(b'git version 1.7.5\n'),
+            ExpectMasterShell(['git', 'init', '--bare', self.POLLER_WORKDIR]),
+            ExpectMasterShell(['git', 'ls-remote', '--refs', self.REPOURL])
+            .stdout(b'4423cdbcbb89c14e50dd5f4152415afd686c5241\trefs/heads/master\n'
+                    b'9118f4ab71963d23d02d4bdc54876ac8bf05acf2\trefs/heads/release\n'),
+        ]
+        if fetch is not None:
+            commands.append(
+                ExpectMasterShell(['git', 'fetch', '--progress', self.REPOURL] +
+                                  [f'+{b}:refs/buildbot/{self.REPOURL_QUOTED}/{b}'
+                                   for b in fetch])
+                .workdir(self.POLLER_WORKDIR))
+        commands.append(
+            ExpectMasterShell(['git', 'rev-parse',
+                               f'refs/buildbot/{self.REPOURL_QUOTED}/{branch}'])
+            .workdir(self.POLLER_WORKDIR)
+            .stdout(unicode2bytes(rev)))
+        if last_rev is not None:
+            commands.append(
+                ExpectMasterShell(['git', 'log', '--ignore-missing', '--format=%H', rev,
+                                   '^' + last_rev, '--'])
+                .workdir(self.POLLER_WORKDIR))
+        return commands
+
+    def test_shared_repository(self):
+        self.assertIs(self.poller.sharedRepository, self.poller2.sharedRepository)
+
+    @defer.inlineCallbacks
+    def test_poll_coalesced(self):
+        self.expect_commands(
+            *self.expect_poll('release', '9118f4ab71963d23d02d4bdc54876ac8bf05acf2',
+                              fetch=['release']),
+            # the refspecs of both pollers are fetched together
+            *self.expect_poll('master', '4423cdbcbb89c14e50dd5f4152415afd686c5241',
+                              fetch=['master', 'release']),
+            # the second poller reuses the fetch of the first one
+            *self.expect_poll('release', '9118f4ab71963d23d02d4bdc54876ac8bf05acf2',
+                              last_rev='9118f4ab71963d23d02d4bdc54876ac8bf05acf2'),
+        )
+
+        yield self.poller2.poll()
+        yield self.poller.poll()
+        yield self.poller2.poll()
+
+        self.assert_all_commands_ran()
+        self.assertEqual(self.poller.lastRev,
+                         {'master': '4423cdbcbb89c14e50dd5f4152415afd686c5241'})
+        self.assertEqual(self.poller2.lastRev,
+                         {'release': '9118f4ab71963d23d02d4bdc54876ac8bf05acf2'})
+
+    @defer.inlineCallbacks
+    def test_poll_fetch_expired(self):
+        self.expect_commands(
+            *self.expect_poll('master', '4423cdbcbb89c14e50dd5f4152415afd686c5241',
+                              fetch=['master']),
+            *self.expect_poll('release', '9118f4ab71963d23d02d4bdc54876ac8bf05acf2',
+                              fetch=['master', 'release']),
+            *self.expect_poll('master', '4423cdbcbb89c14e50dd5f4152415afd686c5241',
+                              fetch=['master', 'release'],
+                              last_rev='4423cdbcbb89c14e50dd5f4152415afd686c5241'),
+        )
+
+        yield self.poller.poll()
+        yield self.poller2.poll()
+        self.reactor.advance(60)
+        yield self.poller.poll()
+
+        self.assert_all_commands_ran()
+
+    @defer.inlineCallbacks
+    def test_poll_unregistered_on_deactivate(self):
+        self.expect_commands(
+            *self.expect_poll('release', '9118f4ab71963d23d02d4bdc54876ac8bf05acf2',
+                              fetch=['release']),
+            *self.expect_poll('master', '4423cdbcbb89c14e50dd5f4152415afd686c5241',
+                              fetch=['master']),
+        )
+
+        yield self.poller2.poll()
+        yield self.poller2.deactivate()
+        self.reactor.advance(60)
+        yield self.poller.poll()
+
+        self.assert_all_commands_ran()
+
+    @defer.inlineCallbacks
+    def test_poll_coalesced_fetch_fails(self):
+        self.expect_commands(
+            *self.expect_poll('release', '9118f4ab71963d23d02d4bdc54876ac8bf05acf2',
+                              fetch=['release']),
+            ExpectMasterShell(['git', '--version'])
+            .stdout(b'git version 1.7.5\n'),
+            ExpectMasterShell(['git', 'init', '--bare', self.POLLER_WORKDIR]),
+            ExpectMasterShell(['git', 'ls-remote', '--refs', self.REPOURL])
+            .stdout(b'4423cdbcbb89c14e50dd5f4152415afd686c5241\trefs/heads/master\n'),
+            ExpectMasterShell(['git', 'fetch', '--progress', self.REPOURL,
+                               f'+master:refs/buildbot/{self.REPOURL_QUOTED}/master',
+                               f'+release:refs/buildbot/{self.REPOURL_QUOTED}/release'])
+            .workdir(self.POLLER_WORKDIR)
+            .exit(128),
+            ExpectMasterShell(['git', 'fetch', '--progress', self.REPOURL,
+                               f'+master:refs/buildbot/{self.REPOURL_QUOTED}/master'])
+            .workdir(self.POLLER_WORKDIR),
+            ExpectMasterShell(['git', 'rev-parse',
+                               f'refs/buildbot/{self.REPOURL_QUOTED}/master'])
+            .workdir(self.POLLER_WORKDIR)
+            .stdout(b'4423cdbcbb89c14e50dd5f4152415afd686c5241'),
+        )
+
+        yield self.poller2.poll()
+        yield self.poller.poll()
+
+        self.assert_all_commands_ran()
+        self.assertEqual(self.poller.lastRev,
+                         {'master': '4423cdbcbb89c14e50dd5f4152415afd686c5241'})
+
+    @defer.inlineCallbacks
+    def test_poll_waits_for_fetch_in_progress(self):
+        fetch_d = defer.Deferred()
+        calls = []
+
+        def dovccmd(command, args, path=None):
+            calls.append(args)
+            return fetch_d
+        self.patch(self.poller, '_dovccmd', dovccmd)
+        self.patch(self.poller2, '_dovccmd', dovccmd)
+
+        repo = self.poller.sharedRepository
+        d1 = repo.fetch(self.poller2, ['+release:release'], 60)
+        d2 = repo.fetch(self.poller, ['+release:release'], 60)
+        self.assertEqual(len(calls), 1)
+
+        fetch_d.callback('')
+        yield d1
+        yield d2
+        self.assertEqual(len(calls), 1)
+
+
 class TestGitPollerWithSshPrivateKey(TestGitPollerBase):
 
     def createPoller(self):
@@ -1856,6 +2249,13 @@ class TestGitPollerConstructor(unittest.TestCase, TestReactorMixin, changesource
             yield self.attachChangeSource(gitpoller.GitPoller("/tmp/git.git", only_tags=True,
                                                               branch='bad'))
 
+    @defer.inlineCallbacks
+    def test_branchConcurrency_invalid(self):
+        with self.assertRaisesConfigError(
+                "branchConcurrency must be a positive integer"):
+            yield self.attachChangeSource(gitpoller.GitPoller("/tmp/git.git",
+                                                              branchConcurrency=0))
+
     @defer.inlineCallbacks
     def test_gitbin_default(self):
         poller = yield self.attachChangeSource(gitpoller.GitPoller("/tmp/git.git"))
@@ -590,6 +590,25 @@ class MasterConfig_loaders(ConfigErrorsMixin, unittest.TestCase):
         self.cfg.load_db(self.filename, {'db': {'db_url': 'abcd'}})
         self.assertResults(db=dict(db_url='abcd'))
 
+    def test_load_db_pools(self):
+        self.cfg.load_db(self.filename, {'db': {'db_url': 'abcd', 'pool_size': 10,
+                                                'read_db_url': 'efgh', 'read_pool_size': 20,
+                                                'sqlite_single_writer': True}})
+        self.assertResults(db=dict(db_url='abcd', pool_size=10, read_db_url='efgh',
+                                   read_pool_size=20, sqlite_single_writer=True))
+
+    def test_load_db_pool_size_invalid(self):
+        for key, value, message in (
+                ('pool_size', 0, "c['db']['pool_size'] must be a strictly positive integer"),
+                ('read_pool_size', '2',
+                 "c['db']['read_pool_size'] must be a strictly positive integer"),
+                ('read_db_url', 3, "c['db']['read_db_url'] must be a string"),
+                ('sqlite_single_writer', 1, "c['db']['sqlite_single_writer'] must be a boolean")):
+            with capture_config_errors() as errors:
+                self.cfg.load_db(self.filename, {'db': {key: value}})
+
+            self.assertConfigError(errors, message)
+
     def test_load_db_unk_keys(self):
         with capture_config_errors() as errors:
             self.cfg.load_db(self.filename, {'db': {'db_url': 'abcd', 'bar': 'bar'}})
@@ -632,6 +651,37 @@ class MasterConfig_loaders(ConfigErrorsMixin, unittest.TestCase):
                               dict(metrics=dict(foo=1)))
         self.assertResults(metrics=dict(foo=1))
 
+    def test_load_metrics_reactor_profiler(self):
+        metrics = dict(reactor_profiler=dict(threshold=0.2, interval=1, sample_interval=None))
+        self.cfg.load_metrics(self.filename, dict(metrics=metrics))
+        self.assertResults(metrics=metrics)
+
+    def test_load_metrics_reactor_profiler_bool(self):
+        self.cfg.load_metrics(self.filename, dict(metrics=dict(reactor_profiler=True)))
+        self.assertResults(metrics=dict(reactor_profiler=True))
+
+    def test_load_metrics_reactor_profiler_invalid(self):
+        with capture_config_errors() as errors:
+            self.cfg.load_metrics(self.filename, dict(metrics=dict(reactor_profiler=13)))
+
+        self.assertConfigError(errors, "must be a boolean or a dictionary")
+
+    def test_load_metrics_reactor_profiler_unknown_key(self):
+        with capture_config_errors() as errors:
+            self.cfg.load_metrics(self.filename,
+                                  dict(metrics=dict(reactor_profiler=dict(treshold=0.2))))
+
+        self.assertConfigError(errors, "unrecognized keys in c['metrics']['reactor_profiler']: "
+                                       "treshold")
+
+    def test_load_metrics_reactor_profiler_invalid_value(self):
+        with capture_config_errors() as errors:
+            self.cfg.load_metrics(self.filename,
+                                  dict(metrics=dict(reactor_profiler=dict(interval=0))))
+
+        self.assertConfigError(errors, "c['metrics']['reactor_profiler']['interval'] must be a "
+                                       "positive number")
+
     def test_load_caches_defaults(self):
         self.cfg.load_caches(self.filename, {})
         self.assertResults(caches=dict(Changes=10, Builds=15))
@@ -198,7 +198,8 @@ class TestBuildRequestsEndpoint(endpoint.EndpointMixin, unittest.TestCase):
             bsid=None,
             complete=None,
             claimed=None,
-            resultSpec=resultspec.ResultSpec())
+            resultSpec=resultspec.ResultSpec(),
+            stale_ok=False)
 
     @defer.inlineCallbacks
     def testGetFilters(self):
@@ -218,7 +219,8 @@ class TestBuildRequestsEndpoint(endpoint.EndpointMixin, unittest.TestCase):
             bsid=55,
             complete=False,
             claimed=True,
-            resultSpec=resultspec.ResultSpec(filters=[f4, f5]))
+            resultSpec=resultspec.ResultSpec(filters=[f4, f5]),
+            stale_ok=False)
 
     @defer.inlineCallbacks
     def testGetClaimedByMasterIdFilters(self):
@@ -236,7 +238,8 @@ class TestBuildRequestsEndpoint(endpoint.EndpointMixin, unittest.TestCase):
             bsid=None,
             complete=None,
             claimed=fakedb.FakeBuildRequestsComponent.MASTER_ID,
-            resultSpec=resultspec.ResultSpec(filters=[f1]))
+            resultSpec=resultspec.ResultSpec(filters=[f1]),
+            stale_ok=False)
 
     @defer.inlineCallbacks
     def testGetSortedLimit(self):
@@ -423,3 +423,56 @@ class Change(TestReactorMixin, interfaces.InterfaceTests, unittest.TestCase):
         )
         return self.do_test_addChange(kwargs,
                                       expectedRoutingKey, expectedMessage, expectedRow)
+
+    def test_signature_addChanges(self):
+        @self.assertArgSpecMatches(
+            self.master.data.updates.addChanges,  # fake
+            self.rtype.addChanges)  # real
+        def addChanges(self, changes):
+            pass
+
+    @defer.inlineCallbacks
+    def test_addChanges(self):
+        self.reactor.advance(10000000)
+        kwargs = dict(author='warner', committer='david', branch='warnerdb',
+                      category='devel', comments='fix whitespace',
+                      files=['master/buildbot/__init__.py'],
+                      project='Buildbot', repository='git://warner',
+                      revision='0e92a098b', revlink='http://warner/0e92a098b',
+                      when_timestamp=256738404,
+                      properties={'foo': 20})
+        changeids = yield self.rtype.addChanges([
+            kwargs,
+            dict(kwargs, revision='1f03b109c', revlink='http://warner/1f03b109c',
+                 properties={}),
+        ])
+
+        self.assertEqual(changeids, [500, 501])
+        # the events are produced once the whole batch is in the db
+        self.assertEqual([p[0] for p in self.master.mq.productions],
+                         [('changes', '500', 'new'), ('changes', '501', 'new')])
+        self.assertEqual(self.master.mq.productions[0][1], self.changeEvent)
+        self.assertEqual(self.master.mq.productions[1][1]['parent_changeids'], [500])
+        self.master.db.changes.assertChange(501, fakedb.Change(
+            changeid=501,
+            parent_changeids=[500],
+            author='warner',
+            committer='david',
+            comments='fix whitespace',
+            branch='warnerdb',
+            revision='1f03b109c',
+            revlink='http://warner/1f03b109c',
+            when_timestamp=256738404,
+            category='devel',
+            repository='git://warner',
+            codebase='',
+            project='Buildbot',
+            sourcestampid=101,
+        ))
+
+    @defer.inlineCallbacks
+    def test_addChanges_empty(self):
+        changeids = yield self.rtype.addChanges([])
+
+        self.assertEqual(changeids, [])
+        self.master.mq.assertProductions([])
@@ -59,6 +59,11 @@ class Tests(interfaces.InterfaceTests):
                       project='', src=None):
             pass
 
+    def test_signature_updates_addChanges(self):
+        @self.assertArgSpecMatches(self.data.updates.addChanges)
+        def addChanges(self, changes):
+            pass
+
     def test_signature_updates_masterActive(self):
         @self.assertArgSpecMatches(self.data.updates.masterActive)
         def masterActive(self, name, masterid):
@@ -0,0 +1,91 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+
+from twisted.internet import defer
+from twisted.trial import unittest
+
+from buildbot.data import reactor_profiler
+from buildbot.process import reactorprofiler
+from buildbot.test.util import endpoint
+
+
+class FakeMetrics:
+
+    def __init__(self, profiler):
+        self.reactor_profiler = profiler
+
+
+class ProfilerEndpointMixin(endpoint.EndpointMixin):
+
+    def setUp(self):
+        self.setUpEndpoint()
+        self.profiler = reactorprofiler.ReactorProfiler(self.master.reactor)
+        self.master.metrics = FakeMetrics(self.profiler)
+
+        stall = reactorprofiler._Stall()
+        stall.samples = 2
+        stall.stack = ['  File "a.py", line 1, in f\n', '    f()\n']
+        stall.generators.update({'Loop.run': 2, 'Loop.step': 1})
+        self.profiler._record_stall(stall, 1.25, 1000)
+
+    def tearDown(self):
+        self.tearDownEndpoint()
+
+
+class ReactorStallsEndpoint(ProfilerEndpointMixin, unittest.TestCase):
+
+    endpointClass = reactor_profiler.ReactorStallsEndpoint
+    resourceTypeClass = reactor_profiler.ReactorStall
+
+    @defer.inlineCallbacks
+    def test_get(self):
+        stalls = yield self.callGet(('reactor_stalls',))
+        for stall in stalls:
+            self.validateData(stall)
+        self.assertEqual(stalls, [{
+            'stallid': 1,
+            'started_at': 998,
+            'duration_ms': 1250,
+            'generators': ['Loop.run', 'Loop.step'],
+            'stack': ['  File "a.py", line 1, in f', '    f()'],
+        }])
+
+    @defer.inlineCallbacks
+    def test_get_disabled(self):
+        self.master.metrics.reactor_profiler = None
+        stalls = yield self.callGet(('reactor_stalls',))
+        self.assertEqual(stalls, [])
+
+
+class ReactorGeneratorsEndpoint(ProfilerEndpointMixin, unittest.TestCase):
+
+    endpointClass = reactor_profiler.ReactorGeneratorsEndpoint
+    resourceTypeClass = reactor_profiler.ReactorGenerator
+
+    @defer.inlineCallbacks
+    def test_get(self):
+        generators = yield self.callGet(('reactor_generators',))
+        for generator in generators:
+            self.validateData(generator)
+        self.assertEqual(generators, [
+            {'name': 'Loop.run', 'stalled_time_ms': 1250, 'stalls': 1},
+            {'name': 'Loop.step', 'stalled_time_ms': 625, 'stalls': 1},
+        ])
+
+    @defer.inlineCallbacks
+    def test_get_disabled(self):
+        del self.master.metrics
+        generators = yield self.callGet(('reactor_generators',))
+        self.assertEqual(generators, [])
@@ -94,7 +94,7 @@ class Tests(interfaces.InterfaceTests):
     def test_signature_getBuilds(self):
         @self.assertArgSpecMatches(self.db.builds.getBuilds)
         def getBuilds(self, builderid=None, buildrequestid=None, workerid=None,
-                      complete=None, resultSpec=None):
+                      complete=None, resultSpec=None, stale_ok=False):
             pass
 
     def test_signature_addBuild(self):
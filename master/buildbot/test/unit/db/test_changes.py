@@ -13,6 +13,7 @@
 #
 # Copyright Buildbot Team Members
 
+import mock
 import sqlalchemy as sa
 
 from twisted.internet import defer
@@ -91,6 +92,11 @@ class Tests(interfaces.InterfaceTests):
                       project='', uid=None):
             pass
 
+    def test_signature_addChanges(self):
+        @self.assertArgSpecMatches(self.db.changes.addChanges)
+        def addChanges(self, changes):
+            pass
+
     def test_signature_getChange(self):
         @self.assertArgSpecMatches(self.db.changes.getChange)
         def getChange(self, key, no_cache=False):
@@ -208,6 +214,43 @@ class Tests(interfaces.InterfaceTests):
             'when_timestamp': epoch2datetime(OTHERTIME),
         })
 
+    @defer.inlineCallbacks
+    def test_addChanges_getChange(self):
+        yield self.insert_test_data(self.change14_rows)
+
+        change = dict(author='delanne', committer='melanne', comments='child of changeid14',
+                      when_timestamp=epoch2datetime(OTHERTIME), branch='warnerdb',
+                      category='devel', revlink=None, properties={},
+                      repository='git://warner', codebase='mainapp', project='Buildbot')
+        changeids = yield self.db.changes.addChanges([
+            dict(change, revision='50adad56', files=['a.txt']),
+            dict(change, revision='50adad57', files=['b.txt', 'c.txt'],
+                 properties={'platform': ('linux', 'Change')}),
+            dict(change, revision='50adad58', branch='other', files=[]),
+        ])
+        self.assertEqual(len(changeids), 3)
+
+        chdicts = []
+        for changeid in changeids:
+            chdict = yield self.db.changes.getChange(changeid)
+            validation.verifyDbDict(self, 'chdict', chdict)
+            chdicts.append(chdict)
+
+        self.assertEqual([ch['revision'] for ch in chdicts],
+                         ['50adad56', '50adad57', '50adad58'])
+        self.assertEqual([ch['parent_changeids'] for ch in chdicts],
+                         [[14], [changeids[0]], []])
+        self.assertEqual([sorted(ch['files']) for ch in chdicts],
+                         [['a.txt'], ['b.txt', 'c.txt'], []])
+        self.assertEqual([ch['properties'] for ch in chdicts],
+                         [{}, {'platform': ('linux', 'Change')}, {}])
+        self.assertEqual(len({ch['sourcestampid'] for ch in chdicts}), 3)
+
+    @defer.inlineCallbacks
+    def test_addChanges_empty(self):
+        changeids = yield self.db.changes.addChanges([])
+        self.assertEqual(changeids, [])
+
     @defer.inlineCallbacks
     def test_getChange_chdict(self):
         yield self.insert_test_data(self.change14_rows)
@@ -261,7 +304,7 @@ class Tests(interfaces.InterfaceTests):
 
     def test_signature_getChanges(self):
         @self.assertArgSpecMatches(self.db.changes.getChanges)
-        def getChanges(self, resultSpec=None):
+        def getChanges(self, resultSpec=None, stale_ok=False):
             pass
 
     def insert7Changes(self):
@@ -747,6 +790,121 @@ class RealTests(Tests):
         yield expect(6, ['10th commit'])
         yield expect(7, ['11th commit'])
 
+    @defer.inlineCallbacks
+    def test_addChange_compact_files(self):
+        self.patch(changes.ChangesConnectorComponent, 'COMPACT_FILES_THRESHOLD', 2)
+        files = ['master/a.txt', 'master/b.txt', 'worker/c.txt']
+        changeid = yield self.db.changes.addChange(
+            author='dustin',
+            committer='justin',
+            files=files,
+            comments='touch many files',
+            revision='2d6caa52',
+            when_timestamp=epoch2datetime(OTHERTIME),
+            branch='master',
+            category=None,
+            revlink=None,
+            properties={},
+            repository='',
+            codebase='',
+            project='')
+
+        def thd(conn):
+            results = {}
+            for tbl_name in ('change_files', 'change_files_compact'):
+                tbl = self.db.model.metadata.tables[tbl_name]
+                res = conn.execute(sa.select([tbl.c.changeid]))
+                results[tbl_name] = [row[0] for row in res.fetchall()]
+            self.assertEqual(results, {
+                'change_files': [],
+                'change_files_compact': [changeid],
+            })
+            res = conn.execute(sa.select([self.db.model.changes.c.files_compact]))
+            self.assertEqual([row[0] for row in res.fetchall()], [1])
+        yield self.db.pool.do(thd)
+
+        chdict = yield self.db.changes.getChange(changeid)
+        self.assertEqual(chdict['files'], files)
+
+        # the compact files are pruned along with the change
+        yield self.db.changes.addChange(
+            author='dustin', committer='justin', files=[], comments='later change',
+            revision='2d6caa53', when_timestamp=epoch2datetime(OTHERTIME),
+            branch='master', category=None, revlink=None, properties={},
+            repository='', codebase='', project='')
+        yield self.db.changes.pruneChanges(1)
+
+        def thd_pruned(conn):
+            tbl = self.db.model.change_files_compact
+            res = conn.execute(sa.select([tbl.c.changeid]))
+            self.assertEqual(res.fetchall(), [])
+        yield self.db.pool.do(thd_pruned)
+
+    @defer.inlineCallbacks
+    def test_addChange_compact_files_checkLength(self):
+        self.patch(changes.ChangesConnectorComponent, 'COMPACT_FILES_THRESHOLD', 2)
+        checkLength = mock.Mock()
+        self.patch(self.db.changes, 'checkLength', checkLength)
+        files = ['master/a.txt', 'master/b.txt', 'worker/c.txt']
+        yield self.db.changes.addChange(
+            author='dustin', committer='justin', files=files, comments='touch many files',
+            revision='2d6caa52', when_timestamp=epoch2datetime(OTHERTIME), branch='master',
+            category=None, revlink=None, properties={}, repository='', codebase='',
+            project='')
+
+        # the file names are checked even though they are stored compressed
+        checked = [call[0][1] for call in checkLength.call_args_list
+                   if call[0][0] is self.db.model.change_files.c.filename]
+        self.assertEqual(checked, files)
+
+    @defer.inlineCallbacks
+    def test_addChanges_compact_files_mixed(self):
+        self.patch(changes.ChangesConnectorComponent, 'COMPACT_FILES_THRESHOLD', 2)
+        change = dict(author='dustin', committer='justin', comments='fix spelling',
+                      when_timestamp=epoch2datetime(OTHERTIME), branch='master',
+                      category=None, revlink=None, properties={}, repository='',
+                      codebase='', project='')
+        changeids = yield self.db.changes.addChanges([
+            dict(change, revision='2d6caa52', files=['a', 'b', 'c']),
+            dict(change, revision='2d6caa53', files=['d']),
+            dict(change, revision='2d6caa54', files=[]),
+        ])
+
+        files = []
+        for changeid in changeids:
+            chdict = yield self.db.changes.getChange(changeid)
+            files.append(chdict['files'])
+        self.assertEqual(files, [['a', 'b', 'c'], ['d'], []])
+
+    @defer.inlineCallbacks
+    def test_addChanges_sourcestamps_in_one_transaction(self):
+        existing_ssid = yield self.db.sourcestamps.findSourceStampId(
+            branch='master', revision='2d6caa52', repository='', project='', codebase='')
+        change = dict(author='dustin', committer='justin', comments='fix spelling',
+                      when_timestamp=epoch2datetime(OTHERTIME), branch='master',
+                      category=None, revlink=None, properties={}, repository='',
+                      codebase='', project='', files=[])
+
+        do = mock.Mock(side_effect=self.db.pool.do)
+        self.patch(self.db.pool, 'do', do)
+        changeids = yield self.db.changes.addChanges([
+            dict(change, revision='2d6caa52'),
+            dict(change, revision='2d6caa53'),
+            dict(change, revision='2d6caa53', comments='same revision'),
+        ])
+        self.assertEqual(do.call_count, 1)
+
+        ssids = []
+        for changeid in changeids:
+            chdict = yield self.db.changes.getChange(changeid)
+            ssids.append(chdict['sourcestampid'])
+        self.assertEqual(ssids[0], existing_ssid)
+        self.assertEqual(ssids[1], ssids[2])
+        self.assertNotEqual(ssids[1], existing_ssid)
+        ss = yield self.db.sourcestamps.getSourceStamp(ssids[1])
+        self.assertEqual((ss['branch'], ss['revision'], ss['patchid']),
+                         ('master', '2d6caa53', None))
+
 
 class TestFakeDB(unittest.TestCase, connector_component.FakeConnectorComponentMixin, Tests):
 
@@ -762,7 +920,7 @@ class TestRealDB(unittest.TestCase,
     @defer.inlineCallbacks
     def setUp(self):
         yield self.setUpConnectorComponent(
-            table_names=['changes', 'change_files',
+            table_names=['changes', 'change_files', 'change_files_compact',
                          'change_properties', 'scheduler_changes', 'schedulers',
                          'sourcestampsets', 'sourcestamps', 'patches', 'change_users',
                          'users', 'buildsets', 'workers', 'builders', 'masters',
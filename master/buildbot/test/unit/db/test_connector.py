@@ -21,8 +21,11 @@ from twisted.internet import defer
 from twisted.trial import unittest
 
 from buildbot.config.master import MasterConfig
+from buildbot.data import connector as dataconnector
+from buildbot.data import resultspec
 from buildbot.db import connector
 from buildbot.db import exceptions
+from buildbot.test import fakedb
 from buildbot.test.fake import fakemaster
 from buildbot.test.reactor import TestReactorMixin
 from buildbot.test.util import db
@@ -39,7 +42,7 @@ class TestDBConnector(TestReactorMixin, db.RealDatabaseMixin,
     def setUp(self):
         self.setup_test_reactor()
         yield self.setUpRealDatabase(table_names=[
-            'changes', 'change_properties', 'change_files', 'patches',
+            'changes', 'change_properties', 'change_files', 'change_files_compact', 'patches',
             'sourcestamps', 'buildset_properties', 'buildsets',
             'sourcestampsets', 'builds', 'builders', 'masters',
             'buildrequests', 'workers', "projects"])
@@ -70,6 +73,87 @@ class TestDBConnector(TestReactorMixin, db.RealDatabaseMixin,
 
         self.assertTrue(self.db.cleanup_timer.running)
 
+    @defer.inlineCallbacks
+    def test_reconfig_slow_query_threshold(self):
+        yield self.startService()
+        self.assertIsNone(self.db.pool.slow_query_threshold)
+
+        self.master.config.metrics = {'db_slow_query_threshold': 0.5}
+        yield self.db.reconfigServiceWithBuildbotConfig(self.master.config)
+        self.assertEqual(self.db.pool.slow_query_threshold, 0.5)
+
+        self.master.config.metrics = None
+        yield self.db.reconfigServiceWithBuildbotConfig(self.master.config)
+        self.assertIsNone(self.db.pool.slow_query_threshold)
+
+    @defer.inlineCallbacks
+    def test_no_read_pool(self):
+        yield self.startService()
+        self.assertIsNone(self.db.read_pool)
+        self.assertEqual(self.db.pools, [self.db.pool])
+        self.assertIdentical(self.db.get_read_pool(), self.db.pool)
+        self.assertIdentical(self.db.get_read_pool(stale_ok=True), self.db.pool)
+
+    @defer.inlineCallbacks
+    def test_read_pool(self):
+        self.master.config.db['read_pool_size'] = 2
+        yield self.startService()
+        if self.db._engine.optimal_thread_pool_size == 1:
+            # SQLite uses a single connection
+            self.assertIsNone(self.db.read_pool)
+            return
+        self.addCleanup(self.db.read_pool.shutdown)
+
+        self.assertEqual(self.db.read_pool.name, 'read')
+        self.assertEqual(self.db.read_pool.pool_size, 2)
+        self.assertIsNot(self.db.read_pool.engine, self.db.pool.engine)
+        self.assertIdentical(self.db.get_read_pool(), self.db.read_pool)
+        self.assertIdentical(self.db.get_read_pool(stale_ok=True), self.db.read_pool)
+
+    @defer.inlineCallbacks
+    def test_read_replica(self):
+        self.master.config.db['read_db_url'] = 'sqlite:///replica.sqlite'
+        yield self.startService()
+        self.addCleanup(self.db.read_pool.shutdown)
+
+        self.assertTrue(self.db.read_pool_is_replica)
+        self.assertEqual(str(self.db.read_pool.engine.url),
+                         'sqlite:///' + os.path.abspath(os.path.join('basedir', 'replica.sqlite')))
+        self.assertEqual(self.db.pools, [self.db.pool, self.db.read_pool])
+        # only the queries tolerating the replication lag are sent to the replica
+        self.assertIdentical(self.db.get_read_pool(), self.db.pool)
+        self.assertIdentical(self.db.get_read_pool(stale_ok=True), self.db.read_pool)
+
+        self.master.config.metrics = {'db_slow_query_threshold': 0.5}
+        yield self.db.reconfigServiceWithBuildbotConfig(self.master.config)
+        self.assertEqual(self.db.read_pool.slow_query_threshold, 0.5)
+
+    @defer.inlineCallbacks
+    def test_sqlite_single_writer(self):
+        self.master.config.db.update(db_url='sqlite:///state.sqlite', sqlite_single_writer=True)
+        yield self.db.setup(check_version=False)
+        self.addCleanup(self.db.pool.shutdown)
+        self.addCleanup(self.db.read_pool.shutdown)
+
+        self.assertTrue(self.db.pool.batch_writes)
+        self.assertEqual(self.db.pool.pool_size, 1)
+        # the readers do not wait for the writer
+        self.assertEqual(self.db.read_pool.pool_size, self.db.SQLITE_READ_POOL_SIZE)
+        self.assertFalse(self.db.read_pool.batch_writes)
+        self.assertFalse(self.db.read_pool_is_replica)
+        self.assertIdentical(self.db.get_read_pool(), self.db.read_pool)
+
+    @defer.inlineCallbacks
+    def test_sqlite_single_writer_in_memory(self):
+        self.master.config.db.update(db_url='sqlite://', sqlite_single_writer=True,
+                                     read_pool_size=3)
+        yield self.db.setup(check_version=False)
+        self.addCleanup(self.db.pool.shutdown)
+
+        self.assertTrue(self.db.pool.batch_writes)
+        # another connection would open another in-memory database
+        self.assertIsNone(self.db.read_pool)
+
     def test_doCleanup_unconfigured(self):
         self.db.changes.pruneChanges = mock.Mock(
             return_value=defer.succeed(None))
@@ -95,3 +179,58 @@ class TestDBConnector(TestReactorMixin, db.RealDatabaseMixin,
     def test_setup_check_version_good(self):
         self.db.model.is_current = lambda: defer.succeed(True)
         return self.startService(check_version=True)
+
+
+class TestDataReadReplica(TestReactorMixin, db.RealDatabaseWithConnectorMixin,
+                          unittest.TestCase):
+
+    @defer.inlineCallbacks
+    def setUp(self):
+        self.setup_test_reactor()
+        self.master = fakemaster.make_master(self)
+        self.master.config = MasterConfig()
+        yield self.setUpRealDatabaseWithConnector(self.master, table_names=[
+            'changes', 'change_properties', 'change_files', 'patches', 'sourcestamps',
+            'buildset_properties', 'buildsets', 'builds', 'builders', 'masters', 'buildrequests',
+            'buildrequest_claims', 'workers', 'steps', 'logs', 'logchunks', 'build_properties',
+            'buildset_sourcestamps', 'projects'])
+
+        # the replica has no database of its own here, its queries are run on the main one
+        self.master.db.read_pool = mock.Mock()
+        self.master.db.read_pool.do.side_effect = self.db_pool.do
+        self.master.db.read_pool_is_replica = True
+
+        self.data = dataconnector.DataConnector()
+        yield self.data.setServiceParent(self.master)
+
+    def tearDown(self):
+        return self.tearDownRealDatabaseWithConnector()
+
+    @defer.inlineCallbacks
+    def test_data_api_web_reads_use_read_replica(self):
+        yield self.insert_test_data([
+            fakedb.Master(id=92),
+            fakedb.Worker(id=13, name='wrk'),
+            fakedb.Builder(id=77, name='b1'),
+            fakedb.Buildset(id=8822),
+            fakedb.BuildRequest(id=82, buildsetid=8822, builderid=77),
+            fakedb.Build(id=30, buildrequestid=82, number=7, masterid=92, builderid=77,
+                         workerid=13),
+            fakedb.Step(id=50, buildid=30, number=0, name='one'),
+            fakedb.Log(id=60, stepid=50, name='stdio', slug='stdio', type='s', num_lines=1),
+            fakedb.LogChunk(logid=60, first_line=0, last_line=0, compressed=0,
+                            content='line'),
+        ])
+
+        for path in [('builds',), ('builds', 30, 'steps'), ('steps', 50, 'logs'),
+                     ('logs', 60, 'contents'), ('changes',), ('buildrequests',)]:
+            # the internal reads need the latest data
+            self.master.db.read_pool.do.reset_mock()
+            yield self.data.get(path)
+            self.assertEqual(self.master.db.read_pool.do.call_count, 0, path)
+
+            # the web layer tolerates a replication lag
+            ep, kwargs = self.data.getEndpoint(path)
+            kwargs['stale_ok'] = True
+            yield ep.get(resultspec.ResultSpec(), kwargs)
+            self.assertEqual(self.master.db.read_pool.do.call_count, 1, path)
@@ -111,12 +111,12 @@ class Tests(interfaces.InterfaceTests):
 
     def test_signature_getLogs(self):
         @self.assertArgSpecMatches(self.db.logs.getLogs)
-        def getLogs(self, stepid=None):
+        def getLogs(self, stepid=None, stale_ok=False):
             pass
 
     def test_signature_getLogLines(self):
         @self.assertArgSpecMatches(self.db.logs.getLogLines)
-        def getLogLines(self, logid, first_line, last_line):
+        def getLogLines(self, logid, first_line, last_line, stale_ok=False):
             pass
 
     def test_signature_addLog(self):
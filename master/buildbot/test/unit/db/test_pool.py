@@ -25,14 +25,16 @@ from twisted.trial import unittest
 
 from buildbot.db import pool
 from buildbot.test.util import db
+from buildbot.test.util.logging import LoggingMixin
 from buildbot.util import sautils
 
 
-class Basic(unittest.TestCase):
+class Basic(LoggingMixin, unittest.TestCase):
 
     # basic tests, just using an in-memory SQL db and one thread
 
     def setUp(self):
+        self.setUpLogging()
         self.engine = sa.create_engine('sqlite://')
         self.engine.should_retry = lambda _: False
         self.engine.optimal_thread_pool_size = 1
@@ -51,6 +53,58 @@ class Basic(unittest.TestCase):
 
         self.assertEqual(res, 21)
 
+    @defer.inlineCallbacks
+    def test_query_stats(self):
+        def add(conn, addend1, addend2):
+            rp = conn.execute(f"SELECT {addend1} + {addend2}")
+            return rp.scalar()
+
+        d = self.pool.do(add, 10, 11)
+        self.assertEqual(self.pool.queries_in_flight, 1)
+        yield d
+        yield self.pool.do_with_engine(lambda engine: None)
+
+        self.assertEqual(self.pool.queries_in_flight, 0)
+        self.assertEqual(self.pool.queries_queued, 0)
+        stats = self.pool.query_stats['Basic.test_query_stats']
+        self.assertEqual(stats.count, 2)
+        self.assertEqual(stats.wait.count, 2)
+        self.assertEqual(stats.execution.count, 2)
+        self.assertEqual(stats.execution.cumulativeCounts()[-1], (float('inf'), 2))
+
+    @defer.inlineCallbacks
+    def test_slow_query_log(self):
+        def select(conn):
+            conn.execute("SELECT 1")
+            conn.execute("SELECT\n   2")
+
+        yield self.pool.do(select)
+        self.assertNotLogged('slow database query')
+
+        self.pool.slow_query_threshold = 0
+        yield self.pool.do(select)
+        self.assertLogged('slow database query Basic.test_slow_query_log: executed in')
+        self.assertLogged('  SELECT 1\n  SELECT 2')
+
+    @defer.inlineCallbacks
+    def test_slow_query_log_truncated(self):
+        self.patch(self.pool, 'MAX_LOGGED_STATEMENTS', 1)
+        self.patch(self.pool, 'MAX_LOGGED_STATEMENT_LENGTH', 10)
+
+        def select(conn):
+            conn.execute("SELECT 'abcdefghijkl'")
+            conn.execute("SELECT 2")
+
+        self.pool.slow_query_threshold = 0
+        yield self.pool.do(select)
+        self.assertLogged(r"  SELECT 'ab\.\.\.\n  \.\.\. and 1 more statements")
+
+    @defer.inlineCallbacks
+    def test_slow_query_threshold(self):
+        self.pool.slow_query_threshold = 60
+        yield self.pool.do(lambda conn: conn.execute("SELECT 1") and None)
+        self.assertNotLogged('slow database query')
+
     @defer.inlineCallbacks
     def expect_failure(self, d, expected_exception, expect_logged_error=False):
         exception = None
@@ -109,6 +163,116 @@ class Basic(unittest.TestCase):
         yield self.pool.do_with_engine(insert_into_table)
 
 
+class PoolSize(LoggingMixin, unittest.TestCase):
+
+    def setUp(self):
+        self.setUpLogging()
+
+    def make_pool(self, optimal_thread_pool_size, **kwargs):
+        engine = sa.create_engine('sqlite://', connect_args={'check_same_thread': False})
+        if optimal_thread_pool_size is not None:
+            engine.optimal_thread_pool_size = optimal_thread_pool_size
+        db_pool = pool.DBThreadPool(engine, reactor=reactor, **kwargs)
+        self.addCleanup(self.shutdown_pool, db_pool)
+        return db_pool
+
+    @defer.inlineCallbacks
+    def shutdown_pool(self, db_pool):
+        # the pool is started once the reactor runs
+        yield db_pool.do(lambda conn: None)
+        yield db_pool.shutdown()
+
+    def test_default(self):
+        db_pool = self.make_pool(None)
+        self.assertEqual(db_pool.pool_size, 5)
+        self.assertEqual(db_pool.name, 'write')
+
+    def test_engine_size(self):
+        db_pool = self.make_pool(15)
+        self.assertEqual(db_pool.pool_size, 15)
+
+    def test_configured_size(self):
+        db_pool = self.make_pool(15, pool_size=3, name='read')
+        self.assertEqual(db_pool.pool_size, 3)
+        self.assertEqual(db_pool._pool.max, 3)
+        self.assertEqual(db_pool.name, 'read')
+
+    def test_configured_size_limited_by_engine(self):
+        db_pool = self.make_pool(1, pool_size=8)
+        self.assertEqual(db_pool.pool_size, 1)
+        self.assertLogged('the size of the write database thread pool is limited to 1 threads')
+
+
+class BatchedWrites(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = sa.create_engine('sqlite:///batched.sqlite')
+        self.engine.should_retry = lambda _: False
+        self.engine.optimal_thread_pool_size = 1
+        self.engine.execute("CREATE TABLE test (a integer PRIMARY KEY)")
+        self.commits = 0
+
+        def count_commits(conn):
+            self.commits += 1
+        sa.event.listen(self.engine, 'commit', count_commits)
+
+        self.pool = pool.DBThreadPool(self.engine, reactor=reactor, batch_writes=True)
+
+    @defer.inlineCallbacks
+    def tearDown(self):
+        yield self.pool.shutdown()
+        os.unlink("batched.sqlite")
+
+    def insert(self, conn, value):
+        conn.execute(f"INSERT INTO test VALUES ({value})")
+        return value
+
+    @defer.inlineCallbacks
+    def get_values(self):
+        def thd(conn):
+            return [row.a for row in conn.execute("SELECT a FROM test ORDER BY a")]
+        values = yield self.pool.do(thd)
+        return values
+
+    @defer.inlineCallbacks
+    def test_single_transaction(self):
+        # the pool thread is busy, so the inserts are queued and share a transaction
+        blocker = self.pool.do(lambda conn: time.sleep(0.1))
+        d = defer.gatherResults([self.pool.do_batched(self.insert, i) for i in range(5)])
+        self.assertEqual(self.pool.queries_in_flight, 6)
+        yield blocker
+        self.assertEqual((yield d), list(range(5)))
+
+        self.assertEqual(self.commits, 1)
+        self.assertEqual((yield self.get_values()), list(range(5)))
+        self.assertEqual(self.pool.queries_in_flight, 0)
+        self.assertEqual(self.pool.query_stats['BatchedWrites.insert'].count, 5)
+
+    @defer.inlineCallbacks
+    def test_max_batch_size(self):
+        self.patch(self.pool, 'MAX_BATCH_SIZE', 2)
+        yield defer.gatherResults([self.pool.do_batched(self.insert, i) for i in range(5)])
+        self.assertEqual(self.commits, 3)
+        self.assertEqual((yield self.get_values()), list(range(5)))
+
+    @defer.inlineCallbacks
+    def test_failure_isolated(self):
+        # the duplicate value fails, and is only reported to its caller
+        ds = [self.pool.do_batched(self.insert, i) for i in (1, 2, 2, 3)]
+        results = yield defer.DeferredList(ds, consumeErrors=True)
+
+        self.assertEqual([success for success, _ in results], [True, True, False, True])
+        results[2][1].trap(sa.exc.IntegrityError)
+        self.flushLoggedErrors(sa.exc.IntegrityError)
+        self.assertEqual((yield self.get_values()), [1, 2, 3])
+
+    @defer.inlineCallbacks
+    def test_not_batched(self):
+        self.pool.batch_writes = False
+        yield defer.gatherResults([self.pool.do_batched(self.insert, i) for i in range(3)])
+        self.assertEqual(self.commits, 3)
+
+
 class Stress(unittest.TestCase):
 
     def setUp(self):
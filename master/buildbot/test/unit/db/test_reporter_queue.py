@@ -0,0 +1,135 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+
+from twisted.internet import defer
+from twisted.trial import unittest
+
+from buildbot.db import reporter_queue
+from buildbot.test import fakedb
+from buildbot.test.util import connector_component
+from buildbot.test.util import interfaces
+
+
+class Tests(interfaces.InterfaceTests):
+
+    common_data = [
+        fakedb.Object(id=7, name='reporter', class_name='GitHubStatusPush'),
+        fakedb.Object(id=8, name='other', class_name='GitHubStatusPush'),
+        fakedb.Master(id=88),
+        fakedb.Master(id=89, name='other'),
+    ]
+
+    def test_signature_enqueueReports(self):
+        @self.assertArgSpecMatches(self.db.reporter_queue.enqueueReports)
+        def enqueueReports(self, objectid, masterid, reports, ordering_key=None):
+            pass
+
+    def test_signature_getQueuedReports(self):
+        @self.assertArgSpecMatches(self.db.reporter_queue.getQueuedReports)
+        def getQueuedReports(self, objectid, masterid, limit=None, after_id=None):
+            pass
+
+    def test_signature_rescheduleQueuedReport(self):
+        @self.assertArgSpecMatches(self.db.reporter_queue.rescheduleQueuedReport)
+        def rescheduleQueuedReport(self, queueid, next_attempt_at):
+            pass
+
+    def test_signature_deleteQueuedReport(self):
+        @self.assertArgSpecMatches(self.db.reporter_queue.deleteQueuedReport)
+        def deleteQueuedReport(self, queueid):
+            pass
+
+    @defer.inlineCallbacks
+    def test_enqueue_get(self):
+        yield self.insert_test_data(self.common_data)
+        self.reactor.advance(1000)
+
+        reports = [{'body': 'body', 'builds': [{'buildid': 3, 'complete': True}]}]
+        queueid = yield self.db.reporter_queue.enqueueReports(7, 88, reports,
+                                                              ordering_key='buildrequests/3')
+        yield self.db.reporter_queue.enqueueReports(8, 88, [{'body': 'other reporter'}])
+        yield self.db.reporter_queue.enqueueReports(7, 89, [{'body': 'other master'}])
+
+        entries = yield self.db.reporter_queue.getQueuedReports(7, 88)
+        self.assertEqual(entries, [{
+            'id': queueid,
+            'objectid': 7,
+            'masterid': 88,
+            'created_at': 1000,
+            'next_attempt_at': 1000,
+            'attempts': 0,
+            'ordering_key': 'buildrequests/3',
+            'reports': reports,
+        }])
+
+    @defer.inlineCallbacks
+    def test_get_ordered_and_limited(self):
+        yield self.insert_test_data(self.common_data + [
+            fakedb.ReporterQueueEntry(id=12, objectid=7, masterid=88, reports=[2]),
+            fakedb.ReporterQueueEntry(id=11, objectid=7, masterid=88, reports=[1]),
+            fakedb.ReporterQueueEntry(id=13, objectid=7, masterid=88, reports=[3]),
+        ])
+
+        entries = yield self.db.reporter_queue.getQueuedReports(7, 88, limit=2)
+        self.assertEqual([(e['id'], e['reports']) for e in entries], [(11, [1]), (12, [2])])
+
+        entries = yield self.db.reporter_queue.getQueuedReports(7, 88, limit=2, after_id=12)
+        self.assertEqual([(e['id'], e['reports']) for e in entries], [(13, [3])])
+
+    @defer.inlineCallbacks
+    def test_reschedule(self):
+        yield self.insert_test_data(self.common_data + [
+            fakedb.ReporterQueueEntry(id=11, objectid=7, masterid=88, attempts=2,
+                                      reports=[1]),
+        ])
+
+        yield self.db.reporter_queue.rescheduleQueuedReport(11, 2000)
+
+        entries = yield self.db.reporter_queue.getQueuedReports(7, 88)
+        self.assertEqual([(e['next_attempt_at'], e['attempts']) for e in entries], [(2000, 3)])
+
+    @defer.inlineCallbacks
+    def test_delete(self):
+        yield self.insert_test_data(self.common_data + [
+            fakedb.ReporterQueueEntry(id=11, objectid=7, masterid=88, reports=[1]),
+            fakedb.ReporterQueueEntry(id=12, objectid=7, masterid=88, reports=[2]),
+        ])
+
+        yield self.db.reporter_queue.deleteQueuedReport(11)
+
+        entries = yield self.db.reporter_queue.getQueuedReports(7, 88)
+        self.assertEqual([e['id'] for e in entries], [12])
+
+
+class TestFakeDB(Tests, connector_component.FakeConnectorComponentMixin, unittest.TestCase):
+
+    @defer.inlineCallbacks
+    def setUp(self):
+        yield self.setUpConnectorComponent()
+
+
+class TestRealDB(unittest.TestCase,
+                 connector_component.ConnectorComponentMixin,
+                 Tests):
+
+    @defer.inlineCallbacks
+    def setUp(self):
+        yield self.setUpConnectorComponent(
+            table_names=['objects', 'masters', 'reporter_queue'])
+
+        self.db.reporter_queue = reporter_queue.ReporterQueueConnectorComponent(self.db)
+
+    def tearDown(self):
+        return self.tearDownConnectorComponent()
@@ -93,7 +93,7 @@ class Tests(interfaces.InterfaceTests):
 
     def test_signature_getSteps(self):
         @self.assertArgSpecMatches(self.db.steps.getSteps)
-        def getSteps(self, buildid):
+        def getSteps(self, buildid, stale_ok=False):
             pass
 
     def test_signature_addStep(self):
@@ -493,6 +493,23 @@ class Tests(interfaces.InterfaceTests):
         w = yield self.db.workers.getWorker(self.W1_ID)
         self.assertEqual(w['connected_to'], [])
 
+    @defer.inlineCallbacks
+    def test_workerConnected_concurrent(self):
+        yield self.insert_test_data(self.baseRows + self.worker1_rows + self.worker2_rows)
+        yield defer.gatherResults([
+            self.db.workers.workerConnected(workerid=self.W1_ID, masterid=10, workerinfo={}),
+            self.db.workers.workerConnected(workerid=self.W2_ID, masterid=10,
+                                            workerinfo={'new': 1}),
+            self.db.workers.workerConnected(workerid=self.W1_ID, masterid=11, workerinfo={}),
+            self.db.workers.workerDisconnected(workerid=self.W1_ID, masterid=10),
+        ])
+
+        w = yield self.db.workers.getWorker(self.W1_ID)
+        self.assertEqual(w['connected_to'], [11])
+        w = yield self.db.workers.getWorker(self.W2_ID)
+        self.assertEqual(w['connected_to'], [10])
+        self.assertEqual(w['workerinfo'], {'new': 1})
+
     @defer.inlineCallbacks
     def test_setWorkerState_existing(self):
         yield self.insert_test_data(self.baseRows + self.worker1_rows)
@@ -691,6 +708,65 @@ class TestRealDB(unittest.TestCase,
         w = yield self.db.workers.getWorker(30)
         self.assertEqual(sorted(w['configured_on']), [])
 
+    @defer.inlineCallbacks
+    def test_workerConnected_batched(self):
+        yield self.insert_test_data(self.baseRows + [
+            fakedb.Worker(id=50 + n, name='zero' + str(n))
+            for n in range(1000)
+        ])
+        writes = []
+        do = self.db.pool.do
+
+        def count_writes(callable, *args, **kwargs):
+            writes.append(callable)
+            return do(callable, *args, **kwargs)
+        self.db.pool.do = count_writes
+
+        with self.assertNoMaxVariables():
+            yield defer.gatherResults([
+                self.db.workers.workerConnected(workerid=50 + n, masterid=10, workerinfo={})
+                for n in range(1000)])
+        # the first connection is written alone, the others wait for it and are written together
+        self.assertEqual(len(writes), 2)
+
+        self.db.pool.do = do
+        workers = yield self.db.workers.getWorkers()
+        self.assertEqual(len([w for w in workers if w['connected_to'] == [10]]), 1000)
+
+    @defer.inlineCallbacks
+    def test_workerConnected_batch_failure(self):
+        yield self.insert_test_data(self.baseRows + self.worker1_rows + self.worker2_rows)
+
+        def fail_batch(conn, changes):
+            raise RuntimeError('batch failed')
+        self.db.workers._thdWriteConnectionChanges = fail_batch
+
+        write_change = self.db.workers._thdWriteConnectionChange
+
+        def fail_w2(conn, workerid, *args):
+            if workerid == self.W2_ID:
+                raise RuntimeError('worker failed')
+            return write_change(conn, workerid, *args)
+        self.db.workers._thdWriteConnectionChange = fail_w2
+
+        d1 = self.db.workers.workerConnected(workerid=self.W1_ID, masterid=10,
+                                             workerinfo={'new': 1})
+        d2 = self.db.workers.workerConnected(workerid=self.W2_ID, masterid=10, workerinfo={})
+        d3 = self.db.workers.workerConnected(workerid=self.W1_ID, masterid=11, workerinfo={})
+
+        # only the caller of the failed change gets the error
+        yield d1
+        with self.assertRaises(RuntimeError):
+            yield d2
+        yield d3
+
+        w = yield self.db.workers.getWorker(self.W1_ID)
+        self.assertEqual(sorted(w['connected_to']), [10, 11])
+        w = yield self.db.workers.getWorker(self.W2_ID)
+        self.assertEqual(w['connected_to'], [])
+        # the pool logs the failed writes
+        self.flushLoggedErrors(RuntimeError)
+
     @defer.inlineCallbacks
     def test_workerConfiguredManyBuilders(self):
         manyWorkers = [
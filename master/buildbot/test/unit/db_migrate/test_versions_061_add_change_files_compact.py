@@ -0,0 +1,68 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+
+import sqlalchemy as sa
+
+from twisted.trial import unittest
+
+from buildbot.test.util import migration
+from buildbot.util import sautils
+
+
+class Migration(migration.MigrateTestMixin, unittest.TestCase):
+
+    def setUp(self):
+        return self.setUpMigrateTest()
+
+    def tearDown(self):
+        return self.tearDownMigrateTest()
+
+    def create_tables_thd(self, conn):
+        metadata = sa.MetaData()
+        metadata.bind = conn
+
+        changes = sautils.Table(
+            'changes', metadata,
+            sa.Column('changeid', sa.Integer, primary_key=True),
+            sa.Column('author', sa.String(255), nullable=False),
+        )
+        changes.create()
+
+    def test_update(self):
+        def setup_thd(conn):
+            self.create_tables_thd(conn)
+
+        def verify_thd(conn):
+            metadata = sa.MetaData()
+            metadata.bind = conn
+
+            # check that change_files_compact table has been added
+            change_files_compact = sautils.Table('change_files_compact', metadata,
+                                                 autoload=True)
+
+            q = sa.select([
+                change_files_compact.c.changeid,
+                change_files_compact.c.files,
+            ])
+            self.assertEqual(conn.execute(q).fetchall(), [])
+
+            # check that the new index has been added
+            insp = sa.inspect(conn)
+
+            indexes = insp.get_indexes('change_files_compact')
+            index_names = [item['name'] for item in indexes]
+            self.assertTrue('change_files_compact_changeid' in index_names)
+
+        return self.do_test_migration('060', '061', setup_thd, verify_thd)
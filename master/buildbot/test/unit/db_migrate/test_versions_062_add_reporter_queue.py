@@ -0,0 +1,84 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+
+import sqlalchemy as sa
+
+from twisted.trial import unittest
+
+from buildbot.test.util import migration
+from buildbot.util import sautils
+
+
+class Migration(migration.MigrateTestMixin, unittest.TestCase):
+
+    def setUp(self):
+        return self.setUpMigrateTest()
+
+    def tearDown(self):
+        return self.tearDownMigrateTest()
+
+    def create_tables_thd(self, conn):
+        metadata = sa.MetaData()
+        metadata.bind = conn
+
+        objects = sautils.Table(
+            "objects", metadata,
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column('name', sa.String(128), nullable=False),
+            sa.Column('class_name', sa.String(128), nullable=False),
+        )
+        objects.create()
+
+        masters = sautils.Table(
+            "masters", metadata,
+            sa.Column('id', sa.Integer, primary_key=True),
+            sa.Column('name', sa.Text, nullable=False),
+            sa.Column('name_hash', sa.String(40), nullable=False),
+            sa.Column('active', sa.Integer, nullable=False),
+            sa.Column('last_active', sa.Integer, nullable=False),
+        )
+        masters.create()
+
+    def test_update(self):
+        def setup_thd(conn):
+            self.create_tables_thd(conn)
+
+        def verify_thd(conn):
+            metadata = sa.MetaData()
+            metadata.bind = conn
+
+            # check that reporter_queue table has been added
+            reporter_queue = sautils.Table('reporter_queue', metadata, autoload=True)
+
+            q = sa.select([
+                reporter_queue.c.id,
+                reporter_queue.c.objectid,
+                reporter_queue.c.masterid,
+                reporter_queue.c.created_at,
+                reporter_queue.c.next_attempt_at,
+                reporter_queue.c.attempts,
+                reporter_queue.c.ordering_key,
+                reporter_queue.c.reports,
+            ])
+            self.assertEqual(conn.execute(q).fetchall(), [])
+
+            # check that the new index has been added
+            insp = sa.inspect(conn)
+
+            indexes = insp.get_indexes('reporter_queue')
+            index_names = [item['name'] for item in indexes]
+            self.assertTrue('reporter_queue_objectid_masterid' in index_names)
+
+        return self.do_test_migration('061', '062', setup_thd, verify_thd)
@@ -0,0 +1,77 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+
+import sqlalchemy as sa
+
+from twisted.trial import unittest
+
+from buildbot.test.util import migration
+from buildbot.util import sautils
+
+
+class Migration(migration.MigrateTestMixin, unittest.TestCase):
+
+    def setUp(self):
+        return self.setUpMigrateTest()
+
+    def tearDown(self):
+        return self.tearDownMigrateTest()
+
+    def create_tables_thd(self, conn):
+        metadata = sa.MetaData()
+        metadata.bind = conn
+
+        changes = sautils.Table(
+            'changes', metadata,
+            sa.Column('changeid', sa.Integer, primary_key=True),
+            sa.Column('author', sa.String(255), nullable=False),
+        )
+        changes.create()
+
+        change_files_compact = sautils.Table(
+            'change_files_compact', metadata,
+            sa.Column('changeid', sa.Integer,
+                      sa.ForeignKey('changes.changeid', ondelete='CASCADE'),
+                      nullable=False),
+            sa.Column('files', sa.LargeBinary, nullable=False),
+        )
+        change_files_compact.create()
+
+        conn.execute(changes.insert(), [
+            {'changeid': 1, 'author': 'frank'},
+            {'changeid': 2, 'author': 'steve'},
+        ])
+        conn.execute(change_files_compact.insert(), [
+            {'changeid': 2, 'files': b'files'},
+        ])
+
+    def test_update(self):
+        def setup_thd(conn):
+            self.create_tables_thd(conn)
+
+        def verify_thd(conn):
+            metadata = sa.MetaData()
+            metadata.bind = conn
+
+            # check that changes.files_compact has been added, and set for the
+            # changes with compact files
+            changes = sautils.Table('changes', metadata, autoload=True)
+            self.assertIsInstance(changes.c.files_compact.type, sa.SmallInteger)
+
+            q = sa.select([changes.c.changeid, changes.c.files_compact])
+            q = q.order_by(changes.c.changeid)
+            self.assertEqual([tuple(row) for row in conn.execute(q)], [(1, 0), (2, 1)])
+
+        return self.do_test_migration('062', '063', setup_thd, verify_thd)
@@ -28,7 +28,9 @@ from buildbot.locks import WorkerLock
 from buildbot.process.build import Build
 from buildbot.process.buildstep import BuildStep
 from buildbot.process.metrics import MetricLogObserver
+from buildbot.process.properties import Interpolate
 from buildbot.process.properties import Properties
+from buildbot.process.properties import Secret
 from buildbot.process.results import CANCELLED
 from buildbot.process.results import EXCEPTION
 from buildbot.process.results import FAILURE
@@ -883,6 +885,28 @@ class TestBuild(TestReactorMixin, unittest.TestCase):
         url = yield self.build.getUrl()
         self.assertEqual(url, 'http://localhost:8080/#/builders/108/builds/33')
 
+    def test_prefetch_secrets(self):
+        prefetched = []
+
+        class FakeSecretManager:
+
+            def prefetch(self, names):
+                prefetched.append(names)
+                return defer.succeed(None)
+
+        self.master.namedServices['secrets'] = FakeSecretManager()
+        self.addCleanup(self.master.namedServices.pop, 'secrets')
+
+        factory = FakeStepFactory(FakeBuildStep())
+        factory.args = (Secret('login'),)
+        factory.kwargs = {'command': ['curl', Interpolate('-H%(secret:token)s')]}
+        self.build.setStepFactories([factory])
+
+        self.build.startBuild(self.workerforbuilder)
+
+        self.assertEqual(prefetched, [{'login', 'token'}])
+        self.assertEqual(self.build.results, SUCCESS)
+
     def test_active_builds_metric(self):
         """
         The number of active builds is increased when a build starts
@@ -211,6 +211,32 @@ class Test(TestBRDBase):
         self.assertEqual(self.maybeStartBuildsOnBuilder_calls, builders)
         self.checkAllCleanedUp()
 
+    @defer.inlineCallbacks
+    def test_maybeStartBuildsOn_sorts_coalesced(self):
+        builders = [f'bldr{i:02}' for i in range(15)]
+        sorted_builders = []
+
+        def slow_sorter(master, bldrs):
+            sorted_builders.append(sorted(b.name for b in bldrs))
+            d = defer.Deferred()
+            self.reactor.callLater(0, d.callback, sorted(bldrs, key=lambda b: b.name))
+            return d
+        self.master.config.prioritizeBuilders = slow_sorter
+
+        self.useMock_maybeStartBuildsOnBuilder()
+        self.addBuilders(builders)
+        # as when many workers attach at the same time
+        d = defer.gatherResults([self.brd.maybeStartBuildsOn([bldr]) for bldr in builders])
+        self.reactor.advance(0)
+        self.reactor.advance(0)
+        yield d
+
+        # the builders added while the first one is sorted are sorted together
+        self.assertEqual(sorted_builders, [builders[:1], builders])
+        yield self.brd._waitForFinish()
+        self.assertEqual(self.maybeStartBuildsOnBuilder_calls, builders)
+        self.checkAllCleanedUp()
+
     @defer.inlineCallbacks
     def test_maybeStartBuildsOn_exception(self):
         self.addBuilders(['bldr1'])
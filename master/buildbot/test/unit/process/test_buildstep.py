@@ -1205,6 +1205,29 @@ class TestShellMixin(TestBuildStepMixin,
         self.expect_outcome(result=SUCCESS)
         yield self.run_step()
 
+    @defer.inlineCallbacks
+    def test_collected_output_closed_when_step_finishes(self):
+        class CollectingStep(SimpleShellCommand):
+            @defer.inlineCallbacks
+            def run(self):
+                self.collecting_cmd = yield self.makeRemoteShellCommand(collectStdout=True)
+                self.collecting_cmd.stdout_buffer.max_memory = 4
+                yield self.runCommand(self.collecting_cmd)
+                self.collected = self.collecting_cmd.stdout
+                return self.collecting_cmd.results()
+
+        step = self.setup_step(CollectingStep(command=['cmd', 'arg']))
+        self.expect_commands(
+            ExpectShell(workdir='wkdir', command=['cmd', 'arg'])
+            .stdout("some log\n")
+            .exit(0)
+        )
+        self.expect_outcome(result=SUCCESS)
+        yield self.run_step()
+        self.assertEqual(step.collected, 'some log\n')
+        self.assertFalse(step.collecting_cmd.stdout_buffer.spilled)
+        self.assertEqual(step.collecting_cmd.stdout, '')
+
     @defer.inlineCallbacks
     def test_step_workdir(self):
         self.setup_step(SimpleShellCommand(command=['cmd', 'arg'], workdir='/stepdir'))
@@ -181,6 +181,18 @@ class Tests(TestReactorMixin, unittest.TestCase):
             'type': 's',
         })
 
+    @defer.inlineCallbacks
+    def test_updates_stream_whole_lines(self):
+        _log = yield self.makeLog('s')
+
+        _log.add_stdout_lines('hello\n\ncruel world\n')
+        _log.add_stderr_lines('oh noes!\n')
+        _log.add_header_lines('headers\n')
+        yield _log.finish()
+
+        self.assertEqual(self.master.data.updates.logs[_log.logid]['content'],
+                         ['ohello\no\nocruel world\n', 'eoh noes!\n', 'hheaders\n'])
+
     @defer.inlineCallbacks
     def test_unyielded_finish(self):
         _log = yield self.makeLog('s')
@@ -134,6 +134,25 @@ class TestMetricTimeEvent(TestMetricBase):
         self.assertEqual(
             report['timers']['foo_time'], sum(data) / float(len(data)))
 
+    def testTotals(self):
+        # the totals are not limited to the last events
+        for i in range(20):
+            metrics.MetricTimeEvent.log('foo_time', i)
+        handler = self.observer.getHandler(metrics.MetricTimeEvent)
+        self.assertEqual(handler.getTotals('foo_time'), (20, sum(range(20))))
+
+
+class TestHistogram(unittest.TestCase):
+
+    def testObserve(self):
+        histogram = metrics.Histogram(buckets=(1, 5))
+        for value in (0.5, 1, 3, 7):
+            histogram.observe(value)
+
+        self.assertEqual(histogram.count, 4)
+        self.assertEqual(histogram.sum, 11.5)
+        self.assertEqual(histogram.cumulativeCounts(), [(1, 2), (5, 3), (float('inf'), 4)])
+
 
 class TestPeriodicChecks(TestMetricBase):
 
@@ -218,6 +237,49 @@ class TestReconfig(TestMetricBase):
 
         # (service will be stopped by tearDown)
 
+    def testReconfigReactorProfiler(self):
+        observer = self.observer
+        new_config = self.master.config
+
+        new_config.metrics = dict(reactor_profiler=True)
+        observer.reconfigServiceWithBuildbotConfig(new_config)
+        profiler = observer.reactor_profiler
+        self.assertEqual(profiler.threshold, 0.5)
+
+        # an identical configuration keeps the profiler and its data
+        observer.reconfigServiceWithBuildbotConfig(new_config)
+        self.assertIdentical(observer.reactor_profiler, profiler)
+
+        new_config.metrics = dict(reactor_profiler=dict(threshold=0.2))
+        observer.reconfigServiceWithBuildbotConfig(new_config)
+        self.assertNotIdentical(observer.reactor_profiler, profiler)
+        self.assertEqual(observer.reactor_profiler.threshold, 0.2)
+
+        new_config.metrics = dict(reactor_profiler=False)
+        observer.reconfigServiceWithBuildbotConfig(new_config)
+        self.assertIsNone(observer.reactor_profiler)
+
+        new_config.metrics = dict(reactor_profiler=True)
+        observer.reconfigServiceWithBuildbotConfig(new_config)
+        new_config.metrics = None
+        observer.reconfigServiceWithBuildbotConfig(new_config)
+        self.assertIsNone(observer.reactor_profiler)
+
+    def testEnabledByWww(self):
+        observer = self.observer
+        new_config = self.master.config
+
+        new_config.metrics = None
+        new_config.www['metrics'] = True
+        observer.reconfigServiceWithBuildbotConfig(new_config)
+        self.assertTrue(observer.enabled)
+        self.assertEqual(observer.log_task, None)
+        self.assertTrue(observer.periodic_task)
+
+        new_config.www['metrics'] = False
+        observer.reconfigServiceWithBuildbotConfig(new_config)
+        self.assertFalse(observer.enabled)
+
 
 class _LogObserver:
 
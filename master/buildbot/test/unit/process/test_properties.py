@@ -29,11 +29,13 @@ from buildbot.process.properties import Interpolate
 from buildbot.process.properties import Properties
 from buildbot.process.properties import PropertiesMixin
 from buildbot.process.properties import Property
+from buildbot.process.properties import Secret
 from buildbot.process.properties import Transform
 from buildbot.process.properties import WithProperties
 from buildbot.process.properties import _Lazy
 from buildbot.process.properties import _Lookup
 from buildbot.process.properties import _SourceStampDict
+from buildbot.process.properties import get_secret_names
 from buildbot.process.properties import renderer
 from buildbot.test.fake.fakebuild import FakeBuild
 from buildbot.test.util.config import ConfigErrorsMixin
@@ -766,6 +768,27 @@ class TestInterpolateKwargs(unittest.TestCase):
         return d
 
 
+class TestGetSecretNames(unittest.TestCase):
+
+    def test_interpolate(self):
+        self.assertEqual(get_secret_names(Interpolate('%(secret:a)s %(prop:b)s')), {'a'})
+
+    def test_interpolate_default(self):
+        self.assertEqual(get_secret_names(Interpolate('%(prop:b:-%(secret:c)s)s')), {'c'})
+
+    def test_containers(self):
+        obj = {'env': {'TOKEN': Secret('a')},
+               'command': ['curl', Interpolate('%(secret:b)s'), ('x', Secret('a'))]}
+        self.assertEqual(get_secret_names(obj), {'a', 'b'})
+
+    def test_nested_renderables(self):
+        obj = Transform(str.upper, Interpolate('%(secret:a)s'))
+        self.assertEqual(get_secret_names(obj), {'a'})
+
+    def test_none(self):
+        self.assertEqual(get_secret_names([Property('a'), 'plain', 1, None]), set())
+
+
 class TestWithProperties(unittest.TestCase):
 
     def setUp(self):
@@ -0,0 +1,154 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+
+import sys
+
+from twisted.internet import defer
+from twisted.internet import task
+from twisted.trial import unittest
+
+from buildbot.process import reactorprofiler
+from buildbot.test.util.logging import LoggingMixin
+
+
+class FakeDistributor:
+
+    def __init__(self, profiler, clock):
+        self.profiler = profiler
+        self.clock = clock
+
+    @defer.inlineCallbacks
+    def _activityLoop(self):
+        yield self._maybeStartBuilds()
+
+    @defer.inlineCallbacks
+    def _maybeStartBuilds(self):
+        # blocks the reactor for a second, the watchdog samples it once past the threshold
+        for _ in range(2):
+            self.clock.advance(0.5)
+            self.profiler._check()
+        yield defer.succeed(None)
+
+
+class TestInlineCallbacksGenerators(unittest.TestCase):
+
+    def test_no_generator(self):
+        self.assertEqual(reactorprofiler.inline_callbacks_generators(sys._getframe()), [])
+
+    def test_nested(self):
+        frames = []
+
+        class Loop:
+
+            @defer.inlineCallbacks
+            def run(self):
+                frames.append(reactorprofiler.inline_callbacks_generators(sys._getframe()))
+                yield defer.succeed(None)
+
+        Loop().run()
+        self.assertEqual(frames[0][0].rsplit('.', 2)[-2:], ['Loop', 'run'])
+
+
+class TestReactorProfiler(LoggingMixin, unittest.TestCase):
+
+    def setUp(self):
+        self.setUpLogging()
+        self.clock = task.Clock()
+        self.profiler = reactorprofiler.ReactorProfiler(self.clock, interval=0.1, threshold=0.5)
+        self.profiler._get_reactor_frame = sys._getframe
+
+    def test_start_stop(self):
+        self.profiler.start()
+        self.assertTrue(self.profiler._thread.is_alive())
+        self.clock.pump([0.1, 0.1, 0.1])
+        self.assertEqual(self.profiler.lag, 0)
+
+        thread = self.profiler._thread
+        self.profiler.stop()
+        self.assertFalse(thread.is_alive())
+        self.assertIsNone(self.profiler._heartbeat)
+        self.assertFalse(self.clock.getDelayedCalls())
+
+    def test_lag(self):
+        self.profiler._tick()
+        self.clock.advance(0.1)
+        self.profiler._tick()
+        self.assertEqual(self.profiler.lag, 0)
+
+        self.clock.advance(0.3)
+        self.profiler._tick()
+        self.assertAlmostEqual(self.profiler.lag, 0.2)
+        self.assertAlmostEqual(self.profiler.max_lag, 0.2)
+        self.assertEqual(self.profiler.stall_count, 0)
+
+    def test_check_not_blocked(self):
+        self.profiler._check()
+        self.profiler._tick()
+        self.clock.advance(0.5)
+        self.profiler._check()
+        self.assertIsNone(self.profiler._stall)
+
+    def test_stall_attributed_to_generators(self):
+        self.profiler._tick()
+        FakeDistributor(self.profiler, self.clock)._activityLoop()
+        self.profiler._tick()
+
+        self.assertEqual(self.profiler.stall_count, 1)
+        self.assertAlmostEqual(self.profiler.stalled_time, 0.9)
+        stall, = self.profiler.stalls
+        self.assertEqual(stall['stallid'], 1)
+        self.assertAlmostEqual(stall['started_at'], 0.1)
+        self.assertAlmostEqual(stall['duration'], 0.9)
+        self.assertEqual(sorted(stall['generators']),
+                         ['FakeDistributor._activityLoop', 'FakeDistributor._maybeStartBuilds'])
+        self.assertIn('in _maybeStartBuilds', stall['stack'][-2])
+
+        self.assertEqual(sorted(self.profiler.generators), sorted(stall['generators']))
+        stalled_time, stalls = self.profiler.generators['FakeDistributor._activityLoop']
+        self.assertAlmostEqual(stalled_time, 0.9)
+        self.assertEqual(stalls, 1)
+
+        self.assertLogged('the reactor was blocked for 0.900s in FakeDistributor')
+
+    def test_stall_split_between_generators(self):
+        stall = reactorprofiler._Stall()
+        stall.samples = 4
+        stall.generators.update({'a': 3, 'b': 1})
+        self.profiler._record_stall(stall, 2, 10)
+
+        self.assertEqual(self.profiler.generators, {'a': [1.5, 1], 'b': [0.5, 1]})
+        self.assertEqual(self.profiler.stalls[0]['generators'], ['a', 'b'])
+
+    def test_stall_not_sampled(self):
+        # the watchdog did not get a chance to sample the stack
+        self.profiler._tick()
+        self.clock.advance(1)
+        self.profiler._tick()
+
+        stall, = self.profiler.stalls
+        self.assertAlmostEqual(stall['duration'], 0.9)
+        self.assertEqual(stall['stack'], [])
+        self.assertEqual(stall['generators'], [])
+        self.assertEqual(self.profiler.generators, {})
+
+    def test_max_stalls(self):
+        self.profiler._tick()
+        for _ in range(self.profiler.MAX_STALLS + 5):
+            self.clock.advance(1)
+            self.profiler._tick()
+
+        self.assertEqual(len(self.profiler.stalls), self.profiler.MAX_STALLS)
+        self.assertEqual(self.profiler.stalls[-1]['stallid'], self.profiler.MAX_STALLS + 5)
+        self.assertEqual(self.profiler.stall_count, self.profiler.MAX_STALLS + 5)
@@ -145,6 +145,18 @@ class Tests(interfaces.InterfaceTests, unittest.TestCase):
         cmd.addHeader('some header')
         self.assertEqual(log.header, 'some header')
 
+    def test_collect_spilled(self):
+        cmd = remotecommand.RemoteCommand('ping', {}, collectStdout=True, collectStderr=True)
+        self.addCleanup(cmd.close_collected_output)
+        cmd.stdout_buffer.max_memory = 10
+        for data in ['0123456789', 'abc', 'def']:
+            cmd.addStdout(data)
+        cmd.add_stdout_lines('line\n', True)
+        cmd.addStderr('err')
+        self.assertTrue(cmd.stdout_buffer.spilled)
+        self.assertEqual(cmd.stdout, '0123456789abcdefline')
+        self.assertEqual(cmd.stderr, 'err')
+
     def test_RemoteShellCommand_usePTY_on_worker_2_16(self):
         cmd = remotecommand.RemoteShellCommand('workdir', 'shell')
 
@@ -14,16 +14,20 @@
 # Copyright Buildbot Team Members
 
 
+import datetime
+
 import mock
 
 from twisted.internet import defer
 from twisted.trial import unittest
 
+from buildbot.process import metrics
 from buildbot.process.results import FAILURE
 from buildbot.reporters.base import ReporterBase
 from buildbot.reporters.generators.build import BuildStatusGenerator
 from buildbot.reporters.generators.worker import WorkerMissingGenerator
 from buildbot.reporters.message import MessageFormatter
+from buildbot.test import fakedb
 from buildbot.test.fake import fakemaster
 from buildbot.test.reactor import TestReactorMixin
 from buildbot.test.util.config import ConfigErrorsMixin
@@ -46,8 +50,8 @@ class TestReporterBase(ConfigErrorsMixin, TestReactorMixin, LoggingMixin,
                                              wantMq=True)
 
     @defer.inlineCallbacks
-    def setupNotifier(self, generators):
-        mn = ReporterBase(generators=generators)
+    def setupNotifier(self, generators, **kwargs):
+        mn = ReporterBase(generators=generators, **kwargs)
         mn.sendMessage = mock.Mock(spec=mn.sendMessage)
         mn.sendMessage.return_value = "<message>"
         yield mn.setServiceParent(self.master)
@@ -76,6 +80,47 @@ class TestReporterBase(ConfigErrorsMixin, TestReactorMixin, LoggingMixin,
         yield mn._got_event(('builds', 20, 'finished'), build)
         return (mn, build, formatter)
 
+    @defer.inlineCallbacks
+    def test_build_details_shared_between_reporters(self):
+        build = yield self.insert_build_finished(FAILURE)
+        buildset_gets = []
+        get = self.master.data.get
+
+        def counting_get(path, *args, **kwargs):
+            if path[0] == 'buildsets':
+                buildset_gets.append(path)
+            return get(path, *args, **kwargs)
+        self.patch(self.master.data, 'get', counting_get)
+
+        seen_reasons = []
+
+        def format_message_for_build(master, build, **kwargs):
+            seen_reasons.append(build['properties'].get('reason'))
+            # a formatter modifying the build does not affect the other reporters
+            build['properties']['reason'] = ('modified', 'formatter')
+            return {"body": "body", "type": "text", "subject": "subject"}
+
+        reporters = []
+        for i in range(2):
+            formatter = mock.Mock(spec=MessageFormatter)
+            formatter.format_message_for_build.side_effect = format_message_for_build
+            formatter.want_properties = True
+            formatter.want_steps = False
+            formatter.want_logs = False
+            formatter.want_logs_content = False
+            generator = BuildStatusGenerator(message_formatter=formatter)
+            reporters.append((yield self.setupNotifier(generators=[generator],
+                                                       name=f'reporter{i}')))
+
+        for mn in reporters:
+            yield mn._got_event(('builds', 20, 'finished'), dict(build))
+
+        self.assertEqual(len(buildset_gets), 1)
+        self.assertEqual(seen_reasons, [seen_reasons[0]] * 2)
+        self.assertNotEqual(seen_reasons[0], ('modified', 'formatter'))
+        for mn in reporters:
+            self.assertEqual(mn.sendMessage.call_count, 1)
+
     def setup_mock_generator(self, events_filter):
         gen = mock.Mock()
         gen.wanted_event_keys = events_filter
@@ -86,6 +131,10 @@ class TestReporterBase(ConfigErrorsMixin, TestReactorMixin, LoggingMixin,
         with self.assertRaisesConfigError('generators argument must be a list'):
             ReporterBase(generators='abc')
 
+    def test_check_config_raises_error_when_max_concurrent_events_invalid(self):
+        with self.assertRaisesConfigError('max_concurrent_events must be a positive integer'):
+            ReporterBase(generators=[], max_concurrent_events=0)
+
     @defer.inlineCallbacks
     def test_buildMessage_nominal(self):
         mn, build, formatter = yield self.setupBuildMessage(mode=("failing",))
@@ -219,11 +268,259 @@ class TestReporterBase(ConfigErrorsMixin, TestReactorMixin, LoggingMixin,
 
         notifier = yield self.setupNotifier(generators=[gen])
         notifier._got_event(('fake1', None, None), None)
-        self.assertIsNotNone(notifier._pending_got_event_call)
+        self.assertEqual(len(notifier._pending_got_event_calls), 1)
 
         d = notifier.reconfigService(generators=[gen])
         self.assertFalse(d.called)
 
         gen.generate.return_value.callback(1)
         self.assertTrue(d.called)
-        self.assertIsNone(notifier._pending_got_event_call)
+        self.assertEqual(notifier._pending_got_event_calls, {})
+
+    def setup_deferred_send_message(self, notifier):
+        sent = []
+
+        def sendMessage(reports):
+            d = defer.Deferred()
+            sent.append((reports, d))
+            return d
+        notifier.sendMessage = sendMessage
+        return sent
+
+    @defer.inlineCallbacks
+    def test_concurrent_events_different_keys(self):
+        gen = self.setup_mock_generator([('builds', None, None)])
+        gen.generate = lambda master, reporter, key, msg: msg['buildid']
+
+        notifier = yield self.setupNotifier(generators=[gen], max_concurrent_events=2)
+        sent = self.setup_deferred_send_message(notifier)
+
+        notifier._got_event(('builds', 1, 'new'), {'buildid': 1, 'buildrequestid': 11})
+        notifier._got_event(('builds', 2, 'new'), {'buildid': 2, 'buildrequestid': 12})
+        notifier._got_event(('builds', 3, 'new'), {'buildid': 3, 'buildrequestid': 13})
+
+        # only two events are processed at once
+        self.assertEqual([reports for reports, _ in sent], [[1], [2]])
+
+        sent[1][1].callback(None)
+        self.assertEqual([reports for reports, _ in sent], [[1], [2], [3]])
+
+        sent[0][1].callback(None)
+        sent[2][1].callback(None)
+        self.assertEqual(notifier._pending_got_event_calls, {})
+
+    @defer.inlineCallbacks
+    def test_concurrent_events_same_key_ordered(self):
+        gen = self.setup_mock_generator([('builds', None, None), ('buildrequests', None, None)])
+        gen.generate = lambda master, reporter, key, msg: key[2]
+
+        notifier = yield self.setupNotifier(generators=[gen], max_concurrent_events=5)
+        sent = self.setup_deferred_send_message(notifier)
+
+        # a build request and its build share their ordering key
+        notifier._got_event(('buildrequests', 11, 'new'), {'buildrequestid': 11})
+        notifier._got_event(('builds', 1, 'new'), {'buildid': 1, 'buildrequestid': 11})
+        notifier._got_event(('builds', 2, 'new'), {'buildid': 2, 'buildrequestid': 12})
+        notifier._got_event(('builds', 1, 'finished'), {'buildid': 1, 'buildrequestid': 11})
+
+        self.assertEqual([reports for reports, _ in sent], [['new'], ['new']])
+
+        sent[0][1].callback(None)
+        self.assertEqual([reports for reports, _ in sent], [['new'], ['new'], ['new']])
+
+        sent[2][1].callback(None)
+        self.assertEqual([reports for reports, _ in sent],
+                         [['new'], ['new'], ['new'], ['finished']])
+
+        d = notifier.stopService()
+        self.assertFalse(d.called)
+        sent[1][1].callback(None)
+        sent[3][1].callback(None)
+        yield d
+
+    @defer.inlineCallbacks
+    def test_send_message_metrics(self):
+        gen = self.setup_mock_generator([('fake1', None, None)])
+        gen.generate = mock.Mock(return_value=1)
+
+        notifier = yield self.setupNotifier(generators=[gen])
+        sent = self.setup_deferred_send_message(notifier)
+
+        notifier._got_event(('fake1', None, None), None)
+        self.reactor.advance(3)
+        sent[0][1].callback(None)
+
+        metric_events = [e['metric'] for e in self._logEvents if 'metric' in e]
+        self.assertEqual([(e.counter, e.count) for e in metric_events
+                          if isinstance(e, metrics.MetricCountEvent)],
+                         [('ReporterBase_<name>.pending_events', 1),
+                          ('ReporterBase_<name>.pending_events', -1)])
+        self.assertEqual([(e.timer, e.elapsed) for e in metric_events
+                          if isinstance(e, metrics.MetricTimeEvent)],
+                         [('ReporterBase_<name>.sendMessage', 3)])
+
+    def queued_entries(self):
+        return sorted(self.master.db.reporter_queue.entries.values(), key=lambda e: e['id'])
+
+    @defer.inlineCallbacks
+    def test_persistent_queue_delivers_reports(self):
+        gen = self.setup_mock_generator([('fake1', None, None)])
+        gen.generate = mock.Mock(return_value={
+            'body': b'body',
+            'complete_at': datetime.datetime(2023, 6, 15, tzinfo=datetime.timezone.utc),
+        })
+
+        notifier = yield self.setupNotifier(generators=[gen], persistent_queue=True)
+        notifier.sendMessage.side_effect = TestException()
+        yield notifier._got_event(('fake1', None, None), None)
+        self.flushLoggedErrors(TestException)
+
+        # the reports are delivered as they were generated, not as they are stored
+        notifier.sendMessage.assert_called_once_with([{
+            'body': b'body',
+            'complete_at': datetime.datetime(2023, 6, 15, tzinfo=datetime.timezone.utc),
+        }])
+        self.assertEqual([e['reports'] for e in self.queued_entries()],
+                         [[{'body': 'body', 'complete_at': {'__datetime__': 1686787200}}]])
+
+        notifier.sendMessage.side_effect = None
+        self.reactor.advance(notifier.QUEUE_RETRY_START)
+        self.assertEqual(notifier.sendMessage.call_count, 2)
+        self.assertEqual(notifier.sendMessage.call_args, notifier.sendMessage.call_args_list[0])
+        self.assertEqual(self.queued_entries(), [])
+
+    @defer.inlineCallbacks
+    def test_persistent_queue_retries_in_order(self):
+        gen = self.setup_mock_generator([('builds', None, None)])
+        notifier = yield self.setupNotifier(generators=[gen], persistent_queue=True)
+        sent = []
+
+        def sendMessage(reports):
+            sent.append(reports)
+            if reports == [1] and sent.count([1]) == 1:
+                raise TestException()
+        notifier.sendMessage = sendMessage
+
+        gen.generate = mock.Mock(return_value=1)
+        yield notifier._got_event(('builds', 20, 'new'), {'buildrequestid': 10})
+        gen.generate = mock.Mock(return_value=2)
+        yield notifier._got_event(('builds', 20, 'finished'), {'buildrequestid': 10})
+        gen.generate = mock.Mock(return_value=3)
+        yield notifier._got_event(('builds', 21, 'new'), {'buildrequestid': 11})
+
+        # the second report waits until the first one, about the same build request, has been
+        # delivered, but the report about another build request does not
+        self.assertEqual(sent, [[1], [3]])
+        self.assertEqual(len(self.flushLoggedErrors(TestException)), 1)
+        self.assertEqual([(e['reports'], e['attempts'], e['ordering_key'])
+                          for e in self.queued_entries()],
+                         [([1], 1, 'buildrequests/10'), ([2], 0, 'buildrequests/10')])
+
+        self.reactor.advance(notifier.QUEUE_RETRY_START)
+        self.assertEqual(sent, [[1], [3], [1], [2]])
+        self.assertEqual(self.queued_entries(), [])
+
+    @defer.inlineCallbacks
+    def test_persistent_queue_pages_past_waiting_reports(self):
+        self.patch(ReporterBase, 'QUEUE_BATCH_SIZE', 2)
+        gen = self.setup_mock_generator([('builds', None, None)])
+        notifier = yield self.setupNotifier(generators=[gen], persistent_queue=True)
+        sent = []
+
+        def sendMessage(reports):
+            sent.append(reports)
+            if reports[0] < 2 and sent.count(reports) == 1:
+                raise TestException()
+        notifier.sendMessage = sendMessage
+
+        for i in range(4):
+            gen.generate = mock.Mock(return_value=i)
+            yield notifier._got_event(('builds', 20, 'new'), {'buildrequestid': 10 + i % 2})
+        gen.generate = mock.Mock(return_value=4)
+        yield notifier._got_event(('builds', 22, 'new'), {'buildrequestid': 12})
+
+        # the reports after the first batch, which waits for a retry, are delivered too
+        self.assertEqual(len(self.flushLoggedErrors(TestException)), 2)
+        self.assertEqual(sent, [[0], [1], [4]])
+
+        self.reactor.advance(notifier.QUEUE_RETRY_START)
+        self.assertEqual(sent, [[0], [1], [4], [0], [1], [2], [3]])
+        self.assertEqual(self.queued_entries(), [])
+
+    @defer.inlineCallbacks
+    def test_persistent_queue_drops_reports_after_max_attempts(self):
+        gen = self.setup_mock_generator([('fake1', None, None)])
+        gen.generate = mock.Mock(return_value=1)
+        notifier = yield self.setupNotifier(generators=[gen], persistent_queue=True)
+        notifier.sendMessage.side_effect = TestException()
+
+        yield notifier._got_event(('fake1', None, None), None)
+        self.reactor.pump([notifier.QUEUE_RETRY_MAX] * notifier.QUEUE_MAX_ATTEMPTS)
+
+        self.assertEqual(notifier.sendMessage.call_count, notifier.QUEUE_MAX_ATTEMPTS)
+        self.assertEqual(len(self.flushLoggedErrors(TestException)),
+                         notifier.QUEUE_MAX_ATTEMPTS)
+        self.assertLogged('dropping them')
+        self.assertEqual(self.queued_entries(), [])
+
+    @defer.inlineCallbacks
+    def test_persistent_queue_delivers_leftovers_on_startup(self):
+        gen = self.setup_mock_generator([('fake1', None, None)])
+        objectid = yield self.master.db.state.getObjectId('ReporterBase', 'ReporterBase')
+        yield self.master.db.insert_test_data([
+            fakedb.ReporterQueueEntry(id=5, objectid=objectid, masterid=self.master.masterid,
+                                      reports=[{'body': 'left over'}]),
+            # queued by another master
+            fakedb.ReporterQueueEntry(id=6, objectid=objectid, masterid=self.master.masterid + 1,
+                                      reports=[{'body': 'other'}]),
+        ])
+
+        notifier = yield self.setupNotifier(generators=[gen], persistent_queue=True)
+
+        notifier.sendMessage.assert_called_once_with([{'body': 'left over'}])
+        self.assertEqual([e['id'] for e in self.queued_entries()], [6])
+
+    @defer.inlineCallbacks
+    def test_persistent_queue_named_after_reporter_name(self):
+        gen = self.setup_mock_generator([('fake1', None, None)])
+        objectid = yield self.master.db.state.getObjectId('reporter', 'ReporterBase')
+        yield self.master.db.insert_test_data([
+            fakedb.ReporterQueueEntry(id=5, objectid=objectid, masterid=self.master.masterid,
+                                      reports=[{'body': 'left over'}]),
+        ])
+
+        notifier = yield self.setupNotifier(generators=[gen], persistent_queue=True,
+                                            name='reporter')
+
+        notifier.sendMessage.assert_called_once_with([{'body': 'left over'}])
+
+    @defer.inlineCallbacks
+    def test_persistent_queue_leftovers_restore_datetimes(self):
+        gen = self.setup_mock_generator([('fake1', None, None)])
+        objectid = yield self.master.db.state.getObjectId('ReporterBase', 'ReporterBase')
+        yield self.master.db.insert_test_data([
+            fakedb.ReporterQueueEntry(id=5, objectid=objectid, masterid=self.master.masterid,
+                                      reports=[{'body': 'left over', 'builds': [
+                                          {'complete_at': {'__datetime__': 1686787200}}]}]),
+        ])
+
+        notifier = yield self.setupNotifier(generators=[gen], persistent_queue=True)
+
+        complete_at = datetime.datetime(2023, 6, 15, tzinfo=datetime.timezone.utc)
+        notifier.sendMessage.assert_called_once_with([{'body': 'left over', 'builds': [
+            {'complete_at': complete_at}]}])
+
+    @defer.inlineCallbacks
+    def test_persistent_queue_stop_keeps_undelivered_reports(self):
+        gen = self.setup_mock_generator([('fake1', None, None)])
+        gen.generate = mock.Mock(return_value=1)
+        notifier = yield self.setupNotifier(generators=[gen], persistent_queue=True)
+        notifier.sendMessage.side_effect = TestException()
+
+        yield notifier._got_event(('fake1', None, None), None)
+        self.flushLoggedErrors(TestException)
+        yield notifier.stopService()
+        self.reactor.advance(notifier.QUEUE_RETRY_MAX)
+
+        self.assertEqual(notifier.sendMessage.call_count, 1)
+        self.assertEqual(len(self.queued_entries()), 1)
@@ -55,8 +55,17 @@ class TestGitHubStatusPush(TestReactorMixin, unittest.TestCase, ConfigErrorsMixi
         self.sp = self.createService()
         yield self.sp.setServiceParent(self.master)
 
-    def createService(self):
-        return GitHubStatusPush(Interpolate('XXYYZZ'))
+    def createService(self, **kwargs):
+        return GitHubStatusPush(Interpolate('XXYYZZ'), **kwargs)
+
+    def expect_build_done(self, **kwargs):
+        self._http.expect(
+            'post',
+            '/repos/buildbot/buildbot/statuses/d34db33fd43db33f',
+            json={'state': 'success',
+                  'target_url': 'http://localhost:8080/#/builders/79/builds/0',
+                  'description': 'Build done.', 'context': 'buildbot/Builder0'},
+            **kwargs)
 
     def tearDown(self):
         return self.master.stopService()
@@ -93,6 +102,60 @@ class TestGitHubStatusPush(TestReactorMixin, unittest.TestCase, ConfigErrorsMixi
         build['results'] = FAILURE
         yield self.sp._got_event(('builds', 20, 'finished'), build)
 
+    @defer.inlineCallbacks
+    def test_rate_limited_updates_are_coalesced(self):
+        build = yield self.insert_build_new()
+        self._http.expect(
+            'post',
+            '/repos/buildbot/buildbot/statuses/d34db33fd43db33f',
+            json={'state': 'pending',
+                  'target_url': 'http://localhost:8080/#/builders/79/builds/0',
+                  'description': 'Build started.', 'context': 'buildbot/Builder0'},
+            code=403, content_json={'message': 'API rate limit exceeded'},
+            response_headers={'X-RateLimit-Remaining': '0',
+                              'X-RateLimit-Reset': str(int(self.reactor.seconds()) + 60)})
+
+        # the events don't wait for the statuses to be sent, so that the status of the
+        # same build can be replaced while waiting for the rate limit to reset
+        build['complete'] = False
+        yield self.sp._got_event(('builds', 20, 'new'), build)
+        build['complete'] = True
+        build['results'] = SUCCESS
+        yield self.sp._got_event(('builds', 20, 'finished'), build)
+        build['results'] = FAILURE
+        yield self.sp._got_event(('builds', 20, 'finished'), build)
+
+        # only the latest state is sent once the rate limit resets
+        self._http.expect(
+            'post',
+            '/repos/buildbot/buildbot/statuses/d34db33fd43db33f',
+            json={'state': 'failure',
+                  'target_url': 'http://localhost:8080/#/builders/79/builds/0',
+                  'description': 'Build done.', 'context': 'buildbot/Builder0'})
+        self.reactor.advance(60)
+        self.assertEqual(self.sp._status_queue._pending, {})
+        self.assertEqual(self.sp._status_queue.coalesced, 2)
+
+    @defer.inlineCallbacks
+    def test_server_error_with_persistent_queue_is_retried(self):
+        yield self.sp.disownServiceParent()
+        self.sp = self.createService(persistent_queue=True)
+        yield self.sp.setServiceParent(self.master)
+
+        build = yield self.insert_build_finished(SUCCESS)
+        self.expect_build_done(code=500, content_json={'message': 'Server Error'})
+        yield self.sp._got_event(('builds', 20, 'finished'), build)
+
+        # the report stays queued
+        self.assertEqual(len(self.flushLoggedErrors(RuntimeError)), 1)
+        entries = list(self.master.db.reporter_queue.entries.values())
+        self.assertEqual([e['attempts'] for e in entries], [1])
+
+        # and is sent again later
+        self.expect_build_done()
+        self.reactor.advance(self.sp.QUEUE_RETRY_START)
+        self.assertEqual(self.master.db.reporter_queue.entries, {})
+
     @defer.inlineCallbacks
     def test_empty(self):
         build = yield self.insert_build_new(insert_ss=False)
@@ -315,8 +378,15 @@ class TestGitHubStatusPushURL(TestReactorMixin, unittest.TestCase,
 
 class TestGitHubCommentPush(TestGitHubStatusPush):
 
-    def createService(self):
-        return GitHubCommentPush('XXYYZZ')
+    def createService(self, **kwargs):
+        return GitHubCommentPush('XXYYZZ', **kwargs)
+
+    def expect_build_done(self, **kwargs):
+        self._http.expect(
+            'post',
+            '/repos/buildbot/buildbot/issues/34/comments',
+            json={'body': 'Build done.'},
+            **kwargs)
 
     @defer.inlineCallbacks
     def test_basic(self):
@@ -339,6 +409,35 @@ class TestGitHubCommentPush(TestGitHubStatusPush):
         build['results'] = FAILURE
         yield self.sp._got_event(('builds', 20, 'finished'), build)
 
+    @defer.inlineCallbacks
+    def test_rate_limited_updates_are_coalesced(self):
+        build = yield self.insert_build_new()
+        self._http.expect(
+            'post',
+            '/repos/buildbot/buildbot/issues/34/comments',
+            json={'body': 'Build done.'},
+            code=429, content_json={'message': 'API rate limit exceeded'},
+            response_headers={'Retry-After': '60'})
+
+        build['complete'] = True
+        build['results'] = SUCCESS
+        yield self.sp._got_event(('builds', 20, 'finished'), build)
+        build['results'] = FAILURE
+        yield self.sp._got_event(('builds', 20, 'finished'), build)
+
+        # comments are never coalesced, the rate limited one is retried first
+        self._http.expect(
+            'post',
+            '/repos/buildbot/buildbot/issues/34/comments',
+            json={'body': 'Build done.'})
+        self._http.expect(
+            'post',
+            '/repos/buildbot/buildbot/issues/34/comments',
+            json={'body': 'Build done.'})
+        self.reactor.advance(60)
+        self.assertEqual(self.sp._status_queue._pending, {})
+        self.assertEqual(self.sp._status_queue.coalesced, 0)
+
     @defer.inlineCallbacks
     def test_empty(self):
         build = yield self.insert_build_new(insert_ss=False)
@@ -105,3 +105,21 @@ class TestHttpStatusPush(TestReactorMixin, unittest.TestCase, ReporterTestMixin,
     @defer.inlineCallbacks
     def test_http202(self):
         yield self.http2XX(code=202, content="Accepted")
+
+    @defer.inlineCallbacks
+    def test_http500_persistent_queue_retries(self):
+        yield self.createReporter(persistent_queue=True)
+        self._http.expect('post', '', code=500, content="Internal Server Error",
+                          json=BuildDictLookAlike())
+        build = yield self.insert_build_finished(SUCCESS)
+        yield self.sp._got_event(('builds', 20, 'finished'), build)
+
+        # the report stays queued
+        self.assertEqual(len(self.flushLoggedErrors(RuntimeError)), 1)
+        entries = list(self.master.db.reporter_queue.entries.values())
+        self.assertEqual([e['attempts'] for e in entries], [1])
+
+        # and is sent again later
+        self._http.expect('post', '', json=BuildDictLookAlike())
+        self.reactor.advance(self.sp.QUEUE_RETRY_START)
+        self.assertEqual(self.master.db.reporter_queue.entries, {})
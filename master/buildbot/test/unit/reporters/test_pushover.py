@@ -49,6 +49,11 @@ class TestPushoverNotifier(ConfigErrorsMixin, TestReactorMixin, unittest.TestCas
         yield pn.startService()
         return pn
 
+    @defer.inlineCallbacks
+    def test_max_concurrent_events(self):
+        pn = yield self.setupPushoverNotifier(max_concurrent_events=3)
+        self.assertEqual(pn.max_concurrent_events, 3)
+
     @defer.inlineCallbacks
     def test_sendMessage(self):
         _http = yield self.setupFakeHttp()
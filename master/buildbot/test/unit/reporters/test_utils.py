@@ -143,6 +143,122 @@ class TestDataUtils(TestReactorMixin, unittest.TestCase, logging.LoggingMixin):
         self.assertEqual(build['parentbuild']['buildid'], 21)
         self.assertEqual(build['parentbuilder']['name'], "Builder1")
 
+    def count_data_gets(self):
+        paths = []
+        get = self.master.data.get
+
+        def counting_get(path, *args, **kwargs):
+            paths.append(path)
+            return get(path, *args, **kwargs)
+        self.patch(self.master.data, 'get', counting_get)
+        return paths
+
+    @defer.inlineCallbacks
+    def test_getDetailsForBuild_shared_between_callers(self):
+        self.setupDb()
+        build1 = yield self.master.data.get(("builds", 21))
+        build2 = yield self.master.data.get(("builds", 21))
+        paths = self.count_data_gets()
+
+        yield utils.getDetailsForBuild(self.master, build1, want_properties=True,
+                                       want_steps=True)
+        fetches = len(paths)
+        self.assertNotEqual(fetches, 0)
+
+        # a caller wanting a subset of the details only fetches the builder
+        yield utils.getDetailsForBuild(self.master, build2, want_properties=True)
+        self.assertEqual(paths[fetches:], [('builders', build2['builderid'])])
+        self.assertEqual(build2['properties'], build1['properties'])
+        self.assertEqual(build2['buildset'], build1['buildset'])
+        self.assertNotIn('steps', build2)
+
+    @defer.inlineCallbacks
+    def test_getDetailsForBuild_concurrent_callers(self):
+        self.setupDb()
+        build1 = yield self.master.data.get(("builds", 21))
+        build2 = yield self.master.data.get(("builds", 21))
+        paths = self.count_data_gets()
+
+        yield defer.gatherResults([
+            utils.getDetailsForBuild(self.master, build1, want_properties=True),
+            utils.getDetailsForBuild(self.master, build2, want_properties=True),
+        ])
+        self.assertEqual(paths.count(("builds", 21, 'properties')), 1)
+        self.assertEqual(build1['properties'], build2['properties'])
+
+    @defer.inlineCallbacks
+    def test_getDetailsForBuild_superset_refetched(self):
+        self.setupDb()
+        build = yield self.master.data.get(("builds", 21))
+        paths = self.count_data_gets()
+
+        yield utils.getDetailsForBuild(self.master, build, want_properties=True)
+        yield utils.getDetailsForBuild(self.master, build, want_steps=True)
+        self.assertEqual(paths.count(("builds", 21, 'properties')), 2)
+        self.assertEqual(paths.count(("builds", 21, 'steps')), 1)
+
+        # both sets of details are now remembered
+        yield utils.getDetailsForBuild(self.master, build, want_properties=True,
+                                       want_steps=True)
+        self.assertEqual(paths.count(("builds", 21, 'properties')), 2)
+        self.assertEqual(paths.count(("builds", 21, 'steps')), 1)
+
+    @defer.inlineCallbacks
+    def test_getDetailsForBuild_not_shared_after_timeout_or_completion(self):
+        self.setupDb()
+        build = yield self.master.data.get(("builds", 21))
+        paths = self.count_data_gets()
+
+        yield utils.getDetailsForBuild(self.master, build, want_properties=True)
+        self.reactor.advance(utils.BuildDetailsCache.TIMEOUT)
+        yield utils.getDetailsForBuild(self.master, build, want_properties=True)
+        self.assertEqual(paths.count(("builds", 21, 'properties')), 2)
+
+        build['complete_at'] = datetime.datetime(2023, 1, 1, tzinfo=tzutc())
+        yield utils.getDetailsForBuild(self.master, build, want_properties=True)
+        self.assertEqual(paths.count(("builds", 21, 'properties')), 3)
+
+    @defer.inlineCallbacks
+    def test_getDetailsForBuildset_shared_between_callers(self):
+        self.setupDb()
+        paths = self.count_data_gets()
+
+        res1 = yield utils.getDetailsForBuildset(self.master, 98, want_properties=True,
+                                                 want_steps=True)
+        res2 = yield utils.getDetailsForBuildset(self.master, 98, want_properties=True)
+        self.assertEqual(paths.count(("builds", 20, 'properties')), 1)
+        self.assertEqual(paths.count(("builds", 20, 'steps')), 1)
+        self.assertEqual(res2['builds'][0]['properties'], res1['builds'][0]['properties'])
+        self.assertNotIn('steps', res2['builds'][0])
+        self.assertNotIn('buildrequest', res2['builds'][0])
+
+    @defer.inlineCallbacks
+    def test_getDetailsForBuildset_fetches_buildset_once(self):
+        self.setupDb()
+        paths = self.count_data_gets()
+
+        yield utils.getDetailsForBuildset(self.master, 98, want_properties=True)
+        # the buildset given by the caller is used for all the builds, and the builders are
+        # fetched once
+        self.assertEqual(paths.count(("buildsets", 98)), 1)
+        self.assertEqual([p for p in paths if p[0] == 'buildrequests' and len(p) == 2], [])
+        builder_paths = [p for p in paths if p[0] == 'builders']
+        self.assertEqual(len(builder_paths), len(set(builder_paths)))
+
+    @defer.inlineCallbacks
+    def test_getDetailsForBuild_returns_copies(self):
+        self.setupDb()
+        build1 = yield self.master.data.get(("builds", 20))
+        build2 = yield self.master.data.get(("builds", 20))
+
+        yield utils.getDetailsForBuild(self.master, build1, want_properties=True)
+        build1['properties']['reason'] = ('changed', 'test')
+        build1['builder']['name'] = 'changed'
+
+        yield utils.getDetailsForBuild(self.master, build2, want_properties=True)
+        self.assertEqual(build2['properties']['reason'], ('because', 'fakedb'))
+        self.assertEqual(build2['builder']['name'], 'Builder1')
+
     @defer.inlineCallbacks
     def test_getDetailsForBuildsetWithLogs(self):
         self.setupDb()
@@ -40,14 +40,20 @@ class TestZulipStatusPush(unittest.TestCase, ReporterTestMixin, LoggingMixin, Co
             yield self.master.stopService()
 
     @defer.inlineCallbacks
-    def setupZulipStatusPush(self, endpoint="http://example.com", token="123", stream=None):
+    def setupZulipStatusPush(self, endpoint="http://example.com", token="123", stream=None,
+                             **kwargs):
         self.sp = ZulipStatusPush(
-            endpoint=endpoint, token=token, stream=stream)
+            endpoint=endpoint, token=token, stream=stream, **kwargs)
         self._http = yield fakehttpclientservice.HTTPClientService.getService(
             self.master, self, endpoint, debug=None, verify=None)
         yield self.sp.setServiceParent(self.master)
         yield self.master.startService()
 
+    @defer.inlineCallbacks
+    def test_max_concurrent_events(self):
+        yield self.setupZulipStatusPush(max_concurrent_events=3)
+        self.assertEqual(self.sp.max_concurrent_events, 3)
+
     @defer.inlineCallbacks
     def test_build_started(self):
         yield self.setupZulipStatusPush(stream="xyz")
@@ -58,6 +58,12 @@ class SimpleMQ(TestReactorMixin, unittest.TestCase):
         # topic
         callback.assert_called_with(('a', 'b'), 'foo')
 
+    def test_counts_produced_messages(self):
+        self.mq.produce(('builds', '1', 'new'), 'foo')
+        self.mq.produce(('builds', '1', 'finished'), 'foo')
+        self.mq.produce(('changes', '2', 'new'), 'foo')
+        self.assertEqual(self.mq.produced, {'builds': 2, 'changes': 1})
+
     @defer.inlineCallbacks
     def test_waits_for_called_callback(self):
         def callback(_, __):
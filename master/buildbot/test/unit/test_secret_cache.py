@@ -0,0 +1,261 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+
+from twisted.internet import defer
+from twisted.trial import unittest
+
+from buildbot.config.master import MasterConfig
+from buildbot.secrets.cache import SecretCache
+from buildbot.secrets.manager import SecretManager
+from buildbot.secrets.providers.base import SecretProviderBase
+from buildbot.test.fake import fakemaster
+from buildbot.test.reactor import TestReactorMixin
+from buildbot.test.util.config import ConfigErrorsMixin
+
+
+class CountingSecretStorage(SecretProviderBase):
+
+    name = "CountingSecretStorage"
+
+    def reconfigService(self, secretdict=None):
+        self.allsecrets = secretdict or {}
+        self.queries = []
+        self.pending = None
+
+    def get(self, key):
+        self.queries.append(key)
+        if self.pending is not None:
+            d = defer.Deferred()
+            self.pending.append((d, self.allsecrets.get(key)))
+            return d
+        return self.allsecrets.get(key)
+
+
+class TestSecretCache(TestReactorMixin, unittest.TestCase):
+
+    def setUp(self):
+        self.setup_test_reactor()
+        self.queries = []
+        self.values = {'foo': 'bar'}
+
+    def fetch(self, key):
+        self.queries.append(key)
+        return self.values.get(key)
+
+    @defer.inlineCallbacks
+    def test_ttl(self):
+        cache = SecretCache(self.reactor, 10)
+        self.assertEqual((yield cache.get('foo', self.fetch)), 'bar')
+        self.reactor.advance(9)
+        self.assertEqual((yield cache.get('foo', self.fetch)), 'bar')
+        self.assertEqual(self.queries, ['foo'])
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        self.reactor.advance(1)
+        self.values['foo'] = 'new'
+        self.assertEqual((yield cache.get('foo', self.fetch)), 'new')
+        self.assertEqual(self.queries, ['foo', 'foo'])
+
+    @defer.inlineCallbacks
+    def test_negative_ttl(self):
+        cache = SecretCache(self.reactor, 10, negative_ttl=2)
+        self.assertIsNone((yield cache.get('missing', self.fetch)))
+        self.assertIsNone((yield cache.get('missing', self.fetch)))
+        self.assertEqual(self.queries, ['missing'])
+
+        self.reactor.advance(2)
+        self.assertIsNone((yield cache.get('missing', self.fetch)))
+        self.assertEqual(self.queries, ['missing', 'missing'])
+
+    @defer.inlineCallbacks
+    def test_negative_ttl_disabled(self):
+        cache = SecretCache(self.reactor, 10, negative_ttl=0)
+        yield cache.get('missing', self.fetch)
+        yield cache.get('missing', self.fetch)
+        self.assertEqual(self.queries, ['missing', 'missing'])
+
+    @defer.inlineCallbacks
+    def test_max_size(self):
+        self.values.update({'a': '1', 'b': '2'})
+        cache = SecretCache(self.reactor, 10, max_size=2)
+        yield cache.get('foo', self.fetch)
+        yield cache.get('a', self.fetch)
+        # foo is now the most recently used
+        yield cache.get('foo', self.fetch)
+        yield cache.get('b', self.fetch)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.evictions, 1)
+
+        yield cache.get('foo', self.fetch)
+        yield cache.get('a', self.fetch)
+        self.assertEqual(self.queries, ['foo', 'a', 'b', 'a'])
+
+    @defer.inlineCallbacks
+    def test_concurrent_queries(self):
+        pending = defer.Deferred()
+        cache = SecretCache(self.reactor, 10)
+
+        d1 = cache.get('foo', lambda key: pending)
+        d2 = cache.get('foo', self.fetch)
+        self.assertFalse(d2.called)
+        pending.callback('bar')
+        self.assertEqual((yield d1), 'bar')
+        self.assertEqual((yield d2), 'bar')
+        self.assertEqual(self.queries, [])
+
+    @defer.inlineCallbacks
+    def test_errors_not_cached(self):
+        cache = SecretCache(self.reactor, 10)
+
+        def fail(key):
+            raise KeyError(key)
+
+        pending = defer.Deferred()
+        d1 = cache.get('foo', lambda key: pending)
+        d2 = cache.get('foo', fail)
+        pending.errback(KeyError('foo'))
+        with self.assertRaises(KeyError):
+            yield d1
+        with self.assertRaises(KeyError):
+            yield d2
+
+        self.assertEqual((yield cache.get('foo', self.fetch)), 'bar')
+
+    @defer.inlineCallbacks
+    def test_clear(self):
+        cache = SecretCache(self.reactor, 10)
+        pending = defer.Deferred()
+        d = cache.get('foo', lambda key: pending)
+        cache.clear()
+        pending.callback('old')
+        self.assertEqual((yield d), 'old')
+
+        # the value queried before clear() is not cached
+        self.assertEqual((yield cache.get('foo', self.fetch)), 'bar')
+        self.assertEqual(self.queries, ['foo'])
+
+    def test_repr_hides_values(self):
+        cache = SecretCache(self.reactor, 10)
+        cache.get('foo', self.fetch)
+        self.assertNotIn('bar', repr(cache))
+
+
+class TestCachedSecretProvider(TestReactorMixin, ConfigErrorsMixin, unittest.TestCase):
+
+    def setUp(self):
+        self.setup_test_reactor()
+        self.master = fakemaster.make_master(self)
+
+    @defer.inlineCallbacks
+    def setupProviders(self, *providers):
+        self.secrets = SecretManager()
+        yield self.secrets.setServiceParent(self.master)
+        yield self.master.startService()
+        self.addCleanup(self.master.stopService)
+        config = MasterConfig()
+        config.secretsProviders = list(providers)
+        yield self.secrets.reconfigServiceWithBuildbotConfig(config)
+
+    def test_config_errors(self):
+        with self.assertRaisesConfigError("cache_ttl must be a positive number"):
+            CountingSecretStorage(cache_ttl=-1)
+        with self.assertRaisesConfigError("cache_negative_ttl must be a positive number"):
+            CountingSecretStorage(cache_negative_ttl='1')
+        with self.assertRaisesConfigError("cache_max_size must be a strictly positive"):
+            CountingSecretStorage(cache_max_size=0)
+
+    @defer.inlineCallbacks
+    def test_no_cache_by_default(self):
+        provider = CountingSecretStorage(secretdict={'foo': 'bar'})
+        yield self.setupProviders(provider)
+        self.assertIsNone(provider.secret_cache)
+
+        yield self.secrets.get('foo')
+        yield self.secrets.get('foo')
+        self.assertEqual(provider.queries, ['foo', 'foo'])
+
+    @defer.inlineCallbacks
+    def test_cached_lookups(self):
+        first = CountingSecretStorage(name='first', secretdict={}, cache_ttl=60)
+        second = CountingSecretStorage(name='second', secretdict={'foo': 'bar'}, cache_ttl=60)
+        yield self.setupProviders(first)
+        # added by a second reconfig, so that it is queried after the first one
+        config = MasterConfig()
+        config.secretsProviders = [first, second]
+        yield self.secrets.reconfigServiceWithBuildbotConfig(config)
+
+        for _ in range(3):
+            details = yield self.secrets.get('foo')
+            self.assertEqual(details.value, 'bar')
+        # the first provider does not know the secret, which is cached too
+        self.assertEqual(first.queries, ['foo'])
+        self.assertEqual(second.queries, ['foo'])
+
+    @defer.inlineCallbacks
+    def test_reconfig(self):
+        provider = CountingSecretStorage(secretdict={'foo': 'bar'}, cache_ttl=60)
+        yield self.setupProviders(provider)
+        yield self.secrets.get('foo')
+        cache = provider.secret_cache
+
+        # an identical configuration keeps the cache
+        config = MasterConfig()
+        config.secretsProviders = [
+            CountingSecretStorage(secretdict={'foo': 'bar'}, cache_ttl=60)]
+        yield self.secrets.reconfigServiceWithBuildbotConfig(config)
+        self.assertIdentical(provider.secret_cache, cache)
+        self.assertEqual(len(cache), 1)
+
+        config.secretsProviders = [
+            CountingSecretStorage(secretdict={'foo': 'new'}, cache_ttl=30)]
+        yield self.secrets.reconfigServiceWithBuildbotConfig(config)
+        self.assertEqual(provider.secret_cache.ttl, 30)
+        details = yield self.secrets.get('foo')
+        self.assertEqual(details.value, 'new')
+
+        config.secretsProviders = [CountingSecretStorage(secretdict={'foo': 'new'})]
+        yield self.secrets.reconfigServiceWithBuildbotConfig(config)
+        self.assertIsNone(provider.secret_cache)
+
+    @defer.inlineCallbacks
+    def test_prefetch(self):
+        provider = CountingSecretStorage(secretdict={'foo': 'bar', 'baz': 'qux'}, cache_ttl=60)
+        yield self.setupProviders(provider)
+        provider.pending = []
+
+        d = self.secrets.prefetch(['foo', 'baz', 'foo'])
+        # the secrets are queried in parallel
+        self.assertEqual(sorted(provider.queries), ['baz', 'foo'])
+        for pending, value in provider.pending:
+            pending.callback(value)
+        yield d
+
+        details = yield self.secrets.get('foo')
+        self.assertEqual(details.value, 'bar')
+        self.assertEqual(len(provider.queries), 2)
+
+    @defer.inlineCallbacks
+    def test_prefetch_errors_ignored(self):
+        provider = CountingSecretStorage(secretdict={}, cache_ttl=60)
+        provider.get = lambda key: defer.fail(KeyError(key))
+        yield self.setupProviders(provider)
+        yield self.secrets.prefetch(['foo'])
+
+    @defer.inlineCallbacks
+    def test_prefetch_without_cache(self):
+        provider = CountingSecretStorage(secretdict={'foo': 'bar'})
+        yield self.setupProviders(provider)
+        yield self.secrets.prefetch(['foo'])
+        self.assertEqual(provider.queries, [])
@@ -17,6 +17,7 @@
 import mock
 
 from twisted.internet import defer
+from twisted.internet import threads
 from twisted.trial import unittest
 
 from buildbot import config
@@ -24,6 +25,7 @@ from buildbot.errors import CaptureCallbackError
 from buildbot.statistics import capture
 from buildbot.statistics import stats_service
 from buildbot.statistics import storage_backends
+from buildbot.statistics.storage_backends import file_storage
 from buildbot.statistics.storage_backends.base import StatsStorageBase
 from buildbot.statistics.storage_backends.influxdb_client import InfluxStorageService
 from buildbot.test import fakedb
@@ -106,6 +108,152 @@ class TestStatsServicesConfiguration(TestStatsServicesBase):
                                      "Not all storage services registered.")
 
 
+class TestStatsBuffer(TestReactorMixin, unittest.TestCase):
+
+    def setUp(self):
+        self.setup_test_reactor()
+        self.backend = fakestats.FakeStatsStorageService()
+        self.buffer = stats_service.StatsBuffer(self.reactor, self.backend, max_batch_size=3,
+                                                flush_interval=5, max_buffered_points=5)
+
+    def post(self, count):
+        for i in range(count):
+            self.buffer.postStatsValue({'value': i}, 'series', {'tag': 'x'})
+
+    def test_flush_by_size(self):
+        self.post(2)
+        self.assertEqual(self.backend.stored_data, [])
+        self.post(1)
+        self.assertEqual(self.backend.stored_data, [
+            ({'value': 0}, 'series', {'tag': 'x'}),
+            ({'value': 1}, 'series', {'tag': 'x'}),
+            ({'value': 0}, 'series', {'tag': 'x'}),
+        ])
+        self.assertEqual(self.backend.batch_sizes, [3])
+        self.assertEqual(self.buffer.written, 3)
+
+    def test_flush_by_interval(self):
+        self.reactor.advance(100)
+        self.post(1)
+        self.reactor.advance(4)
+        self.assertEqual(self.backend.stored_data, [])
+        self.reactor.advance(1)
+        self.assertEqual(self.backend.batch_sizes, [1])
+        self.assertEqual(self.backend.timestamps, [100])
+
+    def test_overflow_drops_values(self):
+        d = defer.Deferred()
+
+        def deferToThread(f, *args):
+            # the first write blocks until d fires
+            if not d.called:
+                return d.addCallback(lambda _: f(*args))
+            return defer.maybeDeferred(f, *args)
+        self.patch(threads, 'deferToThread', deferToThread)
+
+        # the values captured while the backend is busy are buffered until the buffer is full
+        self.post(3)
+        self.post(6)
+        self.assertEqual(len(self.buffer.points), 5)
+        self.assertEqual(self.buffer.dropped, 1)
+
+        d.callback(None)
+        self.assertEqual(self.backend.batch_sizes, [3, 3, 2])
+        self.assertEqual(self.buffer.points, [])
+        self.assertEqual(self.buffer.written, 8)
+
+    def test_backend_failure_drops_batch(self):
+        self.backend.fail = True
+        self.post(3)
+        self.assertEqual(self.buffer.dropped, 3)
+        self.assertEqual(len(self.flushLoggedErrors(RuntimeError)), 1)
+        self.backend.fail = False
+        self.post(3)
+        self.assertEqual(self.buffer.written, 3)
+
+    @defer.inlineCallbacks
+    def test_stop_writes_everything(self):
+        self.post(2)
+        yield self.buffer.stop()
+        self.assertEqual(self.backend.batch_sizes, [2])
+        self.assertEqual(self.reactor.getDelayedCalls(), [])
+
+
+class TestStatsServicesBatching(TestStatsServicesBase):
+
+    @defer.inlineCallbacks
+    def setup_capture(self, **kwargs):
+        self.master.mq.verifyMessages = False
+        self.backend = fakestats.FakeStatsStorageService()
+        self.backend.captures = [capture.CaptureDataAllBuilders('test')]
+        yield self.stats_service.reconfigService([self.backend], **kwargs)
+
+    def capture(self, value):
+        routingKey = ("stats-yieldMetricsValue", "stats-yield-data")
+        self.master.mq.callConsumer(routingKey, {
+            'data_name': 'test',
+            'post_data': {'value': value},
+            'build_data': {'builderid': 1, 'number': 1}
+        })
+
+    @defer.inlineCallbacks
+    def test_batched(self):
+        yield self.setup_capture(max_batch_size=2, flush_interval=10)
+        self.capture(1)
+        self.assertEqual(self.backend.stored_data, [])
+        self.capture(2)
+        self.assertEqual(self.backend.batch_sizes, [2])
+        self.capture(3)
+        self.reactor.advance(10)
+        self.assertEqual(self.backend.batch_sizes, [2, 1])
+
+    @defer.inlineCallbacks
+    def test_reconfig_flushes_and_does_not_duplicate(self):
+        yield self.setup_capture(max_batch_size=10)
+        self.capture(1)
+        yield self.stats_service.reconfigService([self.backend], max_batch_size=10)
+        self.assertEqual(self.backend.batch_sizes, [1])
+        self.capture(2)
+        yield self.stats_service.flushBuffers()
+        self.assertEqual(self.backend.batch_sizes, [1, 1])
+        self.assertEqual([d[0] for d in self.backend.stored_data],
+                         [{'value': 1}, {'value': 2}])
+
+    @defer.inlineCallbacks
+    def test_bad_batch_configuration(self):
+        with self.assertRaises(ValueError):
+            yield self.setup_capture(max_batch_size=0)
+        with self.assertRaises(ValueError):
+            yield self.setup_capture(max_batch_size=10, max_buffered_points=5)
+
+
+class TestFileStorage(unittest.TestCase):
+
+    def test_format_line(self):
+        self.assertEqual(
+            file_storage.format_line({'value': 10, 'ratio': 0.5, 'ok': True, 'name': 'a "b"'},
+                                     'my series', {'builder name': 'b1,b2', 'number': 3},
+                                     1.5),
+            'my\\ series,builder\\ name=b1\\,b2,number=3 '
+            'name="a \\"b\\"",ok=true,ratio=0.5,value=10i 1500000000')
+
+    def test_format_line_no_context(self):
+        self.assertEqual(file_storage.format_line({'value': 'x'}, 'series'),
+                         'series value="x"')
+
+    def test_write(self):
+        path = self.mktemp()
+        svc = file_storage.FileStorageService(path, [])
+        svc.thd_postStatsValue({'value': 1}, 'series', {'tag': 'a'})
+        svc.thd_postStatsValues([({'value': 2}, 'series', None, 2),
+                                 ({'value': 3}, 'series', None, 3)])
+        with open(path, encoding='utf-8') as f:
+            self.assertEqual(f.read(),
+                             'series,tag=a value=1i\n'
+                             'series value=2i 2000000000\n'
+                             'series value=3i 3000000000\n')
+
+
 class TestInfluxDB(TestStatsServicesBase, logging.LoggingMixin):
     # Smooth test of influx db service. We don't want to force people to install influxdb, so we
     # just disable this unit test if the influxdb module is not installed,
@@ -168,6 +316,21 @@ class TestInfluxDB(TestStatsServicesBase, logging.LoggingMixin):
         points = [data]
         self.assertEqual(svc.client.points, points)
 
+    def test_influx_storage_service_post_values(self):
+        self.patch(storage_backends.influxdb_client,
+                   'InfluxDBClient', fakestats.FakeInfluxDBClient)
+        svc = InfluxStorageService(
+            "fake_url", "fake_port", "fake_user", "fake_password", "fake_db", "fake_stats")
+        svc.thd_postStatsValues([
+            ({'value': 1}, "series", {'x': 'y'}, 10),
+            ({'value': 2}, "series", None, 10.5),
+        ])
+        self.assertEqual(svc.client.points, [
+            {'measurement': 'series', 'fields': {'value': 1}, 'tags': {'x': 'y'}, 'time': 10000},
+            {'measurement': 'series', 'fields': {'value': 2}, 'time': 10500},
+        ])
+        self.assertEqual(svc.client.writes, 1)
+
     def test_influx_service_not_inited(self):
         self.setUpLogging()
         self.patch(storage_backends.influxdb_client,
@@ -203,7 +366,8 @@ class TestStatsServicesConsumers(TestBuildStepMixin, TestStatsServicesBase):
     def setupFakeStorage(self, captures):
         self.fake_storage_service = fakestats.FakeStatsStorageService()
         self.fake_storage_service.captures = captures
-        yield self.stats_service.reconfigService([self.fake_storage_service])
+        # write each value as soon as it is captured
+        yield self.stats_service.reconfigService([self.fake_storage_service], max_batch_size=1)
 
     def get_dict(self, build):
         return dict(
@@ -27,6 +27,7 @@ from twisted.web import resource
 from twisted.web import server
 
 from buildbot import interfaces
+from buildbot.process import metrics
 from buildbot.test.fake import httpclientservice as fakehttpclientservice
 from buildbot.util import bytes2unicode
 from buildbot.util import httpclientservice
@@ -241,6 +242,97 @@ class HTTPClientServiceTestTReq(HTTPClientServiceTestBase):
                                                             })
 
 
+class HTTPConnectionPoolServiceTest(HTTPClientServiceTestBase):
+
+    @defer.inlineCallbacks
+    def test_shared_by_host(self):
+        httpclientservice.txrequests.Session.side_effect = lambda **kwargs: mock.Mock()
+        http1 = yield httpclientservice.HTTPClientService.getService(
+            self.parent, 'http://foo', headers={'X-TOKEN': 'a'})
+        http2 = yield httpclientservice.HTTPClientService.getService(
+            self.parent, 'http://foo/api', headers={'X-TOKEN': 'b'})
+        http3 = yield httpclientservice.HTTPClientService.getService(
+            self.parent, 'http://bar', headers={'X-TOKEN': 'a'})
+
+        self.assertIsNot(http1, http2)
+        self.assertIs(http1._connection_pool, http2._connection_pool)
+        self.assertIsNot(http1._connection_pool, http3._connection_pool)
+
+        # the sessions, and their cookies, are not shared: only the connections are
+        self.assertIsNot(http1._session, http2._session)
+        adapter = http1._connection_pool.adapter
+        for http in (http1, http2):
+            http._session.mount.assert_has_calls([mock.call('http://', adapter),
+                                                  mock.call('https://', adapter)])
+
+    @defer.inlineCallbacks
+    def test_stop_client_keeps_shared_adapter(self):
+        httpclientservice.txrequests.Session.side_effect = lambda **kwargs: mock.Mock()
+        http1 = yield httpclientservice.HTTPClientService.getService(
+            self.parent, 'http://foo', headers={'X-TOKEN': 'a'})
+        http2 = yield httpclientservice.HTTPClientService.getService(
+            self.parent, 'http://foo', headers={'X-TOKEN': 'b'})
+        session = http1._session
+        adapter = http1._connection_pool.adapter
+        self.patch(adapter, 'close', mock.Mock())
+
+        yield http1.disownServiceParent()
+
+        session.adapters.clear.assert_called_once_with()
+        session.close.assert_called_once_with()
+        adapter.close.assert_not_called()
+        self.assertIs(http2._connection_pool.adapter, adapter)
+
+    @defer.inlineCallbacks
+    def test_not_shared_between_libraries(self):
+        http1 = yield httpclientservice.HTTPClientService.getService(self.parent, 'http://foo')
+        self.patch(httpclientservice.HTTPClientService, 'PREFER_TREQ', True)
+        http2 = yield httpclientservice.HTTPClientService.getService(
+            self.parent, 'http://foo', headers={'X-TOKEN': 'a'})
+
+        self.assertIsNot(http1._connection_pool, http2._connection_pool)
+        self.assertIsNone(http2._session)
+        self.assertIsNotNone(http2._agent)
+
+    @defer.inlineCallbacks
+    def test_max_connections_per_host(self):
+        self.patch(httpclientservice.HTTPConnectionPoolService, 'MAX_CONNECTIONS_PER_HOST', 2)
+        http = yield httpclientservice.HTTPClientService.getService(self.parent, 'http://foo')
+        pending = [defer.Deferred() for _ in range(3)]
+        http._session.request.side_effect = pending
+
+        for _ in range(3):
+            http.get('/bar')
+        self.assertEqual(http._session.request.call_count, 2)
+
+        pending[0].callback(mock.Mock())
+        self.assertEqual(http._session.request.call_count, 3)
+
+    @defer.inlineCallbacks
+    def test_metrics(self):
+        time_log = mock.Mock()
+        count_log = mock.Mock()
+        self.patch(metrics.MetricTimeEvent, 'log', time_log)
+        self.patch(metrics.MetricCountEvent, 'log', count_log)
+        http = yield httpclientservice.HTTPClientService.getService(self.parent, 'http://foo')
+        pool = http._connection_pool
+
+        def request(*args, **kwargs):
+            if http._session.request.call_count == 1:
+                pool.connections_created += 1
+            return defer.succeed(mock.Mock())
+        http._session.request.side_effect = request
+
+        yield http.get('/bar')
+        yield http.get('/bar')
+
+        self.assertEqual([c[0][0] for c in time_log.call_args_list],
+                         ['http.foo.request', 'http.foo.request'])
+        self.assertEqual(count_log.call_args_list,
+                         [mock.call('http.foo.connections_created', 1),
+                          mock.call('http.foo.connections_reused', 1)])
+
+
 class HTTPClientServiceTestTReqNoEncoding(HTTPClientServiceTestBase):
 
     @defer.inlineCallbacks
@@ -430,6 +522,21 @@ class HTTPClientServiceTestTxRequestE2E(unittest.TestCase):
         dl = [oneReq() for i in range(self.NUM_PARALLEL)]
         yield defer.gatherResults(dl)
 
+    @defer.inlineCallbacks
+    def test_connections_are_reused(self):
+        pool = self._http._connection_pool
+        for _ in range(3):
+            res = yield self._http.get('/')
+            yield res.content()
+        self.assertEqual(pool.connections_created, 1)
+
+        # another service talking to the same host uses the same connections
+        http = yield httpclientservice.HTTPClientService.getService(
+            self.parent, f'http://127.0.0.1:{self.port}', headers={'X-TOKEN': 'XXX'})
+        res = yield http.get('/')
+        yield res.content()
+        self.assertEqual(pool.connections_created, 1)
+
 
 class HTTPClientServiceTestTReqE2E(HTTPClientServiceTestTxRequestE2E):
 
@@ -449,3 +556,6 @@ class HTTPClientServiceTestFakeE2E(HTTPClientServiceTestTxRequestE2E):
 
     def expect(self, *arg, **kwargs):
         self._http.expect(*arg, **kwargs)
+
+    def test_connections_are_reused(self):
+        raise unittest.SkipTest('the fake service does not pool connections')
@@ -93,3 +93,10 @@ class Matcher(unittest.TestCase):
         self.m[('abc', 'efg')] = 3
         self.assertEqual(self.m[('abc', 'def')], (2, {}))
         self.assertEqual(self.m[('abc', 'efg')], (3, {}))
+
+    def test_compiled_once(self):
+        self.m[('abc', 'def')] = 2
+        self.assertEqual(self.m[('abc', 'def')], (2, {}))
+        compiled = self.m._by_length
+        self.assertEqual(self.m[('abc', 'def')], (2, {}))
+        self.assertIdentical(self.m._by_length, compiled)
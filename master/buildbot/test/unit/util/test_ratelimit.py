@@ -0,0 +1,214 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+
+import mock
+
+from twisted.internet import defer
+from twisted.trial import unittest
+
+from buildbot.test.fake.httpclientservice import ResponseWrapper
+from buildbot.test.reactor import TestReactorMixin
+from buildbot.util import ratelimit
+
+
+class TestParseRetryAfter(unittest.TestCase):
+
+    def test_seconds(self):
+        self.assertEqual(ratelimit.parse_retry_after('120', 1000), 120)
+
+    def test_http_date(self):
+        # Thu, 01 Jan 1970 00:20:00 GMT is 1200 seconds after the epoch
+        self.assertEqual(ratelimit.parse_retry_after('Thu, 01 Jan 1970 00:20:00 GMT', 1000),
+                         200)
+
+    def test_date_in_the_past(self):
+        self.assertEqual(ratelimit.parse_retry_after('Thu, 01 Jan 1970 00:00:00 GMT', 1000), 0)
+
+    def test_invalid(self):
+        self.assertIsNone(ratelimit.parse_retry_after('soon', 1000))
+        self.assertIsNone(ratelimit.parse_retry_after(None, 1000))
+
+
+class TestTokenBucket(TestReactorMixin, unittest.TestCase):
+
+    def setUp(self):
+        self.setup_test_reactor()
+
+    def test_construct_asserts(self):
+        with self.assertRaises(ValueError):
+            ratelimit.TokenBucket(self.reactor, 0, 1)
+        with self.assertRaises(ValueError):
+            ratelimit.TokenBucket(self.reactor, 1, 0)
+
+    def test_burst_then_rate(self):
+        bucket = ratelimit.TokenBucket(self.reactor, rate=2, burst=3)
+        for _ in range(3):
+            self.assertEqual(bucket.get_delay(), 0)
+            bucket.consume()
+        self.assertAlmostEqual(bucket.get_delay(), 0.5)
+        self.reactor.advance(0.5)
+        self.assertEqual(bucket.get_delay(), 0)
+
+    def test_refill_is_capped_at_burst(self):
+        bucket = ratelimit.TokenBucket(self.reactor, rate=10, burst=2)
+        bucket.consume()
+        self.reactor.advance(100)
+        bucket.get_delay()
+        self.assertEqual(bucket.tokens, 2)
+
+    def test_retry_after(self):
+        bucket = ratelimit.TokenBucket(self.reactor, rate=10, burst=10)
+        bucket.update_from_headers({'retry-after': '30'})
+        self.assertTrue(bucket.is_paused())
+        self.assertEqual(bucket.get_delay(), 30)
+        self.reactor.advance(30)
+        self.assertEqual(bucket.get_delay(), 0)
+        self.assertFalse(bucket.is_paused())
+
+    def test_ratelimit_exhausted(self):
+        self.reactor.advance(1000)
+        bucket = ratelimit.TokenBucket(self.reactor, rate=10, burst=10)
+        bucket.update_from_headers({'x-ratelimit-remaining': '0', 'x-ratelimit-reset': '1100'})
+        self.assertEqual(bucket.get_delay(), 100)
+
+    def test_ratelimit_remaining_limits_tokens(self):
+        bucket = ratelimit.TokenBucket(self.reactor, rate=1, burst=10)
+        bucket.update_from_headers({'ratelimit-remaining': '2', 'ratelimit-reset': '1100'})
+        self.assertEqual(bucket.tokens, 2)
+        self.assertFalse(bucket.is_paused())
+
+    def test_no_headers(self):
+        bucket = ratelimit.TokenBucket(self.reactor, rate=1, burst=10)
+        bucket.update_from_headers({})
+        bucket.update_from_headers(None)
+        self.assertEqual(bucket.get_delay(), 0)
+
+
+class TestCoalescingRateLimitedQueue(TestReactorMixin, unittest.TestCase):
+
+    def setUp(self):
+        self.setup_test_reactor()
+        self.queue = ratelimit.CoalescingRateLimitedQueue(self.reactor, rate=1, burst=1,
+                                                          name='status_queue')
+        self.sent = []
+        self.responses = []
+
+    def request(self, name):
+        def send():
+            self.sent.append(name)
+            if self.responses:
+                return defer.succeed(self.responses.pop(0))
+            return defer.succeed(ResponseWrapper(200, name))
+        return send
+
+    def test_sends_immediately(self):
+        d = self.queue.push('key', self.request('a'))
+        self.assertEqual(self.sent, ['a'])
+        self.assertEqual(d.result.code, 200)
+
+    def test_coalesces_while_waiting(self):
+        d1 = self.queue.push('key', self.request('a'))
+        d2 = self.queue.push('key', self.request('b'))
+        d3 = self.queue.push('other', self.request('c'))
+        d4 = self.queue.push('key', self.request('d'))
+        self.assertEqual(self.sent, ['a'])
+        self.assertIsNone(d2.result)
+
+        self.reactor.advance(1)
+        # the latest update for 'key' kept the position of the first waiting one
+        self.assertEqual(self.sent, ['a', 'd'])
+        self.reactor.advance(1)
+        self.assertEqual(self.sent, ['a', 'd', 'c'])
+        self.assertEqual(self.queue.coalesced, 1)
+        for d in (d1, d3, d4):
+            self.assertEqual(d.result.code, 200)
+
+    def test_no_key_is_never_coalesced(self):
+        self.queue.push(None, self.request('a'))
+        self.queue.push(None, self.request('b'))
+        self.queue.push(None, self.request('c'))
+        self.reactor.pump([1, 1])
+        self.assertEqual(self.sent, ['a', 'b', 'c'])
+
+    def test_retry_after(self):
+        self.responses.append(ResponseWrapper(429, '', headers={'Retry-After': '120'}))
+        d = self.queue.push('key', self.request('a'))
+        self.assertEqual(self.sent, ['a'])
+        self.assertFalse(d.called)
+
+        self.reactor.advance(119)
+        self.assertEqual(self.sent, ['a'])
+        self.reactor.advance(1)
+        self.assertEqual(self.sent, ['a', 'a'])
+        self.assertEqual(d.result.code, 200)
+
+    def test_retry_superseded(self):
+        self.responses.append(ResponseWrapper(429, '', headers={'Retry-After': '120'}))
+        d1 = self.queue.push('key', self.request('a'))
+        # the newer update replaces the retry of the rate limited one
+        d2 = self.queue.push('key', self.request('b'))
+        self.assertIsNone(d1.result)
+        self.reactor.advance(120)
+        self.assertEqual(self.sent, ['a', 'b'])
+        self.assertEqual(d2.result.code, 200)
+
+    def test_retries_are_limited(self):
+        for _ in range(3):
+            self.responses.append(ResponseWrapper(429, ''))
+        d = self.queue.push('key', self.request('a'))
+        self.reactor.pump([self.queue.DEFAULT_RETRY_AFTER] * 3)
+        self.assertEqual(self.sent, ['a', 'a', 'a'])
+        self.assertEqual(d.result.code, 429)
+
+    def test_request_failure(self):
+        def fail():
+            raise RuntimeError('oh no')
+
+        d = self.queue.push('key', fail)
+        self.assertFailure(d, RuntimeError)
+        return d
+
+    @defer.inlineCallbacks
+    def test_stop_sends_pending(self):
+        yield self.queue.startService()
+        self.queue.push('key', self.request('a'))
+        d = self.queue.push('key2', self.request('b'))
+
+        stopped = self.queue.stopService()
+        self.assertFalse(stopped.called)
+        self.reactor.advance(1)
+        yield stopped
+        self.assertEqual(self.sent, ['a', 'b'])
+        self.assertEqual(d.result.code, 200)
+
+        self.assertIsNone((yield self.queue.push('key', self.request('c'))))
+        self.assertEqual(self.sent, ['a', 'b'])
+
+    @defer.inlineCallbacks
+    def test_stop_drops_pending_after_timeout(self):
+        yield self.queue.startService()
+        self.responses.append(ResponseWrapper(429, '', headers={'Retry-After': '3600'}))
+        d1 = self.queue.push('key', self.request('a'))
+        d2 = self.queue.push('key2', self.request('b'))
+
+        with mock.patch.object(ratelimit.log, 'msg') as log_msg:
+            stopped = self.queue.stopService()
+            self.reactor.advance(self.queue.STOP_TIMEOUT)
+            yield stopped
+        self.assertEqual(self.sent, ['a'])
+        self.assertIsNone(d1.result)
+        self.assertIsNone(d2.result)
+        log_msg.assert_called_once_with(
+            "status_queue: dropping 2 pending requests on shutdown: 'key', 'key2'")
@@ -0,0 +1,67 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+
+from twisted.trial import unittest
+
+from buildbot.util.spillbuffer import SpillBuffer
+
+
+class TestSpillBuffer(unittest.TestCase):
+
+    def test_in_memory(self):
+        buf = SpillBuffer(max_memory=10)
+        buf.append('abc')
+        buf.append('')
+        buf.append('def')
+        self.assertFalse(buf.spilled)
+        self.assertEqual(len(buf), 6)
+        self.assertEqual(list(buf.chunks()), ['abc', 'def'])
+        self.assertEqual(buf.getvalue(), 'abcdef')
+        # the chunks are joined once
+        self.assertEqual(list(buf.chunks()), ['abcdef'])
+
+    def test_spilled(self):
+        buf = SpillBuffer(max_memory=10)
+        self.addCleanup(buf.close)
+        buf.append('0123456789')
+        self.assertFalse(buf.spilled)
+        buf.append('\r\né')
+        self.assertTrue(buf.spilled)
+        buf.append('end')
+        self.assertEqual(len(buf), 16)
+        self.assertEqual(buf.getvalue(), '0123456789\r\néend')
+        self.assertEqual(list(buf.chunks(size=6)), ['012345', '6789\r\n', 'éend'])
+
+        buf.append('more')
+        self.assertEqual(buf.getvalue(), '0123456789\r\néendmore')
+
+    def test_append_while_reading_chunks(self):
+        buf = SpillBuffer(max_memory=2)
+        self.addCleanup(buf.close)
+        buf.append('abcd')
+        chunks = []
+        for chunk in buf.chunks(size=2):
+            chunks.append(chunk)
+            if len(chunks) == 1:
+                buf.append('ef')
+        self.assertEqual(chunks, ['ab', 'cd', 'ef'])
+
+    def test_close(self):
+        buf = SpillBuffer(max_memory=2)
+        buf.append('abcd')
+        buf.close()
+        self.assertFalse(buf.spilled)
+        self.assertEqual(len(buf), 0)
+        self.assertEqual(buf.getvalue(), '')
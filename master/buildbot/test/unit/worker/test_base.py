@@ -634,6 +634,40 @@ class TestAbstractWorker(logging.LoggingMixin, TestReactorMixin, unittest.TestCa
         self.assertEqual(db_worker['workerinfo']['access_uri'], 'TheURI')
         self.assertEqual(db_worker['workerinfo']['version'], 'TheVersion')
 
+    @defer.inlineCallbacks
+    def test_attached_waits_for_attach_limit(self):
+        worker = yield self.createWorker()
+        yield worker.startService()
+        self.workers.attach_limit = defer.DeferredSemaphore(1)
+        yield self.workers.attach_limit.acquire()
+
+        conn = fakeprotocol.FakeConnection(worker)
+        d = worker.attached(conn)
+        self.assertFalse(d.called)
+        self.assertEqual(conn.remoteCalls, [])
+
+        self.workers.attach_limit.release()
+        yield d
+        self.assertEqual(self.botmaster.buildsStartedForWorkers, ["bot"])
+        db_worker = yield self.master.db.workers.getWorker(name="bot")
+        self.assertEqual(db_worker['connected_to'], [self.master.masterid])
+
+    @defer.inlineCallbacks
+    def test_attached_disconnected_while_waiting(self):
+        worker = yield self.createWorker()
+        yield worker.startService()
+        self.workers.attach_limit = defer.DeferredSemaphore(1)
+        yield self.workers.attach_limit.acquire()
+
+        conn = fakeprotocol.FakeConnection(worker)
+        d = worker.attached(conn)
+        conn.loseConnection()
+        self.workers.attach_limit.release()
+        with self.assertRaisesRegex(RuntimeError, "disconnected while waiting to attach"):
+            yield d
+        self.assertIsNone(worker.conn)
+        self.assertEqual(self.botmaster.buildsStartedForWorkers, [])
+
     @defer.inlineCallbacks
     def test_double_attached(self):
         worker = yield self.createWorker()
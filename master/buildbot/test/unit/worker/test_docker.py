@@ -13,6 +13,7 @@
 #
 # Copyright Buildbot Team Members
 
+import threading
 
 from twisted.internet import defer
 from twisted.trial import unittest
@@ -432,6 +433,117 @@ class TestDockerLatentWorker(unittest.TestCase, TestReactorMixin):
             image="myworker_image", hostname="myworker_hostname")
         self.assertEqual(bs.hostname, 'myworker_hostname')
 
+    @defer.inlineCallbacks
+    def test_client_shared_between_workers(self):
+        bs = yield self.setupWorker('bot', 'pass', 'tcp://1234:2375', 'busybox:latest')
+        yield bs.start_instance(self.build)
+        client = docker.Client.latest
+        yield bs.stop_instance()
+
+        bs2 = dockerworker.DockerLatentWorker('bot2', 'pass', 'tcp://1234:2375',
+                                              'busybox:latest')
+        yield bs2.setServiceParent(bs.master)
+        yield bs2.start_instance(self.build)
+        self.assertIs(docker.Client.latest, client)
+
+    @defer.inlineCallbacks
+    def test_client_per_docker_host(self):
+        bs = yield self.setupWorker('bot', 'pass',
+                                    docker_host=Interpolate('tcp://value-%(prop:builder)s'),
+                                    image='busybox:latest')
+        yield bs.start_instance(self.build)
+        client = docker.Client.latest
+        yield bs.stop_instance()
+        yield bs.start_instance(self.build2)
+        self.assertIsNot(docker.Client.latest, client)
+        self.assertEqual(docker.Client.latest.base_url, 'tcp://value-docker_worker2')
+
+    @defer.inlineCallbacks
+    def test_images_cached(self):
+        bs = yield self.setupWorker('bot', 'pass', 'tcp://1234:2375', 'busybox:latest')
+        yield bs.start_instance(self.build)
+        client = docker.Client.latest
+        self.assertEqual(client._imagesCount, 1)
+        yield bs.stop_instance()
+
+        yield bs.start_instance(self.build)
+        self.assertEqual(client._imagesCount, 1)
+        yield bs.stop_instance()
+
+        self.reactor.advance(dockerworker.DockerClientService.IMAGES_CACHE_TIMEOUT + 1)
+        yield bs.start_instance(self.build)
+        self.assertEqual(client._imagesCount, 2)
+
+    @defer.inlineCallbacks
+    def test_images_cache_invalidated_by_pull(self):
+        bs = yield self.setupWorker(
+            'bot', 'pass', 'tcp://1234:2375', 'alpine:latest', autopull=True)
+        _, name = yield bs.start_instance(self.build)
+        self.assertEqual(name, 'alpine:latest')
+        client = docker.Client.latest
+        self.assertEqual(client._pullCount, 1)
+        yield bs.stop_instance()
+
+        yield bs.start_instance(self.build)
+        self.assertEqual(client._pullCount, 1)
+
+    @defer.inlineCallbacks
+    def test_pull_in_flight_is_shared(self):
+        bs = yield self.setupWorker(
+            'bot', 'pass', 'tcp://1234:2375', 'tester:latest', autopull=True, alwaysPull=True)
+        docker_service = yield bs._getDockerService('tcp://1234:2375')
+        client = docker_service.thd_get_client()
+
+        # simulate a concurrent substantiation which already finished pulling
+        done = threading.Event()
+        done.set()
+        docker_service._pulls['tester:latest'] = done
+        docker_service.thd_pull('tester:latest')
+        self.assertEqual(client._pullCount, 0)
+
+        del docker_service._pulls['tester:latest']
+        docker_service.thd_pull('tester:latest')
+        self.assertEqual(client._pullCount, 1)
+        self.assertEqual(docker_service._pulls, {})
+
+    @defer.inlineCallbacks
+    def test_start_instance_follow_startup_logs(self):
+        bs = yield self.setupWorker('bot', 'pass', 'tcp://1234:2375', 'busybox:latest',
+                                    followStartupLogs=True)
+        docker_service = yield bs._getDockerService('tcp://1234:2375')
+        pool_calls = []
+        deferToThread = docker_service.deferToThread
+
+        def record_pool_call(f, *args, **kwargs):
+            pool_calls.append(f.__name__)
+            return deferToThread(f, *args, **kwargs)
+        self.patch(docker_service, 'deferToThread', record_pool_call)
+
+        id, _ = yield bs.start_instance(self.build)
+        self.assertEqual(docker.Client.latest.attached, [id])
+        # the logs are not followed in the thread pool shared by the workers
+        self.assertEqual(pool_calls, ['_thd_start_instance'])
+
+    @defer.inlineCallbacks
+    def test_max_docker_threads(self):
+        bs = yield self.setupWorker('bot', 'pass', 'tcp://1234:2375', 'busybox:latest',
+                                    max_docker_threads=10)
+        docker_service = yield bs._getDockerService('tcp://1234:2375')
+        self.assertEqual(docker_service._max_threads, 10)
+
+        bs2 = dockerworker.DockerLatentWorker('bot2', 'pass', 'tcp://1234:2375',
+                                              'busybox:latest')
+        yield bs2.setServiceParent(bs.master)
+        docker_service2 = yield bs2._getDockerService('tcp://1234:2375')
+        self.assertEqual(docker_service2._max_threads,
+                         dockerworker.DockerClientService.MAX_THREADS)
+
+    @defer.inlineCallbacks
+    def test_max_docker_threads_invalid(self):
+        with self.assertRaises(config.ConfigErrors):
+            yield self.setupWorker('bot', 'pass', 'tcp://1234:2375', 'busybox:latest',
+                                   max_docker_threads=0)
+
 
 class testDockerPyStreamLogs(unittest.TestCase):
 
@@ -122,3 +122,30 @@ class TestWorkerManager(TestReactorMixin, unittest.TestCase):
             return_value=defer.fail(Error()))
         yield self.assertFailure(
             self.workers.newConnection(conn, "worker"), Error)
+
+    @defer.inlineCallbacks
+    def test_newConnection_concurrent_handshakes_limited(self):
+        self.workers.attach_limit = defer.DeferredSemaphore(2)
+        pending = []
+
+        def remoteGetWorkerInfo():
+            d = defer.Deferred()
+            pending.append(d)
+            return d
+
+        results = []
+        for i in range(3):
+            conn = mock.Mock()
+            conn.remotePrint = mock.Mock(return_value=defer.succeed(None))
+            conn.remoteGetWorkerInfo = remoteGetWorkerInfo
+            results.append(self.workers.newConnection(conn, f"worker{i}"))
+
+        # the third worker waits for the handshake of one of the others to finish
+        self.assertEqual(len(pending), 2)
+        pending[0].callback({})
+        self.assertEqual(len(pending), 3)
+        pending[1].callback({})
+        pending[2].callback({})
+        accepted = yield defer.gatherResults(results)
+        self.assertEqual(accepted, [True, True, True])
+        self.assertEqual(sorted(self.workers.connections), ['worker0', 'worker1', 'worker2'])
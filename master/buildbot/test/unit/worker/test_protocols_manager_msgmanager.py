@@ -20,13 +20,18 @@ from parameterized import parameterized
 
 import mock
 
+from autobahn.websocket.compress import PerMessageDeflateOffer
+from autobahn.websocket.compress import PerMessageDeflateOfferAccept
 from autobahn.websocket.types import ConnectionDeny
 from twisted.internet import defer
 from twisted.trial import unittest
 
+from buildbot.util import eventual
 from buildbot.worker.protocols.manager.msgpack import BuildbotWebSocketServerProtocol
 from buildbot.worker.protocols.manager.msgpack import ConnectioLostError
+from buildbot.worker.protocols.manager.msgpack import Dispatcher
 from buildbot.worker.protocols.manager.msgpack import RemoteWorkerError
+from buildbot.worker.protocols.manager.msgpack import accept_compression
 from buildbot.worker.protocols.manager.msgpack import decode_http_authorization_header
 from buildbot.worker.protocols.manager.msgpack import encode_http_authorization_header
 
@@ -71,6 +76,21 @@ class TestHttpAuthorization(unittest.TestCase):
             decode_http_authorization_header(value)
 
 
+class TestCompression(unittest.TestCase):
+
+    def test_accept_compression(self):
+        offer = PerMessageDeflateOffer()
+        self.assertIsInstance(accept_compression([mock.Mock(), offer]),
+                              PerMessageDeflateOfferAccept)
+
+    def test_accept_compression_no_offer(self):
+        self.assertIsNone(accept_compression([]))
+
+    def test_dispatcher_accepts_compression(self):
+        dispatcher = Dispatcher('0', 'tcp:0')
+        self.assertIs(dispatcher.serverFactory.perMessageCompressionAccept, accept_compression)
+
+
 class TestException(Exception):
     pass
 
@@ -317,6 +337,76 @@ class TestBuildbotWebSocketServerProtocol(unittest.TestCase):
         yield self.send_msg_check_response(self.protocol, msg, expected)
         command.remote_update_msgpack.assert_called_once_with(msg['args'])
 
+    def sent_messages(self):
+        msgs = [msgpack.unpackb(call.args[0], raw=False)
+                for call in self.protocol.sendMessage.call_args_list]
+        self.protocol.sendMessage.reset_mock()
+        return msgs
+
+    @defer.inlineCallbacks
+    def test_update_stream_acked_in_batches(self):
+        yield self.connect_authenticated_worker()
+        commands = {1: mock.Mock(), 2: mock.Mock()}
+        self.protocol.command_id_to_command_map = commands
+        self.protocol.sendMessage.reset_mock()
+
+        for command_id, update_number in [(1, 0), (1, 1), (2, 0)]:
+            self.protocol.onMessage(msgpack.packb({
+                'op': 'update_stream', 'args': ['args', update_number], 'seq_number': 0,
+                'command_id': command_id, 'update_number': update_number}), True)
+        yield self.protocol._deferwaiter.wait()
+        self.assertEqual(commands[1].remote_update_msgpack.call_count, 2)
+        commands[2].remote_update_msgpack.assert_called_once_with(['args', 0])
+        # the updates do not get a response
+        self.assertEqual(self.sent_messages(), [])
+
+        yield eventual.flushEventualQueue()
+        self.assertEqual(self.sent_messages(), [
+            {'op': 'ack_updates', 'command_id': 1, 'update_number': 1, 'seq_number': 0},
+            {'op': 'ack_updates', 'command_id': 2, 'update_number': 0, 'seq_number': 1},
+        ])
+
+    @defer.inlineCallbacks
+    def test_update_stream_acked_once_processed(self):
+        yield self.connect_authenticated_worker()
+        slow_command = mock.Mock()
+        d = defer.Deferred()
+        slow_command.remote_update_msgpack.return_value = d
+        self.protocol.command_id_to_command_map = {1: slow_command, 2: mock.Mock()}
+        self.protocol.sendMessage.reset_mock()
+
+        for command_id in [1, 2]:
+            self.protocol.onMessage(msgpack.packb({
+                'op': 'update_stream', 'args': 'args', 'seq_number': 0,
+                'command_id': command_id, 'update_number': 0}), True)
+        yield eventual.flushEventualQueue()
+        self.assertEqual(self.sent_messages(), [
+            {'op': 'ack_updates', 'command_id': 2, 'update_number': 0, 'seq_number': 0},
+        ])
+
+        d.callback(None)
+        yield eventual.flushEventualQueue()
+        self.assertEqual(self.sent_messages(), [
+            {'op': 'ack_updates', 'command_id': 1, 'update_number': 0, 'seq_number': 1},
+        ])
+
+    @defer.inlineCallbacks
+    def test_update_stream_unknown_command_id(self):
+        yield self.connect_authenticated_worker()
+        self.protocol.command_id_to_command_map = {}
+        self.protocol.sendMessage.reset_mock()
+
+        with mock.patch('twisted.python.log.msg') as mock_log:
+            self.protocol.onMessage(msgpack.packb({
+                'op': 'update_stream', 'args': 'args', 'seq_number': 0,
+                'command_id': 1, 'update_number': 0}), True)
+            yield self.protocol._deferwaiter.wait()
+            mock_log.assert_any_call('Processing of an update from worker name failed: '
+                                     '\'unknown "command_id"\'')
+        # the update is acknowledged anyway, the worker would otherwise stop sending updates
+        yield eventual.flushEventualQueue()
+        self.assertEqual(len(self.sent_messages()), 1)
+
     @defer.inlineCallbacks
     def test_complete_success(self):
         yield self.connect_authenticated_worker()
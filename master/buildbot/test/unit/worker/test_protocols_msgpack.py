@@ -220,7 +220,8 @@ class TestConnection(TestReactorMixin, unittest.TestCase):
                 'newline_re': newline_re,
                 'max_line_length': 4096,
                 'buffer_timeout': 5,
-                'buffer_size': 64 * 1024
+                'buffer_size': 64 * 1024,
+                'update_window': 16
             }
         })
         self.protocol.get_message_result.reset_mock()
@@ -13,10 +13,14 @@
 #
 # Copyright Buildbot Team Members
 
+import zlib
+
 import mock
 
 from twisted.internet import defer
 from twisted.internet.address import IPv4Address
+from twisted.spread import banana
+from twisted.spread import jelly
 from twisted.spread import pb as twisted_pb
 from twisted.trial import unittest
 
@@ -398,6 +402,78 @@ class TestConnection(TestReactorMixin, unittest.TestCase):
         conn.mind.broker.transport.getPeer.return_value = IPv4Address("TCP", "ip", "port",)
         self.assertEqual(conn.get_peer(), "ip:port")
 
+    def test_perspective_negotiateCompression(self):
+        conn = pb.Connection(self.master, self.worker, self.mind)
+        self.assertEqual(conn.perspective_negotiateCompression([b'zstd', b'zlib']), 'zlib')
+        self.assertEqual(conn.compression, 'zlib')
+
+    def test_perspective_negotiateCompression_unsupported(self):
+        conn = pb.Connection(self.master, self.worker, self.mind)
+        self.assertIsNone(conn.perspective_negotiateCompression(['zstd']))
+        self.assertIsNone(conn.compression)
+
+
+class Compressor:
+
+    # the compression of the worker
+    def __init__(self):
+        self.compressor = zlib.compressobj()
+
+    def __call__(self, data):
+        return self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+
+class TestCompression(unittest.TestCase):
+
+    def test_update(self):
+        impl = mock.Mock(spec=base.RemoteCommandImpl)
+        impl.remote_update.return_value = 0
+        proxy = pb.RemoteCommand(impl)
+        compress = Compressor()
+
+        for text in ['hello\n', 'hello again\n']:
+            updates = [[{'stdout': text}, 0]]
+            data = compress(banana.encode(jelly.jelly(updates)))
+            self.assertEqual(proxy.remote_update_compressed(data), 0)
+            impl.remote_update.assert_called_with(updates)
+
+    def test_update_insecure(self):
+        proxy = pb.RemoteCommand(mock.Mock(spec=base.RemoteCommandImpl))
+        data = Compressor()(banana.encode(jelly.jelly([[{'stdout': Compressor()}, 0]])))
+        with self.assertRaises(jelly.InsecureJelly):
+            proxy.remote_update_compressed(data)
+
+    def test_write(self):
+        impl = mock.Mock(spec=base.FileWriterImpl)
+        proxy = pb.FileWriterProxy(impl)
+        compress = Compressor()
+
+        proxy.remote_write_compressed(compress(b'data' * 100))
+        impl.remote_write.assert_called_with(b'data' * 100)
+        proxy.remote_write_compressed(compress(b'data' * 100))
+        impl.remote_write.assert_called_with(b'data' * 100)
+
+    def test_write_too_large(self):
+        proxy = pb.FileWriterProxy(mock.Mock(spec=base.FileWriterImpl))
+        data = Compressor()(b'\0' * (pb.MAX_DECOMPRESSED_SIZE + 1))
+        with self.assertRaises(ValueError):
+            proxy.remote_write_compressed(data)
+
+    def test_read(self):
+        impl = mock.Mock(spec=base.FileReaderImpl)
+        proxy = pb.FileReaderProxy(impl)
+        decompressor = zlib.decompressobj()
+
+        impl.remote_read.return_value = b'data' * 100
+        data = proxy.remote_read_compressed(400)
+        impl.remote_read.assert_called_with(400)
+        self.assertEqual(decompressor.decompress(data), b'data' * 100)
+
+        # end of file
+        impl.remote_read.return_value = ''
+        data = proxy.remote_read_compressed(400)
+        self.assertEqual(decompressor.decompress(data), b'')
+
 
 class Test_wrapRemoteException(unittest.TestCase):
 
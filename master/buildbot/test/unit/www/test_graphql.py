@@ -21,6 +21,7 @@ from twisted.internet import defer
 from twisted.trial import unittest
 
 from buildbot.data import connector
+from buildbot.test.fake import endpoint
 from buildbot.test.reactor import TestReactorMixin
 from buildbot.test.util import www
 from buildbot.util import unicode2bytes
@@ -103,6 +104,17 @@ class V3RootResource(TestReactorMixin, www.WwwTestMixin, unittest.TestCase):
         )
         self.assertResult({"test": {"testid": 13, "info": "ok"}})
 
+    @defer.inlineCallbacks
+    def test_get_query_item_stale_ok(self):
+        get = mock.Mock(return_value=defer.succeed(endpoint.testData[13]))
+        self.patch(endpoint.TestEndpoint, 'get', get)
+        yield self.render_resource(
+            self.rsrc,
+            b"/?query={test(testid:13){testid, info}}",
+        )
+        self.assertResult({"test": {"testid": 13, "info": "ok"}})
+        get.assert_called_once_with(None, {'graphql': True, 'testid': 13, 'stale_ok': True})
+
     @defer.inlineCallbacks
     def test_get_query_subresource(self):
         yield self.render_resource(
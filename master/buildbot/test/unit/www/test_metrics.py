@@ -0,0 +1,152 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+
+from collections import Counter
+
+from twisted.internet import defer
+from twisted.trial import unittest
+
+from buildbot.db.pool import QueryStats
+from buildbot.process import cache
+from buildbot.process import metrics as process_metrics
+from buildbot.test.reactor import TestReactorMixin
+from buildbot.test.util import www
+from buildbot.util import bytes2unicode
+from buildbot.www import metrics
+
+
+class FakePool:
+    pool_size = 5
+    queries_in_flight = 7
+    queries_queued = 2
+
+    def __init__(self, name):
+        self.name = name
+        stats = QueryStats()
+        stats.count = 3
+        stats.total = 0.25
+        for wait, execution in ((0, 0.002), (0.5, 0.05), (0.5, 20)):
+            stats.wait.observe(wait)
+            stats.execution.observe(execution)
+        self.query_stats = {'BuildsConnectorComponent.getBuild': stats}
+
+
+class FakeMQ:
+
+    def __init__(self):
+        self.produced = Counter({'builds': 5, 'changes': 1})
+
+
+class TestMetricsWriter(unittest.TestCase):
+
+    def test_format(self):
+        writer = metrics.MetricsWriter()
+        writer.describe('a_total', 'counter', 'Some help')
+        writer.sample('a_total', 3, name='x "y"\\z\n')
+        writer.describe('a_total', 'counter', 'Some help')
+        writer.sample('b', 0.5)
+        writer.sample('c', True)
+        self.assertEqual(writer.getvalue(),
+                         '# HELP a_total Some help\n'
+                         '# TYPE a_total counter\n'
+                         'a_total{name="x \\"y\\"\\\\z\\n"} 3\n'
+                         'b 0.5\n'
+                         'c 1\n')
+
+
+class TestMetricsResource(TestReactorMixin, www.WwwTestMixin, unittest.TestCase):
+
+    def setUp(self):
+        self.setup_test_reactor()
+        self.master = self.make_master(url='h:/a/b/', metrics=True)
+
+        self.master.metrics = process_metrics.MetricLogObserver()
+        self.master.metrics.enable()
+        self.addCleanup(self.master.metrics.disable)
+
+        read_pool = FakePool('read')
+        read_pool.queries_in_flight = read_pool.queries_queued = 0
+        self.master.db.pools = [FakePool('write'), read_pool]
+        self.master.mq.impl = FakeMQ()
+        self.master.caches = cache.CacheManager()
+        self.master.caches.get_cache('Builds', None)
+
+        self.rsrc = metrics.MetricsResource(self.master)
+        self.rsrc.reconfigResource(self.master.config)
+
+    @defer.inlineCallbacks
+    def test_render(self):
+        process_metrics.MetricCountEvent.log('BotMaster.attached_workers', 2, absolute=True)
+        process_metrics.MetricTimeEvent.log('reactorDelay', 0.5)
+        process_metrics.MetricTimeEvent.log('reactorDelay', 0.25)
+        process_metrics.MetricAlarmEvent.log('gc.garbage', level=process_metrics.ALARM_WARN)
+
+        res = bytes2unicode((yield self.render_resource(self.rsrc, b'/metrics')))
+        self.assertEqual(self.request.headers[b'content-type'], [metrics.CONTENT_TYPE])
+
+        lines = res.splitlines()
+        for expected in [
+            '# TYPE buildbot_metric_count gauge',
+            'buildbot_metric_count{name="BotMaster.attached_workers"} 2',
+            '# TYPE buildbot_metric_time_seconds summary',
+            'buildbot_metric_time_seconds_count{name="reactorDelay"} 2',
+            'buildbot_metric_time_seconds_sum{name="reactorDelay"} 0.75',
+            'buildbot_metric_alarm{name="gc.garbage"} 1',
+            'buildbot_db_pool_size{pool="write"} 5',
+            'buildbot_db_pool_queries_in_flight{pool="write"} 7',
+            'buildbot_db_pool_queries_in_flight{pool="read"} 0',
+            'buildbot_db_pool_queries_queued{pool="write"} 2',
+            'buildbot_db_query_seconds_count'
+            '{pool="write",query="BuildsConnectorComponent.getBuild"} 3',
+            'buildbot_db_query_seconds_sum'
+            '{pool="write",query="BuildsConnectorComponent.getBuild"} 0.25',
+            'buildbot_db_query_seconds_count'
+            '{pool="read",query="BuildsConnectorComponent.getBuild"} 3',
+            '# TYPE buildbot_db_query_wait_seconds histogram',
+            'buildbot_db_query_wait_seconds_bucket'
+            '{le="0.001",pool="write",query="BuildsConnectorComponent.getBuild"} 1',
+            'buildbot_db_query_wait_seconds_bucket'
+            '{le="0.5",pool="write",query="BuildsConnectorComponent.getBuild"} 3',
+            'buildbot_db_query_wait_seconds_sum'
+            '{pool="write",query="BuildsConnectorComponent.getBuild"} 1.0',
+            'buildbot_db_query_execution_seconds_bucket'
+            '{le="0.0025",pool="write",query="BuildsConnectorComponent.getBuild"} 1',
+            'buildbot_db_query_execution_seconds_bucket'
+            '{le="10",pool="write",query="BuildsConnectorComponent.getBuild"} 2',
+            'buildbot_db_query_execution_seconds_bucket'
+            '{le="+Inf",pool="write",query="BuildsConnectorComponent.getBuild"} 3',
+            'buildbot_db_query_execution_seconds_count'
+            '{pool="write",query="BuildsConnectorComponent.getBuild"} 3',
+            'buildbot_mq_produced_messages_total{prefix="builds"} 5',
+            'buildbot_mq_produced_messages_total{prefix="changes"} 1',
+            'buildbot_cache_hits_total{cache="Builds"} 0',
+            'buildbot_cache_misses_total{cache="Builds"} 0',
+            'buildbot_cache_max_size{cache="Builds"} 1',
+        ]:
+            self.assertIn(expected, lines)
+
+    @defer.inlineCallbacks
+    def test_metric_events_disabled(self):
+        self.master.metrics.disable()
+        res = bytes2unicode((yield self.render_resource(self.rsrc, b'/metrics')))
+        self.assertNotIn('buildbot_metric_count', res)
+        self.assertIn('buildbot_db_pool_queries_in_flight{pool="write"} 7', res)
+
+    @defer.inlineCallbacks
+    def test_not_enabled(self):
+        self.master.config.www['metrics'] = False
+        self.rsrc.reconfigResource(self.master.config)
+        yield self.render_resource(self.rsrc, b'/metrics')
+        self.assertEqual(self.request.responseCode, 404)
@@ -542,6 +542,13 @@ class V2RootResource_REST(TestReactorMixin, www.WwwTestMixin,
         self.assertRestDetails(typeName='tests',
                                item=endpoint.testData[13])
 
+    @defer.inlineCallbacks
+    def test_api_details_stale_ok(self):
+        get = mock.Mock(return_value=defer.succeed(endpoint.testData[13]))
+        self.patch(endpoint.TestEndpoint, 'get', get)
+        yield self.render_resource(self.rsrc, b'/test/13')
+        get.assert_called_once_with(mock.ANY, {'testid': 13, 'stale_ok': True})
+
     @defer.inlineCallbacks
     def test_api_details_none(self):
         self.maxDiff = None
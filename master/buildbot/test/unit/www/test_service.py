@@ -193,9 +193,9 @@ class Test(TestReactorMixin, www.WwwTestMixin, unittest.TestCase):
         rsrc = self.svc.site.resource.getChildWithDefault(b'change_hook', mock.Mock())
         path = b'/change_hook/base'
         request = test_hooks_base._prepare_request({})
-        self.master.data.updates.addChange = mock.Mock()
+        self.master.data.updates.addChanges = mock.Mock(return_value=[1])
         yield self.render_resource(rsrc, path, request=request)
-        self.master.data.updates.addChange.assert_called()
+        self.master.data.updates.addChanges.assert_called()
 
     @defer.inlineCallbacks
     def test_setupSiteWithHookAndAuth(self):
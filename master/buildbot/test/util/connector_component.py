@@ -25,7 +25,9 @@ from buildbot.test.util import db
 
 
 class FakeDBConnector:
-    pass
+
+    def get_read_pool(self, stale_ok=False):
+        return self.pool
 
 
 class ConnectorComponentMixin(TestReactorMixin, db.RealDatabaseMixin):
@@ -180,6 +180,8 @@ class RunFakeMasterTestCase(unittest.TestCase, TestReactorMixin,
 
 class RunMasterBase(unittest.TestCase):
     proto = "null"
+    # the compression of the messages of the pb and msgpack workers
+    worker_compression = None
 
     if Worker is None:
         skip = "buildbot-worker package is not installed"
@@ -244,6 +246,10 @@ class RunMasterBase(unittest.TestCase):
             # along with the master
             worker_dir = FilePath(self.mktemp())
             worker_dir.createDirectory()
+            if self.worker_compression is not None:
+                if sandboxed_worker_path is not None:
+                    raise SkipTest('The sandboxed worker is not configured with compression')
+                worker_kwargs['compression'] = self.worker_compression
             if sandboxed_worker_path is None:
                 self.w = Worker(
                     "127.0.0.1", workerPort, "local1", "localpw", worker_dir.path,
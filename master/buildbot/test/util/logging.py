@@ -47,5 +47,7 @@ class LoggingMixin:
             self.fail(f"{repr(regexp)} matched in log output.\n{lines} ")
 
     def assertWasQuiet(self):
+        # metric events are not written to the log, so they don't count
         self.assertEqual([
-            log.textFromEventDict(event) for event in self._logEvents], [])
+            log.textFromEventDict(event) for event in self._logEvents
+            if 'metric' not in event], [])
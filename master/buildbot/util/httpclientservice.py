@@ -15,6 +15,7 @@
 
 import json as jsonmodule
 import textwrap
+from urllib.parse import urlparse
 
 from twisted.internet import defer
 from twisted.logger import Logger
@@ -24,14 +25,17 @@ from zope.interface import implementer
 
 from buildbot import config
 from buildbot.interfaces import IHttpResponse
+from buildbot.process import metrics
 from buildbot.util import service
 from buildbot.util import toJson
 from buildbot.util import unicode2bytes
 
 try:
     import txrequests
+    from requests.adapters import HTTPAdapter
 except ImportError:
     txrequests = None
+    HTTPAdapter = object
 
 try:
     import treq
@@ -61,6 +65,10 @@ class TxRequestsResponseWrapper:
     def url(self):
         return self._res.url
 
+    @property
+    def headers(self):
+        return {k.lower(): v for k, v in self._res.headers.items()}
+
 
 @implementer(IHttpResponse)
 class TreqResponseWrapper:
@@ -82,6 +90,109 @@ class TreqResponseWrapper:
     def url(self):
         return self._res.request.absoluteURI.decode()
 
+    @property
+    def headers(self):
+        return {k.decode().lower(): v[-1].decode()
+                for k, v in self._res.headers.getAllRawHeaders()}
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+
+    def __init__(self, reactor, stats):
+        super().__init__(reactor)
+        self._stats = stats
+
+    def _newConnection(self, key, endpoint):
+        self._stats.connections_created += 1
+        return super()._newConnection(key, endpoint)
+
+
+class _CountingHTTPAdapter(HTTPAdapter):
+
+    def __init__(self, stats, **kwargs):
+        # init_poolmanager is called by the constructor
+        self._stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        stats = self._stats
+
+        def counting(pool_cls):
+            class CountingPool(pool_cls):
+                def _new_conn(self):
+                    # called from the threads of txrequests, but the GIL is
+                    # good enough for a statistic
+                    stats.connections_created += 1
+                    return super()._new_conn()
+            return CountingPool
+
+        self.poolmanager.pool_classes_by_scheme = {
+            scheme: counting(pool_cls)
+            for scheme, pool_cls in self.poolmanager.pool_classes_by_scheme.items()}
+
+
+class HTTPConnectionPoolService(service.SharedService):
+    """The persistent connections to a remote host, shared by all the HTTPClientService instances
+    talking to it with the same library, whatever their headers or authentication.
+
+    Only the connections are shared: each HTTPClientService keeps its own requests session, and
+    thus its own cookies.
+
+    At most MAX_CONNECTIONS_PER_HOST requests are in flight at once, and idle connections are kept
+    alive for KEEPALIVE_TIMEOUT seconds (treq only, requests keeps them until they are closed by
+    the remote host).
+    """
+    MAX_CONNECTIONS_PER_HOST = 5
+    KEEPALIVE_TIMEOUT = 240
+
+    def __init__(self, origin, use_treq):
+        super().__init__()
+        self.origin = origin
+        self.use_treq = use_treq
+        self.adapter = None
+        self.agent = None
+        self._pool = None
+        self._semaphore = defer.DeferredSemaphore(self.MAX_CONNECTIONS_PER_HOST)
+        self.connections_created = 0
+        self._reported_connections_created = 0
+        self.metric_prefix = f'http.{urlparse(origin).netloc or origin or "default"}'
+
+    def startService(self):
+        if self.use_treq:
+            self._pool = _CountingHTTPConnectionPool(self.master.reactor, self)
+            self._pool.maxPersistentPerHost = self.MAX_CONNECTIONS_PER_HOST
+            self._pool.cachedConnectionTimeout = self.KEEPALIVE_TIMEOUT
+            self.agent = Agent(self.master.reactor, pool=self._pool)
+        else:
+            self.adapter = _CountingHTTPAdapter(self, pool_maxsize=self.MAX_CONNECTIONS_PER_HOST)
+        return super().startService()
+
+    @defer.inlineCallbacks
+    def stopService(self):
+        if self.adapter is not None:
+            self.adapter.close()
+        if self._pool is not None:
+            yield self._pool.closeCachedConnections()
+        yield super().stopService()
+
+    @defer.inlineCallbacks
+    def request(self, fn, *args, **kwargs):
+        start = self.master.reactor.seconds()
+        res = yield self._semaphore.run(fn, *args, **kwargs)
+        metrics.MetricTimeEvent.log(f'{self.metric_prefix}.request',
+                                    self.master.reactor.seconds() - start)
+
+        # a request either reused a connection or created a new one; with
+        # concurrent requests this is an approximation
+        created = self.connections_created - self._reported_connections_created
+        self._reported_connections_created = self.connections_created
+        if created:
+            metrics.MetricCountEvent.log(f'{self.metric_prefix}.connections_created', created)
+        else:
+            metrics.MetricCountEvent.log(f'{self.metric_prefix}.connections_reused', 1)
+        return res
+
 
 class HTTPClientService(service.SharedService):
     """A SharedService class that can make http requests to remote services.
@@ -107,7 +218,6 @@ class HTTPClientService(service.SharedService):
     # import buildbot.util.httpclientservice.HTTPClientService.PREFER_TREQ = True
     # We prefer at the moment keeping it simple
     PREFER_TREQ = False
-    MAX_THREADS = 5
 
     def __init__(self, base_url, auth=None, headers=None, verify=None, debug=False,
                  skipEncoding=False):
@@ -117,8 +227,9 @@ class HTTPClientService(service.SharedService):
         self._base_url = base_url
         self._auth = auth
         self._headers = headers
-        self._pool = None
+        self._connection_pool = None
         self._session = None
+        self._agent = None
         self.verify = verify
         self.debug = debug
         self.skipEncoding = skipEncoding
@@ -137,13 +248,14 @@ class HTTPClientService(service.SharedService):
             config.error(f"neither txrequests nor treq is installed, but {from_module} is "
                          f"requiring it\n\n{HTTPClientService.TREQ_PROS_AND_CONS}")
 
+    @defer.inlineCallbacks
     def startService(self):
         # treq only supports basicauth, so we force txrequests if the auth is
         # something else
         if self._auth is not None and not isinstance(self._auth, tuple):
             self.PREFER_TREQ = False
         if txrequests is not None and not self.PREFER_TREQ:
-            self._session = txrequests.Session()
+            use_treq = False
             self._doRequest = self._doTxRequest
         elif treq is None:
             raise ImportError("{classname} requires either txrequest or treq install."
@@ -151,18 +263,29 @@ class HTTPClientService(service.SharedService):
                               " to properly alert the user.".format(
                                   classname=self.__class__.__name__))
         else:
+            use_treq = True
             self._doRequest = self._doTReq
-            self._pool = HTTPConnectionPool(self.master.reactor)
-            self._pool.maxPersistentPerHost = self.MAX_THREADS
-            self._agent = Agent(self.master.reactor, pool=self._pool)
-        return super().startService()
+
+        url = urlparse(self._base_url)
+        origin = f'{url.scheme}://{url.netloc}' if url.netloc else self._base_url
+        self._connection_pool = yield HTTPConnectionPoolService.getService(
+            self.master, origin, use_treq)
+        if use_treq:
+            self._agent = self._connection_pool.agent
+        else:
+            self._session = txrequests.Session(
+                maxthreads=HTTPConnectionPoolService.MAX_CONNECTIONS_PER_HOST)
+            self._session.mount('http://', self._connection_pool.adapter)
+            self._session.mount('https://', self._connection_pool.adapter)
+        yield super().startService()
 
     @defer.inlineCallbacks
     def stopService(self):
         if self._session:
+            # the adapter is shared with the other clients of the host: only stop the threads
+            self._session.adapters.clear()
             yield self._session.close()
-        if self._pool:
-            yield self._pool.closeCachedConnections()
+            self._session = None
         yield super().stopService()
 
     def _prepareRequest(self, ep, kwargs):
@@ -209,7 +332,7 @@ class HTTPClientService(service.SharedService):
         if self.verify is False:
             kwargs['verify'] = False
 
-        res = yield self._session.request(method, url, **kwargs)
+        res = yield self._connection_pool.request(self._session.request, method, url, **kwargs)
         return IHttpResponse(TxRequestsResponseWrapper(res))
 
     @defer.inlineCallbacks
@@ -220,7 +343,7 @@ class HTTPClientService(service.SharedService):
                              for k, v in kwargs['headers'].items()}
         kwargs['agent'] = self._agent
 
-        res = yield getattr(treq, method)(url, **kwargs)
+        res = yield self._connection_pool.request(getattr(treq, method), url, **kwargs)
         return IHttpResponse(TreqResponseWrapper(res))
 
     # lets be nice to the auto completers, and don't generate that code
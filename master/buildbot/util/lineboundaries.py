@@ -64,7 +64,10 @@ class LineBoundaryFinder:
                 return result
             text = self.partialLine + text
             self.partialLine = None
-        text = self.newline_re.sub('\n', text)
+        # most output has none of the sequences converted to newlines, it is not worth running
+        # the regexp on it
+        if '\r' in text or '\033' in text or '\x08' in text:
+            text = self.newline_re.sub('\n', text)
         if text:
             if text[-1] != '\n':
                 i = text.rfind('\n')
@@ -78,3 +78,4 @@ class Matcher:
         for k, v in self.iterPatterns():
             length = len(k)
             self._by_length.setdefault(length, {})[k] = v
+        self._dirty = False
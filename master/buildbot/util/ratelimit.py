@@ -0,0 +1,290 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+
+import collections
+import email.utils
+
+from twisted.internet import defer
+from twisted.python import log
+
+from buildbot.util import Notifier
+from buildbot.util import service
+
+
+def parse_retry_after(value, now):
+    """ Returns the number of seconds to wait according to a ``Retry-After`` header value, which
+        is either a number of seconds or a HTTP date. Returns None if the value can't be parsed.
+    """
+    if value is None:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when is None:
+        return None
+    return max(0.0, when.timestamp() - now)
+
+
+class TokenBucket:
+    """ A token bucket that allows ``burst`` requests at once and then ``rate`` requests per
+        second. The bucket can also be paused until a given time, e.g. because the remote side
+        asked us to back off.
+    """
+
+    def __init__(self, reactor, rate, burst):
+        if rate <= 0:
+            raise ValueError('rate must be positive')
+        if burst < 1:
+            raise ValueError('burst must be at least 1')
+
+        self.reactor = reactor
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.paused_until = None
+        self._last_refill = reactor.seconds()
+
+    def _refill(self):
+        now = self.reactor.seconds()
+        self.tokens = min(self.burst, self.tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+        return now
+
+    def get_delay(self):
+        """ Returns the number of seconds to wait before a token can be consumed """
+        now = self._refill()
+        delay = 0
+        if self.paused_until is not None:
+            if self.paused_until > now:
+                delay = self.paused_until - now
+            else:
+                self.paused_until = None
+        if self.tokens < 1:
+            delay = max(delay, (1 - self.tokens) / self.rate)
+        return delay
+
+    def consume(self):
+        self._refill()
+        self.tokens -= 1
+
+    def pause_until(self, when):
+        if self.paused_until is None or when > self.paused_until:
+            self.paused_until = when
+
+    def is_paused(self):
+        return self.paused_until is not None and self.paused_until > self.reactor.seconds()
+
+    def update_from_headers(self, headers):
+        """ Updates the state of the bucket according to the rate limiting headers of a response.
+
+            ``Retry-After`` pauses the bucket for the given amount of time. The
+            ``X-RateLimit-Remaining`` and ``X-RateLimit-Reset`` pair (or ``RateLimit-*`` as sent by
+            GitLab) limits the number of available tokens to the remaining quota and pauses the
+            bucket until the reset time once the quota is exhausted.
+        """
+        if not headers:
+            return
+        now = self._refill()
+
+        retry_after = parse_retry_after(headers.get('retry-after'), now)
+        if retry_after is not None:
+            self.pause_until(now + retry_after)
+
+        for prefix in ('x-ratelimit-', 'ratelimit-'):
+            remaining = headers.get(prefix + 'remaining')
+            if remaining is not None:
+                break
+        else:
+            return
+
+        try:
+            remaining = int(remaining)
+        except ValueError:
+            return
+        self.tokens = min(self.tokens, remaining)
+
+        if remaining > 0:
+            return
+        try:
+            reset = float(headers.get(prefix + 'reset'))
+        except (TypeError, ValueError):
+            return
+        self.pause_until(reset)
+
+
+class _QueueEntry:
+    __slots__ = ['request', 'deferred', 'retries']
+
+    def __init__(self, request):
+        self.request = request
+        self.deferred = defer.Deferred()
+        self.retries = 0
+
+
+class CoalescingRateLimitedQueue(service.AsyncService):
+    """ Sends HTTP requests one at a time through a token bucket.
+
+        Requests are identified by a key. While a request waits in the queue, pushing another
+        request with the same key replaces it, so that only the latest one is sent. The
+        rate limiting headers of each response are fed to the token bucket and rate limited
+        requests are retried up to ``max_retries`` times unless superseded in the meantime.
+    """
+
+    DEFAULT_RETRY_AFTER = 60
+    # seconds given to the pending requests to be sent when the service stops
+    STOP_TIMEOUT = 30
+
+    def __init__(self, reactor, rate, burst, max_retries=2, name=None):
+        super().__init__()
+        if name is not None:
+            self.name = name
+        self._bucket = TokenBucket(reactor, rate, burst)
+        self._reactor = reactor
+        self._max_retries = max_retries
+        self._pending = collections.OrderedDict()
+        self._processing = False
+        self._stopping = False
+        self._stopped = False
+        self._idle_notifier = Notifier()
+        self._wait_call = None
+        self._wait_deferred = None
+        self.coalesced = 0
+
+    def push(self, key, request):
+        """ Queues ``request``, a callable returning a Deferred with the response.
+
+            Returns a Deferred that fires with the response, or with None if the request has been
+            superseded by a newer one with the same key or dropped because the queue stopped. A
+            key of None is never coalesced.
+        """
+        if self._stopping or self._stopped:
+            self._log_dropped([key])
+            return defer.succeed(None)
+        if key is None:
+            key = object()
+
+        entry = _QueueEntry(request)
+        previous = self._pending.get(key)
+        # the new entry takes the place of the old one so that frequently updated keys don't
+        # starve
+        self._pending[key] = entry
+        if previous is not None:
+            self.coalesced += 1
+            previous.deferred.callback(None)
+
+        if not self._processing:
+            self._process()
+        return entry.deferred
+
+    def _is_rate_limited(self, response):
+        code = getattr(response, 'code', None)
+        if code == 429:
+            return True
+        if code == 403:
+            headers = getattr(response, 'headers', None) or {}
+            return (headers.get('x-ratelimit-remaining') == '0' or
+                    'retry-after' in headers)
+        return False
+
+    def _wait(self, delay):
+        self._wait_deferred = defer.Deferred()
+        self._wait_call = self._reactor.callLater(delay, self._wait_deferred.callback, None)
+        return self._wait_deferred
+
+    @defer.inlineCallbacks
+    def _process(self):
+        self._processing = True
+        try:
+            while self._pending and not self._stopping:
+                delay = self._bucket.get_delay()
+                if delay > 0:
+                    yield self._wait(delay)
+                    self._wait_call = self._wait_deferred = None
+                    continue
+
+                key, entry = self._pending.popitem(last=False)
+                self._bucket.consume()
+                try:
+                    response = yield entry.request()
+                except Exception:
+                    entry.deferred.errback()
+                    continue
+
+                self._bucket.update_from_headers(getattr(response, 'headers', None))
+
+                if (self._is_rate_limited(response) and entry.retries < self._max_retries and
+                        key not in self._pending and not self._stopping):
+                    if not self._bucket.is_paused():
+                        self._bucket.pause_until(self._reactor.seconds() +
+                                                 self.DEFAULT_RETRY_AFTER)
+                    entry.retries += 1
+                    self._pending[key] = entry
+                    self._pending.move_to_end(key, last=False)
+                    continue
+
+                entry.deferred.callback(response)
+        finally:
+            self._processing = False
+            self._idle_notifier.notify(None)
+
+    def _log_dropped(self, keys):
+        # keys of None are replaced by plain objects, which say nothing about the request
+        names = ', '.join(repr(key) for key in keys if key is not None and type(key) is not object)
+        log.msg(f'{self.name}: dropping {len(keys)} pending requests on shutdown'
+                + (f': {names}' if names else ''))
+
+    def _drop_pending(self):
+        self._stopping = True
+
+        pending = list(self._pending.items())
+        self._pending.clear()
+        if pending:
+            self._log_dropped([key for key, _ in pending])
+        for _, entry in pending:
+            entry.deferred.callback(None)
+
+        if self._wait_call is not None and self._wait_call.active():
+            self._wait_call.cancel()
+            self._wait_deferred.callback(None)
+
+    def startService(self):
+        self._stopping = False
+        self._stopped = False
+        return super().startService()
+
+    @defer.inlineCallbacks
+    def drain(self):
+        """
+        Wait until the pending requests have been sent, for up to STOP_TIMEOUT seconds, after
+        which the remaining ones are dropped.  Called on stop, so that e.g. the final status of a
+        build is not lost on reconfig or shutdown.
+        """
+        if self._processing:
+            timeout = self._reactor.callLater(self.STOP_TIMEOUT, self._drop_pending)
+            yield self._idle_notifier.wait()
+            if timeout.active():
+                timeout.cancel()
+
+    @defer.inlineCallbacks
+    def stopService(self):
+        yield self.drain()
+        self._stopped = True
+        yield super().stopService()
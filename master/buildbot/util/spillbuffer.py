@@ -0,0 +1,88 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+
+import tempfile
+
+
+class SpillBuffer:
+    """ Accumulates text in a list of chunks, which are moved to a temporary file once they are
+        larger than ``max_memory`` characters.  This bounds the memory used to collect the output
+        of a command, and avoids copying the whole text each time it grows.
+
+        The memory is only bounded while the text is accumulated: ``getvalue()`` still builds the
+        whole text, while ``chunks()`` reads it back piece by piece.  The owner of the buffer must
+        call ``close()`` once the text has been read, which deletes the temporary file.
+    """
+
+    def __init__(self, max_memory=1024 * 1024):
+        self.max_memory = max_memory
+        self._chunks = []
+        self._length = 0
+        self._file = None
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def spilled(self):
+        return self._file is not None
+
+    def append(self, text):
+        if not text:
+            return
+        self._length += len(text)
+        if self._file is not None:
+            self._file.write(text)
+            return
+        self._chunks.append(text)
+        if self._length > self.max_memory:
+            # newline='' keeps the text exactly as it was appended
+            self._file = tempfile.TemporaryFile(mode='w+', encoding='utf-8', newline='')
+            self._file.writelines(self._chunks)
+            self._chunks = []
+
+    def chunks(self, size=64 * 1024):
+        """ Yields the text of the buffer in chunks of at most ``size`` characters if it was moved
+            to the temporary file, or in the chunks it was appended otherwise.
+        """
+        if self._file is None:
+            yield from list(self._chunks)
+            return
+        self._file.flush()
+        position = 0
+        while True:
+            # the buffer can be appended to between two chunks, which writes at the end of the
+            # file
+            self._file.seek(position)
+            chunk = self._file.read(size)
+            position = self._file.tell()
+            self._file.seek(0, 2)
+            if not chunk:
+                return
+            yield chunk
+
+    def getvalue(self):
+        if self._file is None:
+            value = ''.join(self._chunks)
+            self._chunks = [value] if value else []
+            return value
+        return ''.join(self.chunks())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._chunks = []
+        self._length = 0
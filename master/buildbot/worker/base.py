@@ -441,6 +441,15 @@ class AbstractWorker(service.BuildbotService):
         # The _detach_sub member is only ever used from tests.
         self._detached_sub = self.conn.notifyOnDisconnect(self.detached)
 
+        # when many workers connect at the same time, e.g. after a restart of the master, only a
+        # few of them go through the rest of the handshake at once
+        yield self.master.workers.attach_limit.run(self._finishAttach, conn)
+
+    @defer.inlineCallbacks
+    def _finishAttach(self, conn):
+        if self.conn is not conn:
+            raise RuntimeError(f"{self.name}: disconnected while waiting to attach")
+
         workerinfo = {
             'admin': conn.info.get('admin'),
             'host': conn.info.get('host'),
@@ -17,15 +17,18 @@
 import hashlib
 import json
 import socket
+import threading
 from io import BytesIO
 
 from twisted.internet import defer
 from twisted.internet import threads
 from twisted.python import log
+from twisted.python import threadpool
 
 from buildbot import config
 from buildbot.interfaces import LatentWorkerCannotSubstantiate
 from buildbot.interfaces import LatentWorkerFailedToSubstantiate
+from buildbot.util import service
 from buildbot.util import unicode2bytes
 from buildbot.util.latent import CompatibleLatentWorkerMixin
 from buildbot.worker import AbstractLatentWorker
@@ -60,6 +63,129 @@ def _handle_stream_line(line):
             yield streamline
 
 
+class DockerClientService(service.SharedService):
+    """A SharedService that owns the docker client for a given docker host.
+
+    All the DockerLatentWorker instances talking to the same docker host share
+    a single client and a bounded thread pool, so that a burst of
+    substantiations does not exhaust the reactor thread pool. The list of
+    images present on the host is cached, and concurrent pulls of the same
+    image are coalesced into a single pull.
+    """
+    # the default size of the thread pool, see the max_docker_threads
+    # parameter of DockerLatentWorker
+    MAX_THREADS = 5
+    IMAGES_CACHE_TIMEOUT = 60
+
+    def __init__(self, client_args, max_threads=None):
+        super().__init__()
+        self._client_args = client_args
+        self._max_threads = max_threads or self.MAX_THREADS
+        self._client = None
+        self._pool = None
+        self._lock = threading.Lock()
+        self._images = None
+        self._images_timestamp = None
+        self._pulls = {}
+
+    def startService(self):
+        self._pool = threadpool.ThreadPool(minthreads=0, maxthreads=self._max_threads,
+                                           name=f'DockerClientService-{self.base_url}')
+        self._pool.start()
+        return super().startService()
+
+    @defer.inlineCallbacks
+    def stopService(self):
+        yield super().stopService()
+        if self._pool is not None:
+            yield self.deferToThread(self._thd_close)
+            self._pool.stop()
+            self._pool = None
+
+    @property
+    def base_url(self):
+        return self._client_args.get('base_url')
+
+    def deferToThread(self, f, *args, **kwargs):
+        return threads.deferToThreadPool(self.master.reactor, self._pool, f, *args, **kwargs)
+
+    def thd_get_client(self):
+        with self._lock:
+            if self._client is None:
+                if 1.0 <= docker_py_version < 2.0:
+                    self._client = client.Client(**self._client_args)
+                else:
+                    self._client = client.APIClient(**self._client_args)
+            return self._client
+
+    def _thd_close(self):
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+    def _thd_refresh_images(self, docker_client):
+        tags = set()
+        for image in docker_client.images():
+            tags.update(image['RepoTags'] or [])
+        with self._lock:
+            self._images = tags
+            self._images_timestamp = self.master.reactor.seconds()
+        return tags
+
+    def _thd_get_cached_images(self):
+        with self._lock:
+            if self._images is None:
+                return None
+            if self.master.reactor.seconds() - self._images_timestamp > \
+                    self.IMAGES_CACHE_TIMEOUT:
+                return None
+            return self._images
+
+    @staticmethod
+    def _image_in_tags(name, tags):
+        for tag in tags:
+            if ':' in name and tag == name:
+                return True
+            if tag.startswith(name + ':'):
+                return True
+        return False
+
+    def thd_image_exists(self, name):
+        # only positive answers are served from the cache, a missing image is
+        # always checked against the docker host
+        tags = self._thd_get_cached_images()
+        if tags is not None and self._image_in_tags(name, tags):
+            return True
+        tags = self._thd_refresh_images(self.thd_get_client())
+        return self._image_in_tags(name, tags)
+
+    def thd_invalidate_images(self):
+        with self._lock:
+            self._images = None
+            self._images_timestamp = None
+
+    def thd_pull(self, image):
+        # Only one pull of a given image is in flight at any time; concurrent
+        # callers wait for it to finish instead of starting their own.
+        with self._lock:
+            done = self._pulls.get(image)
+            owner = done is None
+            if owner:
+                done = self._pulls[image] = threading.Event()
+        if not owner:
+            done.wait()
+            return
+        try:
+            self.thd_get_client().pull(image)
+        finally:
+            with self._lock:
+                del self._pulls[image]
+                self._images = None
+                self._images_timestamp = None
+            done.set()
+
+
 class DockerBaseWorker(AbstractLatentWorker):
 
     def checkConfig(self, name, password=None, image=None,
@@ -128,13 +254,14 @@ class DockerBaseWorker(AbstractLatentWorker):
 class DockerLatentWorker(CompatibleLatentWorkerMixin,
                          DockerBaseWorker):
     instance = None
+    _docker_service = None
 
     def checkConfig(self, name, password, docker_host, image=None,
                     command=None, volumes=None, dockerfile=None, version=None,
                     tls=None, followStartupLogs=False, masterFQDN=None,
                     hostconfig=None, autopull=False, alwaysPull=False,
                     custom_context=False, encoding='gzip', buildargs=None,
-                    hostname=None, **kwargs):
+                    hostname=None, max_docker_threads=None, **kwargs):
 
         super().checkConfig(name, password, image, masterFQDN, **kwargs)
 
@@ -144,6 +271,10 @@ class DockerLatentWorker(CompatibleLatentWorkerMixin,
         if not image and not dockerfile:
             config.error("DockerLatentWorker: You need to specify at least"
                          " an image name, or a dockerfile")
+        if max_docker_threads is not None and \
+                (not isinstance(max_docker_threads, int) or max_docker_threads < 1):
+            config.error("DockerLatentWorker: max_docker_threads must be a strictly"
+                         " positive integer")
 
         # Following block is only for checking config errors,
         # actual parsing happens in self.parse_volumes()
@@ -168,7 +299,7 @@ class DockerLatentWorker(CompatibleLatentWorkerMixin,
                         masterFQDN=None, hostconfig=None, autopull=False,
                         alwaysPull=False, custom_context=False,
                         encoding='gzip', target="", buildargs=None,
-                        hostname=None, **kwargs):
+                        hostname=None, max_docker_threads=None, **kwargs):
 
         yield super().reconfigService(name, password, image, masterFQDN, **kwargs)
         self.docker_host = docker_host
@@ -192,6 +323,7 @@ class DockerLatentWorker(CompatibleLatentWorkerMixin,
         if tls is not None:
             self.client_args['tls'] = tls
         self.hostname = hostname
+        self.max_docker_threads = max_docker_threads
 
     def _thd_parse_volumes(self, volumes):
         volume_list = []
@@ -209,12 +341,11 @@ class DockerLatentWorker(CompatibleLatentWorkerMixin,
             volume_list.append(volume)
         return volume_list, volumes
 
-    def _getDockerClient(self, client_args):
-        if 1.0 <= docker_py_version < 2.0:
-            docker_client = client.Client(**client_args)
-        else:
-            docker_client = client.APIClient(**client_args)
-        return docker_client
+    def _getDockerService(self, docker_host):
+        client_args = self.client_args.copy()
+        client_args['base_url'] = docker_host
+        return DockerClientService.getService(self.master, client_args,
+                                              self.max_docker_threads)
 
     def renderWorkerProps(self, build):
         return build.render((self.docker_host, self.image, self.dockerfile,
@@ -230,27 +361,21 @@ class DockerLatentWorker(CompatibleLatentWorkerMixin,
             encoding, target, buildargs, \
             hostname = yield self.renderWorkerPropsOnStart(build)
 
-        res = yield threads.deferToThread(self._thd_start_instance, docker_host, image,
-                                          dockerfile, volumes, hostconfig, custom_context,
-                                          encoding, target, buildargs, hostname)
+        docker_service = yield self._getDockerService(docker_host)
+        res = yield docker_service.deferToThread(self._thd_start_instance, docker_service,
+                                                 image, dockerfile, volumes, hostconfig,
+                                                 custom_context, encoding, target, buildargs,
+                                                 hostname)
+        if self.followStartupLogs:
+            # this lasts until the worker connects: do not hold a thread of the
+            # pool shared by all the workers of the docker host meanwhile
+            yield threads.deferToThread(self._thd_follow_startup_logs,
+                                        docker_service.thd_get_client(), res[0])
         return res
 
-    def _image_exists(self, client, name):
-        # Make sure the image exists
-        for image in client.images():
-            for tag in image['RepoTags'] or []:
-                if ':' in name and tag == name:
-                    return True
-                if tag.startswith(name + ':'):
-                    return True
-        return False
-
-    def _thd_start_instance(self, docker_host, image, dockerfile, volumes, host_config,
+    def _thd_start_instance(self, docker_service, image, dockerfile, volumes, host_config,
                             custom_context, encoding, target, buildargs, hostname):
-        curr_client_args = self.client_args.copy()
-        curr_client_args['base_url'] = docker_host
-
-        docker_client = self._getDockerClient(curr_client_args)
+        docker_client = docker_service.thd_get_client()
         container_name = self.getContainerName()
         # cleanup the old instances
         instances = docker_client.containers(
@@ -267,7 +392,7 @@ class DockerLatentWorker(CompatibleLatentWorkerMixin,
 
         found = False
         if image is not None:
-            found = self._image_exists(docker_client, image)
+            found = docker_service.thd_image_exists(image)
         else:
             image = f'{self.workername}_{id(self)}_image'
         if (not found) and (dockerfile is not None):
@@ -289,17 +414,17 @@ class DockerLatentWorker(CompatibleLatentWorkerMixin,
             for line in lines:
                 for streamline in _handle_stream_line(line):
                     log.msg(streamline)
+            docker_service.thd_invalidate_images()
 
-        imageExists = self._image_exists(docker_client, image)
+        imageExists = docker_service.thd_image_exists(image)
         if ((not imageExists) or self.alwaysPull) and self.autopull:
             if not imageExists:
                 log.msg(f"Image '{image}' not found, pulling from registry")
-            docker_client.pull(image)
+            docker_service.thd_pull(image)
 
-        if not self._image_exists(docker_client, image):
+        if not docker_service.thd_image_exists(image):
             msg = f'Image "{image}" not found on docker host.'
             log.msg(msg)
-            docker_client.close()
             raise LatentWorkerCannotSubstantiate(msg)
 
         volumes, binds = self._thd_parse_volumes(volumes)
@@ -320,7 +445,6 @@ class DockerLatentWorker(CompatibleLatentWorkerMixin,
 
         if instance.get('Id') is None:
             log.msg('Failed to create the container')
-            docker_client.close()
             raise LatentWorkerFailedToSubstantiate(
                 'Failed to start container'
             )
@@ -328,12 +452,11 @@ class DockerLatentWorker(CompatibleLatentWorkerMixin,
         log.msg(f'Container created, Id: {shortid}...')
         instance['image'] = image
         self.instance = instance
-        self._curr_client_args = curr_client_args
+        self._docker_service = docker_service
 
         try:
             docker_client.start(instance)
         except docker.errors.APIError as e:
-            docker_client.close()
             # The following was noticed in certain usage of Docker on Windows
             if 'The container operating system does not match the host operating system' in str(e):
                 msg = f'Image used for build is wrong: {str(e)}'
@@ -341,17 +464,18 @@ class DockerLatentWorker(CompatibleLatentWorkerMixin,
             raise
 
         log.msg('Container started')
-        if self.followStartupLogs:
-            logs = docker_client.attach(
-                container=instance, stdout=True, stderr=True, stream=True)
-            for line in logs:
-                log.msg(f"docker VM {shortid}: {line.strip()}")
-                if self.conn:
-                    break
-            del logs
-        docker_client.close()
         return [instance['Id'], image]
 
+    def _thd_follow_startup_logs(self, docker_client, container_id):
+        shortid = container_id[:6]
+        logs = docker_client.attach(
+            container=container_id, stdout=True, stderr=True, stream=True)
+        for line in logs:
+            log.msg(f"docker VM {shortid}: {line.strip()}")
+            if self.conn:
+                break
+        del logs
+
     def stop_instance(self, fast=False):
         if self.instance is None:
             # be gentle. Something may just be trying to alert us that an
@@ -360,14 +484,15 @@ class DockerLatentWorker(CompatibleLatentWorkerMixin,
             return defer.succeed(None)
         instance = self.instance
         self.instance = None
-        curr_client_args = self._curr_client_args
-        self._curr_client_args = None
+        docker_service = self._docker_service
+        self._docker_service = None
 
         self.resetWorkerPropsOnStop()
-        return threads.deferToThread(self._thd_stop_instance, instance, curr_client_args, fast)
+        return docker_service.deferToThread(self._thd_stop_instance, instance, docker_service,
+                                            fast)
 
-    def _thd_stop_instance(self, instance, curr_client_args, fast):
-        docker_client = self._getDockerClient(curr_client_args)
+    def _thd_stop_instance(self, instance, docker_service, fast):
+        docker_client = docker_service.thd_get_client()
         log.msg(f"Stopping container {instance['Id'][:6]}...")
         docker_client.stop(instance['Id'])
         if not fast:
@@ -378,4 +503,4 @@ class DockerLatentWorker(CompatibleLatentWorkerMixin,
                 docker_client.remove_image(image=instance['image'])
             except docker.errors.APIError as e:
                 log.msg('Error while removing the image: %s', e)
-        docker_client.close()
+            docker_service.thd_invalidate_images()
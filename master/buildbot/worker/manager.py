@@ -76,6 +76,8 @@ class WorkerManager(MeasuredBuildbotServiceManager):
 
     config_attr = "workers"
     PING_TIMEOUT = 10
+    # maximum number of workers going through the attach handshake at the same time
+    MAX_CONCURRENT_ATTACHES = 20
     reconfig_priority = 127
 
     def __init__(self, master):
@@ -90,6 +92,8 @@ class WorkerManager(MeasuredBuildbotServiceManager):
         # connection objects keyed by worker name
         self.connections = {}
 
+        self.attach_limit = defer.DeferredSemaphore(self.MAX_CONCURRENT_ATTACHES)
+
     @property
     def workers(self):
         # self.workers contains a ready Worker instance for each
@@ -139,8 +143,7 @@ class WorkerManager(MeasuredBuildbotServiceManager):
             log.msg(f"Old connection for '{workerName}' was lost, accepting new")
 
         try:
-            yield conn.remotePrint(message="attached")
-            info = yield conn.remoteGetWorkerInfo()
+            info = yield self.attach_limit.run(self._getWorkerInfo, conn)
             log.msg(f"Got workerinfo from '{workerName}'")
         except Exception as e:
             log.msg(f"Failed to communicate with worker '{workerName}'\n{e}".format(workerName, e))
@@ -155,3 +158,9 @@ class WorkerManager(MeasuredBuildbotServiceManager):
 
         # accept the connection
         return True
+
+    @defer.inlineCallbacks
+    def _getWorkerInfo(self, conn):
+        yield conn.remotePrint(message="attached")
+        info = yield conn.remoteGetWorkerInfo()
+        return info
@@ -20,6 +20,8 @@ import msgpack
 
 from autobahn.twisted.websocket import WebSocketServerFactory
 from autobahn.twisted.websocket import WebSocketServerProtocol
+from autobahn.websocket.compress import PerMessageDeflateOffer
+from autobahn.websocket.compress import PerMessageDeflateOfferAccept
 from autobahn.websocket.types import ConnectionDeny
 from twisted.internet import defer
 from twisted.python import log
@@ -57,8 +59,19 @@ def encode_http_authorization_header(name, password):
     return 'Basic ' + base64.b64encode(userpass).decode()
 
 
+def accept_compression(offers):
+    # workers configured to compress their messages offer the permessage-deflate extension;
+    # the messages in both directions are then compressed with a zlib stream kept for the
+    # whole connection
+    for offer in offers:
+        if isinstance(offer, PerMessageDeflateOffer):
+            return PerMessageDeflateOfferAccept(offer)
+    return None
+
+
 class BuildbotWebSocketServerProtocol(WebSocketServerProtocol):
     debug = True
+    closed = False
 
     def __init__(self):
         super().__init__()
@@ -78,6 +91,8 @@ class BuildbotWebSocketServerProtocol(WebSocketServerProtocol):
             log.msg("WebSocket connection open.")
         self.seq_number = 0
         self.command_id_to_command_map = {}
+        # command id -> number of the last update processed and not yet acknowledged
+        self._updates_to_ack = {}
         self.command_id_to_reader_map = {}
         self.command_id_to_writer_map = {}
         yield self.initialize()
@@ -99,10 +114,17 @@ class BuildbotWebSocketServerProtocol(WebSocketServerProtocol):
     def initialize(self):
         try:
             dispatcher = self.get_dispatcher()
+            # as for PB, the lock is only held to find the worker: the attach handshakes of the
+            # workers connecting at the same time run concurrently
             yield dispatcher.master.initLock.acquire()
-
-            if self.worker_name in dispatcher.users:
-                _, afactory = dispatcher.users[self.worker_name]
+            try:
+                afactory = None
+                if self.worker_name in dispatcher.users:
+                    _, afactory = dispatcher.users[self.worker_name]
+            finally:
+                eventually(dispatcher.master.initLock.release)
+
+            if afactory is not None:
                 self.connection = yield afactory(self, self.worker_name)
                 yield self.connection.attached(self)
             else:
@@ -110,8 +132,6 @@ class BuildbotWebSocketServerProtocol(WebSocketServerProtocol):
         except Exception as e:
             log.msg(f"Connection opening failed: {e}")
             self.sendClose()
-        finally:
-            eventually(dispatcher.master.initLock.release)
 
     @defer.inlineCallbacks
     def call_update(self, msg):
@@ -131,6 +151,38 @@ class BuildbotWebSocketServerProtocol(WebSocketServerProtocol):
 
         self.send_response_msg(msg, result, is_exception)
 
+    @defer.inlineCallbacks
+    def call_update_stream(self, msg):
+        # the updates of the commands are acknowledged in batches, once they are processed: the
+        # worker limits the number of updates of each command that are not acknowledged, which
+        # slows down the commands whose output can not be processed fast enough without
+        # delaying the others
+        try:
+            self.contains_msg_key(msg, ('command_id', 'update_number', 'args'))
+
+            if msg['command_id'] not in self.command_id_to_command_map:
+                raise KeyError('unknown "command_id"')
+
+            command = self.command_id_to_command_map[msg['command_id']]
+            yield command.remote_update_msgpack(msg['args'])
+        except Exception as e:
+            log.msg(f'Processing of an update from worker {self.worker_name} failed: {e}')
+
+        if 'command_id' in msg and 'update_number' in msg:
+            if not self._updates_to_ack:
+                eventually(self.send_update_acks)
+            update_number = self._updates_to_ack.get(msg['command_id'], -1)
+            self._updates_to_ack[msg['command_id']] = max(update_number, msg['update_number'])
+
+    def send_update_acks(self):
+        updates_to_ack = self._updates_to_ack
+        self._updates_to_ack = {}
+        if self.closed:
+            return
+        for command_id, update_number in updates_to_ack.items():
+            self.send_message({'op': 'ack_updates', 'command_id': command_id,
+                               'update_number': update_number})
+
     @defer.inlineCallbacks
     def call_complete(self, msg):
         result = None
@@ -306,6 +358,8 @@ class BuildbotWebSocketServerProtocol(WebSocketServerProtocol):
 
         if msg['op'] == "update":
             self._deferwaiter.add(self.call_update(msg))
+        elif msg['op'] == "update_stream":
+            self._deferwaiter.add(self.call_update_stream(msg))
         elif msg['op'] == "update_upload_file_write":
             self._deferwaiter.add(self.call_update_upload_file_write(msg))
         elif msg['op'] == "update_upload_file_close":
@@ -334,21 +388,25 @@ class BuildbotWebSocketServerProtocol(WebSocketServerProtocol):
             self.send_response_msg(msg, f"Command {msg['op']} does not exist.",
                                    is_exception=True)
 
-    @defer.inlineCallbacks
-    def get_message_result(self, msg):
-        if msg['op'] != 'print' and msg['op'] != 'get_worker_info' and self.connection is None:
-            raise ConnectioLostError("No worker connection")
-
+    def send_message(self, msg, d=None):
         msg['seq_number'] = self.seq_number
 
         self.maybe_log_master_to_worker_msg(msg)
 
         object = msgpack.packb(msg, use_bin_type=True)
-        d = defer.Deferred()
-        self.seq_num_to_waiters_map[self.seq_number] = d
+        if d is not None:
+            self.seq_num_to_waiters_map[self.seq_number] = d
 
         self.seq_number = self.seq_number + 1
         self.sendMessage(object, isBinary=True)
+
+    @defer.inlineCallbacks
+    def get_message_result(self, msg):
+        if msg['op'] != 'print' and msg['op'] != 'get_worker_info' and self.connection is None:
+            raise ConnectioLostError("No worker connection")
+
+        d = defer.Deferred()
+        self.send_message(msg, d)
         res1 = yield d
         return res1
 
@@ -390,6 +448,7 @@ class BuildbotWebSocketServerProtocol(WebSocketServerProtocol):
     def onClose(self, wasClean, code, reason):
         if self.debug:
             log.msg(f"WebSocket connection closed: {reason}")
+        self.closed = True
         # stop waiting for the responses of all commands
         for d in self.seq_num_to_waiters_map.values():
             d.errback(ConnectioLostError("Connection lost"))
@@ -421,6 +480,7 @@ class Dispatcher(BaseDispatcher):
         self.serverFactory = WebSocketServerFactory(f"ws://0.0.0.0:{port}")
         self.serverFactory.buildbot_dispatcher = self
         self.serverFactory.protocol = BuildbotWebSocketServerProtocol
+        self.serverFactory.setProtocolOptions(perMessageCompressionAccept=accept_compression)
 
     def start_listening_port(self):
         port = super().start_listening_port()
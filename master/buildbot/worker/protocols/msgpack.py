@@ -89,6 +89,8 @@ class Connection(base.Connection):
     keepalive_timer = None
     keepalive_interval = 3600
     info = None
+    # number of updates of a command that the worker can send before their acknowledgement
+    update_window = 16
 
     def __init__(self, master, worker, protocol):
         super().__init__(worker.workername)
@@ -169,7 +171,8 @@ class Connection(base.Connection):
             'args': {'newline_re': newline_re,
                      'max_line_length': 4096,
                      'buffer_timeout': 5,
-                     'buffer_size': 64 * 1024}})
+                     'buffer_size': 64 * 1024,
+                     'update_window': self.update_window}})
 
     def create_remote_command(self, worker_name, expected_keys, error_msg):
         command_id = remotecommand.RemoteCommand.generate_new_command_id()
@@ -14,15 +14,29 @@
 # Copyright Buildbot Team Members
 
 import contextlib
+import zlib
 
 from twisted.internet import defer
 from twisted.python import log
+from twisted.spread import banana
+from twisted.spread import jelly
 from twisted.spread import pb
 
 from buildbot.pbutil import decode
 from buildbot.util import deferwaiter
+from buildbot.util import unicode2bytes
 from buildbot.worker.protocols import base
 
+# the compressions the workers may use for their messages, in the order of preference of the master
+COMPRESSIONS = ('zlib',)
+# the maximum size of a decompressed message, so that a small message cannot expand to fill the
+# memory of the master
+MAX_DECOMPRESSED_SIZE = 10 * 1024 * 1024
+
+# the compressed updates may only contain basic types
+_update_security = jelly.SecurityOptions()
+_update_security.allowBasicTypes()
+
 
 class Listener(base.UpdateRegistrationListener):
     name = "pbListener"
@@ -48,23 +62,54 @@ class ReferenceableProxy(pb.Referenceable):
     def __init__(self, impl):
         assert isinstance(impl, self.ImplClass)
         self.impl = impl
+        self._compressor = None
+        self._decompressor = None
 
     def __getattr__(self, name):
         return getattr(self.impl, name)
 
+    # The compressed messages exchanged with an object are parts of a single zlib stream, each
+    # message being flushed with Z_SYNC_FLUSH, so that the repeated content of the messages is
+    # only sent once.
+
+    def _compress(self, data):
+        if self._compressor is None:
+            self._compressor = zlib.compressobj()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def _decompress(self, data):
+        if self._decompressor is None:
+            self._decompressor = zlib.decompressobj()
+        data = self._decompressor.decompress(data, MAX_DECOMPRESSED_SIZE)
+        if self._decompressor.unconsumed_tail:
+            raise ValueError("decompressed message is larger than "
+                             f"{MAX_DECOMPRESSED_SIZE} bytes")
+        return data
+
 
 # Proxy are just ReferenceableProxy to the Impl classes
 class RemoteCommand(ReferenceableProxy):
     ImplClass = base.RemoteCommandImpl
 
+    def remote_update_compressed(self, data):
+        # the updates are serialized the same way as PB does it
+        updates = jelly.unjelly(banana.decode(self._decompress(data)), taster=_update_security)
+        return self.impl.remote_update(updates)
+
 
 class FileReaderProxy(ReferenceableProxy):
     ImplClass = base.FileReaderImpl
 
+    def remote_read_compressed(self, maxLength):
+        return self._compress(unicode2bytes(self.impl.remote_read(maxLength)))
+
 
 class FileWriterProxy(ReferenceableProxy):
     ImplClass = base.FileWriterImpl
 
+    def remote_write_compressed(self, data):
+        return self.impl.remote_write(self._decompress(data))
+
 
 class _NoSuchMethod(Exception):
     """Rewrapped pb.NoSuchMethod remote exception"""
@@ -89,6 +134,7 @@ class Connection(base.Connection, pb.Avatar):
     keepalive_timer = None
     keepalive_interval = 3600
     info = None
+    compression = None
 
     def __init__(self, master, worker, mind):
         super().__init__(worker.workername)
@@ -291,6 +337,18 @@ class Connection(base.Connection, pb.Avatar):
         self.worker.messageReceivedFromWorker()
         self.worker.shutdownRequested()
 
+    def perspective_negotiateCompression(self, compressions):
+        # called by the workers configured to compress their messages, the returned compression
+        # is used for the updates and file transfers of the commands started afterwards
+        compressions = decode(compressions)
+        for compression in COMPRESSIONS:
+            if compression in compressions:
+                log.msg(f"worker '{self.worker.workername}' compresses its messages with "
+                        f"{compression}")
+                self.compression = compression
+                return compression
+        return None
+
     def get_peer(self):
         p = self.mind.broker.transport.getPeer()
         return f"{p.host}:{p.port}"
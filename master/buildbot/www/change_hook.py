@@ -184,5 +184,8 @@ class ChangeHookResource(resource.Resource):
             if chdict.get('properties'):
                 chdict['properties'] = dict((bytes2unicode(k), v)
                                             for k, v in chdict['properties'].items())
-            chid = yield self.master.data.updates.addChange(src=bytes2unicode(src), **chdict)
-            log.msg(f"injected change {chid}")
+            chdict['src'] = bytes2unicode(src)
+        if changes:
+            chids = yield self.master.data.updates.addChanges(changes)
+            for chid in chids:
+                log.msg(f"injected change {chid}")
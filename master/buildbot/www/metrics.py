@@ -0,0 +1,207 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+
+from twisted.internet import defer
+from twisted.web.error import Error
+
+from buildbot.process import metrics
+from buildbot.util import unicode2bytes
+from buildbot.www import resource
+
+CONTENT_TYPE = b'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape_label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value):
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, int):
+        return str(value)
+    try:
+        return repr(float(value))
+    except (TypeError, ValueError):
+        return 'NaN'
+
+
+class MetricsWriter:
+
+    """
+    Formats metrics in the Prometheus text exposition format
+    """
+
+    def __init__(self):
+        self.lines = []
+        self._described = set()
+
+    def describe(self, name, metric_type, help_text):
+        if name in self._described:
+            return
+        self._described.add(name)
+        self.lines.append(f'# HELP {name} {help_text}')
+        self.lines.append(f'# TYPE {name} {metric_type}')
+
+    def sample(self, metric, value, **labels):
+        if labels:
+            label_str = ','.join(f'{k}="{_escape_label_value(v)}"'
+                                 for k, v in sorted(labels.items()))
+            self.lines.append(f'{metric}{{{label_str}}} {_format_value(value)}')
+        else:
+            self.lines.append(f'{metric} {_format_value(value)}')
+
+    def getvalue(self):
+        return '\n'.join(self.lines) + '\n'
+
+
+def write_histogram(writer, metric, histogram, **labels):
+    for bound, count in histogram.cumulativeCounts():
+        le = '+Inf' if bound == float('inf') else _format_value(bound)
+        writer.sample(f'{metric}_bucket', count, le=le, **labels)
+    writer.sample(f'{metric}_sum', histogram.sum, **labels)
+    writer.sample(f'{metric}_count', histogram.count, **labels)
+
+
+def write_metric_events(writer, observer):
+    """ Exports the values collected from the metric events """
+    if observer is None or not observer.enabled:
+        return
+
+    counts = observer.getHandler(metrics.MetricCountEvent)
+    if counts is not None:
+        writer.describe('buildbot_metric_count', 'gauge',
+                        'Value of the buildbot metric counters')
+        for name in sorted(counts.keys()):
+            writer.sample('buildbot_metric_count', counts.get(name), name=name)
+
+    timers = observer.getHandler(metrics.MetricTimeEvent)
+    if timers is not None:
+        writer.describe('buildbot_metric_time_seconds', 'summary',
+                        'Elapsed time measured by the buildbot metric timers')
+        for name in sorted(timers.keys()):
+            count, total = timers.getTotals(name)
+            writer.sample('buildbot_metric_time_seconds_count', count, name=name)
+            writer.sample('buildbot_metric_time_seconds_sum', total, name=name)
+
+    alarms = observer.getHandler(metrics.MetricAlarmEvent)
+    if alarms is not None:
+        writer.describe('buildbot_metric_alarm', 'gauge',
+                        'Level of the buildbot metric alarms (0: OK, 1: WARN, 2: CRIT)')
+        for name, (level, _) in sorted(alarms.asDict()['alarms'].items()):
+            writer.sample('buildbot_metric_alarm', metrics.ALARM_TEXT.index(level), name=name)
+
+
+def write_db_pools(writer, pools):
+    """ Exports the saturation of the database thread pools and the query latencies """
+    if not pools:
+        return
+
+    for metric, attr, help_text in (
+            ('buildbot_db_pool_size', 'pool_size',
+             'Maximum number of threads of the database thread pool'),
+            ('buildbot_db_pool_queries_in_flight', 'queries_in_flight',
+             'Number of database queries submitted and not completed'),
+            ('buildbot_db_pool_queries_queued', 'queries_queued',
+             'Number of database queries waiting for a thread')):
+        writer.describe(metric, 'gauge', help_text)
+        for db_pool in pools:
+            writer.sample(metric, getattr(db_pool, attr), pool=db_pool.name)
+
+    query_stats = [(db_pool.name, name, stats)
+                   for db_pool in pools
+                   for name, stats in sorted(db_pool.query_stats.items())]
+    writer.describe('buildbot_db_query_seconds', 'summary',
+                    'Time between the submission and the completion of database queries')
+    for pool_name, name, stats in query_stats:
+        writer.sample('buildbot_db_query_seconds_count', stats.count, pool=pool_name, query=name)
+        writer.sample('buildbot_db_query_seconds_sum', stats.total, pool=pool_name, query=name)
+
+    for metric, attr, help_text in (
+            ('buildbot_db_query_wait_seconds', 'wait',
+             'Time spent by database queries waiting for a thread of the pool'),
+            ('buildbot_db_query_execution_seconds', 'execution',
+             'Time spent executing database queries')):
+        writer.describe(metric, 'histogram', help_text)
+        for pool_name, name, stats in query_stats:
+            write_histogram(writer, metric, getattr(stats, attr), pool=pool_name, query=name)
+
+
+def write_mq(writer, mq_impl):
+    """ Exports the number of produced messages by routing key prefix """
+    if mq_impl is None:
+        return
+
+    writer.describe('buildbot_mq_produced_messages_total', 'counter',
+                    'Number of messages produced, by first element of the routing key')
+    for prefix, count in sorted(mq_impl.produced.items(), key=lambda i: str(i[0])):
+        writer.sample('buildbot_mq_produced_messages_total', count, prefix=prefix)
+
+
+def write_caches(writer, caches):
+    """ Exports the hit rates of the caches """
+    if caches is None:
+        return
+
+    cache_metrics = caches.get_metrics()
+    for key, help_text in (('hits', 'Number of cache hits'),
+                           ('refhits', 'Number of cache hits on weakly referenced entries'),
+                           ('misses', 'Number of cache misses')):
+        name = f'buildbot_cache_{key}_total'
+        writer.describe(name, 'counter', help_text)
+        for cache_name, values in sorted(cache_metrics.items()):
+            writer.sample(name, values[key], cache=cache_name)
+
+    writer.describe('buildbot_cache_max_size', 'gauge', 'Maximum size of the cache')
+    for cache_name, values in sorted(cache_metrics.items()):
+        writer.sample('buildbot_cache_max_size', values['max_size'], cache=cache_name)
+
+
+def format_metrics(master):
+    """ Returns the metrics of the master in the Prometheus text exposition format """
+    writer = MetricsWriter()
+    write_metric_events(writer, getattr(master, 'metrics', None))
+    write_db_pools(writer, getattr(master.db, 'pools', None))
+    write_mq(writer, getattr(master.mq, 'impl', None))
+    write_caches(writer, getattr(master, 'caches', None))
+    return writer.getvalue()
+
+
+class MetricsResource(resource.Resource):
+
+    """
+    Exposes the internal metrics of the master to Prometheus. The resource is enabled with
+    ``c['www']['metrics'] = True``.
+    """
+
+    isLeaf = True
+    needsReconfig = True
+
+    def __init__(self, master):
+        super().__init__(master)
+        self.enabled = False
+
+    def reconfigResource(self, new_config):
+        self.enabled = bool(new_config.www.get('metrics'))
+
+    def render_GET(self, request):
+        return self.asyncRenderHelper(request, self.renderMetrics)
+
+    def renderMetrics(self, request):
+        if not self.enabled:
+            raise Error(404, b'metrics are not enabled')
+        request.setHeader(b'content-type', CONTENT_TYPE)
+        request.setHeader(b'cache-control', b'no-cache')
+        return defer.succeed(unicode2bytes(format_metrics(self.master)))
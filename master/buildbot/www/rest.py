@@ -273,7 +273,8 @@ class V2RootResource(resource.Resource):
             ep, kwargs = yield self.getEndpoint(request, bytes2unicode(request.method), {})
 
             rspec = self.decodeResultSpec(request, ep)
-            data = yield ep.get(rspec, kwargs)
+            # the web clients can read from the read replica of the database
+            data = yield ep.get(rspec, dict(kwargs, stale_ok=True))
             if data is None:
                 msg = (f"not found while getting from {repr(ep)} with "
                        f"arguments {repr(rspec)} and {str(kwargs)}")
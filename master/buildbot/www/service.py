@@ -41,6 +41,7 @@ from buildbot.www import avatar
 from buildbot.www import change_hook
 from buildbot.www import config as wwwconfig
 from buildbot.www import graphql
+from buildbot.www import metrics
 from buildbot.www import rest
 from buildbot.www import sse
 from buildbot.www import ws
@@ -329,6 +330,9 @@ class WWWService(service.ReconfigurableServiceMixin, service.AsyncMultiService):
         # /sse
         root.putChild(b'sse', sse.EventResource(self.master))
 
+        # /metrics
+        root.putChild(b'metrics', metrics.MetricsResource(self.master))
+
         # /change_hook
         resource_obj = change_hook.ChangeHookResource(master=self.master)
 
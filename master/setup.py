@@ -201,6 +201,7 @@ setup_args = {
         "buildbot.test.fake",
         "buildbot.test.fakedb",
     ] + ([] if BUILDING_WHEEL else [  # skip tests for wheels (save 50% of the archive)
+        "buildbot.test.benchmarks",
         "buildbot.test.fuzz",
         "buildbot.test.integration",
         "buildbot.test.integration.interop",
@@ -0,0 +1,2 @@
+Added a ``master.data.updates.addChanges`` batch API which stores a list of changes in a single database transaction, using multi-row inserts for their files, properties and users, and announces them once the transaction is committed.
+``GitPoller``, ``HgPoller``, ``SVNPoller`` and the ``www`` change hooks now submit the changes of a poll or request through it.
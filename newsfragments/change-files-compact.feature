@@ -0,0 +1,2 @@
+The files of changes touching more than 1000 files are now stored as a single compressed row in the new ``change_files_compact`` table, which makes adding and loading such changes much faster.
+``Change.files`` is now only sorted when it is first accessed, so schedulers whose filters don't look at the files don't pay for it.
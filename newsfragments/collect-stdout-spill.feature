@@ -0,0 +1 @@
+The stdout and stderr collected by the remote commands of the master (``collectStdout``) and kept by the worker (``keepStdout``) are accumulated in chunks instead of being copied each time they grow, and are moved to a temporary file when they exceed 1 MB. Only the accumulation is bounded: reading the whole collected output still loads it in memory.
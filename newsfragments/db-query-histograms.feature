@@ -0,0 +1 @@
+The database thread pool now keeps histograms of the time queries wait for a thread and execute, by connector method, exposed by the Prometheus endpoint, and can log slow queries with their SQL statements when c['metrics']['db_slow_query_threshold'] is set.
@@ -0,0 +1,2 @@
+The size of the database thread pool can be configured with ``c['db']['pool_size']``, and the read-only queries can be run in a separate pool, optionally connected to a read replica, with ``c['db']['read_pool_size']`` and ``c['db']['read_db_url']``.
+The ``/metrics`` endpoint reports the saturation of each pool.
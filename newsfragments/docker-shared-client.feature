@@ -0,0 +1 @@
+`DockerLatentWorker` now reuses a single docker client per docker host, runs docker calls in a dedicated thread pool whose size is set by the new ``max_docker_threads`` parameter, caches the list of images present on the host and coalesces concurrent pulls of the same image.
@@ -0,0 +1 @@
+`GitPoller` can now retrieve the details of all new commits of a branch with a single :command:`git log` call (``batchLog``) and process several branches concurrently (``branchConcurrency``).
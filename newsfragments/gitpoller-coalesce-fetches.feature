@@ -0,0 +1 @@
+`GitPoller` instances watching the same repository can now share a single coalesced fetch per poll interval (``coalesceFetches``).
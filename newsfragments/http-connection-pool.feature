@@ -0,0 +1 @@
+HTTP clients accessing the same host now share a keep-alive connection pool (:py:class:`~buildbot.util.httpclientservice.HTTPConnectionPoolService`), which reports connection reuse metrics.
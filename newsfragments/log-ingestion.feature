@@ -0,0 +1 @@
+The master uses less CPU to store the output of the commands sent by the workers: the lines are no longer scanned with regular expressions, and the data API endpoints are no longer looked up by recompiling their paths.
@@ -0,0 +1 @@
+The msgpack worker protocol sends the messages of the concurrent commands of a worker in turn, and the master acknowledges their updates in batches, so that a command sending a lot of output or a large file does not delay the other commands of the worker.
@@ -0,0 +1 @@
+Added an opt-in reactor profiler, enabled with c['metrics']['reactor_profiler'], which logs the callbacks and inlineCallbacks generators that block the reactor of the master and exposes them at the /reactor_stalls and /reactor_generators data API endpoints.
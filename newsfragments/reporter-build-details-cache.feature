@@ -0,0 +1 @@
+Reporters handling the same build event now share a single fetch of the build details (build request, buildset, properties, steps and logs) instead of each fetching them from the data API.
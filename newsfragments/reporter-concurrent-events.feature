@@ -0,0 +1,2 @@
+Reporters derived from ``ReporterBase`` accept a ``max_concurrent_events`` argument to process events about different builds and buildsets concurrently, while keeping the events of each build in order.
+The number of queued events and the duration of ``sendMessage`` calls are now reported as metrics.
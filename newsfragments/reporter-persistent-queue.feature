@@ -0,0 +1 @@
+Reporters accept a ``persistent_queue`` argument which stores the generated reports in the database and delivers them from there with retries, so that they survive master restarts.
@@ -0,0 +1 @@
+Secret providers accept the cache_ttl, cache_negative_ttl and cache_max_size arguments to cache the secrets they return in memory, and builds query the secrets used by their steps in parallel when a cache is configured.
@@ -0,0 +1 @@
+Added the ``c['db']['sqlite_single_writer']`` option: the log appends queued at the same time are written to SQLite in a single transaction, and the reads of the web UI run concurrently in separate reader threads.
@@ -0,0 +1 @@
+:py:class:`~buildbot.statistics.stats_service.StatsService` now buffers the captured values and writes them to the storage backends in batches, and a new ``FileStorageService`` storage backend writes statistics to a local file in the InfluxDB line protocol.
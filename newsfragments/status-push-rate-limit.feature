@@ -0,0 +1 @@
+:bb:reporter:`GitHubStatusPush`, :bb:reporter:`GitLabStatusPush` and :bb:reporter:`BitbucketServerStatusPush` now send status updates through a rate limited queue that only sends the latest state of each status and honors the ``Retry-After`` and ``X-RateLimit-*`` headers of the server.
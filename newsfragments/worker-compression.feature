@@ -0,0 +1 @@
+Workers can compress the output of the commands and the file transfers sent to the master with the new ``--compression=zlib`` option of ``buildbot-worker create-worker``; the compression is negotiated with the master when connecting.
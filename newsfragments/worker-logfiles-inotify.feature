@@ -0,0 +1 @@
+On Linux, the worker watches the logfiles of the shell commands with inotify, and sends their new content as soon as it is written instead of polling them every 2 seconds.
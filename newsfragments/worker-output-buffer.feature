@@ -0,0 +1 @@
+The worker no longer copies the whole buffered output each time it appends a line to it, which reduces its CPU usage for commands outputting many short lines.
@@ -0,0 +1 @@
+The master now handles many workers reconnecting at the same time, e.g. after a restart, without becoming unresponsive: at most 20 workers go through the attach handshake at once, the connections and disconnections of the workers are written to the database in batches, and the builders of the attaching workers are sorted once by the build request distributor instead of once per worker.
@@ -0,0 +1 @@
+The master can now expose its internal metrics, database pool and query latency statistics, message queue production counts and cache hit rates at ``/metrics`` in the Prometheus text format, by setting ``c['www']['metrics'] = True``.
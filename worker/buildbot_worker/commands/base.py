@@ -21,6 +21,7 @@ from twisted.internet import reactor
 from twisted.python import log
 from zope.interface import implementer
 
+from buildbot_worker import runprocess
 from buildbot_worker import util
 from buildbot_worker.exceptions import AbandonChain
 from buildbot_worker.interfaces import IWorkerCommand
@@ -162,6 +163,10 @@ class Command(object):
         def commandComplete(res):
             self.sendStatus([("elapsed", util.now(self._reactor) - self.startTime)])
             self.running = False
+            # the output kept by the process has been read by the command by now
+            command = getattr(self, 'command', None)
+            if isinstance(command, runprocess.RunProcess):
+                command.close_kept_output()
             return res
         d.addBoth(commandComplete)
         return d
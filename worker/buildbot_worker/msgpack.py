@@ -17,11 +17,16 @@ from __future__ import absolute_import
 from __future__ import print_function
 
 import base64
+from collections import OrderedDict
+from collections import deque
 
 import msgpack
 
 from autobahn.twisted.websocket import WebSocketClientFactory
 from autobahn.twisted.websocket import WebSocketClientProtocol
+from autobahn.websocket.compress import PerMessageDeflateOffer
+from autobahn.websocket.compress import PerMessageDeflateResponse
+from autobahn.websocket.compress import PerMessageDeflateResponseAccept
 from autobahn.websocket.types import ConnectingRequest
 from twisted.internet import defer
 from twisted.python import log
@@ -89,8 +94,7 @@ class ProtocolCommandMsgpack(ProtocolCommandBase):
             args['reader'] = None
 
     def protocol_send_update_message(self, message):
-        d = self.protocol.get_message_result({'op': 'update', 'args': message,
-                                              'command_id': self.command_id})
+        d = self.protocol.send_command_update(self.command_id, message)
         d.addErrback(self._ack_failed, "ProtocolCommandBase.send_update")
 
     def protocol_notify_on_disconnect(self):
@@ -101,47 +105,92 @@ class ProtocolCommandMsgpack(ProtocolCommandBase):
         d_update = self.flush_command_output()
         if failure is not None:
             failure = str(failure)
-        d_complete = self.protocol.get_message_result({'op': 'complete', 'args': failure,
-                                                       'command_id': self.command_id})
+        d_complete = self.protocol.get_command_message_result({'op': 'complete',
+                                                               'args': failure,
+                                                               'command_id': self.command_id})
         yield d_update
-        yield d_complete
+        try:
+            yield d_complete
+        finally:
+            self.protocol.remove_command_stream(self.command_id)
 
     # Returns a Deferred
     def protocol_update_upload_file_close(self, writer):
-        return self.protocol.get_message_result({'op': 'update_upload_file_close',
-                                                 'command_id': self.command_id})
+        return self.protocol.get_command_message_result({'op': 'update_upload_file_close',
+                                                         'command_id': self.command_id})
 
     # Returns a Deferred
     def protocol_update_upload_file_utime(self, writer, access_time, modified_time):
-        return self.protocol.get_message_result({'op': 'update_upload_file_utime',
-                                                 'access_time': access_time,
-                                                 'modified_time': modified_time,
-                                                 'command_id': self.command_id})
+        return self.protocol.get_command_message_result({'op': 'update_upload_file_utime',
+                                                         'access_time': access_time,
+                                                         'modified_time': modified_time,
+                                                         'command_id': self.command_id})
 
     # Returns a Deferred
     def protocol_update_upload_file_write(self, writer, data):
-        return self.protocol.get_message_result({'op': 'update_upload_file_write', 'args': data,
-                                                 'command_id': self.command_id})
+        return self.protocol.get_command_message_result({'op': 'update_upload_file_write',
+                                                         'args': data,
+                                                         'command_id': self.command_id})
 
     # Returns a Deferred
     def protocol_update_upload_directory(self, writer):
-        return self.protocol.get_message_result({'op': 'update_upload_directory_unpack',
-                                                 'command_id': self.command_id})
+        return self.protocol.get_command_message_result({'op': 'update_upload_directory_unpack',
+                                                         'command_id': self.command_id})
 
     # Returns a Deferred
     def protocol_update_upload_directory_write(self, writer, data):
-        return self.protocol.get_message_result({'op': 'update_upload_directory_write',
-                                                 'args': data, 'command_id': self.command_id})
+        return self.protocol.get_command_message_result({'op': 'update_upload_directory_write',
+                                                         'args': data,
+                                                         'command_id': self.command_id})
 
     # Returns a Deferred
     def protocol_update_read_file_close(self, reader):
-        return self.protocol.get_message_result({'op': 'update_read_file_close',
-                                                 'command_id': self.command_id})
+        return self.protocol.get_command_message_result({'op': 'update_read_file_close',
+                                                         'command_id': self.command_id})
 
     # Returns a Deferred
     def protocol_update_read_file(self, reader, length):
-        return self.protocol.get_message_result({'op': 'update_read_file', 'length': length,
-                                                 'command_id': self.command_id})
+        return self.protocol.get_command_message_result({'op': 'update_read_file',
+                                                         'length': length,
+                                                         'command_id': self.command_id})
+
+
+class CommandStream(object):
+
+    """
+    The messages of a command waiting to be sent to the master.  The protocol
+    sends the messages of the streams in turn, so that a command sending a lot
+    of data does not delay the messages of the other commands.
+
+    When the master acknowledges the updates in batches, at most `window`
+    updates of the command are sent without having been acknowledged.
+    """
+
+    def __init__(self, window=None):
+        self.window = window
+        # (message, deferred firing with its response, or None for updates
+        # acknowledged in batches)
+        self.queue = deque()
+        self.next_update_number = 0
+        self.acked_update_number = -1
+
+    def unacked_updates(self):
+        return self.next_update_number - self.acked_update_number - 1
+
+    def is_ready(self):
+        if not self.queue:
+            return False
+        msg, _ = self.queue[0]
+        return msg['op'] != 'update_stream' or self.unacked_updates() < self.window
+
+    def ack(self, update_number):
+        self.acked_update_number = max(self.acked_update_number, update_number)
+
+    def fail(self, reason):
+        waiters = [d for _, d in self.queue if d is not None]
+        self.queue.clear()
+        for d in waiters:
+            d.errback(reason)
 
 
 class ConnectionLostError(Exception):
@@ -193,6 +242,24 @@ class BuildbotWebSocketClientProtocol(WebSocketClientProtocol):
         if self.debug:
             log.msg("WebSocket connection open.")
         self.seq_number = 0
+        # set when the master acknowledges the updates of the commands in batches
+        self.update_window = None
+        self.command_streams = OrderedDict()
+        self.producer_paused = False
+        if self.transport is not None:
+            # the transport pauses us when its send buffer is full: the messages of the commands
+            # then wait in their streams, from which they are sent in turn
+            self.registerProducer(self, True)
+
+    def pauseProducing(self):
+        self.producer_paused = True
+
+    def resumeProducing(self):
+        self.producer_paused = False
+        self.send_command_streams()
+
+    def stopProducing(self):
+        self.producer_paused = True
 
     def call_print(self, msg):
         is_exception = False
@@ -239,6 +306,9 @@ class BuildbotWebSocketClientProtocol(WebSocketClientProtocol):
             self.factory.buildbot_bot.buffer_timeout = msg["args"]["buffer_timeout"]
             self.factory.buildbot_bot.newline_re = msg["args"]["newline_re"]
             self.factory.buildbot_bot.max_line_length = msg["args"]["max_line_length"]
+            # masters acknowledging the updates in batches tell how many updates of a command
+            # can be sent without waiting for their acknowledgement
+            self.update_window = msg["args"].get("update_window")
             result = None
         except Exception as e:
             is_exception = True
@@ -286,6 +356,13 @@ class BuildbotWebSocketClientProtocol(WebSocketClientProtocol):
             result = str(e)
         self.send_response_msg(msg, result, is_exception)
 
+    def call_ack_updates(self, msg):
+        # the acknowledgements do not get a response
+        stream = self.command_streams.get(msg.get('command_id'))
+        if stream is not None and 'update_number' in msg:
+            stream.ack(msg['update_number'])
+            self.send_command_streams()
+
     def send_response_msg(self, msg, result, is_exception):
         dict_output = {
             'op': 'response',
@@ -324,6 +401,8 @@ class BuildbotWebSocketClientProtocol(WebSocketClientProtocol):
             self._deferwaiter.add(self.call_shutdown(msg))
         elif msg['op'] == "interrupt_command":
             self._deferwaiter.add(self.call_interrupt_command(msg))
+        elif msg['op'] == "ack_updates":
+            self.call_ack_updates(msg)
         elif msg['op'] == "response":
             seq_number = msg['seq_number']
             if "is_exception" in msg:
@@ -336,27 +415,89 @@ class BuildbotWebSocketClientProtocol(WebSocketClientProtocol):
             self.send_response_msg(msg, "Command {} does not exist.".format(msg['op']),
                                    is_exception=True)
 
-    @defer.inlineCallbacks
-    def get_message_result(self, msg):
+    def send_message(self, msg, d=None):
         msg['seq_number'] = self.seq_number
+        if d is not None:
+            self.seq_num_to_waiters_map[self.seq_number] = d
+        self.seq_number = self.seq_number + 1
         self.maybe_log_worker_to_master_msg(msg)
-        msg = msgpack.packb(msg)
+        self.sendMessage(msgpack.packb(msg), isBinary=True)
+
+    @defer.inlineCallbacks
+    def get_message_result(self, msg):
         d = defer.Deferred()
-        self.seq_num_to_waiters_map[self.seq_number] = d
-        self.seq_number = self.seq_number + 1
-        self.sendMessage(msg, isBinary=True)
+        self.send_message(msg, d)
         res1 = yield d
         defer.returnValue(res1)
 
+    def get_command_stream(self, command_id):
+        stream = self.command_streams.get(command_id)
+        if stream is None:
+            stream = self.command_streams[command_id] = CommandStream()
+        return stream
+
+    def remove_command_stream(self, command_id):
+        self.command_streams.pop(command_id, None)
+
+    def get_command_message_result(self, msg):
+        d = defer.Deferred()
+        self.get_command_stream(msg['command_id']).queue.append((msg, d))
+        self.send_command_streams()
+        return d
+
+    def send_command_update(self, command_id, message):
+        if self.update_window is None:
+            return self.get_command_message_result({'op': 'update', 'args': message,
+                                                    'command_id': command_id})
+        stream = self.get_command_stream(command_id)
+        stream.window = self.update_window
+        stream.queue.append(({'op': 'update_stream', 'args': message,
+                              'command_id': command_id}, None))
+        self.send_command_streams()
+        return defer.succeed(None)
+
+    def send_command_streams(self):
+        # send one message of each stream in turn, until the transport is full
+        while not self.producer_paused:
+            ready = [(command_id, stream) for command_id, stream in self.command_streams.items()
+                     if stream.is_ready()]
+            if not ready:
+                return
+            for command_id, stream in ready:
+                if self.producer_paused:
+                    return
+                msg, d = stream.queue.popleft()
+                if msg['op'] == 'update_stream':
+                    msg['update_number'] = stream.next_update_number
+                    stream.next_update_number += 1
+                # the stream goes last for the next turn
+                self.command_streams[command_id] = self.command_streams.pop(command_id)
+                self.send_message(msg, d)
+
     def onClose(self, wasClean, code, reason):
         if self.debug:
             log.msg("WebSocket connection closed: {0}".format(reason))
+        for stream in self.command_streams.values():
+            stream.fail(ConnectionLostError("Connection lost"))
+        self.command_streams.clear()
         # stop waiting for the responses of all commands
         for seq_number in self.seq_num_to_waiters_map:
             self.seq_num_to_waiters_map[seq_number].errback(ConnectionLostError("Connection lost"))
         self.seq_num_to_waiters_map.clear()
 
 
+def accept_compression(response):
+    if isinstance(response, PerMessageDeflateResponse):
+        return PerMessageDeflateResponseAccept(response)
+    return None
+
+
 class BuildbotWebSocketClientFactory(WebSocketClientFactory):
     def waitForCompleteShutdown(self):
         pass
+
+    def enable_compression(self):
+        # offer the permessage-deflate extension: if the master accepts it, the messages in both
+        # directions are compressed with a zlib stream kept for the whole connection
+        self.setProtocolOptions(perMessageCompressionOffers=[PerMessageDeflateOffer()],
+                                perMessageCompressionAccept=accept_compression)
@@ -20,6 +20,7 @@ import os.path
 import shutil
 import signal
 import sys
+import zlib
 
 from twisted.application import service
 from twisted.application.internet import ClientService
@@ -30,6 +31,8 @@ from twisted.internet import reactor
 from twisted.internet import task
 from twisted.internet.endpoints import clientFromString
 from twisted.python import log
+from twisted.spread import banana
+from twisted.spread import jelly
 from twisted.spread import pb
 
 from buildbot_worker import util
@@ -49,6 +52,10 @@ if sys.version_info >= (3, 6):
     from buildbot_worker.msgpack import ProtocolCommandMsgpack
 
 
+# the compressions supported by the worker
+COMPRESSIONS = ('zlib',)
+
+
 class UnknownCommand(pb.Error):
     pass
 
@@ -56,9 +63,13 @@ class UnknownCommand(pb.Error):
 class ProtocolCommandPb(ProtocolCommandBase):
     def __init__(self, unicode_encoding, worker_basedir, basedir, buffer_size, buffer_timeout,
                  max_line_length, newline_re, builder_is_running, on_command_complete,
-                 on_lost_remote_step, command, stepId, args, command_ref):
+                 on_lost_remote_step, command, stepId, args, command_ref, compression=None):
         self.basedir = basedir
         self.command_ref = command_ref
+        self.compression = compression
+        # the zlib streams of the compressed messages, by remote object
+        self._compressors = {}
+        self._decompressors = {}
         ProtocolCommandBase.__init__(self, unicode_encoding, worker_basedir, buffer_size,
                                      buffer_timeout, max_line_length, newline_re,
                                      builder_is_running, on_command_complete, on_lost_remote_step,
@@ -136,9 +147,30 @@ class ProtocolCommandPb(ProtocolCommandBase):
             else:
                 update = [{key: value}, 0]
             updates = [update]
-            d = self.command_ref.callRemote("update", updates)
+            if self.compression:
+                # the updates are serialized the same way as PB does it
+                data = banana.encode(jelly.jelly(updates))
+                d = self.command_ref.callRemote("update_compressed",
+                                                self._compress(self.command_ref, data))
+            else:
+                d = self.command_ref.callRemote("update", updates)
             d.addErrback(self._ack_failed, "ProtocolCommandBase.send_update")
 
+    # The compressed messages exchanged with a remote object are parts of a single zlib stream,
+    # each message being flushed with Z_SYNC_FLUSH.
+
+    def _compress(self, remote, data):
+        compressor = self._compressors.get(remote)
+        if compressor is None:
+            compressor = self._compressors[remote] = zlib.compressobj()
+        return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def _decompress(self, remote, data):
+        decompressor = self._decompressors.get(remote)
+        if decompressor is None:
+            decompressor = self._decompressors[remote] = zlib.decompressobj()
+        return decompressor.decompress(data)
+
     def protocol_notify_on_disconnect(self):
         self.command_ref.notifyOnDisconnect(self.on_lost_remote_step)
 
@@ -161,6 +193,8 @@ class ProtocolCommandPb(ProtocolCommandBase):
 
     # Returns a Deferred
     def protocol_update_upload_file_write(self, writer, data):
+        if self.compression:
+            return writer.callRemote('write_compressed', self._compress(writer, data))
         return writer.callRemote('write', data)
 
     # Returns a Deferred
@@ -169,6 +203,8 @@ class ProtocolCommandPb(ProtocolCommandBase):
 
     # Returns a Deferred
     def protocol_update_upload_directory_write(self, writer, data):
+        if self.compression:
+            return writer.callRemote('write_compressed', self._compress(writer, data))
         return writer.callRemote('write', data)
 
     # Returns a Deferred
@@ -177,6 +213,10 @@ class ProtocolCommandPb(ProtocolCommandBase):
 
     # Returns a Deferred
     def protocol_update_read_file(self, reader, length):
+        if self.compression:
+            d = reader.callRemote('read_compressed', length)
+            d.addCallback(lambda data: self._decompress(reader, data))
+            return d
         return reader.callRemote('read', length)
 
 
@@ -287,7 +327,7 @@ class WorkerForBuilderPbLike(WorkerForBuilderBase):
                                                      self.newline_re, self.running,
                                                      on_command_complete,
                                                      self.lostRemoteStep, command, stepId, args,
-                                                     command_ref)
+                                                     command_ref, compression=self.bot.compression)
 
         log.msg(u" startCommand:{0} [id {1}]".format(command, stepId))
         self.protocol_command.protocol_notify_on_disconnect()
@@ -324,6 +364,8 @@ class WorkerForBuilderPb(WorkerForBuilderPbLike, pb.Referenceable):
 
 class BotPbLike(BotBase):
     WorkerForBuilder = WorkerForBuilderPbLike
+    # the compression of the messages, as negotiated with the master
+    compression = None
 
     @defer.inlineCallbacks
     def remote_setBuilderList(self, wanted):
@@ -481,9 +523,11 @@ class BotFactory(AutoLoginPBFactory):
 
     _reactor = reactor
 
-    def __init__(self, buildmaster_host, port, keepaliveInterval, maxDelay, retryPolicy=None):
+    def __init__(self, buildmaster_host, port, keepaliveInterval, maxDelay, retryPolicy=None,
+                 compression=None):
         AutoLoginPBFactory.__init__(self, retryPolicy=retryPolicy)
         self.keepaliveInterval = keepaliveInterval
+        self.compression = compression
         self.keepalive_lock = defer.DeferredLock()
         self._shutting_down = False
 
@@ -505,6 +549,24 @@ class BotFactory(AutoLoginPBFactory):
             log.msg("sending application-level keepalives every {0} seconds".format(
                     self.keepaliveInterval))
             self.startTimers()
+        if self.compression:
+            self.negotiateCompression(perspective)
+
+    @defer.inlineCallbacks
+    def negotiateCompression(self, perspective):
+        # the commands started before the answer of the master are not compressed
+        self._client.compression = None
+        try:
+            compression = yield perspective.callRemote("negotiateCompression", [self.compression])
+        except Exception as e:
+            log.msg("master does not support compression, messages are sent uncompressed: "
+                    "{0}".format(e))
+            return
+        if compression not in COMPRESSIONS:
+            log.msg("master refused compression, messages are sent uncompressed")
+            return
+        log.msg("compressing messages with {0}".format(compression))
+        self._client.compression = compression
 
     def startTimers(self):
         assert self.keepaliveInterval
@@ -581,7 +643,7 @@ class Worker(WorkerBase):
                  keepalive, usePTY=None, keepaliveTimeout=None, umask=None,
                  maxdelay=None, numcpus=None, unicode_encoding=None, protocol='pb', useTls=None,
                  allow_shutdown=None, maxRetries=None, connection_string=None,
-                 delete_leftover_dirs=False, proxy_connection_string=None):
+                 delete_leftover_dirs=False, proxy_connection_string=None, compression=None):
 
         assert usePTY is None, "worker-side usePTY is not supported anymore"
         assert (connection_string is None or
@@ -600,6 +662,9 @@ class Worker(WorkerBase):
         else:
             raise ValueError('Unknown protocol {}'.format(protocol))
 
+        if compression is not None and compression not in COMPRESSIONS:
+            raise ValueError('Unknown compression {}'.format(compression))
+
         WorkerBase.__init__(
             self, name, basedir, bot_class, umask=umask, unicode_encoding=unicode_encoding,
             delete_leftover_dirs=delete_leftover_dirs)
@@ -628,7 +693,8 @@ class Worker(WorkerBase):
 
         if protocol == 'pb':
             bf = self.bf = BotFactory(
-                buildmaster_host, port, keepalive, maxdelay, retryPolicy=policy
+                buildmaster_host, port, keepalive, maxdelay, retryPolicy=policy,
+                compression=compression
             )
             bf.startLogin(credentials.UsernamePassword(name, passwd), client=self.bot)
         elif protocol == 'msgpack_experimental_v7':
@@ -644,6 +710,8 @@ class Worker(WorkerBase):
             self.bf.buildbot_bot = self.bot
             self.bf.name = name
             self.bf.password = passwd
+            if compression:
+                bf.enable_compression()
         else:
             raise ValueError('Unknown protocol {}'.format(protocol))
 
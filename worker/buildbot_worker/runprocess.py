@@ -41,6 +41,7 @@ from twisted.internet import protocol
 from twisted.internet import reactor
 from twisted.internet import task
 from twisted.python import failure
+from twisted.python import filepath
 from twisted.python import log
 from twisted.python import runtime
 from twisted.python.win32 import quoteArguments
@@ -50,10 +51,16 @@ from buildbot_worker.compat import bytes2NativeString
 from buildbot_worker.compat import bytes2unicode
 from buildbot_worker.compat import unicode2bytes
 from buildbot_worker.exceptions import AbandonChain
+from buildbot_worker.util.spill_buffer import SpillBuffer
 
 if runtime.platformType == 'posix':
     from twisted.internet.process import Process
 
+if runtime.platform.supportsINotify():
+    from twisted.internet import inotify
+else:
+    inotify = None
+
 
 def win32_batch_quote(cmd_list, unicode_encoding='utf-8'):
     # Quote cmd_list to a string that is suitable for inclusion in a
@@ -97,10 +104,83 @@ def shell_quote(cmd_list, unicode_encoding='utf-8'):
     return u" ".join([quote(e) for e in cmd_list])
 
 
+class LogFileNotifier(object):
+
+    """Watches the directories of the log files of a command with inotify, and
+    tells the L{LogFileWatcher}s when their file changes, so that they do not
+    have to wait for their next poll."""
+
+    MASK = 0
+    if inotify is not None:
+        MASK = (inotify.IN_MODIFY | inotify.IN_CLOSE_WRITE | inotify.IN_CREATE |
+                inotify.IN_MOVED_TO | inotify.IN_DELETE)
+
+    def __init__(self):
+        self._inotify = None
+        # path of a log file -> watchers of this file
+        self._watchers = {}
+
+    @staticmethod
+    def isSupported():
+        return inotify is not None
+
+    def watch(self, watcher):
+        """Starts notifying C{watcher} of the changes of its log file.
+
+        Returns False if the directory of the file cannot be watched (it does
+        not exist yet, or the inotify limits are reached), the watcher then
+        needs to keep polling the file."""
+        path = filepath.FilePath(os.path.abspath(watcher.logfile)).asBytesMode()
+        try:
+            if self._inotify is None:
+                self._inotify = inotify.INotify()
+                self._inotify.startReading()
+            self._inotify.watch(path.parent(), mask=self.MASK, callbacks=[self._notify])
+        except Exception as e:
+            log.msg("cannot watch the changes of {0}: {1}".format(watcher.logfile, e))
+            return False
+        self._watchers.setdefault(path.path, []).append(watcher)
+        return True
+
+    def unwatch(self, watcher):
+        for watchers in self._watchers.values():
+            if watcher in watchers:
+                watchers.remove(watcher)
+
+    def _notify(self, ignored, path, mask):
+        if mask & inotify.IN_DELETE_SELF:
+            # the directory was removed, and twisted closes the inotify
+            # descriptor in that case: go back to polling
+            self._inotify = None
+            self._forget()
+            return
+        for watcher in list(self._watchers.get(path.path, [])):
+            watcher.changed()
+
+    def _forget(self):
+        watchers = [w for ws in self._watchers.values() for w in ws]
+        self._watchers = {}
+        for watcher in watchers:
+            watcher.unwatched()
+
+    def close(self):
+        if self._inotify is not None:
+            self._inotify.loseConnection()
+            self._inotify = None
+        self._forget()
+
+
 class LogFileWatcher(object):
     POLL_INTERVAL = 2
-
-    def __init__(self, command, name, logfile, follow=False, poll=True):
+    # when the file is watched with inotify, polling only catches the events
+    # that were missed, e.g. when the inotify queue overflowed
+    NOTIFIED_POLL_INTERVAL = 30
+    # the reads are sized after the data appended to the file since the last
+    # read, within these bounds
+    MIN_READ_SIZE = 16 * 1024
+    MAX_READ_SIZE = 1024 * 1024
+
+    def __init__(self, command, name, logfile, follow=False, poll=True, notifier=None):
         self.command = command
         self.name = name
         self.logfile = logfile
@@ -118,8 +198,12 @@ class LogFileWatcher(object):
         # added since we started watching
         self.follow = follow
 
-        # every 2 seconds we check on the file again
-        self.poller = task.LoopingCall(self.poll) if poll else None
+        # every 2 seconds we check on the file again, unless the notifier
+        # tells us when the file changes
+        self.poller = task.LoopingCall(self._pollTimer) if poll else None
+        self.notifier = notifier
+        self.notified = False
+        self._notifiedPoll = None
 
     def start(self):
         self.poller.start(self.POLL_INTERVAL).addErrback(self._cleanupPoll)
@@ -129,12 +213,40 @@ class LogFileWatcher(object):
         self.poller = None
 
     def stop(self):
+        if self.notifier is not None:
+            self.notifier.unwatch(self)
+            self.notified = False
+        if self._notifiedPoll is not None:
+            self._notifiedPoll.cancel()
+            self._notifiedPoll = None
         self.poll()
         if self.poller is not None:
             self.poller.stop()
         if self.started:
             self.f.close()
 
+    def _pollTimer(self):
+        if self.notifier is not None and not self.notified:
+            self.notified = self.notifier.watch(self)
+            if self.notified:
+                self.poller.interval = self.NOTIFIED_POLL_INTERVAL
+        self.poll()
+
+    def changed(self):
+        # the events are read in batches, read the file once for all of them
+        if self._notifiedPoll is None:
+            self._notifiedPoll = reactor.callLater(0, self._pollNotified)
+
+    def _pollNotified(self):
+        self._notifiedPoll = None
+        self.poll()
+
+    def unwatched(self):
+        self.notified = False
+        if self.poller is not None and self.poller.running:
+            self.poller.interval = self.POLL_INTERVAL
+            self.poller.reset()
+
     def statFile(self):
         if os.path.exists(self.logfile):
             s = os.stat(self.logfile)
@@ -168,12 +280,16 @@ class LogFileWatcher(object):
         self.f.seek(self.f.tell(), 0)
 
         while True:
-            data = self.f.read(10000)
+            data = self.f.read(self._readSize())
             if not data:
                 return
             decodedData = self.logDecode.decode(data)
             self.command.addLogfile(self.name, decodedData)
 
+    def _readSize(self):
+        appended = os.fstat(self.f.fileno()).st_size - self.f.tell()
+        return min(max(appended, self.MIN_READ_SIZE), self.MAX_READ_SIZE)
+
 
 if runtime.platformType == 'posix':
     class ProcGroupProcess(Process):
@@ -276,6 +392,12 @@ class RunProcess(object):
     # For scheduling future events
     _reactor = reactor
 
+    # the kept stdout and stderr are moved to a temporary file when they are
+    # larger than this number of characters
+    keepMaxMemory = 1024 * 1024
+    stdout_buffer = None
+    stderr_buffer = None
+
     # I wish we had easy access to CLOCK_MONOTONIC in Python:
     # http://www.opengroup.org/onlinepubs/000095399/functions/clock_getres.html
     # Then changes to the system clock during a run wouldn't effect the "elapsed
@@ -292,7 +414,12 @@ class RunProcess(object):
         @param keepStdout: if True, we keep a copy of all the stdout text
                            that we've seen. This copy is available in
                            self.stdout, which can be read after the command
-                           has finished.
+                           has finished.  Large outputs are kept in a
+                           temporary file, self.stdout_buffer.chunks() reads
+                           them without loading them in memory, while
+                           self.stdout loads all of them.  The copy is
+                           discarded by close_kept_output(), which the
+                           worker command calls once it has finished.
         @param keepStderr: same, for stderr
 
         @param usePTY: true to use a PTY, false to not use a PTY.
@@ -411,6 +538,9 @@ class RunProcess(object):
         self.useProcGroup = useProcGroup
 
         self.logFileWatchers = []
+        self.logFileNotifier = None
+        if self.logfiles and LogFileNotifier.isSupported():
+            self.logFileNotifier = LogFileNotifier()
         for name, filevalue in self.logfiles.items():
             filename = filevalue
             follow = False
@@ -423,19 +553,36 @@ class RunProcess(object):
 
             w = LogFileWatcher(self, name,
                                os.path.join(self.workdir, filename),
-                               follow=follow)
+                               follow=follow, notifier=self.logFileNotifier)
             self.logFileWatchers.append(w)
 
     def __repr__(self):
         return "<{0} '{1}'>".format(self.__class__.__name__, self.fake_command)
 
+    @property
+    def stdout(self):
+        if self.stdout_buffer is None:
+            return None
+        return self.stdout_buffer.getvalue()
+
+    @property
+    def stderr(self):
+        if self.stderr_buffer is None:
+            return None
+        return self.stderr_buffer.getvalue()
+
+    def close_kept_output(self):
+        for buf in (self.stdout_buffer, self.stderr_buffer):
+            if buf is not None:
+                buf.close()
+
     def start(self):
         # return a Deferred which fires (with the exit code) when the command
         # completes
         if self.keepStdout:
-            self.stdout = ""
+            self.stdout_buffer = SpillBuffer(self.keepMaxMemory)
         if self.keepStderr:
-            self.stderr = ""
+            self.stderr_buffer = SpillBuffer(self.keepMaxMemory)
         self.deferred = defer.Deferred()
         try:
             self._startCommand()
@@ -642,7 +789,7 @@ class RunProcess(object):
             self.send_update([('stdout', data)])
 
         if self.keepStdout:
-            self.stdout += data
+            self.stdout_buffer.append(data)
         if self.ioTimeoutTimer:
             self.ioTimeoutTimer.reset(self.timeout)
 
@@ -651,7 +798,7 @@ class RunProcess(object):
             self.send_update([('stderr', data)])
 
         if self.keepStderr:
-            self.stderr += data
+            self.stderr_buffer.append(data)
         if self.ioTimeoutTimer:
             self.ioTimeoutTimer.reset(self.timeout)
 
@@ -668,6 +815,8 @@ class RunProcess(object):
         for w in self.logFileWatchers:
             # this will send the final updates
             w.stop()
+        if self.logFileNotifier is not None:
+            self.logFileNotifier.close()
         if sig is not None:
             rc = -1
         if self.sendRC:
@@ -685,6 +834,8 @@ class RunProcess(object):
 
     def failed(self, why):
         log.msg("RunProcess.failed: command failed: {0}".format(why))
+        if self.logFileNotifier is not None:
+            self.logFileNotifier.close()
         self._cancelTimers()
         d = self.deferred
         self.deferred = None
@@ -62,13 +62,15 @@ use_tls = %(use-tls)s
 delete_leftover_dirs = %(delete-leftover-dirs)s
 proxy_connection_string = %(proxy-connection-string)s
 protocol = %(protocol)r
+compression = %(compression)r
 
 s = Worker(buildmaster_host, port, workername, passwd, basedir,
            keepalive, umask=umask, maxdelay=maxdelay,
            numcpus=numcpus, allow_shutdown=allow_shutdown,
            maxRetries=maxretries, protocol=protocol, useTls=use_tls,
            delete_leftover_dirs=delete_leftover_dirs,
-           proxy_connection_string=proxy_connection_string)
+           proxy_connection_string=proxy_connection_string,
+           compression=compression)
 s.setServiceParent(application)
 """]
 
@@ -133,7 +133,10 @@ class CreateWorkerOptions(MakerBase):
          "'signal' or 'file'"],
         ["protocol", None, "pb", "Protocol to be used when creating master-worker connection"],
         ["proxy-connection-string", None, None,
-         "Address of HTTP proxy to tunnel through"]
+         "Address of HTTP proxy to tunnel through"],
+        ["compression", None, None,
+         "Compress the messages sent to the master, if it supports it. Only 'zlib' is "
+         "supported"],
     ]
 
     longdesc = textwrap.dedent("""
@@ -226,6 +229,9 @@ class CreateWorkerOptions(MakerBase):
             raise usage.UsageError("allow-shutdown needs to be one of"
                                    " 'signal' or 'file'")
 
+        if self['compression'] not in [None, 'zlib']:
+            raise usage.UsageError("compression needs to be 'zlib'")
+
 
 class Options(usage.Options):
     synopsis = "Usage:    buildbot-worker <command> [command options]"
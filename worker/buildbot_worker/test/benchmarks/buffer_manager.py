@@ -0,0 +1,81 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+"""
+Measures the CPU time spent by the worker to buffer line-oriented command output, from the
+output chunks of the process to the messages sent to the master.
+
+    python -m buildbot_worker.test.benchmarks.buffer_manager --size 20 --line-length 10
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+
+import argparse
+import time
+
+from twisted.internet import task
+
+from buildbot_worker.util import buffer_manager
+from buildbot_worker.util import lineboundaries
+
+MB = 1024 * 1024
+
+
+def run(options):
+    sent = [0]
+
+    def message_consumer(messages):
+        sent[0] += sum(len(data[0]) for _, data in messages)
+
+    manager = buffer_manager.BufferManager(task.Clock(), message_consumer,
+                                           options.buffer_size, 5)
+    lbf = lineboundaries.LineBoundaryFinder(4096, r'(\r\n|\r(?=.)|\033\[u|\033\[[0-9]+;[0-9]+[Hf]|'
+                                            r'\033\[2J|\x08+)')
+
+    line = 'x' * (options.line_length - 1) + '\n'
+    chunk = line * options.lines_per_chunk
+    chunks = max(1, int(options.size * MB / len(chunk)))
+
+    start = time.process_time()
+    for i in range(chunks):
+        whole_lines = lbf.append(chunk, float(i))
+        if whole_lines is not None:
+            manager.append('stdout', whole_lines)
+    manager.flush()
+    elapsed = time.process_time() - start
+
+    assert sent[0] == chunks * len(chunk)
+    return elapsed, sent[0] / MB
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--size', type=float, default=20,
+                        help='size of the output, in MB')
+    parser.add_argument('--line-length', type=int, default=10,
+                        help='length of the lines, including the newline')
+    parser.add_argument('--lines-per-chunk', type=int, default=1,
+                        help='number of lines of each chunk of output of the process')
+    parser.add_argument('--buffer-size', type=int, default=64 * 1024,
+                        help='size of the messages sent to the master')
+    options = parser.parse_args()
+
+    elapsed, size = run(options)
+    print('{0:.1f} MB of output in {1:.2f} s of CPU: {2:.3f} s/MB'.format(
+        size, elapsed, elapsed / size))
+
+
+if __name__ == '__main__':
+    main()
@@ -150,6 +150,9 @@ class FakeRunProcess(object):
         self.stdout = ''
         self.stderr = ''
 
+    def close_kept_output(self):
+        pass
+
     def start(self):
         # figure out the stdio-related parameters
         keepStdout = self._exp.kwargs.get('keepStdout', False)
@@ -20,6 +20,7 @@ from future.builtins import range
 import multiprocessing
 import os
 import shutil
+import zlib
 
 import mock
 
@@ -28,6 +29,8 @@ from twisted.internet import reactor
 from twisted.internet import task
 from twisted.python import failure
 from twisted.python import log
+from twisted.spread import banana
+from twisted.spread import jelly
 from twisted.trial import unittest
 
 import buildbot_worker
@@ -136,6 +139,7 @@ class FakeStep(object):
     def __init__(self):
         self.finished_d = defer.Deferred()
         self.actions = []
+        self.decompressor = zlib.decompressobj()
 
     def wait_for_finish(self):
         return self.finished_d
@@ -146,6 +150,9 @@ class FakeStep(object):
                 update[0]['elapsed'] = 1
         self.actions.append(["update", updates])
 
+    def remote_update_compressed(self, data):
+        self.remote_update(jelly.unjelly(banana.decode(self.decompressor.decompress(data))))
+
     def remote_complete(self, f):
         self.actions.append(["complete", f])
         self.finished_d.callback(None)
@@ -225,6 +232,29 @@ class TestWorkerForBuilder(command.CommandTestMixin, unittest.TestCase):
             ['complete', None],
         ])
 
+    @defer.inlineCallbacks
+    def test_startCommand_compressed(self):
+        self.bot.compression = 'zlib'
+        st = FakeStep()
+
+        self.patch_runprocess(
+            Expect(['echo', 'hello'], os.path.join(self.basedir, 'wfb', 'workdir'))
+            .update('stdout', 'hello\n')
+            .update('rc', 0)
+            .exit(0)
+        )
+
+        yield self.wfb.callRemote("startCommand", FakeRemote(st),
+                                  "13", "shell", dict(command=['echo', 'hello'],
+                                                      workdir='workdir'))
+        yield st.wait_for_finish()
+        self.assertEqual(st.actions, [
+            ['update', [[{'stdout': 'hello\n'}, 0]]],
+            ['update', [[{'rc': 0}, 0]]],
+            ['update', [[{'elapsed': 1}, 0]]],
+            ['complete', None],
+        ])
+
     @defer.inlineCallbacks
     def test_startCommand_interruptCommand(self):
         # set up a fake step to receive updates
@@ -346,4 +376,80 @@ class TestBotFactory(unittest.TestCase):
         clock.advance(35)
         self.assertEqual(len(self.flushLoggedErrors(RuntimeError)), 1)
 
+    @defer.inlineCallbacks
+    def test_negotiateCompression(self):
+        bot = FakeBot('basedir', False)
+        self.bf.compression = 'zlib'
+        self.bf.startLogin(mock.Mock(), client=bot)
+        perspective = mock.Mock()
+        perspective.callRemote.return_value = defer.succeed('zlib')
+
+        yield self.bf.negotiateCompression(perspective)
+        perspective.callRemote.assert_called_with('negotiateCompression', ['zlib'])
+        self.assertEqual(bot.compression, 'zlib')
+
+        # reconnecting to a master not supporting compression
+        perspective.callRemote.return_value = defer.fail(AttributeError('oh noes'))
+        yield self.bf.negotiateCompression(perspective)
+        self.assertIsNone(bot.compression)
+
+    @defer.inlineCallbacks
+    def test_negotiateCompression_refused(self):
+        bot = FakeBot('basedir', False)
+        bot.compression = 'zlib'
+        self.bf.compression = 'zlib'
+        self.bf.startLogin(mock.Mock(), client=bot)
+        perspective = mock.Mock()
+        perspective.callRemote.return_value = defer.succeed(None)
+
+        yield self.bf.negotiateCompression(perspective)
+        self.assertIsNone(bot.compression)
+
+
+class FakeFileWriter(object):
+
+    def __init__(self):
+        self.data = []
+        self.decompressor = zlib.decompressobj()
+
+    def remote_write_compressed(self, data):
+        self.data.append(self.decompressor.decompress(data))
+
+
+class FakeFileReader(object):
+
+    def __init__(self, data):
+        self.data = data
+        self.compressor = zlib.compressobj()
+
+    def remote_read_compressed(self, length):
+        data, self.data = self.data[:length], self.data[length:]
+        return self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+
+class TestProtocolCommandPbCompression(unittest.TestCase):
+
+    def setUp(self):
+        self.protocol_command = pb.ProtocolCommandPb(
+            'utf-8', 'basedir', 'basedir', 64 * 1024, 5, 4096, r'\r\n', True, None, None,
+            'stat', '13', {'file': 'file'}, FakeRemote(FakeStep()), compression='zlib')
+
+    @defer.inlineCallbacks
+    def test_upload_write(self):
+        writer = FakeFileWriter()
+        remote = FakeRemote(writer)
+        yield self.protocol_command.protocol_update_upload_file_write(remote, b'data' * 100)
+        yield self.protocol_command.protocol_update_upload_directory_write(remote, b'data' * 100)
+        self.assertEqual(writer.data, [b'data' * 100, b'data' * 100])
+
+    @defer.inlineCallbacks
+    def test_read(self):
+        remote = FakeRemote(FakeFileReader(b'data' * 100))
+        data = yield self.protocol_command.protocol_update_read_file(remote, 300)
+        self.assertEqual(data, b'data' * 75)
+        data = yield self.protocol_command.protocol_update_read_file(remote, 300)
+        self.assertEqual(data, b'data' * 25)
+        data = yield self.protocol_command.protocol_update_read_file(remote, 300)
+        self.assertEqual(data, b'')
+
 # note that the Worker class is tested in test_bot_Worker
@@ -145,6 +145,14 @@ class TestWorker(misc.PatcherMixin, unittest.TestCase):
                    umask=0o123, maxdelay=10, keepaliveTimeout=10,
                    unicode_encoding='utf8', protocol='pb', allow_shutdown=True)
 
+    def test_constructor_compression(self):
+        w = bot.Worker('mstr', 9010, 'me', 'pwd', '/s', 10, protocol='pb', compression='zlib')
+        self.assertEqual(w.bf.compression, 'zlib')
+
+    def test_constructor_invalid_compression(self):
+        self.assertRaises(ValueError, bot.Worker,
+                          'mstr', 9010, 'me', 'pwd', '/s', 10, compression='lzma')
+
     def test_worker_print(self):
         d = defer.Deferred()
 
@@ -19,8 +19,10 @@ from __future__ import print_function
 from twisted.internet import defer
 from twisted.trial import unittest
 
+from buildbot_worker import runprocess
 from buildbot_worker.commands.base import Command
 from buildbot_worker.test.util.command import CommandTestMixin
+from buildbot_worker.util.spill_buffer import SpillBuffer
 
 # set up a fake Command subclass to test the handling in Command.  Think of
 # this as testing Command's subclassability.
@@ -107,6 +109,22 @@ class TestDummyCommand(CommandTestMixin, unittest.TestCase):
         d.addCallback(checkresult)
         return d
 
+    @defer.inlineCallbacks
+    def test_run_closes_kept_output(self):
+        cmd = self.make_command(DummyCommand, {})
+        cmd.command = runprocess.RunProcess(['cmd'], self.basedir, 'utf-8', None,
+                                            keepStdout=True)
+        cmd.command.stdout_buffer = SpillBuffer(max_memory=2)
+        cmd.command.stdout_buffer.append('output')
+        self.assertTrue(cmd.command.stdout_buffer.spilled)
+
+        d = self.run_command()
+        cmd.finishCommand()
+        yield d
+
+        self.assertFalse(cmd.command.stdout_buffer.spilled)
+        self.assertEqual(cmd.command.stdout, '')
+
     def test_run_failure(self):
         cmd = self.make_command(DummyCommand, {})
         self.assertState(
@@ -36,9 +36,14 @@ from buildbot_worker.test.util import command
 if sys.version_info >= (3, 6):
     import msgpack
     # pylint: disable=ungrouped-imports
+    from autobahn.websocket.compress import PerMessageDeflateOffer
+    from autobahn.websocket.compress import PerMessageDeflateResponse
+    from autobahn.websocket.compress import PerMessageDeflateResponseAccept
+    from buildbot_worker.msgpack import accept_compression
     from buildbot_worker.msgpack import decode_http_authorization_header
     from buildbot_worker.msgpack import encode_http_authorization_header
     from buildbot_worker.msgpack import BuildbotWebSocketClientProtocol
+    from buildbot_worker.msgpack import ConnectionLostError
     from buildbot_worker.pb import BotMsgpack  # pylint: disable=ungrouped-imports
 
 
@@ -85,6 +90,134 @@ class TestHttpAuthorization(unittest.TestCase):
             decode_http_authorization_header(value)
 
 
+class TestCompression(unittest.TestCase):
+    if sys.version_info < (3, 6):
+        skip = "Not python 3.6 or newer"
+
+    def test_worker_offers_compression(self):
+        worker = pb.Worker('mstr', 9010, 'me', 'pwd', '/s', 10,
+                           protocol='msgpack_experimental_v7', compression='zlib')
+        offer, = worker.bf.perMessageCompressionOffers
+        self.assertIsInstance(offer, PerMessageDeflateOffer)
+
+    def test_worker_no_compression(self):
+        worker = pb.Worker('mstr', 9010, 'me', 'pwd', '/s', 10,
+                           protocol='msgpack_experimental_v7')
+        self.assertEqual(worker.bf.perMessageCompressionOffers, [])
+
+    def test_accept_compression(self):
+        response = PerMessageDeflateResponse(False, False, None, None)
+        self.assertIsInstance(accept_compression(response), PerMessageDeflateResponseAccept)
+        self.assertIsNone(accept_compression(mock.Mock()))
+
+
+class TestCommandStreams(unittest.TestCase):
+    if sys.version_info < (3, 6):
+        skip = "Not python 3.6 or newer"
+
+    def setUp(self):
+        self.protocol = BuildbotWebSocketClientProtocol()
+        self.protocol.factory = mock.Mock()
+        self.protocol.onOpen()
+        self.sent = []
+
+        def send_message(payload, isBinary):
+            self.sent.append(msgpack.unpackb(payload, raw=False))
+
+        self.protocol.sendMessage = send_message
+
+    def sent_ops(self):
+        ops = [(msg['op'], msg['command_id'], msg.get('update_number')) for msg in self.sent]
+        self.sent[:] = []
+        return ops
+
+    def respond(self, seq_number, result=None):
+        self.protocol.onMessage(msgpack.packb({'op': 'response', 'seq_number': seq_number,
+                                               'result': result}), True)
+
+    def ack(self, command_id, update_number):
+        self.protocol.onMessage(msgpack.packb({'op': 'ack_updates', 'seq_number': 0,
+                                               'command_id': command_id,
+                                               'update_number': update_number}), True)
+
+    def test_set_worker_settings(self):
+        self.protocol.onMessage(msgpack.packb({
+            'op': 'set_worker_settings', 'seq_number': 0,
+            'args': {'buffer_size': 1, 'buffer_timeout': 1, 'newline_re': '\n',
+                     'max_line_length': 1, 'update_window': 4}}), True)
+        self.assertEqual(self.protocol.update_window, 4)
+
+    def test_updates_with_response(self):
+        # the master does not acknowledge the updates in batches
+        d = self.protocol.send_command_update('a', ['update'])
+        self.assertEqual(self.sent, [{'op': 'update', 'args': ['update'], 'command_id': 'a',
+                                      'seq_number': 0}])
+        self.assertFalse(d.called)
+        self.respond(0)
+        self.assertTrue(d.called)
+
+    def test_updates_window(self):
+        self.protocol.update_window = 2
+        for i in range(3):
+            d = self.protocol.send_command_update('a', ['update', i])
+            self.assertTrue(d.called)
+        self.assertEqual(self.sent_ops(), [('update_stream', 'a', 0), ('update_stream', 'a', 1)])
+
+        # the other commands are not blocked
+        self.protocol.send_command_update('b', ['update'])
+        self.assertEqual(self.sent_ops(), [('update_stream', 'b', 0)])
+
+        self.ack('a', 0)
+        self.assertEqual(self.sent_ops(), [('update_stream', 'a', 2)])
+        # the acknowledgements do not get a response
+        self.ack('a', 2)
+        self.ack('unknown', 0)
+        self.assertEqual(self.sent, [])
+
+    def test_messages_after_updates(self):
+        self.protocol.update_window = 1
+        self.protocol.send_command_update('a', ['update', 0])
+        self.protocol.send_command_update('a', ['update', 1])
+        d = self.protocol.get_command_message_result({'op': 'complete', 'args': None,
+                                                      'command_id': 'a'})
+        self.assertEqual(self.sent_ops(), [('update_stream', 'a', 0)])
+        # the window only limits the updates, the other messages follow them
+        self.ack('a', 0)
+        self.assertEqual(self.sent_ops(), [('update_stream', 'a', 1), ('complete', 'a', None)])
+        self.respond(2, 'done')
+        self.assertEqual(self.successResultOf(d), 'done')
+
+    def test_streams_sent_in_turn(self):
+        self.protocol.update_window = 10
+        self.protocol.pauseProducing()
+        for i in range(3):
+            self.protocol.send_command_update('a', ['update', i])
+        self.protocol.get_command_message_result({'op': 'update_upload_file_write',
+                                                  'args': b'data', 'command_id': 'b'})
+        self.protocol.send_command_update('c', ['update'])
+        self.assertEqual(self.sent, [])
+
+        self.protocol.resumeProducing()
+        self.assertEqual(self.sent_ops(), [
+            ('update_stream', 'a', 0), ('update_upload_file_write', 'b', None),
+            ('update_stream', 'c', 0), ('update_stream', 'a', 1), ('update_stream', 'a', 2)])
+
+    def test_connection_lost(self):
+        self.protocol.pauseProducing()
+        d = self.protocol.get_command_message_result({'op': 'complete', 'args': None,
+                                                      'command_id': 'a'})
+        self.protocol.onClose(False, None, 'lost')
+        self.failureResultOf(d, ConnectionLostError)
+        self.assertEqual(self.protocol.command_streams, {})
+
+    def test_remove_command_stream(self):
+        self.protocol.get_command_message_result({'op': 'complete', 'args': None,
+                                                  'command_id': 'a'})
+        self.protocol.remove_command_stream('a')
+        self.protocol.remove_command_stream('a')
+        self.assertEqual(self.protocol.command_streams, {})
+
+
 class TestException(Exception):
     pass
 
@@ -141,6 +141,19 @@ class TestRunProcess(BasedirMixin, unittest.TestCase):
         self.assertTrue(('rc', 0) in self.updates, self.show())
         self.assertEqual(s.stdout, nl('hello\n'))
 
+    @defer.inlineCallbacks
+    def testKeepStdoutSpilled(self):
+        s = runprocess.RunProcess(stdoutCommand('hello'), self.basedir, 'utf-8', self.send_update,
+                                  keepStdout=True)
+        s.keepMaxMemory = 2
+
+        yield s.start()
+
+        self.assertTrue(s.stdout_buffer.spilled)
+        self.assertEqual(s.stdout, nl('hello\n'))
+        s.close_kept_output()
+        self.assertFalse(s.stdout_buffer.spilled)
+
     @defer.inlineCallbacks
     def testStderr(self):
         s = runprocess.RunProcess(stderrCommand("hello"), self.basedir, 'utf-8', self.send_update)
@@ -980,3 +993,116 @@ class TestLogFileWatcher(BasedirMixin, unittest.TestCase):
         finally:
             lf.stop()
             os.remove(f.name)
+
+    def test_read_size(self):
+        rp = self.makeRP()
+        test_filename = 'test_runprocess_test_read_size.log'
+
+        try:
+            lf = runprocess.LogFileWatcher(rp, 'test', test_filename,
+                                           follow=False, poll=False)
+            data = b'x' * (lf.MAX_READ_SIZE + lf.MIN_READ_SIZE)
+            with open(test_filename, 'wb') as f:
+                f.write(data)
+            lf.poll()
+            # all the data appended to the file is read at once, up to MAX_READ_SIZE
+            self.assertEqual([len(u[1][1]) for u in self.updates],
+                             [lf.MAX_READ_SIZE, lf.MIN_READ_SIZE])
+        finally:
+            lf.stop()
+            os.remove(f.name)
+
+
+class TestLogFileNotifier(BasedirMixin, unittest.TestCase):
+
+    if not runprocess.LogFileNotifier.isSupported():
+        skip = "inotify is not supported on this platform"
+
+    def setUp(self):
+        self.setUpBasedir()
+        os.makedirs(self.basedir)
+        self.updates = []
+        self.notifier = runprocess.LogFileNotifier()
+        self.addCleanup(self.notifier.close)
+
+    def tearDown(self):
+        self.tearDownBasedir()
+
+    def send_update(self, status):
+        for st in status:
+            self.updates.append(st)
+
+    def makeWatcher(self, filename):
+        rp = runprocess.RunProcess(stdoutCommand('hello'), self.basedir, 'utf-8',
+                                   self.send_update)
+        return runprocess.LogFileWatcher(rp, 'test', filename, notifier=self.notifier)
+
+    @defer.inlineCallbacks
+    def waitFor(self, condition):
+        # much shorter than POLL_INTERVAL, only the notifications can be that fast
+        for _ in range(100):
+            if condition():
+                return
+            yield task.deferLater(reactor, 0.01, lambda: None)
+        self.fail("timed out")
+
+    @defer.inlineCallbacks
+    def test_notified_when_file_grows(self):
+        filename = os.path.join(self.basedir, 'test.log')
+        lf = self.makeWatcher(filename)
+        lf.start()
+        self.addCleanup(lf.stop)
+        self.assertTrue(lf.notified)
+        self.assertEqual(lf.poller.interval, lf.NOTIFIED_POLL_INTERVAL)
+
+        with open(filename, 'wb') as f:
+            f.write(b'hello\n')
+        yield self.waitFor(lambda: self.updates)
+        self.assertEqual(self.updates, [('log', ('test', u'hello\n'))])
+
+        with open(filename, 'ab') as f:
+            f.write(b'world\n')
+        yield self.waitFor(lambda: len(self.updates) == 2)
+        self.assertEqual(self.updates[1], ('log', ('test', u'world\n')))
+
+    @defer.inlineCallbacks
+    def test_several_files_in_directory(self):
+        watchers = [self.makeWatcher(os.path.join(self.basedir, name))
+                    for name in ('a.log', 'b.log')]
+        for lf in watchers:
+            lf.start()
+            self.addCleanup(lf.stop)
+
+        with open(os.path.join(self.basedir, 'b.log'), 'wb') as f:
+            f.write(b'b\n')
+        yield self.waitFor(lambda: self.updates)
+        self.assertFalse(watchers[0].started)
+        self.assertTrue(watchers[1].started)
+
+    def test_missing_directory(self):
+        lf = self.makeWatcher(os.path.join(self.basedir, 'missing', 'test.log'))
+        lf.start()
+        self.addCleanup(lf.stop)
+        self.assertFalse(lf.notified)
+        self.assertEqual(lf.poller.interval, lf.POLL_INTERVAL)
+
+    @defer.inlineCallbacks
+    def test_directory_removed(self):
+        subdir = os.path.join(self.basedir, 'logs')
+        os.makedirs(subdir)
+        lf = self.makeWatcher(os.path.join(subdir, 'test.log'))
+        lf.start()
+        self.addCleanup(lf.stop)
+        self.assertTrue(lf.notified)
+
+        os.rmdir(subdir)
+        # the watcher goes back to polling
+        yield self.waitFor(lambda: not lf.notified)
+        self.assertEqual(lf.poller.interval, lf.POLL_INTERVAL)
+
+    def test_stop_unwatches(self):
+        lf = self.makeWatcher(os.path.join(self.basedir, 'test.log'))
+        lf.start()
+        lf.stop()
+        self.assertFalse(lf.notified)
+        self.assertNotIn(lf, sum(self.notifier._watchers.values(), []))
@@ -493,6 +493,7 @@ class TestCreateWorker(misc.StdoutAssertionsMixin, unittest.TestCase):
         "protocol": "pb",
         "maxretries": None,
         "proxy-connection-string": None,
+        "compression": None,
 
         # arguments
         "host": "masterhost",
@@ -629,6 +630,7 @@ class TestCreateWorker(misc.StdoutAssertionsMixin, unittest.TestCase):
             useTls=options["use-tls"],
             delete_leftover_dirs=options["delete-leftover-dirs"],
             proxy_connection_string=options["proxy-connection-string"],
+            compression=options["compression"],
             )
 
         # check that Worker instance attached to application
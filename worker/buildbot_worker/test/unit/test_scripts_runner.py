@@ -181,7 +181,7 @@ class TestCreateWorkerOptions(OptionsMixin, unittest.TestCase):
         opts = self.parse("--force", "--relocatable", "--no-logrotate",
                           "--keepalive=4", "--umask=0o22",
                           "--maxdelay=3", "--numcpus=4", "--log-size=2", "--log-count=1",
-                          "--allow-shutdown=file", *self.req_args)
+                          "--allow-shutdown=file", "--compression=zlib", *self.req_args)
         self.assertOptions(opts,
                            {"force": True,
                             "relocatable": True,
@@ -192,6 +192,7 @@ class TestCreateWorkerOptions(OptionsMixin, unittest.TestCase):
                             "log-size": 2,
                             "log-count": "1",
                             "allow-shutdown": "file",
+                            "compression": "zlib",
                             "basedir": "bdir",
                             "host": "mstr",
                             "port": 5678,
@@ -238,6 +239,10 @@ class TestCreateWorkerOptions(OptionsMixin, unittest.TestCase):
                        "allow-shutdown needs to be one of 'signal' or 'file'"):
             self.parse("--allow-shutdown=X", *self.req_args)
 
+    def test_inv_compression(self):
+        with self.assertRaisesRegex(usage.UsageError, "compression needs to be 'zlib'"):
+            self.parse("--compression=X", *self.req_args)
+
     def test_too_few_args(self):
         with self.assertRaisesRegex(usage.UsageError,
                                     "incorrect number of arguments"):
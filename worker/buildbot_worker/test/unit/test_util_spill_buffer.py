@@ -0,0 +1,64 @@
+# This file is part of Buildbot.  Buildbot is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright Buildbot Team Members
+
+from __future__ import absolute_import
+from __future__ import print_function
+
+from twisted.trial import unittest
+
+from buildbot_worker.util.spill_buffer import SpillBuffer
+
+
+class TestSpillBuffer(unittest.TestCase):
+
+    def test_in_memory(self):
+        buf = SpillBuffer(max_memory=10)
+        buf.append(u'abc')
+        buf.append(u'')
+        buf.append(u'def')
+        self.assertFalse(buf.spilled)
+        self.assertEqual(len(buf), 6)
+        self.assertEqual(list(buf.chunks()), [u'abc', u'def'])
+        self.assertEqual(buf.getvalue(), u'abcdef')
+
+    def test_spilled(self):
+        buf = SpillBuffer(max_memory=10)
+        self.addCleanup(buf.close)
+        buf.append(u'0123456789')
+        self.assertFalse(buf.spilled)
+        buf.append(u'\r\n\xe9')
+        self.assertTrue(buf.spilled)
+        buf.append(u'end')
+        self.assertEqual(len(buf), 16)
+        self.assertEqual(buf.getvalue(), u'0123456789\r\n\xe9end')
+        self.assertEqual(list(buf.chunks(size=6)), [u'012345', u'6789\r\n', u'\xe9end'])
+
+    def test_append_while_reading_chunks(self):
+        buf = SpillBuffer(max_memory=2)
+        self.addCleanup(buf.close)
+        buf.append(u'abcd')
+        chunks = []
+        for chunk in buf.chunks(size=2):
+            chunks.append(chunk)
+            if len(chunks) == 1:
+                buf.append(u'ef')
+        self.assertEqual(chunks, [u'ab', u'cd', u'ef'])
+
+    def test_close(self):
+        buf = SpillBuffer(max_memory=2)
+        buf.append(u'abcd')
+        buf.close()
+        self.assertFalse(buf.spilled)
+        self.assertEqual(buf.getvalue(), u'')
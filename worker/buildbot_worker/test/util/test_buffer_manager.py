@@ -227,6 +227,36 @@ class BufferManager(TestReactorMixin, unittest.TestCase):
             [("stdout", ("1\n2\n3\n4\n", [1, 3, 5, 7], [1.0, 2.0, 3.0, 4.0]))]
         ])
 
+    def test_append_many_messages_same_logname_joined(self):
+        manager = buffer_manager.BufferManager(self.reactor, self.message_consumer, 10000, 5)
+
+        first_line_info = ("0\n", [1], [0.0])
+        manager.append("stdout", first_line_info)
+        for i in range(1, 100):
+            manager.append("stdout", ("{0}\n".format(i % 10), [1], [float(i)]))
+        self.assert_sent_messages([])
+
+        # the appended messages are not modified
+        self.assertEqual(first_line_info, ("0\n", [1], [0.0]))
+
+        manager.flush()
+        self.assert_sent_messages([
+            [("stdout", ("0\n1\n2\n3\n4\n5\n6\n7\n8\n9\n" * 10,
+                         list(range(1, 200, 2)), [float(i) for i in range(100)]))]
+        ])
+
+    def test_append_many_messages_same_logname_log_joined_timeout(self):
+        manager = buffer_manager.BufferManager(self.reactor, self.message_consumer, 10000, 5)
+
+        for i in range(3):
+            manager.append("log", ("log_test", ("{0}{0}\n".format(i), [2], [float(i)])))
+        self.assert_sent_messages([])
+
+        self.reactor.advance(5)
+        self.assert_sent_messages([
+            [("log", ("log_test", ("00\n11\n22\n", [2, 5, 8], [0.0, 1.0, 2.0])))]
+        ])
+
     def test_append_three_messages_not_same_logname_log_not_joined(self):
         manager = buffer_manager.BufferManager(self.reactor, self.message_consumer, 70, 5)
 
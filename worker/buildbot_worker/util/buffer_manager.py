@@ -13,6 +13,41 @@
 #
 # Copyright Buildbot Team Members
 
+from array import array
+
+
+class JoinedLineInfo:
+
+    """
+    Line information of consecutive messages of the same log.  The text fragments and the offsets
+    are accumulated, and only joined into a single message by get(), when the buffer is sent:
+    joining them on every append would copy the whole text again each time.
+    """
+
+    __slots__ = ['fragments', 'length', 'line_indexes', 'line_times']
+
+    def __init__(self, line_info):
+        text, line_indexes, line_times = line_info
+        self.fragments = [text]
+        self.length = len(text)
+        self.line_indexes = array('l', line_indexes)
+        self.line_times = array('d', line_times)
+
+    def append(self, line_info):
+        text, line_indexes, line_times = line_info
+        offset = self.length
+        self.fragments.append(text)
+        self.length += len(text)
+        if len(line_indexes) == 1:
+            # the most frequent case, when the process outputs a line at a time
+            self.line_indexes.append(offset + line_indexes[0])
+        else:
+            self.line_indexes.extend([offset + index for index in line_indexes])
+        self.line_times.extend(line_times)
+
+    def get(self):
+        return (u''.join(self.fragments), self.line_indexes.tolist(), self.line_times.tolist())
+
 
 class BufferManager:
     def __init__(self, reactor, message_consumer, buffer_size, buffer_timeout):
@@ -25,19 +60,10 @@ class BufferManager:
         self._message_consumer = message_consumer
 
     def join_line_info(self, previous_line_info, new_line_info):
-        previous_line_text = previous_line_info[0]
-        len_previous_line_text = len(previous_line_text)
-        new_line_text = previous_line_text + new_line_info[0]
-
-        new_line_indexes = previous_line_info[1]
-        for index in new_line_info[1]:
-            new_line_indexes.append(len_previous_line_text + index)
-
-        new_time_indexes = previous_line_info[2]
-        for time in new_line_info[2]:
-            new_time_indexes.append(time)
-
-        return (new_line_text, new_line_indexes, new_time_indexes)
+        if not isinstance(previous_line_info, JoinedLineInfo):
+            previous_line_info = JoinedLineInfo(previous_line_info)
+        previous_line_info.append(new_line_info)
+        return previous_line_info
 
     def buffered_append_maybe_join_lines(self, logname, msg_data):
         # if logname is the same as before: join message's line information with previous one
@@ -155,8 +181,19 @@ class BufferManager:
             self.send_message([(logname, msg_data)])
             pos_start = pos_end
 
+    def get_buffered_messages(self):
+        messages = []
+        for logname, data in self._buffered:
+            if logname == "log":
+                if isinstance(data[1], JoinedLineInfo):
+                    data = (data[0], data[1].get())
+            elif isinstance(data, JoinedLineInfo):
+                data = data.get()
+            messages.append((logname, data))
+        return messages
+
     def send_message_from_buffer(self):
-        self.send_message(self._buffered)
+        self.send_message(self.get_buffered_messages())
         self._buffered = []
         self._buflen = 0
 
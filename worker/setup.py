@@ -116,6 +116,7 @@ setup_args = {
         "buildbot_worker.monkeypatches",
     ] + ([] if BUILDING_WHEEL else [  # skip tests for wheels (save 40% of the archive)
         "buildbot_worker.test",
+        "buildbot_worker.test.benchmarks",
         "buildbot_worker.test.fake",
         "buildbot_worker.test.unit",
         "buildbot_worker.test.util",